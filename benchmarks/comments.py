@@ -0,0 +1,137 @@
+"""Benchmark of comment threads, run with `python -m benchmarks.comments`
+against a migrated (scratch) database.
+
+Adds a post with COMMENTS comments (threads of THREAD_SIZE comments on
+average with two levels of replies) and reports Postgres time of reading
+the first and the last page of threads, in full and collapsed mode.
+Page costs the same regardless of its position and number of comments
+of the post, as both queries are index range scans.
+"""
+import asyncio
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from dw_blog.db.db import engine
+from dw_blog.models.blog import Blog
+from dw_blog.models.comment import Comment
+from dw_blog.models.post import Post
+from dw_blog.models.user import User
+from dw_blog.queries.comment import PATH_END, comment_path_segment, get_comments_range_query, get_top_comments_query
+from dw_blog.schemas.common import SortOrder, UserType
+
+COMMENTS = 50000
+THREAD_SIZE = 50
+PAGE = 10
+REPEATS = 20
+
+
+def comment_rows(post_id: uuid.UUID, author_id: uuid.UUID) -> list:
+    rows = []
+    start = datetime(2026, 1, 1)
+    parents = []
+    while len(rows) < COMMENTS:
+        # New thread or a reply to a comment of the current thread
+        parent = random.choice(parents) if parents and random.random() > 1 / THREAD_SIZE else None
+        if parent is None:
+            parents = []
+        comment_id = uuid.uuid4()
+        date_created = start + timedelta(seconds=len(rows))
+        segment = comment_path_segment(comment_id=comment_id, date_created=date_created)
+        row = {
+            "id": comment_id,
+            "post_id": post_id,
+            "author_id": author_id,
+            "parent_id": parent["id"] if parent else None,
+            "path": parent["path"] + segment if parent else segment,
+            "depth": parent["depth"] + 1 if parent else 0,
+            "replies_count": 0,
+            "text": f"Comment {len(rows)}",
+            "date_created": date_created,
+            "date_modified": date_created,
+        }
+        if parent:
+            parent["replies_count"] += 1
+        if row["depth"] < 2:
+            parents.append(row)
+        rows.append(row)
+    return rows
+
+
+async def seed(connection: AsyncConnection) -> uuid.UUID:
+    user_id, blog_id, post_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    await connection.execute(insert(User).values(
+        id=user_id, nickname=f"bench_{user_id.hex[:8]}", email=f"{user_id.hex[:8]}@bench.com",
+        password="bench", user_type=UserType.regular,
+    ))
+    await connection.execute(insert(Blog).values(
+        id=blog_id, name=f"Bench {blog_id.hex[:8]}", archived=False,
+        date_created=datetime.utcnow(), date_modified=datetime.utcnow(),
+    ))
+    await connection.execute(insert(Post).values(
+        id=post_id, blog_id=blog_id, title="Bench post", body="b" * 60, published=True,
+        date_created=datetime.utcnow(), date_modified=datetime.utcnow(), comments_count=COMMENTS,
+    ))
+    rows = comment_rows(post_id=post_id, author_id=user_id)
+    for i in range(0, len(rows), 5000):
+        await connection.execute(insert(Comment), rows[i:i + 5000])
+    await connection.exec_driver_sql("ANALYZE comment")
+    return post_id
+
+
+async def execution_time(connection: AsyncConnection, q, params: dict) -> float:
+    compiled = q.compile(dialect=connection.dialect)
+    values = compiled.construct_params(params)
+    result = await connection.exec_driver_sql(
+        f"EXPLAIN (ANALYZE, FORMAT JSON) {compiled}",
+        [tuple(values[key] for key in compiled.positiontup)],
+    )
+    plan = result.scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return plan[0]["Planning Time"] + plan[0]["Execution Time"], plan[0]["Plan"]["Actual Rows"]
+
+
+async def page_time(connection: AsyncConnection, post_id: uuid.UUID, cursor, replies_limit) -> tuple:
+    q, params = get_top_comments_query(post_id=post_id, limit=PAGE, cursor=cursor, sort_order=SortOrder.descending)
+    total, _ = await execution_time(connection, q, params)
+    paths = (await connection.execute(q, params)).scalars().all()
+    q, params = get_comments_range_query(
+        post_id=post_id,
+        low=min(paths),
+        high=max(paths) + PATH_END,
+        depth=0,
+        replies_limit=replies_limit,
+    )
+    range_time, rows = await execution_time(connection, q, params)
+    return total + range_time, rows
+
+
+async def bench():
+    async with engine.begin() as connection:
+        post_id = await seed(connection)
+
+    async with engine.connect() as connection:
+        # Second oldest top level comment, page after it holds the oldest one
+        q, params = get_top_comments_query(post_id=post_id, limit=2, sort_order=SortOrder.ascending)
+        last_page_cursor = (await connection.execute(q, params)).scalars().all()[-1]
+        cases = [
+            ("first page", None, None),
+            ("first page, 3 replies", None, 3),
+            ("last page", last_page_cursor, None),
+            ("last page, 3 replies", last_page_cursor, 3),
+        ]
+        for name, cursor, replies_limit in cases:
+            times = []
+            for _ in range(REPEATS):
+                elapsed, rows = await page_time(connection, post_id, cursor, replies_limit)
+                times.append(elapsed)
+            print(f"{name}: {sorted(times)[len(times) // 2]:.2f}ms ({rows} rows)")
+
+
+if __name__ == "__main__":
+    engine.echo = False
+    asyncio.run(bench())
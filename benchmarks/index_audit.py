@@ -0,0 +1,252 @@
+"""Missing index audit, run with `python -m benchmarks.index_audit`
+against a migrated (scratch) database.
+
+Seeds a generated dataset of DATASET rows per table, EXPLAINs queries
+built by the query builders for the filters used by the API and reports
+sequential scans of tables bigger than MIN_ROWS. Exits with status 1 if
+any not listed in EXPECTED_SCANS is found, so the audit can be run after
+changes of queries or indexes.
+"""
+import asyncio
+import json
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from dw_blog.db.db import engine
+from dw_blog.models.blog import Blog, BlogAuthors, BlogLikes, BlogSubscribers
+from dw_blog.models.category import Category, CategoryBlogs
+from dw_blog.models.post import Post, PostAuthors, PostFavourites, PostLikers
+from dw_blog.models.tag import Tag, TagPosts, TagSubscribers
+from dw_blog.models.trending import BlogTrending, PostTrending
+from dw_blog.models.user import User
+from dw_blog.queries.blog import (
+    check_like_query,
+    check_subscription_query,
+    count_blog_authors_query,
+    get_authors_blogs_query,
+    get_batch_blogs_query,
+    get_listed_blogs_query,
+    get_single_blog_query,
+    is_author_query,
+)
+from dw_blog.queries.category import get_blogs_for_category_query, get_listed_categories_query
+from dw_blog.queries.post import get_listed_posts_query, get_listed_user_posts_query, get_posts_permissions_query
+from dw_blog.queries.tag import (
+    get_batch_tags_query,
+    get_listed_tags_query,
+    get_single_tag_query,
+    tag_subscription_query,
+)
+from dw_blog.queries.trending import add_missing_trending_scores_query
+from dw_blog.schemas.common import SortOrder, UserType
+from dw_blog.schemas.blog import SortBlogBy
+from dw_blog.schemas.category import SortCategoryBy
+from dw_blog.schemas.tag import SortTagBy
+
+# Rows of the main tables, link tables get a few rows per entity
+DATASET = {"user": 20000, "blog": 20000, "category": 200, "tag": 20000, "post": 50000}
+MIN_ROWS = 1000
+CHUNK = 5000
+# Listings ordered by values computed for every row have to read the whole table
+EXPECTED_SCANS = {
+    "blogs by likers": {"blog"},
+    "blogs by subscribers": {"blog"},
+    "tags by most_subscribers": {"tag"},
+}
+
+
+def _dates(count: int) -> Iterator[datetime]:
+    start = datetime(2025, 1, 1)
+    for i in range(count):
+        yield start + timedelta(minutes=i)
+
+
+def _links(
+    rng: random.Random,
+    left: List[uuid.UUID],
+    right: List[uuid.UUID],
+    per_left: int,
+    left_key: str,
+    right_key: str,
+) -> List[dict]:
+    rows = []
+    for left_id in left:
+        right_ids = set()
+        for right_id in rng.choices(right, k=per_left):
+            if right_id not in right_ids:
+                right_ids.add(right_id)
+                rows.append({left_key: left_id, right_key: right_id})
+    return rows
+
+
+async def _insert(connection: AsyncConnection, model, rows: List[dict]):
+    for i in range(0, len(rows), CHUNK):
+        await connection.execute(insert(model), rows[i:i + CHUNK])
+
+
+async def seed(
+    connection: AsyncConnection,
+    dataset: Dict[str, int] = DATASET,
+    rng: Optional[random.Random] = None,
+) -> Dict[str, List[uuid.UUID]]:
+    """Inserts generated dataset, the same for the same seed of rng
+    Args:
+        connection (AsyncConnection): connection of the transaction to insert in
+        dataset (Dict[str, int]): rows of the main tables
+        rng (Optional[random.Random]): source of ids, names and links
+    Returns:
+        Dict[str, List[uuid.UUID]]: ids of the inserted rows per table
+    """
+    rng = rng or random.Random()
+    ids = {
+        table: [uuid.UUID(int=rng.getrandbits(128), version=4) for _ in range(count)]
+        for table, count in dataset.items()
+    }
+    run = f"{rng.getrandbits(32):08x}"
+    await _insert(connection, User, [
+        {"id": user_id, "nickname": f"audit_{run}_{i}", "email": f"audit_{run}_{i}@audit.com",
+         "password": "audit", "user_type": UserType.regular}
+        for i, user_id in enumerate(ids["user"])
+    ])
+    await _insert(connection, Blog, [
+        {"id": blog_id, "name": f"Audit {run} {i}", "archived": i % 10 == 0,
+         "date_created": date, "date_modified": date}
+        for i, (blog_id, date) in enumerate(zip(ids["blog"], _dates(dataset["blog"])))
+    ])
+    await _insert(connection, Category, [
+        {"id": category_id, "name": f"Audit {run} {i}", "approved": True,
+         "date_created": date, "date_modified": date}
+        for i, (category_id, date) in enumerate(zip(ids["category"], _dates(dataset["category"])))
+    ])
+    await _insert(connection, Tag, [
+        {"id": tag_id, "name": f"Audit {run} {i}", "blog_id": rng.choice(ids["blog"]),
+         "date_created": date, "date_modified": date}
+        for i, (tag_id, date) in enumerate(zip(ids["tag"], _dates(dataset["tag"])))
+    ])
+    await _insert(connection, Post, [
+        {"id": post_id, "title": f"Audit {run} {i}", "body": "b" * 60, "published": True,
+         "blog_id": rng.choice(ids["blog"]), "date_created": date, "date_modified": date, "comments_count": 0}
+        for i, (post_id, date) in enumerate(zip(ids["post"], _dates(dataset["post"])))
+    ])
+    await _insert(connection, BlogAuthors, _links(rng, ids["blog"], ids["user"], 2, "blog_id", "author_id"))
+    await _insert(connection, BlogLikes, _links(rng, ids["blog"], ids["user"], 10, "blog_id", "liker_id"))
+    await _insert(connection, BlogSubscribers, _links(rng, ids["blog"], ids["user"], 10, "blog_id", "subscriber_id"))
+    await _insert(connection, CategoryBlogs, _links(rng, ids["blog"], ids["category"], 2, "blog_id", "category_id"))
+    await _insert(connection, TagSubscribers, _links(rng, ids["tag"], ids["user"], 3, "tag_id", "subscriber_id"))
+    await _insert(connection, PostAuthors, _links(rng, ids["post"], ids["user"], 1, "post_id", "author_id"))
+    await _insert(connection, PostLikers, _links(rng, ids["post"], ids["user"], 5, "post_id", "liker_id"))
+    await _insert(connection, PostFavourites, _links(rng, ids["post"], ids["user"], 1, "post_id", "favouriter_id"))
+    await _insert(connection, TagPosts, _links(rng, ids["post"], ids["tag"], 2, "post_id", "tag_id"))
+    # Posts and blogs created through the API get their trending rows with them
+    for model in (PostTrending, BlogTrending):
+        await connection.execute(add_missing_trending_scores_query(model=model))
+    await connection.exec_driver_sql("ANALYZE")
+    return ids
+
+
+def audited_queries(ids: Dict[str, List[uuid.UUID]]) -> Iterator[tuple]:
+    """Yields name, query and params of every audited query. Count queries
+    of listings are left out, unfiltered counts have to read whole tables.
+    """
+    user_id, blog_id, tag_id, category_id = ids["user"][0], ids["blog"][0], ids["tag"][0], ids["category"][0]
+    current_user = {"user_id": user_id}
+    page = {"limit": 10, "offset": 0}
+
+    yield "single blog", get_single_blog_query(blog_id=blog_id), None
+    yield "batch blogs", get_batch_blogs_query(blog_ids=ids["blog"][:10]), None
+    for sort_by in SortBlogBy:
+        q, _, params = get_listed_blogs_query(**page, sort_by=sort_by, sort_order=SortOrder.descending)
+        yield f"blogs by {sort_by.value}", q, params
+    q, _, params = get_listed_blogs_query(**page, author_id=user_id)
+    yield "blogs of author", q, params
+    q, _, params = get_listed_blogs_query(**page, categories_ids=[category_id])
+    yield "blogs of category", q, params
+    yield "blogs limit of authors", get_authors_blogs_query(authors_ids=ids["user"][:5], blog_id=blog_id), None
+    yield "authors limit of blog", count_blog_authors_query(blog_id=blog_id), None
+    yield "is author", is_author_query(blog_id=blog_id, author_id=user_id), None
+    yield "blog like", check_like_query(blog_id=blog_id, current_user=current_user), None
+    yield "blog subscription", check_subscription_query(blog_id=blog_id, current_user=current_user), None
+
+    for sort_by in SortCategoryBy:
+        q, _, params = get_listed_categories_query(**page, sort_by=sort_by, sort_order=SortOrder.descending)
+        yield f"categories by {sort_by.value}", q, params
+    yield "blogs for category stats", get_blogs_for_category_query(category_id=category_id), None
+
+    yield "single tag", get_single_tag_query(tag_id=tag_id), None
+    yield "batch tags", get_batch_tags_query(tag_ids=ids["tag"][:10]), None
+    for sort_by in SortTagBy:
+        q, _, params = get_listed_tags_query(**page, sort_by=sort_by, sort_order=SortOrder.descending)
+        yield f"tags by {sort_by.value}", q, params
+    q, _, params = get_listed_tags_query(**page, blog_id=blog_id)
+    yield "tags of blog", q, params
+    q, _, params = get_listed_tags_query(**page, user_id=user_id)
+    yield "tags of subscriber", q, params
+    yield "tag subscription", tag_subscription_query(tag_id=tag_id, current_user=current_user), None
+
+    q, _, params = get_listed_posts_query(**page, published=True, sort_order=SortOrder.descending)
+    yield "posts by date_created", q, params
+    q, _, params = get_listed_posts_query(**page, published=True, blog_id=blog_id, sort_order=SortOrder.descending)
+    yield "posts of blog", q, params
+    q, _, params = get_listed_posts_query(**page, published=True, authors_ids=[user_id])
+    yield "posts of author", q, params
+    q, _, params = get_listed_posts_query(**page, published=True, tags_ids=[tag_id])
+    yield "posts of tag", q, params
+    for liked in (True, False):
+        q, _, params = get_listed_user_posts_query(user_id=user_id, liked=liked)
+        yield f"user posts, liked {liked}", q, params
+    yield "posts permissions", get_posts_permissions_query(posts_ids=ids["post"][:10], user_id=user_id), None
+
+
+def seq_scans(plan: dict) -> Iterator[str]:
+    if plan["Node Type"] == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
+
+
+async def explain(connection: AsyncConnection, q, params) -> dict:
+    compiled = q.compile(dialect=connection.dialect)
+    values = compiled.construct_params(params)
+    result = await connection.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}",
+        [tuple(values[key] for key in compiled.positiontup)],
+    )
+    plan = result.scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return plan[0]["Plan"]
+
+
+async def audit() -> int:
+    async with engine.begin() as connection:
+        ids = await seed(connection)
+
+    found = 0
+    async with engine.connect() as connection:
+        result = await connection.exec_driver_sql(
+            "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace"
+        )
+        sizes = dict(result.all())
+        for name, q, params in audited_queries(ids):
+            plan = await explain(connection, q, params)
+            scanned = {table for table in seq_scans(plan) if sizes.get(table, 0) >= MIN_ROWS}
+            unexpected = sorted(scanned - EXPECTED_SCANS.get(name, set()))
+            found += bool(unexpected)
+            if unexpected:
+                print(f"{name}: seq scan of {', '.join(unexpected)}")
+            elif scanned:
+                print(f"{name}: ok, expected seq scan of {', '.join(sorted(scanned))}")
+            else:
+                print(f"{name}: ok")
+    print(f"{found} queries with sequential scans")
+    return found
+
+
+if __name__ == "__main__":
+    engine.echo = False
+    sys.exit(1 if asyncio.run(audit()) else 0)
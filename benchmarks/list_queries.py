@@ -0,0 +1,97 @@
+"""Benchmark of listing query builders, run with `python -m benchmarks.list_queries`
+against a seeded database (see seed_db.py).
+
+Reports per call Python time of building listing queries and generating
+their cache key (compiled SQL is looked up by it) with and without
+cached templates, and Postgres planning time of filtering
+by ids bound as a single array compared to a chain of OR-ed ANY() conditions.
+"""
+import asyncio
+import json
+import time
+import uuid
+from typing import Optional
+
+from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from dw_blog.db.db import engine
+from dw_blog.queries.post import LISTED_POST_FIELDS, _listed_posts_template, basic_post_queries, get_listed_posts_query
+from dw_blog.schemas.common import SortOrder
+from dw_blog.schemas.post import SortPostBy
+
+ITERATIONS = 2000
+IDS_COUNTS = [1, 5, 10, 20]
+
+
+def filters(i: int) -> dict:
+    return {
+        "limit": 10,
+        "offset": i % 50,
+        "published": True,
+        "tags_ids": [uuid.uuid4() for _ in range(IDS_COUNTS[i % len(IDS_COUNTS)])],
+        "title_search": f"title {i}",
+        "sort_order": SortOrder.descending,
+        "sort_by": SortPostBy.date_created,
+    }
+
+
+def bench_python():
+    # Cached templates, statement objects and their compiled form are reused
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        q_pag, _, _ = get_listed_posts_query(**filters(i))
+        q_pag._generate_cache_key()
+    templates = (time.perf_counter() - start) / ITERATIONS
+
+    # Statement built from scratch on every call
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        shape = filters(i)
+        q_pag, _ = _listed_posts_template.__wrapped__(
+            blog_id=False,
+            published=True,
+            authors_ids=False,
+            tags_ids=True,
+            title_search=True,
+            body_search=False,
+            sort_order=shape["sort_order"],
+            sort_by=shape["sort_by"],
+            fields=LISTED_POST_FIELDS,
+        )
+        q_pag._generate_cache_key()
+    rebuilt = (time.perf_counter() - start) / ITERATIONS
+
+    print(f"Python build + cache key per call: templates {templates * 1e6:.0f}us, rebuilt {rebuilt * 1e6:.0f}us")
+
+
+async def planning_time(connection: AsyncConnection, q, params: Optional[dict] = None) -> float:
+    compiled = q.compile(dialect=connection.dialect)
+    values = compiled.construct_params(params)
+    result = await connection.exec_driver_sql(
+        f"EXPLAIN (SUMMARY, FORMAT JSON) {compiled}",
+        [tuple(values[key] for key in compiled.positiontup)],
+    )
+    plan = result.scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return plan[0]["Planning Time"]
+
+
+async def bench_planning():
+    async with engine.connect() as connection:
+        for count in IDS_COUNTS:
+            ids = [uuid.uuid4() for _ in range(count)]
+
+            array_q, _, params = get_listed_posts_query(limit=10, offset=0, published=True, tags_ids=ids)
+            chain_q, sub_q = basic_post_queries()
+            chain_q = chain_q.where(or_(*[sub_q.c.tags_ids.any(tag_id) for tag_id in ids])).limit(10)
+
+            array_time = await planning_time(connection, array_q, params)
+            chain_time = await planning_time(connection, chain_q)
+            print(f"Planning time for {count} ids: single array {array_time:.3f}ms, OR chain {chain_time:.3f}ms")
+
+
+if __name__ == "__main__":
+    engine.echo = False
+    bench_python()
+    asyncio.run(bench_planning())
@@ -0,0 +1,109 @@
+"""Benchmark of blog recommendations, run with `python -m benchmarks.recommendations`
+against a migrated (scratch) database.
+
+Adds USERS users, BLOGS blogs and INTERACTIONS likes and subscriptions
+(popular blogs and active users take most of them) and reports wall time
+of the batch rebuild of the neighbour table, built aside and swapped in,
+and Postgres time of scoring recommendations of the most active and of
+a median user from it. Rebuild
+grows with pairs of blogs sharing a user, which is bounded by the latest
+RELATED_BLOGS_USER_INTERACTIONS_MAX interactions counted per user, while
+recommendations read only the neighbours of the user's blogs.
+"""
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import text
+
+from benchmarks.comments import execution_time
+from dw_blog.config import Settings
+from dw_blog.db.db import async_session_maker, engine
+from dw_blog.queries.related import get_recommended_blogs_query
+from dw_blog.services.related import RelatedService
+
+settings = Settings()
+
+USERS = 500000
+BLOGS = 50000
+INTERACTIONS = 10000000
+# Share of interactions which are subscriptions, the rest are likes
+SUBSCRIPTIONS_SHARE = 0.3
+REPEATS = 20
+
+# Ids derived from the run and the number of the row, so that interactions
+# are generated in the database without reading the ids back
+ROW_ID = "md5(:run || :table || n)::uuid"
+
+
+async def seed(connection, run: str):
+    await connection.execute(text(f"""
+        INSERT INTO "user" (id, nickname, email, password, user_type)
+        SELECT {ROW_ID}, :run || '_' || n, :run || '_' || n || '@bench.com', 'bench', 'regular'
+        FROM generate_series(1, :count) AS n
+    """), {"run": run, "table": "user", "count": USERS})
+    await connection.execute(text(f"""
+        INSERT INTO blog (id, name, archived, date_created, date_modified)
+        SELECT {ROW_ID}, 'Bench ' || :run || ' ' || n, n % 20 = 0, now(), now()
+        FROM generate_series(1, :count) AS n
+    """), {"run": run, "table": "blog", "count": BLOGS})
+    # Powers of random skew interactions towards low numbers of users and blogs
+    for table, user_column, count in (
+        ("bloglikes", "liker_id", int(INTERACTIONS * (1 - SUBSCRIPTIONS_SHARE))),
+        ("blogsubscribers", "subscriber_id", int(INTERACTIONS * SUBSCRIPTIONS_SHARE)),
+    ):
+        await connection.execute(text(f"""
+            INSERT INTO {table} (blog_id, {user_column}, date_created)
+            SELECT
+                md5(:run || 'blog' || (1 + floor(:blogs * random() ^ 3)))::uuid,
+                md5(:run || 'user' || (1 + floor(:users * random() ^ 2)))::uuid,
+                now() - random() * interval '365 days'
+            FROM generate_series(1, :count)
+            ON CONFLICT DO NOTHING
+        """), {"run": run, "blogs": BLOGS, "users": USERS, "count": count})
+        await connection.exec_driver_sql(f"ANALYZE {table}")
+    await connection.exec_driver_sql('ANALYZE "user", blog')
+
+
+async def bench():
+    run = uuid.uuid4().hex[:8]
+    async with engine.begin() as connection:
+        start = time.perf_counter()
+        await seed(connection, run)
+        print(f"seed: {time.perf_counter() - start:.1f}s")
+
+    async with async_session_maker() as session:
+        interactions = (await session.execute(text(
+            "SELECT (SELECT count(*) FROM bloglikes) + (SELECT count(*) FROM blogsubscribers)"
+        ))).scalar()
+        start = time.perf_counter()
+        # Staging table is built, indexed and analyzed before the swap
+        await RelatedService(session).refresh_blogs()
+        elapsed = time.perf_counter() - start
+        neighbours = (await session.execute(text("SELECT count(*) FROM blogrelated"))).scalar()
+        print(f"rebuild of {interactions} interactions: {elapsed:.1f}s ({neighbours} neighbours)")
+
+    async with engine.connect() as connection:
+        # Activity of users decreases with their number
+        for name, number in (("most active user", 1), ("median user", USERS // 2)):
+            user_id = uuid.UUID((await connection.execute(
+                text("SELECT md5(:run || 'user' || :number)"),
+                {"run": run, "number": str(number)},
+            )).scalar())
+            q = get_recommended_blogs_query(
+                user_id=user_id,
+                like_weight=settings.RELATED_BLOGS_LIKE_WEIGHT,
+                subscribe_weight=settings.RELATED_BLOGS_SUBSCRIBE_WEIGHT,
+                user_interactions_max=settings.RELATED_BLOGS_USER_INTERACTIONS_MAX,
+                limit=10,
+            )
+            times = []
+            for _ in range(REPEATS):
+                elapsed, rows = await execution_time(connection, q, {})
+                times.append(elapsed)
+            print(f"recommendations of {name}: {sorted(times)[len(times) // 2]:.2f}ms ({rows} rows)")
+
+
+if __name__ == "__main__":
+    engine.echo = False
+    asyncio.run(bench())
@@ -1,7 +1,7 @@
 import os
 from pathlib import Path
 
-from pydantic import BaseSettings, DirectoryPath, Field
+from pydantic import BaseSettings, DirectoryPath, Field, root_validator
 
 
 class Settings(BaseSettings):
@@ -15,8 +15,109 @@ class Settings(BaseSettings):
     DATABASE_URL_SYNC: str = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_SERVER}:{DP_PORT}/{DB_NAME}"
     DATABASE_URL_TEST: str = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_SERVER}:{DP_PORT}/{DB_TEST_NAME}"
     DATABASE_URL_TEST_SYNC: str = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_SERVER}:{DP_PORT}/{DB_TEST_NAME}"
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    REPLICA_STICKY_SECONDS: int = int(os.getenv("REPLICA_STICKY_SECONDS", 5))
+    REPLICA_MAX_LAG: int = int(os.getenv("REPLICA_MAX_LAG", 5))
+    REPLICA_LAG_CHECK_INTERVAL: int = int(os.getenv("REPLICA_LAG_CHECK_INTERVAL", 5))
     SECRET_KEY: str = os.getenv("SECRET_KEY", "this_is_a_secret_number_2137")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     TOKEN_EXPIRATION: int = int(os.getenv("TOKEN_EXPIRATION", 720))
     ROOT_DIR: DirectoryPath = Field(Path(__file__).parent.resolve(), const=True)
+    WEB_HOST: str = os.getenv("WEB_HOST", "0.0.0.0")
+    WEB_PORT: int = int(os.getenv("WEB_PORT", 8000))
+    WEB_WORKERS: int = int(os.getenv("WEB_WORKERS", 0))
+    WEB_MAX_REQUESTS: int = int(os.getenv("WEB_MAX_REQUESTS", 10000))
+    WEB_MAX_REQUESTS_JITTER: int = int(os.getenv("WEB_MAX_REQUESTS_JITTER", 1000))
+    WEB_GRACEFUL_TIMEOUT: int = int(os.getenv("WEB_GRACEFUL_TIMEOUT", 30))
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "dev")
+    BATCH_LIMIT: int = int(os.getenv("BATCH_LIMIT", 50))
+    CATEGORY_TOP_BLOGS: int = int(os.getenv("CATEGORY_TOP_BLOGS", 5))
+    CATEGORY_STATS_REFRESH_INTERVAL: int = int(os.getenv("CATEGORY_STATS_REFRESH_INTERVAL", 10))
+    CATEGORY_STATS_FULL_REFRESH_INTERVAL: int = int(os.getenv("CATEGORY_STATS_FULL_REFRESH_INTERVAL", 600))
+    TRENDING_HALF_LIFE: int = int(os.getenv("TRENDING_HALF_LIFE", 24))
+    TRENDING_MIN_SCORE: float = float(os.getenv("TRENDING_MIN_SCORE", 0.01))
+    EXPORT_PARTITION_SIZE: int = int(os.getenv("EXPORT_PARTITION_SIZE", 500))
+    TRENDING_RENORMALISE_INTERVAL: int = int(os.getenv("TRENDING_RENORMALISE_INTERVAL", 3600))
+    POST_EXCERPT_LENGTH: int = int(os.getenv("POST_EXCERPT_LENGTH", 200))
+    POST_WORDS_PER_MINUTE: int = int(os.getenv("POST_WORDS_PER_MINUTE", 200))
+    COMMENT_MAX_DEPTH: int = int(os.getenv("COMMENT_MAX_DEPTH", 10))
+    IMAGES_DIR: Path = Path(os.getenv("IMAGES_DIR", Path(__file__).parent.parent.resolve() / "media" / "images"))
+    IMAGE_MAX_SIZE: int = int(os.getenv("IMAGE_MAX_SIZE", 52428799))
+    IMAGE_UPLOAD_DEADLINE: float = float(os.getenv("IMAGE_UPLOAD_DEADLINE", 300))
+    IMAGE_CACHE_MAX_AGE: int = int(os.getenv("IMAGE_CACHE_MAX_AGE", 31536000))
+    IMAGE_VARIANTS_DIR: Path = Path(
+        os.getenv("IMAGE_VARIANTS_DIR", Path(__file__).parent.parent.resolve() / "media" / "variants")
+    )
+    IMAGE_VARIANTS_CACHE_SIZE: int = int(os.getenv("IMAGE_VARIANTS_CACHE_SIZE", 1024 * 1024 * 1024))
+    IMAGE_VARIANTS_WORKERS: int = int(os.getenv("IMAGE_VARIANTS_WORKERS", 2))
+    PURGE_CHUNK_SIZE: int = int(os.getenv("PURGE_CHUNK_SIZE", 1000))
+    PURGE_THROTTLE: float = float(os.getenv("PURGE_THROTTLE", 0.1))
+    PURGE_CONCURRENCY: int = int(os.getenv("PURGE_CONCURRENCY", 2))
+    JOB_WORKER_IN_PROCESS: bool = os.getenv("JOB_WORKER_IN_PROCESS", "true").lower() == "true"
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", 1))
+    JOB_BATCH_SIZE: int = int(os.getenv("JOB_BATCH_SIZE", 10))
+    JOB_LEASE: int = int(os.getenv("JOB_LEASE", 60))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+    JOB_RETRY_DELAY: float = float(os.getenv("JOB_RETRY_DELAY", 5))
+    JOB_RETRY_MAX_DELAY: float = float(os.getenv("JOB_RETRY_MAX_DELAY", 3600))
+    JOB_RETENTION: int = int(os.getenv("JOB_RETENTION", 86400))
+    JOB_CLEANUP_INTERVAL: int = int(os.getenv("JOB_CLEANUP_INTERVAL", 300))
+    JOB_METRICS_WINDOW: int = int(os.getenv("JOB_METRICS_WINDOW", 300))
+    JOB_COALESCE_LIMIT: int = int(os.getenv("JOB_COALESCE_LIMIT", 1000))
+    SSE_HEARTBEAT_INTERVAL: int = int(os.getenv("SSE_HEARTBEAT_INTERVAL", 15))
+    SSE_RETRY: int = int(os.getenv("SSE_RETRY", 3000))
+    SSE_BUFFER_SIZE: int = int(os.getenv("SSE_BUFFER_SIZE", 100))
+    SSE_REPLAY_SIZE: int = int(os.getenv("SSE_REPLAY_SIZE", 1000))
+    # Default limits of route classes share connections of the primary pool
+    ADMISSION_WRITE_LIMIT: int = int(os.getenv("ADMISSION_WRITE_LIMIT", max(1, (DB_POOL_SIZE + DB_MAX_OVERFLOW) // 5)))
+    ADMISSION_WRITE_QUEUE: int = int(os.getenv("ADMISSION_WRITE_QUEUE", 10))
+    ADMISSION_SEARCH_LIMIT: int = int(os.getenv("ADMISSION_SEARCH_LIMIT", max(1, (DB_POOL_SIZE + DB_MAX_OVERFLOW) // 6)))
+    ADMISSION_SEARCH_QUEUE: int = int(os.getenv("ADMISSION_SEARCH_QUEUE", 4))
+    ADMISSION_AUTH_LIMIT: int = int(os.getenv("ADMISSION_AUTH_LIMIT", max(1, (DB_POOL_SIZE + DB_MAX_OVERFLOW) // 6)))
+    ADMISSION_AUTH_QUEUE: int = int(os.getenv("ADMISSION_AUTH_QUEUE", 6))
+    ADMISSION_EXPORT_LIMIT: int = int(os.getenv("ADMISSION_EXPORT_LIMIT", 1))
+    ADMISSION_EXPORT_QUEUE: int = int(os.getenv("ADMISSION_EXPORT_QUEUE", 2))
+    ADMISSION_READ_LIMIT: int = int(os.getenv(
+        "ADMISSION_READ_LIMIT",
+        DB_POOL_SIZE + DB_MAX_OVERFLOW - ADMISSION_WRITE_LIMIT - ADMISSION_SEARCH_LIMIT - ADMISSION_AUTH_LIMIT
+        - ADMISSION_EXPORT_LIMIT,
+    ))
+    ADMISSION_READ_QUEUE: int = int(os.getenv("ADMISSION_READ_QUEUE", 20))
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 1))
+    ADMISSION_RETRY_AFTER: int = int(os.getenv("ADMISSION_RETRY_AFTER", 1))
+    REQUEST_DEADLINE: float = float(os.getenv("REQUEST_DEADLINE", 30))
+    REQUEST_DEADLINE_MAX: float = float(os.getenv("REQUEST_DEADLINE_MAX", 300))
+    INTERNAL_SECRET: str = os.getenv("INTERNAL_SECRET", "")
+    RELATED_POSTS_TOP_K: int = int(os.getenv("RELATED_POSTS_TOP_K", 20))
+    RELATED_POSTS_TAG_WEIGHT: float = float(os.getenv("RELATED_POSTS_TAG_WEIGHT", 1))
+    RELATED_POSTS_LIKE_WEIGHT: float = float(os.getenv("RELATED_POSTS_LIKE_WEIGHT", 0.5))
+    RELATED_POSTS_REFRESH_INTERVAL: int = int(os.getenv("RELATED_POSTS_REFRESH_INTERVAL", 60))
+    RELATED_POSTS_FULL_REFRESH_INTERVAL: int = int(os.getenv("RELATED_POSTS_FULL_REFRESH_INTERVAL", 86400))
+    RELATED_BLOGS_TOP_K: int = int(os.getenv("RELATED_BLOGS_TOP_K", 50))
+    RELATED_BLOGS_LIKE_WEIGHT: float = float(os.getenv("RELATED_BLOGS_LIKE_WEIGHT", 1))
+    RELATED_BLOGS_SUBSCRIBE_WEIGHT: float = float(os.getenv("RELATED_BLOGS_SUBSCRIBE_WEIGHT", 2))
+    RELATED_BLOGS_USER_INTERACTIONS_MAX: int = int(os.getenv("RELATED_BLOGS_USER_INTERACTIONS_MAX", 200))
+    RELATED_BLOGS_WORK_MEM: str = os.getenv("RELATED_BLOGS_WORK_MEM", "256MB")
+    RELATED_BLOGS_REFRESH_INTERVAL: int = int(os.getenv("RELATED_BLOGS_REFRESH_INTERVAL", 3600))
+    RELATED_BLOGS_SWAP_LOCK_TIMEOUT: str = os.getenv("RELATED_BLOGS_SWAP_LOCK_TIMEOUT", "5s")
+
+    @root_validator(skip_on_failure=True)
+    def admission_limits_fit_pool(cls, values):
+        """Admitted requests have to get a connection of the primary pool,
+        otherwise they wait for the pool instead of being shed. Jobs run
+        in a pool of their own, so they don't count against the limits.
+        """
+        limits = {
+            route_class: values[f"ADMISSION_{route_class}_LIMIT"]
+            for route_class in ("READ", "WRITE", "SEARCH", "AUTH", "EXPORT")
+        }
+        connections = values["DB_POOL_SIZE"] + values["DB_MAX_OVERFLOW"]
+        if min(limits.values()) < 1:
+            raise ValueError(f"Admission limits have to be positive, got {limits}")
+        if sum(limits.values()) > connections:
+            raise ValueError(
+                f"Admission limits {limits} sum to more than {connections} connections of the database pool"
+            )
+        return values
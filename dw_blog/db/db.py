@@ -1,17 +1,46 @@
+import asyncio
+import logging
 import os
 from typing import AsyncGenerator
 
+from fastapi import Request
 from sqlalchemy.orm import sessionmaker
 from sqlmodel import SQLModel, create_engine
 from sqlmodel.ext.asyncio.session import AsyncEngine, AsyncSession
 
 from dw_blog.config import Settings
+from dw_blog.db.replica import ReplicaLagMonitor, ReplicaRouter, get_request_user_id
+from dw_blog.utils.deadline import set_statement_timeout
 
 settings = Settings()
+logger = logging.getLogger(__name__)
 db_url = settings.DATABASE_URL
+replica_urls = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
 
-engine = AsyncEngine(create_engine(db_url, echo=True, future=True))
+pool_options = {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW}
+
+engine = AsyncEngine(create_engine(db_url, echo=True, future=True, **pool_options))
+replica_engines = [AsyncEngine(create_engine(url, echo=True, future=True, **pool_options)) for url in replica_urls]
 async_session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+# Jobs get a pool of their own, for the poll and every job of a batch, so that
+# in-process jobs don't take connections of requests admitted by admission control
+job_engine = AsyncEngine(create_engine(
+    db_url, echo=True, future=True, pool_size=settings.JOB_BATCH_SIZE + 1, max_overflow=0,
+))
+job_session_maker = sessionmaker(job_engine, class_=AsyncSession, expire_on_commit=False)
+
+replica_router = ReplicaRouter(
+    primary=engine,
+    replicas=replica_engines,
+    sticky_seconds=settings.REPLICA_STICKY_SECONDS,
+    max_lag=settings.REPLICA_MAX_LAG,
+)
+replica_lag_monitor = ReplicaLagMonitor(
+    interval=settings.REPLICA_LAG_CHECK_INTERVAL,
+    router=replica_router,
+)
+
+READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
 
 
 async def init_db():
@@ -21,6 +50,48 @@ async def init_db():
         pass
 
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session_maker() as session:
+async def warm_up_engine(bind: AsyncEngine):
+    connections = await asyncio.gather(*[bind.connect() for _ in range(settings.DB_POOL_SIZE)], return_exceptions=True)
+    # Closing returns connections to the pool
+    await asyncio.gather(*[
+        connection.close() for connection in connections if not isinstance(connection, BaseException)
+    ])
+    for connection in connections:
+        if isinstance(connection, BaseException):
+            raise connection
+
+
+async def warm_up_db():
+    """Opens `DB_POOL_SIZE` connections to primary and every replica,
+    so first requests served by a worker do not wait for connecting.
+    Unreachable replica does not stop the worker from booting, the lag
+    monitor keeps it out of rotation until it answers.
+    """
+    await warm_up_engine(engine)
+    for replica in replica_engines:
+        try:
+            await warm_up_engine(replica)
+        except Exception:
+            logger.warning("Warming up of replica %s failed", replica.url, exc_info=True)
+
+
+async def close_db():
+    for bind in [engine, job_engine, *replica_engines]:
+        await bind.dispose()
+
+
+async def get_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    # Route reads to replicas, writes to primary
+    read_only = request.method in READ_ONLY_METHODS
+    user_id = get_request_user_id(request)
+    if not read_only:
+        replica_router.mark_write(user_id)
+
+    bind = replica_router.get_engine(read_only=read_only, user_id=user_id)
+    async with async_session_maker(bind=bind) as session:
+        set_statement_timeout(session, getattr(request.state, "deadline", None))
         yield session
+
+    # Keep user on primary until replicas catch up with the write
+    if not read_only:
+        replica_router.mark_write(user_id)
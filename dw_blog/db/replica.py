@@ -0,0 +1,131 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Dict, List, Optional
+
+from fastapi import Request
+from jose import JWTError, jwt
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncEngine
+
+from dw_blog.utils.background import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind primary, 0 if it replayed everything it received
+# or if it is not a standby at all (e.g. primary under different URL)
+REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+def get_request_user_id(request: Request) -> Optional[str]:
+    """Reads user id from bearer token without verifying it.
+    Only meant for routing decisions, never for authorization.
+    """
+    authorization = request.headers.get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.get_unverified_claims(token).get("sub")
+    except JWTError:
+        return None
+
+
+class ReplicaRouter:
+    """Chooses engine for a session. Reads are spread round robin over
+    replicas that are not lagging, writes and reads of users that wrote
+    within the last `sticky_seconds` go to the primary.
+    Stickiness is kept in process memory, so with several workers
+    it is per worker.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: List[AsyncEngine],
+        sticky_seconds: int,
+        max_lag: int,
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.healthy = list(replicas)
+        self.sticky_seconds = sticky_seconds
+        self.max_lag = max_lag
+        self.sticky_until: Dict[str, float] = {}
+        self._counter = itertools.count()
+
+    def mark_write(self, user_id: Optional[str]):
+        """Sticks user to the primary for `sticky_seconds`
+        Args:
+            user_id (str): id of user performing write
+        """
+        if not self.replicas or user_id is None:
+            return
+        now = time.monotonic()
+        self.sticky_until[user_id] = now + self.sticky_seconds
+        # Drop expired entries so the dict stays bounded by active writers
+        if len(self.sticky_until) > 1000:
+            self.sticky_until = {
+                key: until for key, until in self.sticky_until.items() if until > now
+            }
+
+    def is_sticky(self, user_id: Optional[str]) -> bool:
+        if user_id is None:
+            return False
+        return self.sticky_until.get(user_id, 0) > time.monotonic()
+
+    def get_engine(self, read_only: bool, user_id: Optional[str] = None) -> AsyncEngine:
+        """Returns engine session should be bound to
+        Args:
+            read_only (bool): whether request only reads data
+            user_id (str): id of user performing request
+        Returns:
+            AsyncEngine: replica engine or primary engine
+        """
+        healthy = self.healthy
+        if not read_only or not healthy or self.is_sticky(user_id):
+            return self.primary
+        return healthy[next(self._counter) % len(healthy)]
+
+    async def get_lag(self, replica: AsyncEngine) -> Optional[float]:
+        try:
+            async with replica.connect() as conn:
+                result = await asyncio.wait_for(conn.execute(REPLICA_LAG_QUERY), timeout=self.max_lag)
+                return float(result.scalar())
+        except Exception:
+            logger.warning("Replica %s is unreachable", replica.url, exc_info=True)
+            return None
+
+    async def check_lag(self):
+        """Takes lagging or unreachable replicas out of rotation
+        and puts back the ones that caught up
+        """
+        healthy = []
+        for replica in self.replicas:
+            lag = await self.get_lag(replica)
+            if lag is not None and lag <= self.max_lag:
+                healthy.append(replica)
+            elif lag is not None:
+                logger.warning("Replica %s is %.1fs behind, taking out of rotation", replica.url, lag)
+        self.healthy = healthy
+
+
+class ReplicaLagMonitor(PeriodicTask):
+    """Periodically checks replicas lag"""
+
+    def __init__(self, interval: int, router: ReplicaRouter):
+        super().__init__(interval=interval)
+        self.router = router
+
+    async def execute(self):
+        if self.router.replicas:
+            await self.router.check_lag()
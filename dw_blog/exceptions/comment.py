@@ -0,0 +1,27 @@
+from uuid import UUID
+
+from fastapi import HTTPException, status
+
+
+class CommentNotFound(HTTPException):
+    def __init__(self, comment_id: UUID):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Comment with id {comment_id} not found!",
+        )
+
+
+class CommentNotThisPost(HTTPException):
+    def __init__(self, comment_id: UUID, post_id: UUID):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Comment {comment_id} does not belong to post {post_id}!",
+        )
+
+
+class CommentMaxDepth(HTTPException):
+    def __init__(self, max_depth: int):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Replies cannot be nested deeper than {max_depth} levels!",
+        )
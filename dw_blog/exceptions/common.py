@@ -22,6 +22,14 @@ class PaginationLimitSurpassed(HTTPException):
         )
 
 
+class BatchLimitSurpassed(HTTPException):
+    def __init__(self, limit: int):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch cannot contain more than {limit} ids!",
+        )
+
+
 class AdminStatusRequired(HTTPException):
     def __init__(self, operation: str):
         super().__init__(
@@ -68,3 +76,36 @@ class EntityFailedAdd(HTTPException):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to add {entity_name}!",
         )
+
+
+class FieldsNotAllowed(HTTPException):
+    def __init__(self, fields: List[str], allowed: List[str]):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Fields {', '.join(fields)} are not allowed, choose from: {', '.join(allowed)}!",
+        )
+
+
+class EntityVersionConflict(HTTPException):
+    def __init__(self, entity_id: UUID, entity_name: str):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"The {entity_name} {entity_id} was modified since it was read, read it again and retry!",
+        )
+
+
+class ServiceOverloaded(HTTPException):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service is overloaded, retry later!",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class DeadlineExceeded(HTTPException):
+    def __init__(self, seconds: float):
+        super().__init__(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"Request did not finish within its deadline of {seconds:g} seconds!",
+        )
@@ -0,0 +1,51 @@
+from uuid import UUID
+
+from fastapi import HTTPException, status
+
+
+class ImageNotFound(HTTPException):
+    def __init__(self, image_id: UUID):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Image with id {image_id} not found!",
+        )
+
+
+class ImageContentNotFound(HTTPException):
+    def __init__(self, image_hash: str):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Image content {image_hash} not found!",
+        )
+
+
+class ImageTypeNotSupported(HTTPException):
+    def __init__(self, content_type: str):
+        super().__init__(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Image type {content_type} is not supported!",
+        )
+
+
+class ImageTooLarge(HTTPException):
+    def __init__(self, max_size: int):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Image cannot be larger than {max_size} bytes!",
+        )
+
+
+class ImageUploadInvalid(HTTPException):
+    def __init__(self, field: str):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Image has to be uploaded as multipart form with text fields followed by single {field} field!",
+        )
+
+
+class ImageVariantFailed(HTTPException):
+    def __init__(self, image_hash: str, variant: str):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to render {variant} variant of image {image_hash}!",
+        )
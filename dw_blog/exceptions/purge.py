@@ -0,0 +1,11 @@
+from uuid import UUID
+
+from fastapi import HTTPException, status
+
+
+class PurgeNotFound(HTTPException):
+    def __init__(self, purge_id: UUID):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Purge {purge_id} not found!",
+        )
@@ -3,5 +3,9 @@ from dw_blog.models.post import Post  # noqa
 from dw_blog.models.tag import Tag, TagPosts  # noqa
 from dw_blog.models.user import User  # noqa
 from dw_blog.models.blog import Blog, BlogAuthors, BlogLikes, BlogSubscribers  # noqa
-from dw_blog.models.category import Category, CategoryBlogs  # noqa
+from dw_blog.models.category import Category, CategoryBlogs, CategoryStats  # noqa
 from dw_blog.models.image import Image  # noqa
+from dw_blog.models.trending import BlogTrending, PostTrending  # noqa
+from dw_blog.models.purge import Purge  # noqa
+from dw_blog.models.job import Job, JobSchedule  # noqa
+from dw_blog.models.related import BlogRelated, PostRelated  # noqa
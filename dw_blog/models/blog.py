@@ -1,7 +1,10 @@
 import uuid
+from datetime import datetime
 from typing import List, Optional
 
-from sqlmodel import Field, Relationship, SQLModel
+from sqlalchemy import Index
+from sqlalchemy.orm import declared_attr
+from sqlmodel import Field, Relationship, SQLModel, text
 
 from dw_blog.models.category import Category, CategoryBlogs
 from dw_blog.schemas.blog import BlogBase
@@ -9,27 +12,42 @@ from dw_blog.schemas.blog import BlogBase
 
 class BlogAuthors(SQLModel, table=True):
     blog_id: uuid.UUID = Field(foreign_key="blog.id", primary_key=True)
-    author_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True)
+    author_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True, index=True)
 
 
 class BlogLikes(SQLModel, table=True):
     blog_id: uuid.UUID = Field(foreign_key="blog.id", primary_key=True)
-    liker_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True)
+    liker_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True, index=True)
+    date_created: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column_kwargs={"server_default": text("timezone('utc', now())")},
+    )
 
 
 class BlogSubscribers(SQLModel, table=True):
     blog_id: uuid.UUID = Field(foreign_key="blog.id", primary_key=True)
-    subscriber_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True)
+    subscriber_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True, index=True)
+    date_created: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column_kwargs={"server_default": text("timezone('utc', now())")},
+    )
 
 
 class Blog(BlogBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
+    version: int = Field(
+        default=1,
+        nullable=False,
+        sa_column_kwargs={"server_default": "1"},
+    )
     name: str = Field(
         min_length=3,
         max_length=500,
         nullable=False,
         unique=True,
     )
+    # Set on deletion, the row is hidden from queries until it is purged
+    date_deleted: Optional[datetime] = Field(default=None, nullable=True)
     authors: List["User"] = Relationship(
         back_populates="blogs",
         link_model=BlogAuthors,
@@ -48,3 +66,13 @@ class Blog(BlogBase, table=True):
     )
     tags: List["Tag"] = Relationship(back_populates="blog")
     posts: Optional[List["Post"]] = Relationship(back_populates="blog")
+
+    __table_args__ = (
+        Index("ix_blog_date_created", "date_created"),
+        # Deleted blogs waiting for purge, excluded from posts and tags
+        Index("ix_blog_deleted_id", "id", postgresql_where=text("date_deleted IS NOT NULL")),
+    )
+
+    @declared_attr
+    def __mapper_args__(cls):
+        return {"version_id_col": cls.__table__.c.version}
@@ -1,6 +1,10 @@
 import uuid
+from datetime import datetime
 from typing import List
 
+from sqlalchemy import Column, ForeignKey, Index, String
+from sqlalchemy.orm import declared_attr
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
 from sqlmodel import Field, Relationship, SQLModel
 
 from dw_blog.schemas.category import CategoryBase
@@ -9,7 +13,7 @@ from dw_blog.schemas.category import CategoryBase
 class CategoryBlogs(SQLModel, table=True):
     __tablename__ = "categoryblogs"
     category_id: uuid.UUID = Field(foreign_key="category.id", primary_key=True)
-    blog_id: uuid.UUID = Field(foreign_key="blog.id", primary_key=True)
+    blog_id: uuid.UUID = Field(foreign_key="blog.id", primary_key=True, index=True)
 
 
 # class CategoryFavourite(SQLModel, table=True):
@@ -19,6 +23,11 @@ class CategoryBlogs(SQLModel, table=True):
 
 class Category(CategoryBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
+    version: int = Field(
+        default=1,
+        nullable=False,
+        sa_column_kwargs={"server_default": "1"},
+    )
     blogs: List["Blog"] = Relationship(
         back_populates="categories",
         link_model=CategoryBlogs,
@@ -27,3 +36,37 @@ class Category(CategoryBase, table=True):
     #     back_populates="categories",
     #     link_model=CategoryFavourite,
     # )
+
+    __table_args__ = (
+        Index("ix_category_date_created", "date_created"),
+    )
+
+    @declared_attr
+    def __mapper_args__(cls):
+        return {"version_id_col": cls.__table__.c.version}
+
+
+class CategoryStats(SQLModel, table=True):
+    """Read model for category listings. Holds precomputed blog count
+    and the CATEGORY_TOP_BLOGS most liked blogs of every category, so that
+    listing does not have to aggregate BlogLikes per request.
+    """
+    __tablename__ = "categorystats"
+    category_id: uuid.UUID = Field(
+        sa_column=Column(
+            UUID(as_uuid=True),
+            ForeignKey("category.id", ondelete="CASCADE"),
+            primary_key=True,
+        )
+    )
+    blogs_count: int = Field(default=0, nullable=False)
+    top_likes_count: int = Field(default=0, nullable=False)
+    top_blog_ids: List[uuid.UUID] = Field(
+        default=[],
+        sa_column=Column(ARRAY(UUID(as_uuid=True)), nullable=False, server_default="{}"),
+    )
+    top_blog_names: List[str] = Field(
+        default=[],
+        sa_column=Column(ARRAY(String(500)), nullable=False, server_default="{}"),
+    )
+    date_refreshed: datetime = Field(default_factory=datetime.utcnow, nullable=False)
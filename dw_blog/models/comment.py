@@ -1,16 +1,45 @@
 import uuid
+from typing import Optional
 
+from sqlalchemy import Column, ForeignKey, Index, String
+from sqlalchemy.dialects.postgresql import UUID
 from sqlmodel import Field, Relationship
 
-# from dw_blog.models import User
 from dw_blog.models.post import Post
 from dw_blog.schemas.comment import CommentBase
 
 
 class Comment(CommentBase, table=True):
+    """Comment of a post, replies are stored as a materialized path.
+    `path` is the path of the parent followed by fixed width segment
+    of the comment, so ordering by it gives threads in display order
+    and every thread or subtree is a single range of (post_id, path) index.
+    """
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
-    post_id: uuid.UUID = Field(foreign_key="post.id")
+    post_id: uuid.UUID = Field(
+        sa_column=Column(
+            UUID(as_uuid=True),
+            ForeignKey("post.id", ondelete="CASCADE"),
+            nullable=False,
+        )
+    )
     post: Post = Relationship(back_populates="comments")
-    # TODO: Add author_id and author fields
-    # author_id: uuid.UUID = Field(foreign_key="user.id")
-    # author: User = Relationship(back_populates="comments")
+    # Cleared when the comment of a purged user is kept for replies of others
+    author_id: Optional[uuid.UUID] = Field(default=None, foreign_key="user.id", nullable=True)
+    author: Optional["User"] = Relationship(back_populates="comments")
+    parent_id: Optional[uuid.UUID] = Field(default=None, foreign_key="comment.id", nullable=True)
+    # C collation makes paths compare bytewise, required by the range queries
+    path: str = Field(sa_column=Column(String(collation="C"), nullable=False))
+    depth: int = Field(default=0, nullable=False)
+    replies_count: int = Field(
+        default=0,
+        nullable=False,
+        sa_column_kwargs={"server_default": "0"},
+    )
+
+    __table_args__ = (
+        Index("ix_comment_post_id_path", "post_id", "path", unique=True),
+        Index("ix_comment_post_id_depth_path", "post_id", "depth", "path"),
+        Index("ix_comment_parent_id_path", "parent_id", "path"),
+        Index("ix_comment_author_id_depth", "author_id", "depth"),
+    )
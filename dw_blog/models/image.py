@@ -2,6 +2,8 @@ import uuid
 from typing import Optional
 from datetime import datetime
 
+from sqlalchemy import Column, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
 from sqlmodel import Field, SQLModel, Relationship
 
 from dw_blog.schemas.image import ImageType
@@ -9,11 +11,23 @@ from dw_blog.models.post import Post
 
 
 class Image(SQLModel, table=True):
+    """Image of a post. File is stored once per content under its
+    sha256 `hash`, images with the same content share the file.
+    """
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
     title: str = Field(min_length=3, max_length=500, nullable=False)
     caption: Optional[str] = Field(min_length=5, max_length=2000, nullable=True)
     size: int = Field(nullable=False, lt=52428800)
     img_type: ImageType = Field(nullable=False)
+    hash: str = Field(min_length=64, max_length=64, nullable=False, index=True)
     date_created: datetime = Field(default_factory=datetime.utcnow)
     date_modified: datetime = Field(default_factory=datetime.utcnow)
-    # post: Post = Relationship(back_populates="images")
+    post_id: uuid.UUID = Field(
+        sa_column=Column(
+            UUID(as_uuid=True),
+            ForeignKey("post.id", ondelete="CASCADE"),
+            nullable=False,
+            index=True,
+        )
+    )
+    post: Post = Relationship(back_populates="images")
@@ -0,0 +1,46 @@
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import Column, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import Field, SQLModel
+
+from dw_blog.schemas.job import JobStatus, JobType
+
+
+class Job(SQLModel, table=True):
+    """Background job, enqueued in the transaction of the write which
+    triggers it. Queued jobs are claimed by workers once `run_at` passes,
+    running job is leased to its worker until `locked_at` is older than
+    the lease. Failed attempts are retried with backoff by moving `run_at`.
+    """
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    type: JobType = Field(nullable=False)
+    payload: Dict = Field(default_factory=dict, sa_column=Column(JSONB, nullable=False))
+    status: JobStatus = Field(default=JobStatus.queued, nullable=False)
+    attempts: int = Field(default=0, nullable=False)
+    max_attempts: int = Field(nullable=False)
+    error: Optional[str] = Field(default=None, nullable=True)
+    run_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    locked_at: Optional[datetime] = Field(default=None, nullable=True)
+    date_created: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    date_started: Optional[datetime] = Field(default=None, nullable=True)
+    date_finished: Optional[datetime] = Field(default=None, nullable=True)
+
+    __table_args__ = (
+        # Claims of due jobs and running jobs counted against concurrency
+        Index("ix_job_type_run_at_queued", "type", "run_at", postgresql_where=text("status = 'queued'")),
+        Index("ix_job_type_locked_at_running", "type", "locked_at", postgresql_where=text("status = 'running'")),
+        # Metrics window and removal of old finished jobs
+        Index("ix_job_status_date_finished", "status", "date_finished"),
+    )
+
+
+class JobSchedule(SQLModel, table=True):
+    """Next run of a periodic job type. Worker which polls first after it
+    passes moves it by the interval and enqueues the job, so that periodic
+    jobs are enqueued once per interval whatever the number of workers.
+    """
+    job_type: JobType = Field(primary_key=True)
+    next_run_at: datetime = Field(nullable=False)
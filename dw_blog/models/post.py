@@ -1,8 +1,10 @@
 import uuid
+from datetime import datetime
 from typing import List, Optional
 
-from sqlmodel import Field, Relationship, String, Column, SQLModel, CheckConstraint
-from sqlalchemy import UniqueConstraint
+from sqlmodel import Field, Relationship, String, Column, SQLModel, CheckConstraint, text
+from sqlalchemy import Index, Sequence, UniqueConstraint
+from sqlalchemy.orm import declared_attr
 from sqlalchemy.dialects.postgresql import ARRAY
 
 from dw_blog.schemas.post import PostBase
@@ -12,21 +14,30 @@ from dw_blog.models.blog import Blog
 
 class PostAuthors(SQLModel, table=True):
     post_id: uuid.UUID = Field(foreign_key="post.id", primary_key=True)
-    author_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True)
+    author_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True, index=True)
 
 
 class PostLikers(SQLModel, table=True):
     post_id: uuid.UUID = Field(foreign_key="post.id", primary_key=True)
-    liker_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True)
+    liker_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True, index=True)
+    date_created: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column_kwargs={"server_default": text("timezone('utc', now())")},
+    )
 
 
 class PostFavourites(SQLModel, table=True):
     post_id: uuid.UUID = Field(foreign_key="post.id", primary_key=True)
-    favouriter_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True)
+    favouriter_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True, index=True)
 
 
 class Post(PostBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
+    version: int = Field(
+        default=1,
+        nullable=False,
+        sa_column_kwargs={"server_default": "1"},
+    )
     notes: Optional[List[str]] = Field(
         default=None,
         sa_column=Column(
@@ -41,7 +52,30 @@ class Post(PostBase, table=True):
             CheckConstraint('array_length(bibliography, 1) <= 5'),
         )
     )
-    comments: Optional[List["Comment"]] = Relationship(back_populates="post")
+    excerpt: str = Field(
+        default="",
+        nullable=False,
+        sa_column_kwargs={"server_default": ""},
+    )
+    word_count: int = Field(
+        default=0,
+        nullable=False,
+        sa_column_kwargs={"server_default": "0"},
+    )
+    reading_time: int = Field(
+        default=0,
+        nullable=False,
+        sa_column_kwargs={"server_default": "0"},
+    )
+    comments: Optional[List["Comment"]] = Relationship(
+        back_populates="post",
+        sa_relationship_kwargs={"passive_deletes": True},
+    )
+    comments_count: int = Field(
+        default=0,
+        nullable=False,
+        sa_column_kwargs={"server_default": "0"},
+    )
     tags: List[Tag] = Relationship(
         back_populates="posts",
         link_model=TagPosts,
@@ -58,7 +92,10 @@ class Post(PostBase, table=True):
         back_populates="favourite_posts",
         link_model=PostFavourites,
     )
-    # images: Optional[List["Image"]] = Relationship(back_populates="post")
+    images: Optional[List["Image"]] = Relationship(
+        back_populates="post",
+        sa_relationship_kwargs={"passive_deletes": True},
+    )
     blog_id: uuid.UUID = Field(
         default=None,
         foreign_key="blog.id",
@@ -67,4 +104,16 @@ class Post(PostBase, table=True):
 
     __table_args__ = (
         UniqueConstraint('title', 'blog_id', name='_blog_post_title_uc'),
+        Index("ix_post_date_created", "date_created"),
+        Index("ix_post_blog_id_date_created", "blog_id", "date_created"),
     )
+
+    # Every update checks and increments version, so update of a row changed
+    # since it was read fails instead of overwriting the change
+    @declared_attr
+    def __mapper_args__(cls):
+        return {"version_id_col": cls.__table__.c.version}
+
+
+# Ids of post events, so that clients of the events stream can resume after the last one
+post_event_id_seq = Sequence("post_event_id_seq", metadata=SQLModel.metadata)
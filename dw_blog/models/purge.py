@@ -0,0 +1,28 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+from dw_blog.schemas.purge import PurgeEntity, PurgeStatus
+
+
+class Purge(SQLModel, table=True):
+    """Background removal of deleted blog, user or tag with its dependent
+    rows. Rows are removed in chunks, table by table (`step` is the index
+    of the current one), every chunk in its own transaction, so no long
+    lived locks are taken. Purge is run by its job, failed one is resumed
+    from its last step by retries of the job.
+    """
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    entity: PurgeEntity = Field(nullable=False)
+    entity_id: uuid.UUID = Field(nullable=False)
+    # Not a foreign key, deleted user can follow purge of itself
+    requested_by: uuid.UUID = Field(nullable=False)
+    status: PurgeStatus = Field(default=PurgeStatus.pending, nullable=False)
+    step: int = Field(default=0, nullable=False)
+    rows_deleted: int = Field(default=0, nullable=False)
+    error: Optional[str] = Field(default=None, nullable=True)
+    date_created: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    date_modified: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    date_finished: Optional[datetime] = Field(default=None, nullable=True)
@@ -0,0 +1,46 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Column, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlmodel import Field, SQLModel
+
+
+class PostRelated(SQLModel, table=True):
+    """Top-K neighbour table of posts. Holds the most similar published
+    posts of every post by cosine similarity of their tags and likers,
+    so that related posts are read by the primary key.
+    """
+    __tablename__ = "postrelated"
+    post_id: uuid.UUID = Field(
+        sa_column=Column(
+            UUID(as_uuid=True),
+            ForeignKey("post.id", ondelete="CASCADE"),
+            primary_key=True,
+        )
+    )
+    related_post_id: uuid.UUID = Field(
+        sa_column=Column(
+            UUID(as_uuid=True),
+            ForeignKey("post.id", ondelete="CASCADE"),
+            primary_key=True,
+            index=True,
+        )
+    )
+    score: float = Field(nullable=False)
+    date_refreshed: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+
+class BlogRelated(SQLModel, table=True):
+    """Top-K neighbour table of blogs. Holds the most similar active blogs
+    of every blog by cosine similarity of their likers and subscribers,
+    so that recommendations are scored from a few primary key lookups.
+    The table is rebuilt aside and swapped in, so it has no foreign keys:
+    rows of blogs are removed by their purge and recommendations read
+    existing blogs only.
+    """
+    __tablename__ = "blogrelated"
+    blog_id: uuid.UUID = Field(sa_column=Column(UUID(as_uuid=True), primary_key=True))
+    related_blog_id: uuid.UUID = Field(sa_column=Column(UUID(as_uuid=True), primary_key=True, index=True))
+    score: float = Field(nullable=False)
+    date_refreshed: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -1,6 +1,9 @@
 import uuid
+from datetime import datetime
 from typing import List, Optional
 
+from sqlalchemy import Index, text
+from sqlalchemy.orm import declared_attr
 from sqlmodel import Field, Relationship, SQLModel
 
 from dw_blog.schemas.tag import TagBase
@@ -9,20 +12,28 @@ from dw_blog.models.blog import Blog
 
 class TagSubscribers(SQLModel, table=True):
     tag_id: uuid.UUID = Field(foreign_key="tag.id", primary_key=True)
-    subscriber_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True)
+    subscriber_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True, index=True)
 
 
 class TagPosts(SQLModel, table=True):
     tag_id: uuid.UUID = Field(foreign_key="tag.id", primary_key=True)
-    post_id: uuid.UUID = Field(foreign_key="post.id", primary_key=True)
+    post_id: uuid.UUID = Field(foreign_key="post.id", primary_key=True, index=True)
 
 
 class Tag(TagBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
+    version: int = Field(
+        default=1,
+        nullable=False,
+        sa_column_kwargs={"server_default": "1"},
+    )
     blog_id: uuid.UUID = Field(
         default=None,
         foreign_key="blog.id",
+        index=True,
     )
+    # Set on deletion, the row is hidden from queries until it is purged
+    date_deleted: Optional[datetime] = Field(default=None, nullable=True)
     posts: Optional[List["Post"]] = Relationship(
         back_populates="tags",
         link_model=TagPosts,
@@ -32,3 +43,13 @@ class Tag(TagBase, table=True):
         back_populates="subscribed_tags",
         link_model=TagSubscribers,
     )
+
+    __table_args__ = (
+        Index("ix_tag_date_created", "date_created"),
+        # Deleted tags waiting for purge, excluded from features of related posts
+        Index("ix_tag_deleted_id", "id", postgresql_where=text("date_deleted IS NOT NULL")),
+    )
+
+    @declared_attr
+    def __mapper_args__(cls):
+        return {"version_id_col": cls.__table__.c.version}
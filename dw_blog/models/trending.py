@@ -0,0 +1,62 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Column, Float, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlmodel import Field, SQLModel
+
+# Trending of posts and blogs without any likes, sorted after all others
+NO_TRENDING = float("-inf")
+
+
+class PostTrending(SQLModel, table=True):
+    """Time-decayed popularity of a post. `score` is the decayed sum
+    of likes relative to `decay_epoch`, `trending` is its time-invariant
+    log2 form used for sorting. Every post has a row, created with
+    the post, and `date_created` of the post breaks ties, so listings
+    sorted by trending read the index in its order.
+    """
+    __tablename__ = "posttrending"
+    post_id: uuid.UUID = Field(
+        sa_column=Column(
+            UUID(as_uuid=True),
+            ForeignKey("post.id", ondelete="CASCADE"),
+            primary_key=True,
+        )
+    )
+    score: float = Field(default=0, nullable=False)
+    decay_epoch: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    trending: float = Field(
+        default=NO_TRENDING,
+        sa_column=Column(Float, nullable=False, server_default=text("'-Infinity'")),
+    )
+    date_created: datetime = Field(nullable=False)
+
+    __table_args__ = (
+        Index("ix_posttrending_trending_date_created", "trending", "date_created"),
+    )
+
+
+class BlogTrending(SQLModel, table=True):
+    """Time-decayed popularity of a blog (likes and subscriptions),
+    same layout as PostTrending.
+    """
+    __tablename__ = "blogtrending"
+    blog_id: uuid.UUID = Field(
+        sa_column=Column(
+            UUID(as_uuid=True),
+            ForeignKey("blog.id", ondelete="CASCADE"),
+            primary_key=True,
+        )
+    )
+    score: float = Field(default=0, nullable=False)
+    decay_epoch: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    trending: float = Field(
+        default=NO_TRENDING,
+        sa_column=Column(Float, nullable=False, server_default=text("'-Infinity'")),
+    )
+    date_created: datetime = Field(nullable=False)
+
+    __table_args__ = (
+        Index("ix_blogtrending_trending_date_created", "trending", "date_created"),
+    )
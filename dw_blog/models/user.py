@@ -1,7 +1,9 @@
 import uuid
+from datetime import datetime
 from typing import List, Optional
 
-from sqlmodel import Field, Relationship
+from sqlalchemy import Index
+from sqlmodel import Field, Relationship, text
 
 from dw_blog.models.blog import Blog, BlogAuthors, BlogLikes, BlogSubscribers
 from dw_blog.models.tag import TagSubscribers, Tag
@@ -13,6 +15,8 @@ from dw_blog.schemas.user import UserBase
 class User(UserBase, table=True):
     __tablename__ = "user"
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True)
+    # Set on deletion, the row is hidden from queries until it is purged
+    date_deleted: Optional[datetime] = Field(default=None, nullable=True)
     blogs: Optional[List[Blog]] = Relationship(
         back_populates="authors",
         link_model=BlogAuthors,
@@ -41,7 +45,13 @@ class User(UserBase, table=True):
         back_populates="authors",
         link_model=PostAuthors,
     )
+    comments: Optional[List["Comment"]] = Relationship(back_populates="author")
     # categories: Optional[List[Category]] = Relationship(
     #     back_populates="favouriters",
     #     link_model=CategoryFavourite,
     # )
+
+    __table_args__ = (
+        # Deleted users waiting for purge, excluded from authors and likers
+        Index("ix_user_deleted_id", "id", postgresql_where=text("date_deleted IS NOT NULL")),
+    )
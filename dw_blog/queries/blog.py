@@ -1,95 +1,160 @@
-from typing import Optional, Union, List
+from typing import FrozenSet, Optional, Union, List
 from uuid import UUID
-from functools import reduce
+from functools import lru_cache, reduce
 
+from sqlalchemy import any_, bindparam
 from sqlmodel import delete, func, select, or_
 
 from dw_blog.schemas.auth import AuthUser
 from dw_blog.models.blog import Blog, BlogAuthors, BlogLikes, BlogSubscribers
-from dw_blog.schemas.blog import SortBlogBy
+from dw_blog.schemas.blog import BlogRead, BlogReadList, SortBlogBy
 from dw_blog.schemas.common import SortOrder
 from dw_blog.models.tag import Tag
 from dw_blog.models.user import User
 from dw_blog.models.category import Category, CategoryBlogs
+from dw_blog.models.trending import BlogTrending
+from dw_blog.queries.common import TEMPLATE_CACHE_SIZE, UUID_ARRAY, collected_arrays, contains_pattern, deleted_ids
 
 UserLiker = User.__table__.alias()
 UserSubscriber = User.__table__.alias()
 
+BLOG_FIELDS = frozenset(BlogRead.__fields__)
+LISTED_BLOG_FIELDS = frozenset(BlogReadList.__fields__)
 
-def get_single_blog_query(blog_id: UUID):
+
+# Fields of blog listing computed by aggregation
+LISTED_BLOG_AGGREGATED_FIELDS = frozenset({"categories_name", "subscription_count", "likes_count"})
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _blog_details_query(fields: FrozenSet[str]):
+    """Builds details query once per fieldset. Only requested relations
+    are collected, by correlated subqueries instead of joins and grouping,
+    so that rows of different relations don't multiply.
+    """
     q = (
-        select(
-            Blog.id,
-            Blog.name,
-            Blog.date_created,
-            Blog.date_modified,
-            func.array_agg(func.distinct(User.id)).label("author_id"),
-            func.array_agg(func.distinct(User.nickname)).label("author_nickname"),
-            func.array_agg(func.distinct(Tag.id)).label("tag_id"),
-            func.array_agg(func.distinct(Tag.name)).label("tag_name"),
-            func.array_agg(func.distinct(UserLiker.c.id)).label("likers_id"),
-            func.array_agg(func.distinct(UserLiker.c.nickname)).label("likers_nicknames"),
-            func.array_agg(func.distinct(UserSubscriber.c.id)).label("subscriber_id"),
-            func.array_agg(func.distinct(UserSubscriber.c.nickname)).label("subscriber_nicknames"),
-            Blog.archived,
-            func.array_agg(func.distinct(Category.name)).label("categories_name"),
-        )
-        .join(BlogAuthors, onclause=Blog.id == BlogAuthors.blog_id, isouter=True)
-        .join(User, onclause=BlogAuthors.author_id == User.id, isouter=True)
-        .join(BlogLikes, onclause=Blog.id == BlogLikes.blog_id, isouter=True)
-        .join(UserLiker, onclause=BlogLikes.liker_id == UserLiker.c.id, isouter=True)
-        .join(BlogSubscribers, onclause=Blog.id == BlogSubscribers.blog_id, isouter=True)
-        .join(UserSubscriber, onclause=BlogSubscribers.subscriber_id == UserSubscriber.c.id, isouter=True)
-        .join(Tag, onclause=Blog.id == Tag.blog_id, isouter=True)
-        .join(CategoryBlogs, onclause=Blog.id == CategoryBlogs.blog_id, isouter=True)
-        .join(Category, onclause=CategoryBlogs.category_id == Category.id, isouter=True)
-        .where(Blog.id == blog_id)
-        .group_by(Blog.id)
+        select(*[column for column in Blog.__table__.c if column.name in fields | {"id"}])
+        .where(Blog.date_deleted.is_(None))
     )
+
+    if "authors" in fields:
+        author_id, author_nickname = collected_arrays(
+            columns=(User.id, User.nickname),
+            where=(BlogAuthors.blog_id == Blog.id) & BlogAuthors.author_id.not_in(deleted_ids(User)),
+            correlate=Blog,
+            order_by=(User.nickname,),
+            joins=[(BlogAuthors, BlogAuthors.author_id == User.id)],
+        )
+        q = q.add_columns(author_id.label("author_id"), author_nickname.label("author_nickname"))
+    if "tags" in fields:
+        tag_id, tag_name = collected_arrays(
+            columns=(Tag.id, Tag.name),
+            where=Tag.blog_id == Blog.id,
+            correlate=Blog,
+            order_by=(Tag.name, Tag.id),
+        )
+        q = q.add_columns(tag_id.label("tag_id"), tag_name.label("tag_name"))
+    if "likers" in fields:
+        likers_id, likers_nicknames = collected_arrays(
+            columns=(UserLiker.c.id, UserLiker.c.nickname),
+            where=(BlogLikes.blog_id == Blog.id) & BlogLikes.liker_id.not_in(deleted_ids(User)),
+            correlate=Blog,
+            order_by=(UserLiker.c.nickname,),
+            joins=[(BlogLikes, BlogLikes.liker_id == UserLiker.c.id)],
+        )
+        q = q.add_columns(likers_id.label("likers_id"), likers_nicknames.label("likers_nicknames"))
+    if "subscribers" in fields:
+        subscriber_id, subscriber_nicknames = collected_arrays(
+            columns=(UserSubscriber.c.id, UserSubscriber.c.nickname),
+            where=(BlogSubscribers.blog_id == Blog.id) & BlogSubscribers.subscriber_id.not_in(deleted_ids(User)),
+            correlate=Blog,
+            order_by=(UserSubscriber.c.nickname,),
+            joins=[(BlogSubscribers, BlogSubscribers.subscriber_id == UserSubscriber.c.id)],
+        )
+        q = q.add_columns(
+            subscriber_id.label("subscriber_id"),
+            subscriber_nicknames.label("subscriber_nicknames"),
+        )
+    if "categories_name" in fields:
+        (categories_name,) = collected_arrays(
+            columns=(Category.name,),
+            where=CategoryBlogs.blog_id == Blog.id,
+            correlate=Blog,
+            order_by=(Category.name,),
+            joins=[(CategoryBlogs, CategoryBlogs.category_id == Category.id)],
+        )
+        q = q.add_columns(categories_name.label("categories_name"))
     return q
 
 
-def get_listed_blogs_query(
-    limit: int,
-    offset: int,
-    blog_name: Optional[str] = None,
-    author_id: Optional[UUID] = None,
-    archived: Optional[Union[bool, None]] = None,
-    categories_ids: Optional[List[UUID]] = None,
-    sort_order: SortOrder = SortOrder.ascending,
-    sort_by: SortBlogBy = SortBlogBy.date_created,
+def get_single_blog_query(blog_id: UUID, fields: FrozenSet[str] = BLOG_FIELDS):
+    return _blog_details_query(fields=fields).where(Blog.id == blog_id)
+
+
+def get_batch_blogs_query(blog_ids: List[UUID], fields: FrozenSet[str] = BLOG_FIELDS):
+    return (
+        _blog_details_query(fields=fields)
+        .where(Blog.id == any_(bindparam("blog_ids", blog_ids, type_=UUID_ARRAY)))
+    )
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _listed_blogs_template(
+    blog_name: bool,
+    author_id: bool,
+    archived: Optional[bool],
+    categories_ids: bool,
+    sort_order: SortOrder,
+    sort_by: SortBlogBy,
+    fields: FrozenSet[str],
 ):
+    """Builds listing query once per filter shape and fieldset, values
+    are bound at execution. Counts and categories are computed only
+    if they are requested or needed for sorting, by correlated subqueries,
+    so that filters and pagination of blogs can use indexes.
+    """
+    # Aggregated fields to compute
+    aggregated = fields & LISTED_BLOG_AGGREGATED_FIELDS
+    if sort_by == SortBlogBy.subscribers:
+        aggregated |= {"subscription_count"}
+    if sort_by == SortBlogBy.likers:
+        aggregated |= {"likes_count"}
+
     # Create query
-    sub_q = (
-        select(
-            Blog.id.label("id"),
-            func.array_agg(func.distinct(Category.id)).label("categories_ids"),
-            func.array_agg(func.distinct(Category.name)).label("categories_name"),
-            Blog.archived.label("archived"),
-            Blog.name.label("name"),
-            Blog.date_created.label("date_created"),
-            Blog.date_modified.label("date_modified"),
-            func.count(func.distinct(BlogSubscribers.subscriber_id)).label("subscription_count"),
-            func.count(func.distinct(BlogLikes.liker_id)).label("likes_count"),
+    sub_q = select(
+        Blog.id.label("id"),
+        Blog.archived.label("archived"),
+        Blog.name.label("name"),
+        Blog.date_created.label("date_created"),
+        Blog.date_modified.label("date_modified"),
+    ).where(Blog.date_deleted.is_(None))
+    if "categories_name" in aggregated:
+        (categories_name,) = collected_arrays(
+            columns=(Category.name,),
+            where=CategoryBlogs.blog_id == Blog.id,
+            correlate=Blog,
+            order_by=(Category.name,),
+            joins=[(CategoryBlogs, CategoryBlogs.category_id == Category.id)],
         )
-        .join(CategoryBlogs, onclause=Blog.id == CategoryBlogs.blog_id, isouter=True)
-        .join(Category, onclause=CategoryBlogs.category_id == Category.id, isouter=True)
-        .join(BlogSubscribers, onclause=BlogSubscribers.blog_id == Blog.id, isouter=True)
-        .join(BlogLikes, onclause=BlogLikes.blog_id == Blog.id, isouter=True)
-        .group_by(Blog.id)
-        .alias()
-    )
-    q = select(
-        sub_q.c.id,
-        sub_q.c.categories_ids,
-        sub_q.c.categories_name,
-        sub_q.c.archived,
-        sub_q.c.name,
-        sub_q.c.date_created,
-        sub_q.c.date_modified,
-        sub_q.c.subscription_count,
-        sub_q.c.likes_count,
-    )
+        sub_q = sub_q.add_columns(categories_name.label("categories_name"))
+    if "subscription_count" in aggregated:
+        sub_q = sub_q.add_columns(
+            select(func.count())
+            .where(BlogSubscribers.blog_id == Blog.id)
+            .correlate(Blog)
+            .scalar_subquery()
+            .label("subscription_count")
+        )
+    if "likes_count" in aggregated:
+        sub_q = sub_q.add_columns(
+            select(func.count())
+            .where(BlogLikes.blog_id == Blog.id)
+            .correlate(Blog)
+            .scalar_subquery()
+            .label("likes_count")
+        )
+    sub_q = sub_q.alias()
+    q = select(*[sub_q.c[field] for field in BlogReadList.__fields__ if field in fields])
 
     # Get archived/active blogs only
     if archived is not None:
@@ -100,20 +165,29 @@ def get_listed_blogs_query(
 
     # Get records based on blog name
     if blog_name:
-        q = q.where(sub_q.c.name.ilike(f"%{blog_name}%"))
+        q = q.where(sub_q.c.name.ilike(bindparam("blog_name")))
 
     # Get records based on blog author id
     if author_id:
-        q = (
-            q.join(BlogAuthors, onclause=BlogAuthors.blog_id == sub_q.c.id, isouter=True)
-            .join(User, onclause=User.id == BlogAuthors.author_id, isouter=True)
-            .where(User.id == author_id)
+        q = q.where(
+            select(BlogAuthors.blog_id)
+            .where(
+                BlogAuthors.blog_id == sub_q.c.id,
+                BlogAuthors.author_id == bindparam("author_id"),
+            )
+            .exists()
         )
 
-    # Get records based on category id
+    # Get records based on category id, whole list is bound as single array
     if categories_ids:
-        conditions = [sub_q.c.categories_ids.any(category_id) for category_id in categories_ids]
-        q = q.where(or_(*conditions))
+        q = q.where(
+            select(CategoryBlogs.blog_id)
+            .where(
+                CategoryBlogs.blog_id == sub_q.c.id,
+                CategoryBlogs.category_id == any_(bindparam("categories_ids", type_=UUID_ARRAY)),
+            )
+            .exists()
+        )
 
     # Create sorting
     if sort_by == SortBlogBy.date_created:
@@ -140,14 +214,86 @@ def get_listed_blogs_query(
         else:
             q = q.order_by(sub_q.c.name.desc())
 
+    if sort_by == SortBlogBy.trending:
+        # Every blog has its trending row, ordered as its index
+        q = q.join(BlogTrending, onclause=BlogTrending.blog_id == sub_q.c.id)
+        if sort_order == SortOrder.ascending:
+            q = q.order_by(BlogTrending.trending.asc(), BlogTrending.date_created.asc())
+        else:
+            q = q.order_by(BlogTrending.trending.desc(), BlogTrending.date_created.desc())
+
     # Assign query for count of all records
     q_all = q
     # Add pagination to query
-    q_pag = q.limit(limit).offset(offset)
+    q_pag = q.limit(bindparam("limit")).offset(bindparam("offset"))
 
     return q_pag, q_all
 
 
+def get_listed_blogs_query(
+    limit: int,
+    offset: int,
+    blog_name: Optional[str] = None,
+    author_id: Optional[UUID] = None,
+    archived: Optional[Union[bool, None]] = None,
+    categories_ids: Optional[List[UUID]] = None,
+    sort_order: SortOrder = SortOrder.ascending,
+    sort_by: SortBlogBy = SortBlogBy.date_created,
+    fields: FrozenSet[str] = LISTED_BLOG_FIELDS,
+):
+    # Get template for given filters and fields
+    q_pag, q_all = _listed_blogs_template(
+        blog_name=bool(blog_name),
+        author_id=bool(author_id),
+        archived=archived,
+        categories_ids=bool(categories_ids),
+        sort_order=sort_order,
+        sort_by=sort_by,
+        fields=fields,
+    )
+
+    # Collect values of bound parameters
+    params = {"limit": limit, "offset": offset}
+    if blog_name:
+        params["blog_name"] = contains_pattern(blog_name)
+    if author_id:
+        params["author_id"] = author_id
+    if categories_ids:
+        params["categories_ids"] = list(categories_ids)
+
+    return q_pag, q_all, params
+
+
+def get_authors_blogs_query(authors_ids: List[UUID], blog_id: Optional[UUID] = None):
+    """Selects existing users of given ids with count of their blogs and,
+    if blog is given, whether they are already its authors
+    """
+    blogs_count = (
+        select(func.count())
+        .where(BlogAuthors.author_id == User.id, BlogAuthors.blog_id.not_in(deleted_ids(Blog)))
+        .correlate(User)
+        .scalar_subquery()
+    )
+    q = select(User.id.label("id"), blogs_count.label("blogs_count"))
+    if blog_id:
+        is_author = (
+            select(BlogAuthors.blog_id)
+            .where(BlogAuthors.blog_id == blog_id, BlogAuthors.author_id == User.id)
+            .exists()
+        )
+        q = q.add_columns(is_author.label("is_author"))
+    q = q.where(
+        User.id == any_(bindparam("authors_ids", authors_ids, type_=UUID_ARRAY)),
+        User.date_deleted.is_(None),
+    )
+    return q
+
+
+def count_blog_authors_query(blog_id: UUID):
+    q = select(func.count()).where(BlogAuthors.blog_id == blog_id)
+    return q
+
+
 def is_author_query(
     blog_id: UUID,
     author_id: UUID,
@@ -1,99 +1,108 @@
+from functools import lru_cache
 from uuid import UUID
-from typing import Optional
+from typing import FrozenSet, List, Optional
 
-from sqlmodel import func, select, literal_column, text
+from sqlalchemy import any_, bindparam
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from sqlmodel import and_, func, select, literal_column, or_
 
-from dw_blog.models.category import Category, CategoryBlogs
-from dw_blog.schemas.category import SortCategoryBy
+from dw_blog.models.category import Category, CategoryBlogs, CategoryStats
+from dw_blog.schemas.category import CategoryReadList, SortCategoryBy
 from dw_blog.schemas.common import SortOrder
 from dw_blog.models.blog import Blog, BlogLikes
+from dw_blog.queries.common import TEMPLATE_CACHE_SIZE, UUID_ARRAY, collected_arrays, contains_pattern
 
+LISTED_CATEGORY_FIELDS = frozenset(CategoryReadList.__fields__)
 
-CategoryBlogsBlogId = CategoryBlogs.__table__.alias()
 
 def get_single_category_query(category_id: UUID):
+    """Builds query of a category with all of its blogs, most liked first.
+    Listings serve only the top CATEGORY_TOP_BLOGS blogs from the read model.
+    """
+    in_category = and_(CategoryBlogs.category_id == Category.id, Blog.date_deleted.is_(None))
+    likes_count = select(func.count()).where(BlogLikes.blog_id == Blog.id).scalar_subquery()
+    blog_ids, blog_names = collected_arrays(
+        columns=(Blog.id, Blog.name),
+        where=in_category,
+        correlate=Category,
+        order_by=(likes_count.desc(), Blog.name, Blog.id),
+        joins=[(CategoryBlogs, CategoryBlogs.blog_id == Blog.id)],
+    )
+    blogs_count = (
+        select(func.count())
+        .select_from(CategoryBlogs)
+        .join(Blog, onclause=Blog.id == CategoryBlogs.blog_id)
+        .where(in_category)
+        .correlate(Category)
+        .scalar_subquery()
+    )
     q = (
             select(
                 Category.id.label("id"),
+                Category.version.label("version"),
                 Category.name.label("name"),
                 Category.approved.label("approved"),
                 Category.date_created.label("date_created"),
                 Category.date_modified.label("date_modified"),
-                func.array_agg(Blog.id).label("blog_ids"),
-                func.array_agg(Blog.name).label("blog_names"),
+                blogs_count.label("blogs_count"),
+                blog_ids.label("blog_ids"),
+                blog_names.label("blog_names"),
             )
-            .join(CategoryBlogs, onclause=CategoryBlogs.category_id == Category.id, isouter=True)
-            .join(Blog, onclause=Blog.id == CategoryBlogs.blog_id, isouter=True)
             .where(Category.id == category_id)
-            .group_by(Category.id)
     )
     return q
 
 
-def get_listed_categories_query(
-    limit: int,
-    offset: int,
-    category_name: Optional[str] = None,
-    approved: Optional[bool] = None,
-    sort_order: SortOrder = SortOrder.ascending,
-    sort_by: SortCategoryBy = SortCategoryBy.date_created,
+def get_categories_query(categories_ids: List[UUID]):
+    q = select(Category).where(Category.id == any_(bindparam("categories_ids", categories_ids, type_=UUID_ARRAY)))
+    return q
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _listed_categories_template(
+    category_name: bool,
+    approved: Optional[bool],
+    sort_order: SortOrder,
+    sort_by: SortCategoryBy,
+    fields: FrozenSet[str],
 ):
-    # Create subquery
-    subquery = (
-        select(
-            Blog.id,
-            Blog.name,
-            func.count(func.distinct(BlogLikes.liker_id)).label('likes_count')
-        )
-        .select_from(Blog)
-        .join(BlogLikes, BlogLikes.blog_id == Blog.id, isouter=True)
-        .join(CategoryBlogs, CategoryBlogs.blog_id == Blog.id, isouter=True)
-        .where(CategoryBlogs.category_id == Category.id)
-        .group_by(Blog.id, CategoryBlogs.category_id)
-        .order_by(func.count(func.distinct(BlogLikes.liker_id)).desc())
-        .limit(5)
-        .lateral()
-    ).alias('subquery')
-
-    # Create query
-    q = (
-        select(
-            Category.id,
-            Category.name,
-            Category.approved,
-            Category.date_created,
-            Category.date_modified,
-            func.array_agg(func.distinct(subquery.c.id)).label('blog_ids'),
-            func.array_agg(func.distinct(subquery.c.name)).label('blog_names'),
-            func.count(func.distinct(CategoryBlogsBlogId.c.blog_id)).label('blogs_count')
+    """Builds listing query once per filter shape and fieldset, values
+    are bound at execution. Read model is joined only if blogs data
+    is requested or needed for sorting.
+    """
+    # Create query, blogs data is served from the precomputed read model
+    blogs_count = func.coalesce(CategoryStats.blogs_count, 0)
+    top_likes_count = func.coalesce(CategoryStats.top_likes_count, 0)
+    q = select(*[column for column in Category.__table__.c if column.name in fields])
+    if "blogs" in fields:
+        q = q.add_columns(
+            func.coalesce(CategoryStats.top_blog_ids, literal_column("'{}'")).label('blog_ids'),
+            func.coalesce(CategoryStats.top_blog_names, literal_column("'{}'")).label('blog_names'),
         )
-        .select_from(Category)
-        .join(CategoryBlogsBlogId, CategoryBlogsBlogId.c.category_id == Category.id, isouter=True)
-        .join(subquery, text('true'), isouter=True)
-        .group_by(Category.id)
-    )
+    if "blogs_count" in fields:
+        q = q.add_columns(blogs_count.label('blogs_count'))
+    if fields & {"blogs", "blogs_count"} or sort_by in (SortCategoryBy.most_blogs, SortCategoryBy.blogs_with_most_likes):
+        q = q.select_from(Category).join(CategoryStats, CategoryStats.category_id == Category.id, isouter=True)
 
     if category_name:
-        q = q.where(Category.name.ilike(f"%{category_name}%"))
+        q = q.where(Category.name.ilike(bindparam("category_name")))
 
     if approved is not None:
         q = q.where(Category.approved == approved)
 
     # Create sorting by most liked blog
     if sort_by == SortCategoryBy.blogs_with_most_likes:
-        sort_most_likes = func.coalesce(func.array_agg(subquery.c.likes_count)[1], literal_column('0'))
         if sort_order == SortOrder.ascending:
-            q = q.order_by(sort_most_likes)
+            q = q.order_by(top_likes_count)
         if sort_order == SortOrder.descending:
-            q = q.order_by(sort_most_likes.desc())
+            q = q.order_by(top_likes_count.desc())
 
     # Create sorting by most blogs
     if sort_by == SortCategoryBy.most_blogs:
-        sort_most_blogs = func.count(func.distinct(CategoryBlogsBlogId.c.blog_id))
         if sort_order == SortOrder.ascending:
-            q = q.order_by(sort_most_blogs)
+            q = q.order_by(blogs_count)
         if sort_order == SortOrder.descending:
-            q = q.order_by(sort_most_blogs.desc())
+            q = q.order_by(blogs_count.desc())
 
     # Create sorting by date created
     if sort_by == SortCategoryBy.date_created:
@@ -110,11 +119,134 @@ def get_listed_categories_query(
             q = q.order_by(Category.name.desc())
 
     q_all = q
-    q_pag = q.limit(limit).offset(offset)
+    q_pag = q.limit(bindparam("limit")).offset(bindparam("offset"))
 
     return q_pag, q_all
 
 
+def get_listed_categories_query(
+    limit: int,
+    offset: int,
+    category_name: Optional[str] = None,
+    approved: Optional[bool] = None,
+    sort_order: SortOrder = SortOrder.ascending,
+    sort_by: SortCategoryBy = SortCategoryBy.date_created,
+    fields: FrozenSet[str] = LISTED_CATEGORY_FIELDS,
+):
+    # Get template for given filters and fields
+    q_pag, q_all = _listed_categories_template(
+        category_name=bool(category_name),
+        approved=approved,
+        sort_order=sort_order,
+        sort_by=sort_by,
+        fields=fields,
+    )
+
+    # Collect values of bound parameters
+    params = {"limit": limit, "offset": offset}
+    if category_name:
+        params["category_name"] = contains_pattern(category_name)
+
+    return q_pag, q_all, params
+
+
+def refresh_category_stats_query(
+    top_blogs: int,
+    category_ids: Optional[List[UUID]] = None,
+    blog_ids: Optional[List[UUID]] = None,
+):
+    """Builds upsert recomputing category read model. Without any
+    filter all categories are refreshed, otherwise only categories
+    passed directly or the ones containing given blogs.
+    """
+    # Categories to refresh
+    conditions = []
+    if category_ids:
+        conditions.append(Category.id.in_(category_ids))
+    if blog_ids:
+        conditions.append(
+            Category.id.in_(
+                select(CategoryBlogs.category_id).where(CategoryBlogs.blog_id.in_(blog_ids))
+            )
+        )
+
+    # Likes count per blog, only of blogs in refreshed categories
+    likes = (
+        select(
+            BlogLikes.blog_id.label("blog_id"),
+            func.count().label("likes_count"),
+        )
+        .group_by(BlogLikes.blog_id)
+    )
+    if conditions:
+        in_scope = select(Category.id).where(or_(*conditions))
+        likes = likes.where(
+            BlogLikes.blog_id.in_(select(CategoryBlogs.blog_id).where(CategoryBlogs.category_id.in_(in_scope)))
+        )
+    likes = likes.subquery("likes")
+    # Blogs ranked by likes within their categories
+    likes_count = func.coalesce(likes.c.likes_count, 0)
+    ranked = (
+        select(
+            CategoryBlogs.category_id.label("category_id"),
+            Blog.id.label("blog_id"),
+            Blog.name.label("blog_name"),
+            likes_count.label("likes_count"),
+            func.row_number().over(
+                partition_by=CategoryBlogs.category_id,
+                order_by=(likes_count.desc(), Blog.name),
+            ).label("rank"),
+            func.count().over(partition_by=CategoryBlogs.category_id).label("blogs_count"),
+        )
+        .join(Blog, onclause=Blog.id == CategoryBlogs.blog_id)
+        .join(likes, onclause=likes.c.blog_id == Blog.id, isouter=True)
+        .where(Blog.date_deleted.is_(None))
+    )
+    stats = select(Category.id.label("category_id"))
+    if conditions:
+        ranked = ranked.where(CategoryBlogs.category_id.in_(in_scope))
+        stats = stats.where(or_(*conditions))
+    ranked = ranked.subquery("ranked")
+
+    # One stats row per category
+    is_top = ranked.c.rank <= top_blogs
+    stats = (
+        stats.add_columns(
+            func.coalesce(func.max(ranked.c.blogs_count), 0).label("blogs_count"),
+            func.coalesce(func.max(ranked.c.likes_count), 0).label("top_likes_count"),
+            func.coalesce(
+                func.array_agg(aggregate_order_by(ranked.c.blog_id, ranked.c.rank)).filter(is_top),
+                literal_column("'{}'"),
+            ).label("top_blog_ids"),
+            func.coalesce(
+                func.array_agg(aggregate_order_by(ranked.c.blog_name, ranked.c.rank)).filter(is_top),
+                literal_column("'{}'"),
+            ).label("top_blog_names"),
+            func.timezone("utc", func.now()).label("date_refreshed"),
+        )
+        .select_from(Category)
+        .join(ranked, onclause=ranked.c.category_id == Category.id, isouter=True)
+        .group_by(Category.id)
+        .order_by(Category.id)
+    )
+
+    q = insert(CategoryStats).from_select(
+        ["category_id", "blogs_count", "top_likes_count", "top_blog_ids", "top_blog_names", "date_refreshed"],
+        stats,
+    )
+    q = q.on_conflict_do_update(
+        index_elements=[CategoryStats.category_id],
+        set_={
+            "blogs_count": q.excluded.blogs_count,
+            "top_likes_count": q.excluded.top_likes_count,
+            "top_blog_ids": q.excluded.top_blog_ids,
+            "top_blog_names": q.excluded.top_blog_names,
+            "date_refreshed": q.excluded.date_refreshed,
+        },
+    )
+    return q
+
+
 def get_blogs_for_category_query(category_id: UUID):
     q = (
             select(
@@ -0,0 +1,173 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import bindparam, delete, true, update
+from sqlmodel import select
+
+from dw_blog.models.comment import Comment
+from dw_blog.models.post import Post
+from dw_blog.models.user import User
+from dw_blog.queries.common import TEMPLATE_CACHE_SIZE
+from dw_blog.schemas.common import SortOrder
+
+# Path segment is 13 hex digits of creation time in microseconds and 8 of id
+SEGMENT_LENGTH = 21
+# Sorts after every hex digit, so [path, path + PATH_END) is the whole subtree
+PATH_END = "~"
+
+
+def comment_path_segment(comment_id: UUID, date_created: datetime) -> str:
+    """Fixed width path segment, sorts by creation time with id breaking ties"""
+    micros = int(date_created.replace(tzinfo=timezone.utc).timestamp() * 1_000_000)
+    return f"{micros:013x}{comment_id.hex[:8]}"
+
+
+def _comment_columns(source):
+    return (
+        source.c.id,
+        source.c.post_id,
+        source.c.parent_id,
+        source.c.author_id,
+        User.nickname.label("author_nickname"),
+        source.c.text,
+        source.c.depth,
+        source.c.replies_count,
+        source.c.path,
+        source.c.date_created,
+        source.c.date_modified,
+    )
+
+
+def get_single_comment_query(comment_id: UUID):
+    source = Comment.__table__
+    q = (
+        select(*_comment_columns(source))
+        .join(User, onclause=User.id == source.c.author_id, isouter=True)
+        .where(source.c.id == comment_id)
+    )
+    return q
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _top_comments_template(cursor: bool, sort_order: SortOrder):
+    """Builds keyset page of top level comments paths once per shape,
+    served by (post_id, depth, path) index in both directions.
+    """
+    q = select(Comment.path).where(
+        Comment.post_id == bindparam("post_id"),
+        Comment.depth == 0,
+    )
+    if sort_order == SortOrder.ascending:
+        if cursor:
+            q = q.where(Comment.path > bindparam("cursor"))
+        q = q.order_by(Comment.path)
+    else:
+        if cursor:
+            q = q.where(Comment.path < bindparam("cursor"))
+        q = q.order_by(Comment.path.desc())
+
+    return q.limit(bindparam("limit"))
+
+
+def get_top_comments_query(
+    post_id: UUID,
+    limit: int,
+    cursor: Optional[str] = None,
+    sort_order: SortOrder = SortOrder.descending,
+):
+    q = _top_comments_template(cursor=bool(cursor), sort_order=sort_order)
+    params = {"post_id": post_id, "limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    return q, params
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _comments_range_template(collapsed: bool):
+    """Builds query of comments with paths in [low, high) range ordered by
+    path. Whole range is read with one index range scan, in collapsed mode
+    only roots of the range (comments at given depth) are read that way,
+    their replies are then walked recursively taking only first
+    `replies_limit` replies of every comment from (parent_id, path) index.
+    """
+    comment = Comment.__table__
+    in_range = (
+        comment.c.post_id == bindparam("post_id"),
+        comment.c.path >= bindparam("low"),
+        comment.c.path < bindparam("high"),
+    )
+
+    if collapsed:
+        roots = (
+            select(comment)
+            .where(*in_range, comment.c.depth == bindparam("depth"))
+            .cte("thread", recursive=True)
+        )
+        replies = (
+            select(comment)
+            .where(comment.c.parent_id == roots.c.id)
+            .order_by(comment.c.path)
+            .limit(bindparam("replies_limit"))
+            .lateral("replies")
+        )
+        source = roots.union_all(
+            select(replies).select_from(roots.join(replies, onclause=true()))
+        )
+        q = select(*_comment_columns(source))
+    else:
+        source = comment
+        q = select(*_comment_columns(source)).where(*in_range)
+
+    # Comments of purged users are kept without author
+    q = q.join(User, onclause=User.id == source.c.author_id, isouter=True).order_by(source.c.path)
+    return q
+
+
+def get_comments_range_query(
+    post_id: UUID,
+    low: str,
+    high: str,
+    depth: int,
+    replies_limit: Optional[int] = None,
+):
+    collapsed = replies_limit is not None
+    q = _comments_range_template(collapsed=collapsed)
+    params = {"post_id": post_id, "low": low, "high": high}
+    if collapsed:
+        params["depth"] = depth
+        params["replies_limit"] = replies_limit
+    return q, params
+
+
+def change_post_comments_count_query(post_id: UUID, change: int):
+    q = (
+        update(Post)
+        .where(Post.id == post_id)
+        .values(comments_count=Post.comments_count + change)
+        .returning(Post.id)
+    )
+    return q
+
+
+def change_replies_count_query(comment_id: UUID, change: int):
+    q = (
+        update(Comment)
+        .where(Comment.id == comment_id)
+        .values(replies_count=Comment.replies_count + change)
+    )
+    return q
+
+
+def delete_comment_subtree_query(post_id: UUID, path: str):
+    q = (
+        delete(Comment)
+        .where(
+            Comment.post_id == post_id,
+            Comment.path >= path,
+            Comment.path < path + PATH_END,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return q
@@ -0,0 +1,45 @@
+from typing import Iterable, List, Tuple
+
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlmodel import func, select
+
+# Type of list of ids bound as single parameter
+UUID_ARRAY = ARRAY(UUID(as_uuid=True))
+# Most statements kept per template builder. Shapes include the fieldset
+# chosen by the client, so their number grows combinatorially; the least
+# recently used ones are rebuilt when requested again.
+TEMPLATE_CACHE_SIZE = 256
+
+
+def contains_pattern(value: str) -> str:
+    return f"%{value}%"
+
+
+def deleted_ids(model):
+    """Ids of deleted rows of the model, which are not purged yet. They are
+    read from the partial index of deleted rows, so excluding them is cheap.
+    """
+    return select(model.id).where(model.date_deleted.is_not(None))
+
+
+def collected_arrays(columns: Iterable, where, correlate, order_by: Iterable = (), joins: Iterable[Tuple] = ()) -> List:
+    """Collects columns of related rows into arrays by correlated subqueries,
+    sorted the same way, so that their values pair up. Unlike joins and
+    grouping they are computed only for the returned rows.
+    Args:
+        columns (Iterable): columns to collect, an array per column
+        where: condition relating rows to the outer query
+        correlate: table of the outer query
+        order_by (Iterable): order of the values in the arrays
+        joins (Iterable[Tuple]): joined target and onclause pairs
+    Returns:
+        List: array per column
+    """
+    arrays = []
+    for column in columns:
+        q = select(column)
+        for target, onclause in joins:
+            q = q.join(target, onclause=onclause)
+        q = q.where(where).order_by(*order_by).correlate(correlate)
+        arrays.append(func.array(q.scalar_subquery(), type_=ARRAY(column.type)))
+    return arrays
@@ -0,0 +1,36 @@
+from uuid import UUID
+
+from sqlmodel import func, select
+
+from dw_blog.models.image import Image
+
+
+def get_post_images_query(post_id: UUID):
+    q = (
+        select(Image)
+        .where(Image.post_id == post_id)
+        .order_by(Image.date_created)
+    )
+    return q
+
+
+def get_content_type_query(content_hash: str):
+    q = (
+        select(Image.img_type)
+        .where(Image.hash == content_hash)
+        .limit(1)
+    )
+    return q
+
+
+def count_content_references_query(content_hash: str):
+    q = select(func.count()).select_from(Image).where(Image.hash == content_hash)
+    return q
+
+
+def lock_content_query(content_hash: str):
+    """Transaction level lock of the stored file, serialises storing
+    and removing of the same content
+    """
+    q = select(func.pg_advisory_xact_lock(func.hashtextextended(content_hash, 0)))
+    return q
@@ -0,0 +1,221 @@
+from datetime import timedelta
+from functools import lru_cache
+from typing import Dict, List
+from uuid import UUID
+
+from sqlalchemy import Float, Integer, String, and_, bindparam, case, cast, delete, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, insert
+from sqlmodel import func
+
+from dw_blog.models.job import Job, JobSchedule
+from dw_blog.schemas.job import JobStatus, JobType
+
+job = Job.__table__
+job_schedule = JobSchedule.__table__
+
+
+def _utc_now():
+    return func.timezone("utc", func.now())
+
+
+def _seconds(interval):
+    return cast(func.extract("epoch", interval), Float)
+
+
+def lock_job_type_query(job_type: JobType):
+    """Serializes claims of the job type until the end of the transaction,
+    so that running jobs are counted against its concurrency limit by
+    one worker at a time
+    """
+    key = func.hashtext(literal("job:") + cast(bindparam("job_type", job_type.value), String))
+    return select(func.pg_advisory_xact_lock(key))
+
+
+@lru_cache(maxsize=None)
+def _claim_jobs_template():
+    """Claims due jobs of a type, up to the batch size and the slots left
+    by its running jobs. Jobs locked by other transactions are skipped.
+    """
+    job_type = bindparam("job_type")
+    running = (
+        select(func.count())
+        .select_from(job)
+        .where(job.c.type == job_type, job.c.status == JobStatus.running)
+        .scalar_subquery()
+    )
+    slots = func.least(
+        bindparam("batch_size", type_=Integer),
+        func.greatest(bindparam("concurrency", type_=Integer) - running, 0),
+    )
+    claimed = (
+        select(job.c.id)
+        .where(job.c.type == job_type, job.c.status == JobStatus.queued, job.c.run_at <= _utc_now())
+        .order_by(job.c.run_at)
+        .limit(slots)
+        .with_for_update(skip_locked=True)
+        .cte("claimed")
+    )
+    q = (
+        update(job)
+        .where(job.c.id == claimed.c.id)
+        .values(
+            status=JobStatus.running,
+            attempts=job.c.attempts + 1,
+            locked_at=_utc_now(),
+            date_started=_utc_now(),
+        )
+        .returning(*job.c)
+    )
+    return q
+
+
+def claim_jobs_query(job_type: JobType, batch_size: int, concurrency: int):
+    q = _claim_jobs_template()
+    params = {"job_type": job_type, "batch_size": batch_size, "concurrency": concurrency}
+    return q, params
+
+
+def requeue_expired_jobs_query(lease: int):
+    """Returns running jobs of workers which stopped extending their lease
+    to the queue, or fails them if they ran out of attempts
+    """
+    expired = _utc_now() - timedelta(seconds=lease)
+    q = (
+        update(job)
+        .where(job.c.status == JobStatus.running, job.c.locked_at < expired)
+        .values(
+            status=case(
+                (job.c.attempts >= job.c.max_attempts, cast(JobStatus.failed, job.c.status.type)),
+                else_=cast(JobStatus.queued, job.c.status.type),
+            ),
+            error="Lease expired",
+            locked_at=None,
+            date_finished=case((job.c.attempts >= job.c.max_attempts, _utc_now()), else_=None),
+        )
+    )
+    return q
+
+
+def extend_jobs_lease_query(job_ids: List[UUID]):
+    q = (
+        update(job)
+        .where(
+            job.c.id == func.any(cast(bindparam("job_ids", job_ids), ARRAY(PG_UUID(as_uuid=True)))),
+            job.c.status == JobStatus.running,
+        )
+        .values(locked_at=_utc_now())
+    )
+    return q
+
+
+def finish_job_query(job_id: UUID):
+    q = (
+        update(job)
+        .where(job.c.id == job_id)
+        .values(status=JobStatus.done, error=None, locked_at=None, date_finished=_utc_now())
+    )
+    return q
+
+
+def retry_job_query(job_id: UUID, error: str, delay: float):
+    q = (
+        update(job)
+        .where(job.c.id == job_id)
+        .values(
+            status=JobStatus.queued,
+            error=error,
+            locked_at=None,
+            run_at=_utc_now() + timedelta(seconds=delay),
+        )
+    )
+    return q
+
+
+def fail_job_query(job_id: UUID, error: str):
+    q = (
+        update(job)
+        .where(job.c.id == job_id)
+        .values(status=JobStatus.failed, error=error, locked_at=None, date_finished=_utc_now())
+    )
+    return q
+
+
+def take_queued_jobs_query(job_type: JobType, limit: int):
+    """Removes up to limit queued jobs of the type, due or not, returning
+    their payloads. Jobs locked by other transactions are skipped.
+    """
+    taken = (
+        select(job.c.id)
+        .where(job.c.type == job_type, job.c.status == JobStatus.queued)
+        .order_by(job.c.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .cte("taken")
+    )
+    return delete(job).where(job.c.id == taken.c.id).returning(job.c.payload)
+
+
+def get_pending_schedules_query():
+    """Periodic job types whose next run did not pass yet"""
+    return select(job_schedule.c.job_type).where(job_schedule.c.next_run_at > _utc_now())
+
+
+def schedule_jobs_query(intervals: Dict[JobType, int]):
+    """Moves next runs of the job types which passed, or were not scheduled
+    yet, by their interval and returns the moved types. Concurrent workers
+    wait for the row lock and then see the moved run, so each run is
+    returned to one of them.
+    """
+    q = insert(job_schedule).values([
+        {"job_type": job_type, "next_run_at": _utc_now() + timedelta(seconds=interval)}
+        for job_type, interval in intervals.items()
+    ])
+    q = q.on_conflict_do_update(
+        index_elements=[job_schedule.c.job_type],
+        set_={"next_run_at": q.excluded.next_run_at},
+        where=job_schedule.c.next_run_at <= _utc_now(),
+    ).returning(job_schedule.c.job_type)
+    return q
+
+
+def delete_finished_jobs_query(retention: int, limit: int):
+    """Removes up to limit jobs done before the retention period"""
+    finished = (
+        select(job.c.id)
+        .where(
+            job.c.status == JobStatus.done,
+            job.c.date_finished < _utc_now() - timedelta(seconds=retention),
+        )
+        .limit(limit)
+    )
+    return delete(job).where(job.c.id.in_(finished))
+
+
+def job_metrics_query(window: int):
+    """Queue depth per type and status, wait for a worker (since the job
+    was due) and run time of the jobs started or finished in the window
+    """
+    since = _utc_now() - timedelta(seconds=window)
+    queued = job.c.status == JobStatus.queued
+    due = and_(queued, job.c.run_at <= _utc_now())
+    started = and_(job.c.status != JobStatus.queued, job.c.date_started >= since)
+    done = and_(job.c.status == JobStatus.done, job.c.date_finished >= since)
+    wait = _seconds(job.c.date_started - job.c.run_at)
+    q = (
+        select(
+            job.c.type,
+            func.count().filter(queued).label("queued"),
+            func.count().filter(due).label("due"),
+            func.count().filter(job.c.status == JobStatus.running).label("running"),
+            func.count().filter(job.c.status == JobStatus.failed).label("failed"),
+            func.count().filter(done).label("done"),
+            func.max(_seconds(_utc_now() - job.c.run_at)).filter(due).label("oldest_due_seconds"),
+            func.avg(wait).filter(started).label("wait_seconds_avg"),
+            func.max(wait).filter(started).label("wait_seconds_max"),
+            func.avg(_seconds(job.c.date_finished - job.c.date_started)).filter(done).label("run_seconds_avg"),
+        )
+        .where(or_(job.c.status != JobStatus.done, done))
+        .group_by(job.c.type)
+        .order_by(job.c.type)
+    )
+    return q
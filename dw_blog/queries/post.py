@@ -1,114 +1,168 @@
 
-from typing import List, Optional
+import json
+from datetime import datetime
+from functools import lru_cache
+from typing import FrozenSet, List, Optional
 from uuid import UUID
 
-from sqlmodel import select, func, or_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import Boolean, String, any_, bindparam, cast, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select, func, literal_column
 
-from dw_blog.models.blog import Blog
-from dw_blog.models.post import Post, PostAuthors, PostLikers, PostFavourites
-from dw_blog.models.tag import Tag, TagPosts
+from dw_blog.models.blog import Blog, BlogAuthors, BlogSubscribers
+from dw_blog.models.post import Post, PostAuthors, PostLikers, PostFavourites, post_event_id_seq
+from dw_blog.models.tag import Tag, TagPosts, TagSubscribers
+from dw_blog.models.trending import PostTrending
 from dw_blog.models.user import User
+from dw_blog.queries.common import TEMPLATE_CACHE_SIZE, UUID_ARRAY, collected_arrays, contains_pattern, deleted_ids
+from dw_blog.queries.trending import add_empty_trending_scores_query
 from dw_blog.schemas.common import SortOrder
-from dw_blog.schemas.post import SortPostBy
+from dw_blog.schemas.post import PostEventType, PostsRead, SortPostBy
 
 UserLiker = User.__table__.alias()
 
+POST_EVENTS_CHANNEL = "post_events"
+
+LISTED_POST_FIELDS = frozenset(PostsRead.__fields__)
+
+
+# Columns of posts listing read for nested fields
+NESTED_POST_COLUMNS = {
+    "blog": ("blog_id", "blog_name"),
+    "tags": ("tags_ids", "tags_names"),
+    "authors": ("authors_ids", "authors_nicknames"),
+    "likers": ("likers_ids", "likers_nicknames"),
+}
+
+
+def basic_post_queries(fields: FrozenSet[str] = LISTED_POST_FIELDS):
+    """Builds posts listing of given fields. Blog is joined and tags, authors
+    and likers collected only if they are requested. They are collected
+    by correlated subqueries instead of joins and grouping, so filters,
+    sorting and pagination of posts use indexes and the subqueries run
+    only for the returned page.
+    """
+    sub_q = select(
+        Post.id.label("id"),
+        Post.blog_id.label("blog_id"),
+        Post.date_created.label("date_created"),
+        Post.date_modified.label("date_modified"),
+        Post.published.label("published"),
+        Post.title.label("title"),
+        Post.excerpt.label("excerpt"),
+        Post.word_count.label("word_count"),
+        Post.reading_time.label("reading_time"),
+        Post.comments_count.label("comments_count"),
+    ).where(Post.blog_id.not_in(deleted_ids(Blog)))
+    if "blog" in fields:
+        sub_q = (
+            sub_q.add_columns(Blog.name.label("blog_name"))
+            .join(Blog, onclause=Blog.id == Post.blog_id, isouter=True)
+        )
+    if "tags" in fields:
+        tags_ids, tags_names = collected_arrays(
+            columns=(Tag.id, Tag.name),
+            where=(TagPosts.post_id == Post.id) & Tag.date_deleted.is_(None),
+            correlate=Post,
+            order_by=(Tag.name, Tag.id),
+            joins=[(TagPosts, TagPosts.tag_id == Tag.id)],
+        )
+        sub_q = sub_q.add_columns(tags_ids.label("tags_ids"), tags_names.label("tags_names"))
+    if "authors" in fields:
+        authors_ids, authors_nicknames = collected_arrays(
+            columns=(User.id, User.nickname),
+            where=(PostAuthors.post_id == Post.id) & PostAuthors.author_id.not_in(deleted_ids(User)),
+            correlate=Post,
+            order_by=(User.nickname,),
+            joins=[(PostAuthors, PostAuthors.author_id == User.id)],
+        )
+        sub_q = sub_q.add_columns(authors_ids.label("authors_ids"), authors_nicknames.label("authors_nicknames"))
+    if "likers" in fields:
+        likers_ids, likers_nicknames = collected_arrays(
+            columns=(UserLiker.c.id, UserLiker.c.nickname),
+            where=(PostLikers.post_id == Post.id) & PostLikers.liker_id.not_in(deleted_ids(User)),
+            correlate=Post,
+            order_by=(UserLiker.c.nickname,),
+            joins=[(PostLikers, PostLikers.liker_id == UserLiker.c.id)],
+        )
+        sub_q = sub_q.add_columns(likers_ids.label("likers_ids"), likers_nicknames.label("likers_nicknames"))
+    if "likes_count" in fields:
+        sub_q = sub_q.add_columns(
+            select(func.count())
+            .where(PostLikers.post_id == Post.id)
+            .correlate(Post)
+            .scalar_subquery()
+            .label("likes_count")
+        )
+    sub_q = sub_q.alias()
+
+    columns = []
+    for field in PostsRead.__fields__:
+        if field in fields:
+            columns.extend(NESTED_POST_COLUMNS.get(field, (field,)))
+    q = select(*[sub_q.c[column] for column in columns])
 
-def basic_post_queries():
-    sub_q = (
-        select(
-            Post.id.label("id"),
-            Post.date_created.label("date_created"),
-            Post.date_modified.label("date_modified"),
-            Post.notes.label("notes"),
-            Post.bibliography.label("bibliography"),
-            Post.published.label("published"),
-            Post.title.label("title"),
-            Post.body.label("body"),
-            Blog.id.label("blog_id"),
-            Blog.name.label("blog_name"),
-            func.array_agg(func.distinct(Tag.id)).label("tags_ids"),
-            func.array_agg(func.distinct(Tag.name)).label("tags_names"),
-            func.array_agg(func.distinct(User.id)).label("authors_ids"),
-            func.array_agg(func.distinct(User.nickname)).label("authors_nicknames"),
-            func.array_agg(func.distinct(UserLiker.c.id)).label("likers_ids"),
-            func.array_agg(func.distinct(UserLiker.c.nickname)).label("likers_nicknames"),
-            func.count(func.distinct(UserLiker.c.id)).label("likes_count"),
-        )
-        .join(Blog, onclause=Blog.id == Post.blog_id, isouter=True)
-        .join(TagPosts, onclause=TagPosts.post_id == Post.id, isouter=True)
-        .join(Tag, onclause=Tag.id == TagPosts.tag_id, isouter=True)
-        .join(PostAuthors, onclause=PostAuthors.post_id == Post.id, isouter=True)
-        .join(User, onclause=User.id == PostAuthors.author_id, isouter=True)
-        .join(PostLikers, onclause=PostLikers.post_id == Post.id, isouter=True)
-        .join(UserLiker, onclause=UserLiker.c.id == PostLikers.liker_id, isouter=True)
-        .group_by(Post.id, Blog.id)
-        .alias()
-    )
-    q = select(
-        sub_q.c.id,
-        sub_q.c.blog_id,
-        sub_q.c.blog_name,
-        sub_q.c.date_created,
-        sub_q.c.date_modified,
-        sub_q.c.notes,
-        sub_q.c.bibliography,
-        sub_q.c.published,
-        sub_q.c.title,
-        sub_q.c.body,
-        sub_q.c.tags_ids,
-        sub_q.c.tags_names,
-        sub_q.c.authors_ids,
-        sub_q.c.authors_nicknames,
-        sub_q.c.likers_ids,
-        sub_q.c.likers_nicknames,
-        sub_q.c.likes_count,
-    )
-    
     return q, sub_q
 
 
-def get_listed_posts_query(
-    limit: int,
-    offset: int,
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _listed_posts_template(
+    blog_id: bool,
     published: bool,
-    blog_id: Optional[UUID] = None,
-    authors_ids: Optional[List[UUID]] = None,
-    tags_ids: Optional[List[UUID]] = None,
-    title_search: Optional[str] = None,
-    body_search: Optional[str] = None,
-    sort_order: SortOrder = SortOrder.ascending,
-    sort_by: SortPostBy = SortPostBy.date_created,
+    authors_ids: bool,
+    tags_ids: bool,
+    title_search: bool,
+    body_search: bool,
+    sort_order: SortOrder,
+    sort_by: SortPostBy,
+    fields: FrozenSet[str],
 ):
-    # Get basic queries
-    q, sub_q = basic_post_queries()
+    """Builds listing query once per filter shape and fieldset. Filter
+    values are bound at execution, so every call with the same shape
+    reuses the same statement, compiled SQL and prepared statement.
+    """
+    # Get basic queries, likes are counted also when sorted by
+    if sort_by == SortPostBy.likers:
+        fields = fields | {"likes_count"}
+    q, sub_q = basic_post_queries(fields=fields)
 
     # Filter by blog_id
     if blog_id:
-        q = q.where(sub_q.c.blog_id == blog_id)
+        q = q.where(sub_q.c.blog_id == bindparam("blog_id"))
 
     # Filter by published
     if published:
-        q = q.where(sub_q.c.published == published)
+        q = q.where(sub_q.c.published == True)
 
-    # Filter by authors_ids
+    # Filter by authors_ids, whole list is bound as single array
     if authors_ids:
-        conditions = [sub_q.c.authors_ids.any(author_id) for author_id in authors_ids]
-        q = q.where(or_(*conditions))
-    
+        q = q.where(
+            select(PostAuthors.post_id)
+            .where(
+                PostAuthors.post_id == sub_q.c.id,
+                PostAuthors.author_id == any_(bindparam("authors_ids", type_=UUID_ARRAY)),
+            )
+            .exists()
+        )
+
     # Filter by tags_ids
     if tags_ids:
-        conditions = [sub_q.c.tags_ids.any(tag_id) for tag_id in tags_ids]
-        q = q.where(or_(*conditions))
+        q = q.where(
+            select(TagPosts.post_id)
+            .where(
+                TagPosts.post_id == sub_q.c.id,
+                TagPosts.tag_id == any_(bindparam("tags_ids", type_=UUID_ARRAY)),
+            )
+            .exists()
+        )
 
     # Filter by title_search
     if title_search:
-        q = q.where(sub_q.c.title.ilike(f"%{title_search}%"))
+        q = q.where(sub_q.c.title.ilike(bindparam("title_search")))
 
-    # Filter by body_search
+    # Filter by body_search, body itself is not carried through grouping
     if body_search:
-        q = q.where(sub_q.c.body.ilike(f"%{body_search}%"))
+        q = q.where(sub_q.c.id.in_(select(Post.id).where(Post.body.ilike(bindparam("body_search")))))
 
     # Create sorting
     if sort_by == SortPostBy.date_created:
@@ -126,46 +180,402 @@ def get_listed_posts_query(
             q = q.order_by(sub_q.c.likes_count)
         else:
             q = q.order_by(sub_q.c.likes_count.desc())
+    elif sort_by == SortPostBy.trending:
+        # Every post has its trending row, ordered as its index
+        q = q.join(PostTrending, onclause=PostTrending.post_id == sub_q.c.id)
+        if sort_order == SortOrder.ascending:
+            q = q.order_by(PostTrending.trending.asc(), PostTrending.date_created.asc())
+        else:
+            q = q.order_by(PostTrending.trending.desc(), PostTrending.date_created.desc())
 
     # Assign query for count of all records
     q_all = q
     # Add pagination to query
-    q_pag = q.limit(limit).offset(offset)
+    q_pag = q.limit(bindparam("limit")).offset(bindparam("offset"))
 
     return q_pag, q_all
 
-def get_listed_user_posts_query(
-    user_id: UUID,
-    liked: bool = True,
-    offset: int = 0,
+
+def get_listed_posts_query(
+    limit: int,
+    offset: int,
+    published: bool,
+    blog_id: Optional[UUID] = None,
+    authors_ids: Optional[List[UUID]] = None,
+    tags_ids: Optional[List[UUID]] = None,
+    title_search: Optional[str] = None,
+    body_search: Optional[str] = None,
+    sort_order: SortOrder = SortOrder.ascending,
+    sort_by: SortPostBy = SortPostBy.date_created,
+    fields: FrozenSet[str] = LISTED_POST_FIELDS,
 ):
+    # Get template for given filters and fields
+    q_pag, q_all = _listed_posts_template(
+        blog_id=bool(blog_id),
+        published=bool(published),
+        authors_ids=bool(authors_ids),
+        tags_ids=bool(tags_ids),
+        title_search=bool(title_search),
+        body_search=bool(body_search),
+        sort_order=sort_order,
+        sort_by=sort_by,
+        fields=fields,
+    )
+
+    # Collect values of bound parameters
+    params = {"limit": limit, "offset": offset}
+    if blog_id:
+        params["blog_id"] = blog_id
+    if authors_ids:
+        params["authors_ids"] = list(authors_ids)
+    if tags_ids:
+        params["tags_ids"] = list(tags_ids)
+    if title_search:
+        params["title_search"] = contains_pattern(title_search)
+    if body_search:
+        params["body_search"] = contains_pattern(body_search)
+
+    return q_pag, q_all, params
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _listed_user_posts_template(liked: bool):
+    """Builds listing of posts liked or marked as favourite by the user.
+    Only columns shown in the listing are read, body stays on disk.
+    """
     # Get basic query
     base_q = (
-        select(Post)
-        .options(selectinload(Post.blog))
+        select(
+            Post.id.label("id"),
+            Post.title.label("title"),
+            Post.excerpt.label("excerpt"),
+            Post.word_count.label("word_count"),
+            Post.reading_time.label("reading_time"),
+            Post.date_created.label("date_created"),
+            Blog.id.label("blog_id"),
+            Blog.name.label("blog_name"),
+        )
+        .join(Blog, onclause=Blog.id == Post.blog_id)
+        .where(Blog.date_deleted.is_(None))
     )
-    
+
     # Extend query depending on liked
     if liked:
         q = (
             base_q
-            .join(PostLikers, onclause=Post.id == PostLikers.post_id, isouter=True)
-            .where(PostLikers.liker_id == user_id, Post.published == True)
+            .join(PostLikers, onclause=Post.id == PostLikers.post_id)
+            .where(PostLikers.liker_id == bindparam("user_id"), Post.published == True)
         )
     else:
         q = (
             base_q
-            .join(PostFavourites, onclause=Post.id == PostFavourites.post_id, isouter=True)
-            .where(PostFavourites.favouriter_id == user_id, Post.published == True)
+            .join(PostFavourites, onclause=Post.id == PostFavourites.post_id)
+            .where(PostFavourites.favouriter_id == bindparam("user_id"), Post.published == True)
         )
 
     # Order by date_created
-    q = q.order_by(Post.date_created)            
-    
+    q = q.order_by(Post.date_created)
+
     # Assign query for count of all records
     q_all = q
     # Add pagination to query
-    q_pag = q.limit(20).offset(offset)
-    
-    # Return query
-    return q_all, q_pag
+    q_pag = q.limit(20).offset(bindparam("offset"))
+
+    return q_pag, q_all
+
+
+def get_listed_user_posts_query(
+    user_id: UUID,
+    liked: bool = True,
+    offset: int = 0,
+):
+    q_pag, q_all = _listed_user_posts_template(liked=liked)
+    params = {"user_id": user_id, "offset": offset}
+    return q_pag, q_all, params
+
+
+def get_export_posts_query(
+    blog_id: Optional[UUID] = None,
+    author_id: Optional[UUID] = None,
+):
+    """Builds query for posts export. Tags and authors are fetched with
+    correlated subqueries instead of grouping, so rows can be streamed
+    as soon as they are read. Ids and names of tags and authors are
+    sorted the same way, so that they pair up.
+    """
+    tags_ids, tags_names = collected_arrays(
+        columns=(Tag.id, Tag.name),
+        where=(TagPosts.post_id == Post.id) & Tag.date_deleted.is_(None),
+        correlate=Post,
+        order_by=(Tag.name, Tag.id),
+        joins=[(TagPosts, TagPosts.tag_id == Tag.id)],
+    )
+    authors_ids, authors_nicknames = collected_arrays(
+        columns=(User.id, User.nickname),
+        where=(PostAuthors.post_id == Post.id) & PostAuthors.author_id.not_in(deleted_ids(User)),
+        correlate=Post,
+        order_by=(User.nickname, User.id),
+        joins=[(PostAuthors, PostAuthors.author_id == User.id)],
+    )
+    q = (
+        select(
+            Post.id.label("id"),
+            Post.title.label("title"),
+            Post.body.label("body"),
+            Post.published.label("published"),
+            Post.date_created.label("date_created"),
+            Post.date_modified.label("date_modified"),
+            Post.notes.label("notes"),
+            Post.bibliography.label("bibliography"),
+            Blog.id.label("blog_id"),
+            Blog.name.label("blog_name"),
+            tags_ids.label("tags_ids"),
+            tags_names.label("tags_names"),
+            authors_ids.label("authors_ids"),
+            authors_nicknames.label("authors_nicknames"),
+        )
+        .join(Blog, onclause=Blog.id == Post.blog_id)
+        .where(Blog.date_deleted.is_(None))
+    )
+
+    if blog_id:
+        q = q.where(Post.blog_id == blog_id)
+
+    if author_id:
+        q = q.where(
+            select(PostAuthors.post_id)
+            .where(PostAuthors.post_id == Post.id, PostAuthors.author_id == author_id)
+            .exists()
+        )
+
+    # Primary key order lets rows be read straight from the index
+    return q.order_by(Post.id)
+
+
+def get_posts_permissions_query(
+    posts_ids: List[UUID],
+    user_id: UUID,
+):
+    """Selects blog of every post and whether the user is author of it"""
+    is_author = (
+        select(BlogAuthors.blog_id)
+        .where(BlogAuthors.blog_id == Post.blog_id, BlogAuthors.author_id == user_id)
+        .exists()
+    )
+    q = (
+        select(
+            Post.id.label("id"),
+            Post.blog_id.label("blog_id"),
+            is_author.label("is_author"),
+        )
+        .where(Post.id == any_(bindparam("posts_ids", posts_ids, type_=UUID_ARRAY)))
+    )
+    return q
+
+
+def add_posts_tags_query(
+    posts_ids: List[UUID],
+    tags_ids: List[UUID],
+):
+    """Links every tag to every post of the same blog, existing links are skipped"""
+    pairs = (
+        select(Tag.id, Post.id)
+        .where(
+            Tag.id == any_(bindparam("tags_ids", tags_ids, type_=UUID_ARRAY)),
+            Post.id == any_(bindparam("posts_ids", posts_ids, type_=UUID_ARRAY)),
+            Tag.blog_id == Post.blog_id,
+        )
+    )
+    q = (
+        insert(TagPosts)
+        .from_select(["tag_id", "post_id"], pairs)
+        .on_conflict_do_nothing(index_elements=[TagPosts.tag_id, TagPosts.post_id])
+    )
+    return q
+
+
+def remove_posts_tags_query(
+    posts_ids: List[UUID],
+    tags_ids: List[UUID],
+):
+    q = (
+        delete(TagPosts)
+        .where(
+            TagPosts.tag_id == any_(bindparam("tags_ids", tags_ids, type_=UUID_ARRAY)),
+            TagPosts.post_id == any_(bindparam("posts_ids", posts_ids, type_=UUID_ARRAY)),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return q
+
+
+# Columns of the post bound at its creation
+CREATED_POST_COLUMNS = (
+    "id",
+    "title",
+    "body",
+    "published",
+    "date_created",
+    "date_modified",
+    "bibliography",
+    "notes",
+    "excerpt",
+    "word_count",
+    "reading_time",
+)
+# Columns of the created post returned by the statement, including server defaults
+RETURNED_POST_COLUMNS = (*CREATED_POST_COLUMNS, "version", "comments_count")
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _create_post_template():
+    """Builds post creation statement once, values are bound at execution.
+    Blog CTE collects the requested authors and tags which belong to the
+    blog, post and its links are inserted only if all of them do and the
+    user is allowed to add posts. Blog row is returned also if nothing was
+    inserted, so that the reason can be reported. It is built of tables
+    instead of models, ORM statements in SQLAlchemy 1.4 drop CTEs which
+    are not selected from.
+    """
+    blog_table, post_table = Blog.__table__, Post.__table__
+    # Casted, asyncpg can't infer types of parameters of array functions
+    authors_ids = cast(bindparam("authors_ids"), UUID_ARRAY)
+    tags_ids = cast(bindparam("tags_ids"), UUID_ARRAY)
+    blog_authors_ids, blog_authors_nicknames = collected_arrays(
+        columns=(User.id, User.nickname),
+        where=(
+            (BlogAuthors.blog_id == blog_table.c.id)
+            & (BlogAuthors.author_id == any_(authors_ids))
+            & User.date_deleted.is_(None)
+        ),
+        correlate=blog_table,
+        order_by=(User.nickname,),
+        joins=[(BlogAuthors, BlogAuthors.author_id == User.id)],
+    )
+    blog_tags_ids, blog_tags_names = collected_arrays(
+        columns=(Tag.id, Tag.name),
+        where=(Tag.blog_id == blog_table.c.id) & (Tag.id == any_(tags_ids)) & Tag.date_deleted.is_(None),
+        correlate=blog_table,
+        order_by=(Tag.name, Tag.id),
+    )
+    is_author = (
+        select(BlogAuthors.blog_id)
+        .where(BlogAuthors.blog_id == blog_table.c.id, BlogAuthors.author_id == bindparam("user_id"))
+        .exists()
+    )
+    blog = (
+        select(
+            blog_table.c.id.label("blog_id"),
+            blog_table.c.name.label("blog_name"),
+            (bindparam("is_admin", type_=Boolean) | is_author).label("permitted"),
+            blog_authors_ids.label("authors_ids"),
+            blog_authors_nicknames.label("authors_nicknames"),
+            blog_tags_ids.label("tags_ids"),
+            blog_tags_names.label("tags_names"),
+        )
+        .where(blog_table.c.id == bindparam("blog_id"), blog_table.c.date_deleted.is_(None))
+        .cte("post_blog")
+    )
+
+    # Insert post only if blog passed validation
+    new_post = (
+        insert(post_table)
+        .from_select(
+            [*CREATED_POST_COLUMNS, "blog_id"],
+            select(
+                *[cast(bindparam(column), post_table.c[column].type) for column in CREATED_POST_COLUMNS],
+                blog.c.blog_id,
+            )
+            .where(
+                blog.c.permitted,
+                func.cardinality(blog.c.authors_ids) == func.cardinality(authors_ids),
+                func.cardinality(blog.c.tags_ids) == func.cardinality(tags_ids),
+            ),
+            include_defaults=False,
+        )
+        .returning(*[post_table.c[column] for column in RETURNED_POST_COLUMNS])
+        .cte("new_post")
+    )
+    # Statements in WITH are executed even though they are not referenced
+    new_authors = (
+        insert(PostAuthors.__table__)
+        .from_select(["post_id", "author_id"], select(new_post.c.id, func.unnest(authors_ids)))
+        .cte("new_authors")
+    )
+    new_tags = (
+        insert(TagPosts.__table__)
+        .from_select(["post_id", "tag_id"], select(new_post.c.id, func.unnest(tags_ids)))
+        .cte("new_tags")
+    )
+    new_trending = add_empty_trending_scores_query(model=PostTrending, entities=new_post).cte("new_trending")
+
+    q = (
+        select(blog, new_post)
+        .select_from(blog.outerjoin(new_post, onclause=literal_column("true")))
+        .add_cte(new_authors)
+        .add_cte(new_tags)
+        .add_cte(new_trending)
+    )
+    return q
+
+
+def get_create_post_query(
+    blog_id: UUID,
+    user_id: UUID,
+    is_admin: bool,
+    authors_ids: List[UUID],
+    tags_ids: List[UUID],
+    **values,
+):
+    """Builds statement validating and creating the post with its authors
+    and tags, values are bound to columns of the post
+    """
+    q = _create_post_template()
+    params = {
+        "blog_id": blog_id,
+        "user_id": user_id,
+        "is_admin": is_admin,
+        "authors_ids": authors_ids,
+        "tags_ids": tags_ids,
+        **{column: values.get(column) for column in CREATED_POST_COLUMNS},
+    }
+    return q, params
+
+
+def notify_post_event_query(
+    event_type: PostEventType,
+    post_id: UUID,
+    blog_id: UUID,
+    tags_ids: List[UUID],
+    title: str,
+    date_modified: datetime,
+):
+    """Notifies listeners of the posts events channel. Notification is sent
+    on commit of the transaction, its payload is id of the event and JSON
+    of the event separated by colon.
+    """
+    data = json.dumps({
+        "type": event_type.value,
+        "post_id": str(post_id),
+        "blog_id": str(blog_id),
+        "tags_ids": [str(tag_id) for tag_id in tags_ids],
+        "title": title,
+        "date_modified": date_modified.isoformat(),
+    })
+    payload = cast(post_event_id_seq.next_value(), String) + ":" + cast(bindparam("data", data), String)
+    return select(func.pg_notify(POST_EVENTS_CHANNEL, payload))
+
+
+def get_user_subscriptions_query(user_id: UUID):
+    """Ids of blogs and tags subscribed by the user in a single row, null if there are none"""
+    blogs_ids = (
+        select(func.array_agg(BlogSubscribers.blog_id))
+        .where(BlogSubscribers.subscriber_id == user_id)
+        .scalar_subquery()
+    )
+    tags_ids = (
+        select(func.array_agg(TagSubscribers.tag_id))
+        .where(TagSubscribers.subscriber_id == user_id)
+        .scalar_subquery()
+    )
+    return select(blogs_ids.label("blogs_ids"), tags_ids.label("tags_ids"))
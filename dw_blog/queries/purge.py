@@ -0,0 +1,268 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import Table, bindparam, delete, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.sql.elements import BindParameter, ColumnElement
+
+from dw_blog.models.blog import Blog, BlogAuthors, BlogLikes, BlogSubscribers
+from dw_blog.models.category import CategoryBlogs
+from dw_blog.models.comment import Comment
+from dw_blog.models.image import Image
+from dw_blog.models.post import Post, PostAuthors, PostFavourites, PostLikers
+from dw_blog.models.purge import Purge
+from dw_blog.models.related import BlogRelated
+from dw_blog.models.tag import Tag, TagPosts, TagSubscribers
+from dw_blog.models.user import User
+from dw_blog.queries.comment import PATH_END
+from dw_blog.schemas.purge import PurgeEntity, PurgeStatus
+
+blog = Blog.__table__
+blog_authors = BlogAuthors.__table__
+blog_likes = BlogLikes.__table__
+blog_related = BlogRelated.__table__
+blog_subscribers = BlogSubscribers.__table__
+category_blogs = CategoryBlogs.__table__
+comment = Comment.__table__
+image = Image.__table__
+post = Post.__table__
+post_authors = PostAuthors.__table__
+post_favourites = PostFavourites.__table__
+post_likers = PostLikers.__table__
+tag = Tag.__table__
+tag_posts = TagPosts.__table__
+tag_subscribers = TagSubscribers.__table__
+user = User.__table__
+
+# Text of comments of purged users kept for replies of other users
+ANONYMISED_COMMENT_TEXT = "[deleted]"
+
+
+class PurgeStep(NamedTuple):
+    """Rows of a single table removed by the purge. `where` selects rows of
+    the purged entity by its bound id, `order_by` orders removal inside the
+    table (e.g. replies before the comments they reply to). With `subtrees`
+    selected comments are removed with their replies and comment counters
+    of their posts and parents are updated, unless their threads have
+    replies of other authors, then the comments are only anonymised. With
+    `content` hashes of stored files of removed rows are returned too.
+    """
+    table: Table
+    where: Callable[[BindParameter], ColumnElement]
+    order_by: Tuple[ColumnElement, ...] = ()
+    subtrees: bool = False
+    content: bool = False
+
+
+def _blog_posts(blog_id: BindParameter):
+    return select(post.c.id).where(post.c.blog_id == blog_id)
+
+
+def _blog_tags(blog_id: BindParameter):
+    return select(tag.c.id).where(tag.c.blog_id == blog_id)
+
+
+# Dependent rows first, so that no foreign key is violated by any chunk
+PURGE_STEPS: Dict[PurgeEntity, List[PurgeStep]] = {
+    PurgeEntity.blog: [
+        PurgeStep(post_likers, lambda blog_id: post_likers.c.post_id.in_(_blog_posts(blog_id))),
+        PurgeStep(post_favourites, lambda blog_id: post_favourites.c.post_id.in_(_blog_posts(blog_id))),
+        PurgeStep(post_authors, lambda blog_id: post_authors.c.post_id.in_(_blog_posts(blog_id))),
+        PurgeStep(tag_posts, lambda blog_id: tag_posts.c.post_id.in_(_blog_posts(blog_id))),
+        PurgeStep(tag_posts, lambda blog_id: tag_posts.c.tag_id.in_(_blog_tags(blog_id))),
+        PurgeStep(
+            comment,
+            lambda blog_id: comment.c.post_id.in_(_blog_posts(blog_id)),
+            order_by=(comment.c.depth.desc(),),
+        ),
+        PurgeStep(image, lambda blog_id: image.c.post_id.in_(_blog_posts(blog_id)), content=True),
+        PurgeStep(post, lambda blog_id: post.c.blog_id == blog_id),
+        PurgeStep(tag_subscribers, lambda blog_id: tag_subscribers.c.tag_id.in_(_blog_tags(blog_id))),
+        PurgeStep(tag, lambda blog_id: tag.c.blog_id == blog_id),
+        PurgeStep(blog_likes, lambda blog_id: blog_likes.c.blog_id == blog_id),
+        PurgeStep(blog_subscribers, lambda blog_id: blog_subscribers.c.blog_id == blog_id),
+        PurgeStep(blog_authors, lambda blog_id: blog_authors.c.blog_id == blog_id),
+        PurgeStep(category_blogs, lambda blog_id: category_blogs.c.blog_id == blog_id),
+        PurgeStep(blog_related, lambda blog_id: blog_related.c.blog_id == blog_id),
+        PurgeStep(blog_related, lambda blog_id: blog_related.c.related_blog_id == blog_id),
+        PurgeStep(blog, lambda blog_id: blog.c.id == blog_id),
+    ],
+    PurgeEntity.user: [
+        PurgeStep(
+            comment,
+            lambda user_id: comment.c.author_id == user_id,
+            order_by=(comment.c.depth,),
+            subtrees=True,
+        ),
+        PurgeStep(post_likers, lambda user_id: post_likers.c.liker_id == user_id),
+        PurgeStep(post_favourites, lambda user_id: post_favourites.c.favouriter_id == user_id),
+        PurgeStep(post_authors, lambda user_id: post_authors.c.author_id == user_id),
+        PurgeStep(tag_subscribers, lambda user_id: tag_subscribers.c.subscriber_id == user_id),
+        PurgeStep(blog_likes, lambda user_id: blog_likes.c.liker_id == user_id),
+        PurgeStep(blog_subscribers, lambda user_id: blog_subscribers.c.subscriber_id == user_id),
+        PurgeStep(blog_authors, lambda user_id: blog_authors.c.author_id == user_id),
+        PurgeStep(user, lambda user_id: user.c.id == user_id),
+    ],
+    PurgeEntity.tag: [
+        PurgeStep(tag_posts, lambda tag_id: tag_posts.c.tag_id == tag_id),
+        PurgeStep(tag_subscribers, lambda tag_id: tag_subscribers.c.tag_id == tag_id),
+        PurgeStep(tag, lambda tag_id: tag.c.id == tag_id),
+    ],
+}
+
+
+def _comment_subtrees_statement(roots):
+    """Removes selected comments with whole their threads, comments count
+    of posts and replies count of parents which are left are decreased.
+    Comments with replies of other authors (or of already anonymised
+    comments) are kept for them, without author and text.
+    """
+    roots = roots.cte("roots")
+    thread = comment.alias("thread")
+    shared = (
+        select(thread.c.id)
+        .where(
+            thread.c.post_id == roots.c.post_id,
+            thread.c.path > roots.c.path,
+            thread.c.path < roots.c.path + PATH_END,
+            thread.c.author_id.is_distinct_from(roots.c.author_id),
+        )
+        .exists()
+    )
+    deleted = (
+        delete(comment)
+        .where(
+            comment.c.post_id == roots.c.post_id,
+            comment.c.path >= roots.c.path,
+            comment.c.path < roots.c.path + PATH_END,
+            ~shared,
+        )
+        .returning(comment.c.id, comment.c.post_id, comment.c.parent_id)
+        .cte("deleted")
+    )
+    posts_counts = (
+        select(deleted.c.post_id, func.count().label("count"))
+        .group_by(deleted.c.post_id)
+        .subquery("posts_counts")
+    )
+    posts_update = (
+        update(post)
+        .where(post.c.id == posts_counts.c.post_id)
+        .values(comments_count=post.c.comments_count - posts_counts.c.count)
+        .returning(post.c.id)
+        .cte("posts_update")
+    )
+    # Only roots of removed threads have parents which are left
+    parents_counts = (
+        select(deleted.c.parent_id, func.count().label("count"))
+        .where(deleted.c.parent_id.is_not(None), deleted.c.parent_id.not_in(select(deleted.c.id)))
+        .group_by(deleted.c.parent_id)
+        .subquery("parents_counts")
+    )
+    # Row is updated once per statement, so anonymised parents are counted down here
+    removed_replies = (
+        select(parents_counts.c.count)
+        .where(parents_counts.c.parent_id == comment.c.id)
+        .scalar_subquery()
+    )
+    anonymised = (
+        update(comment)
+        .where(comment.c.id == roots.c.id, shared)
+        .values(
+            author_id=None,
+            text=ANONYMISED_COMMENT_TEXT,
+            replies_count=comment.c.replies_count - func.coalesce(removed_replies, 0),
+        )
+        .returning(comment.c.id)
+        .cte("anonymised")
+    )
+    parents_update = (
+        update(comment)
+        .where(comment.c.id == parents_counts.c.parent_id, comment.c.id.not_in(select(anonymised.c.id)))
+        .values(replies_count=comment.c.replies_count - parents_counts.c.count)
+        .returning(comment.c.id)
+        .cte("parents_update")
+    )
+    removed = select(deleted.c.id).union_all(select(anonymised.c.id)).subquery("removed")
+    return select(func.count().label("deleted")).select_from(removed).add_cte(posts_update).add_cte(parents_update)
+
+
+@lru_cache(maxsize=None)
+def _purge_chunk_template(entity: PurgeEntity, step: int):
+    """Builds statement removing up to chunk size rows of the step, which
+    returns count of removed rows, with distinct hashes of their files for
+    steps with content. Chunk is selected by the primary key, so only
+    removed rows are locked.
+    """
+    purge_step = PURGE_STEPS[entity][step]
+    entity_id = bindparam("entity_id", type_=PG_UUID(as_uuid=True))
+    if purge_step.subtrees:
+        roots = (
+            select(
+                purge_step.table.c.id,
+                purge_step.table.c.post_id,
+                purge_step.table.c.path,
+                purge_step.table.c.author_id,
+            )
+            .where(purge_step.where(entity_id))
+            .order_by(*purge_step.order_by)
+            .limit(bindparam("chunk_size"))
+        )
+        return _comment_subtrees_statement(roots)
+
+    key = list(purge_step.table.primary_key.columns)
+    chunk = (
+        select(*key)
+        .where(purge_step.where(entity_id))
+        .order_by(*purge_step.order_by)
+        .limit(bindparam("chunk_size"))
+    )
+    returned = [*key, purge_step.table.c.hash] if purge_step.content else key
+    deleted = delete(purge_step.table).where(tuple_(*key).in_(chunk)).returning(*returned).cte("deleted")
+    q = select(func.count().label("deleted")).select_from(deleted)
+    if purge_step.content:
+        q = q.add_columns(func.array_agg(deleted.c.hash.distinct()).label("content_hashes"))
+    return q
+
+
+def get_purge_chunk_query(entity: PurgeEntity, step: int, entity_id: UUID, chunk_size: int):
+    q = _purge_chunk_template(entity=entity, step=step)
+    params = {"entity_id": entity_id, "chunk_size": chunk_size}
+    return q, params
+
+
+def claim_purge_query(purge_id: UUID):
+    """Marks purge as running and returns it, unless it is done. Failed
+    purge is resumed from its last step.
+    """
+    q = (
+        update(Purge)
+        .where(Purge.id == purge_id, Purge.status != PurgeStatus.done)
+        .values(status=PurgeStatus.running, error=None, date_modified=datetime.utcnow(), date_finished=None)
+        .returning(*Purge.__table__.c)
+        .execution_options(synchronize_session=False)
+    )
+    return q
+
+
+def update_purge_progress_query(purge_id: UUID, step: int, rows_deleted: int):
+    q = (
+        update(Purge)
+        .where(Purge.id == purge_id)
+        .values(step=step, rows_deleted=Purge.rows_deleted + rows_deleted, date_modified=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return q
+
+
+def finish_purge_query(purge_id: UUID, status: PurgeStatus, error: Optional[str] = None):
+    now = datetime.utcnow()
+    q = (
+        update(Purge)
+        .where(Purge.id == purge_id)
+        .values(status=status, error=error, date_modified=now, date_finished=now)
+        .execution_options(synchronize_session=False)
+    )
+    return q
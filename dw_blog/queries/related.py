@@ -0,0 +1,435 @@
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy import (Column, Float, Integer, MetaData, String, Table, and_, any_, bindparam, cast, delete, literal,
+                        select, text, union, union_all)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql.elements import BindParameter
+from sqlmodel import func
+
+from dw_blog.models.blog import Blog, BlogAuthors, BlogLikes, BlogSubscribers
+from dw_blog.models.post import Post, PostLikers
+from dw_blog.models.related import BlogRelated, PostRelated
+from dw_blog.models.tag import Tag, TagPosts
+from dw_blog.queries.common import UUID_ARRAY, deleted_ids
+
+blog = Blog.__table__
+blog_authors = BlogAuthors.__table__
+blog_likes = BlogLikes.__table__
+blog_related = BlogRelated.__table__
+blog_subscribers = BlogSubscribers.__table__
+post = Post.__table__
+post_likers = PostLikers.__table__
+post_related = PostRelated.__table__
+tag_posts = TagPosts.__table__
+# Neighbour table of blogs is rebuilt aside and swapped in
+blog_related_staging = Table(
+    "blogrelated_staging",
+    MetaData(),
+    *(Column(column.name, column.type, nullable=False) for column in blog_related.c),
+)
+
+# Kinds of features of posts, so that ids of tags and likers never match each other
+TAG_FEATURE = 0
+LIKER_FEATURE = 1
+
+
+def _published_posts():
+    return select(post.c.id).where(post.c.published.is_(True), post.c.blog_id.not_in(deleted_ids(Blog)))
+
+
+def _sharing_feature_posts(changed: BindParameter):
+    """Selects of the posts sharing a tag and of the posts sharing a liker
+    with the changed posts, which include the changed posts with any
+    """
+    shared_tag = tag_posts.alias("shared_tag")
+    shared_liker = post_likers.alias("shared_liker")
+    return [
+        select(shared_tag.c.post_id)
+        .join(tag_posts, onclause=tag_posts.c.tag_id == shared_tag.c.tag_id)
+        .where(tag_posts.c.post_id == any_(changed)),
+        select(shared_liker.c.post_id)
+        .join(post_likers, onclause=post_likers.c.liker_id == shared_liker.c.liker_id)
+        .where(post_likers.c.post_id == any_(changed)),
+    ]
+
+
+def _features(tag_weight: float, like_weight: float, posts_ids: Optional[List[UUID]] = None):
+    """Sparse feature vectors of published posts, a row per non-zero
+    value: tags of the post and users who liked it. With posts ids only
+    vectors of the posts and their candidate neighbours are read, whole,
+    so that their norms are exact.
+    """
+    published = _published_posts()
+    tags_of_published = tag_posts.c.post_id.in_(published)
+    likes_of_published = post_likers.c.post_id.in_(published)
+    if posts_ids is not None:
+        # Only posts sharing a feature with the posts can be their neighbours
+        changed = bindparam("posts_ids", posts_ids, type_=UUID_ARRAY)
+        candidates = union(
+            select(func.unnest(cast(changed, UUID_ARRAY)).label("post_id")),
+            *_sharing_feature_posts(changed),
+        ).subquery("candidates")
+        # Arrays of ids are computed once and looked up by the indexes, unlike joins with the candidates
+        candidates_ids = func.array(select(candidates.c.post_id).scalar_subquery())
+        published = published.where(post.c.id == any_(candidates_ids)).cte("published")
+        published = func.array(select(published.c.id).scalar_subquery())
+        tags_of_published = tag_posts.c.post_id == any_(published)
+        likes_of_published = post_likers.c.post_id == any_(published)
+    tags = (
+        select(
+            tag_posts.c.post_id,
+            tag_posts.c.tag_id.label("feature_id"),
+            cast(literal(TAG_FEATURE), Integer).label("kind"),
+            cast(literal(tag_weight), Float).label("weight"),
+        )
+        .where(tags_of_published, tag_posts.c.tag_id.not_in(deleted_ids(Tag)))
+    )
+    likes = (
+        select(
+            post_likers.c.post_id,
+            post_likers.c.liker_id.label("feature_id"),
+            cast(literal(LIKER_FEATURE), Integer).label("kind"),
+            cast(literal(like_weight), Float).label("weight"),
+        )
+        .where(likes_of_published)
+    )
+    return union_all(tags, likes).cte("features")
+
+
+def get_related_affected_posts_query(posts_ids: List[UUID]):
+    """Posts whose neighbours change with tags or likers of the given
+    posts: the posts themselves, posts sharing a tag or a liker with them
+    and posts which list them as related now
+    """
+    changed = bindparam("posts_ids", posts_ids, type_=UUID_ARRAY)
+    q = union(
+        select(func.unnest(cast(changed, UUID_ARRAY)).label("post_id")),
+        select(post_related.c.post_id).where(post_related.c.related_post_id == any_(changed)),
+        *_sharing_feature_posts(changed),
+    )
+    return q
+
+
+def delete_related_posts_query(posts_ids: Optional[List[UUID]] = None):
+    q = delete(post_related)
+    if posts_ids is not None:
+        q = q.where(post_related.c.post_id == any_(bindparam("posts_ids", posts_ids, type_=UUID_ARRAY)))
+    return q
+
+
+def refresh_related_posts_query(
+    top_k: int,
+    tag_weight: float,
+    like_weight: float,
+    posts_ids: Optional[List[UUID]] = None,
+):
+    """Builds insert of the top-K neighbours of posts, all published posts
+    without posts ids. Similarity is cosine of the feature vectors: dot
+    products are summed over shared features only, as a sparse product
+    of the feature matrix with its transpose, and divided by the norms.
+    With posts ids the features are read for the posts and their candidate
+    neighbours only, before the self-join.
+    """
+    features = _features(tag_weight=tag_weight, like_weight=like_weight, posts_ids=posts_ids)
+    source = features.alias("source")
+    neighbour = features.alias("neighbour")
+
+    # Dot products of posts sharing at least one feature
+    dots = (
+        select(
+            source.c.post_id,
+            neighbour.c.post_id.label("related_post_id"),
+            func.sum(source.c.weight * neighbour.c.weight).label("dot"),
+        )
+        .join(
+            neighbour,
+            onclause=and_(
+                neighbour.c.kind == source.c.kind,
+                neighbour.c.feature_id == source.c.feature_id,
+                neighbour.c.post_id != source.c.post_id,
+            ),
+        )
+        .group_by(source.c.post_id, neighbour.c.post_id)
+    )
+    if posts_ids is not None:
+        dots = dots.where(source.c.post_id == any_(bindparam("posts_ids", posts_ids, type_=UUID_ARRAY)))
+    dots = dots.cte("dots")
+
+    # Norms of the posts of the dot products only
+    norms = (
+        select(features.c.post_id, func.sqrt(func.sum(features.c.weight * features.c.weight)).label("norm"))
+        .where(
+            features.c.post_id.in_(
+                union(select(dots.c.post_id), select(dots.c.related_post_id))
+            )
+        )
+        .group_by(features.c.post_id)
+        .cte("norms")
+    )
+    source_norm = norms.alias("source_norm")
+    neighbour_norm = norms.alias("neighbour_norm")
+
+    score = dots.c.dot / (source_norm.c.norm * neighbour_norm.c.norm)
+    ranked = (
+        select(
+            dots.c.post_id,
+            dots.c.related_post_id,
+            score.label("score"),
+            func.row_number().over(
+                partition_by=dots.c.post_id,
+                order_by=(score.desc(), dots.c.related_post_id),
+            ).label("rank"),
+        )
+        .join(source_norm, onclause=source_norm.c.post_id == dots.c.post_id)
+        .join(neighbour_norm, onclause=neighbour_norm.c.post_id == dots.c.related_post_id)
+        .subquery("ranked")
+    )
+    top = (
+        select(
+            ranked.c.post_id,
+            ranked.c.related_post_id,
+            ranked.c.score,
+            func.timezone("utc", func.now()).label("date_refreshed"),
+        )
+        .where(ranked.c.rank <= top_k)
+    )
+    q = insert(post_related).from_select(["post_id", "related_post_id", "score", "date_refreshed"], top)
+    # Posts refreshed by another worker at the same time
+    q = q.on_conflict_do_update(
+        index_elements=[post_related.c.post_id, post_related.c.related_post_id],
+        set_={"score": q.excluded.score, "date_refreshed": q.excluded.date_refreshed},
+    )
+    return q
+
+
+def get_related_posts_query(post_id: UUID, limit: int):
+    """Reads the neighbours of the post, skipping the ones which were
+    unpublished or deleted since the refresh
+    """
+    q = (
+        select(
+            post.c.id,
+            post.c.title,
+            post.c.blog_id,
+            post.c.excerpt,
+            post.c.reading_time,
+            post_related.c.score,
+        )
+        .join(post, onclause=post.c.id == post_related.c.related_post_id)
+        .where(
+            post_related.c.post_id == post_id,
+            post.c.published.is_(True),
+            post.c.blog_id.not_in(deleted_ids(Blog)),
+        )
+        .order_by(post_related.c.score.desc(), post_related.c.related_post_id)
+        .limit(limit)
+    )
+    return q
+
+
+def _active_blogs():
+    return select(blog.c.id).where(blog.c.archived.is_(False), blog.c.date_deleted.is_(None))
+
+
+def _interactions(like_weight: float, subscribe_weight: float, user_id=None):
+    """Likes and subscriptions of blogs, a row per interaction"""
+    likes = select(
+        blog_likes.c.blog_id,
+        blog_likes.c.liker_id.label("user_id"),
+        cast(literal(like_weight), Float).label("weight"),
+        blog_likes.c.date_created,
+    )
+    subscriptions = select(
+        blog_subscribers.c.blog_id,
+        blog_subscribers.c.subscriber_id.label("user_id"),
+        cast(literal(subscribe_weight), Float).label("weight"),
+        blog_subscribers.c.date_created,
+    )
+    if user_id is not None:
+        likes = likes.where(blog_likes.c.liker_id == user_id)
+        subscriptions = subscriptions.where(blog_subscribers.c.subscriber_id == user_id)
+    return union_all(likes, subscriptions)
+
+
+def create_related_blogs_staging_queries():
+    """Empty staging table of the rebuild, left by a failed rebuild or not"""
+    return [
+        text("DROP TABLE IF EXISTS blogrelated_staging"),
+        text("CREATE TABLE blogrelated_staging (LIKE blogrelated INCLUDING DEFAULTS)"),
+    ]
+
+
+def index_related_blogs_staging_queries():
+    """Keys and statistics of the staging table, built after its rows are
+    inserted and named as the ones of the neighbour table after the swap
+    """
+    return [
+        text(
+            "ALTER TABLE blogrelated_staging "
+            "ADD CONSTRAINT blogrelated_staging_pkey PRIMARY KEY (blog_id, related_blog_id)"
+        ),
+        text("CREATE INDEX ix_blogrelated_staging_related_blog_id ON blogrelated_staging (related_blog_id)"),
+        text("ANALYZE blogrelated_staging"),
+    ]
+
+
+def set_related_blogs_lock_timeout_query(lock_timeout: str):
+    """Wait for locks until the end of the transaction, so that the swap
+    does not queue reads of recommendations behind a long one
+    """
+    return select(func.set_config("lock_timeout", bindparam("lock_timeout", lock_timeout, type_=String), True))
+
+
+def swap_related_blogs_queries():
+    """Replaces neighbour table with the staging one. Takes exclusive locks
+    of both tables until the end of the transaction, but only renames them.
+    """
+    return [
+        text("DROP TABLE blogrelated"),
+        text("ALTER TABLE blogrelated_staging RENAME TO blogrelated"),
+        text("ALTER INDEX blogrelated_staging_pkey RENAME TO blogrelated_pkey"),
+        text("ALTER INDEX ix_blogrelated_staging_related_blog_id RENAME TO ix_blogrelated_related_blog_id"),
+    ]
+
+
+def set_related_blogs_work_mem_query(work_mem: str):
+    """Memory of sorts and hashes of the rebuild until the end of the
+    transaction, pairs of blogs don't fit in the default one
+    """
+    return select(func.set_config("work_mem", bindparam("work_mem", work_mem, type_=String), True))
+
+
+def refresh_related_blogs_query(top_k: int, like_weight: float, subscribe_weight: float, user_interactions_max: int):
+    """Builds insert of the top-K neighbours of all blogs into the staging
+    table. Blogs are sparse vectors over users, valued by the weights of
+    their like and subscription, and similarity is their cosine. The whole
+    interaction matrix is read in bulk and dot products are summed over
+    shared users only, as a sparse product of the matrix with its transpose.
+    Only latest interactions of a user are counted, as pairs of blogs grow
+    with their square.
+    """
+    # Step 1: Blog-user matrix of non-deleted blogs, capped per user
+    interactions = _interactions(like_weight=like_weight, subscribe_weight=subscribe_weight).subquery("interactions")
+    matrix = (
+        select(
+            interactions.c.blog_id,
+            interactions.c.user_id,
+            func.sum(interactions.c.weight).label("weight"),
+            func.row_number().over(
+                partition_by=interactions.c.user_id,
+                order_by=(func.max(interactions.c.date_created).desc(), interactions.c.blog_id),
+            ).label("rank"),
+        )
+        .where(interactions.c.blog_id.not_in(deleted_ids(Blog)))
+        .group_by(interactions.c.blog_id, interactions.c.user_id)
+        .subquery("matrix")
+    )
+    features = (
+        select(matrix.c.blog_id, matrix.c.user_id, matrix.c.weight)
+        .where(matrix.c.rank <= user_interactions_max)
+        .cte("features")
+    )
+    source = features.alias("source")
+    neighbour = features.alias("neighbour")
+
+    # Step 2: Dot products of blogs sharing at least one user, only active blogs are neighbours
+    dots = (
+        select(
+            source.c.blog_id,
+            neighbour.c.blog_id.label("related_blog_id"),
+            func.sum(source.c.weight * neighbour.c.weight).label("dot"),
+        )
+        .join(
+            neighbour,
+            onclause=and_(neighbour.c.user_id == source.c.user_id, neighbour.c.blog_id != source.c.blog_id),
+        )
+        .where(neighbour.c.blog_id.in_(_active_blogs()))
+        .group_by(source.c.blog_id, neighbour.c.blog_id)
+        .cte("dots")
+    )
+    norms = (
+        select(features.c.blog_id, func.sqrt(func.sum(features.c.weight * features.c.weight)).label("norm"))
+        .group_by(features.c.blog_id)
+        .cte("norms")
+    )
+    source_norm = norms.alias("source_norm")
+    neighbour_norm = norms.alias("neighbour_norm")
+
+    # Step 3: Top-K neighbours of every blog by cosine
+    score = dots.c.dot / (source_norm.c.norm * neighbour_norm.c.norm)
+    ranked = (
+        select(
+            dots.c.blog_id,
+            dots.c.related_blog_id,
+            score.label("score"),
+            func.row_number().over(
+                partition_by=dots.c.blog_id,
+                order_by=(score.desc(), dots.c.related_blog_id),
+            ).label("rank"),
+        )
+        .join(source_norm, onclause=source_norm.c.blog_id == dots.c.blog_id)
+        .join(neighbour_norm, onclause=neighbour_norm.c.blog_id == dots.c.related_blog_id)
+        .subquery("ranked")
+    )
+    top = (
+        select(
+            ranked.c.blog_id,
+            ranked.c.related_blog_id,
+            ranked.c.score,
+            func.timezone("utc", func.now()).label("date_refreshed"),
+        )
+        .where(ranked.c.rank <= top_k)
+    )
+    return insert(blog_related_staging).from_select(["blog_id", "related_blog_id", "score", "date_refreshed"], top)
+
+
+def get_recommended_blogs_query(
+    user_id: UUID,
+    like_weight: float,
+    subscribe_weight: float,
+    user_interactions_max: int,
+    limit: int,
+):
+    """Scores neighbours of the latest blogs the user interacted with by
+    the sum of their similarities, weighted by the interactions. Blogs the
+    user already likes, subscribes or writes and archived or deleted blogs
+    are not recommended.
+    """
+    interactions = _interactions(
+        like_weight=like_weight,
+        subscribe_weight=subscribe_weight,
+        user_id=user_id,
+    ).cte("interactions")
+    # Latest interactions only, as in the rebuild, so that the most active users are scored as fast
+    seeds = (
+        select(interactions.c.blog_id, func.sum(interactions.c.weight).label("weight"))
+        .group_by(interactions.c.blog_id)
+        .order_by(func.max(interactions.c.date_created).desc(), interactions.c.blog_id)
+        .limit(user_interactions_max)
+        .cte("seeds")
+    )
+    # Anti joins, unlike NOT IN, are estimated well and keep lookups of the neighbours by index
+    related_blog_id = blog_related.c.related_blog_id
+    followed = select(interactions.c.blog_id).where(interactions.c.blog_id == related_blog_id)
+    authored = select(blog_authors.c.blog_id).where(
+        blog_authors.c.blog_id == related_blog_id,
+        blog_authors.c.author_id == user_id,
+    )
+    score = func.sum(seeds.c.weight * blog_related.c.score)
+    q = (
+        select(blog.c.id, blog.c.name, score.label("score"))
+        .select_from(seeds)
+        .join(blog_related, onclause=blog_related.c.blog_id == seeds.c.blog_id)
+        .join(blog, onclause=blog.c.id == related_blog_id)
+        .where(
+            ~followed.exists(),
+            ~authored.exists(),
+            blog.c.archived.is_(False),
+            blog.c.date_deleted.is_(None),
+        )
+        .group_by(blog.c.id, blog.c.name)
+        .order_by(score.desc(), blog.c.id)
+        .limit(limit)
+    )
+    return q
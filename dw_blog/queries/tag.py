@@ -1,20 +1,26 @@
+from functools import lru_cache
 from uuid import UUID
-from typing import Optional
+from typing import FrozenSet, List, Optional
 
+from sqlalchemy import any_, bindparam
 from sqlmodel import select, func
 
 from dw_blog.models.tag import Tag, TagSubscribers
-from dw_blog.schemas.tag import SortTagBy
+from dw_blog.schemas.tag import SortTagBy, TagReadList
 from dw_blog.models.blog import Blog
 from dw_blog.schemas.common import SortOrder
 from dw_blog.exceptions.tag import TagListingBothFilters
 from dw_blog.schemas.auth import AuthUser
+from dw_blog.queries.common import TEMPLATE_CACHE_SIZE, UUID_ARRAY, contains_pattern, deleted_ids
 
+LISTED_TAG_FIELDS = frozenset(TagReadList.__fields__)
 
-def get_single_tag_query(tag_id: UUID):
+
+def _tag_details_query():
     q = (
         select(
             Tag.id,
+            Tag.version,
             Tag.name,
             Tag.date_created,
             Tag.date_modified,
@@ -26,59 +32,66 @@ def get_single_tag_query(tag_id: UUID):
             onclause=Blog.id == Tag.blog_id,
             isouter=True,
         )
-        .where(Tag.id == tag_id)
+        .where(Tag.date_deleted.is_(None), Blog.date_deleted.is_(None))
     )
     return q
 
 
-def get_listed_tags_query(
-    limit: int,
-    offset: int,
-    user_id: Optional[UUID] = None,
-    blog_id: Optional[UUID] = None,
-    tag_name: Optional[str] = None,
-    sort_order: SortOrder = SortOrder.ascending,
-    sort_by: SortTagBy = SortTagBy.most_subscribers,
+def get_single_tag_query(tag_id: UUID):
+    return _tag_details_query().where(Tag.id == tag_id)
+
+
+def get_batch_tags_query(tag_ids: List[UUID]):
+    return _tag_details_query().where(Tag.id == any_(bindparam("tag_ids", tag_ids, type_=UUID_ARRAY)))
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _listed_tags_template(
+    user_id: bool,
+    blog_id: bool,
+    tag_name: bool,
+    sort_order: SortOrder,
+    sort_by: SortTagBy,
+    fields: FrozenSet[str],
 ):
-    sub_q = (
-        select(
-            Tag.id.label("id"),
-            Tag.name.label("name"),
-            Tag.date_created.label("date_created"),
-            Tag.date_modified.label("date_modified"),
-            Tag.blog_id.label("blog_id"),
-            func.count(func.distinct(TagSubscribers.subscriber_id)).label("subscription_count"),
-            func.array_agg(func.distinct(TagSubscribers.subscriber_id)).label("subscribers_ids"),
+    """Builds listing query once per filter shape and fieldset, values
+    are bound at execution. Subscriptions are counted only if the count
+    is requested or needed for sorting, by correlated subquery, so that
+    filters of tags can use indexes.
+    """
+    sub_q = select(
+        Tag.id.label("id"),
+        Tag.name.label("name"),
+        Tag.date_created.label("date_created"),
+        Tag.date_modified.label("date_modified"),
+        Tag.blog_id.label("blog_id"),
+    ).where(Tag.date_deleted.is_(None), Tag.blog_id.not_in(deleted_ids(Blog)))
+    if "subscription_count" in fields or sort_by == SortTagBy.most_subscribers:
+        sub_q = sub_q.add_columns(
+            select(func.count())
+            .where(TagSubscribers.tag_id == Tag.id)
+            .correlate(Tag)
+            .scalar_subquery()
+            .label("subscription_count")
         )
-        .join(TagSubscribers, onclause=TagSubscribers.tag_id == Tag.id, isouter=True)
-        .group_by(Tag.id)
-        .alias()
-    )
-    q = select(
-        sub_q.c.id,
-        sub_q.c.name,
-        sub_q.c.date_created,
-        sub_q.c.date_modified,
-        sub_q.c.blog_id,
-        sub_q.c.subscription_count,
-        sub_q.c.subscribers_ids,
-    )
-
-    # Raise exception if both filters are defined
-    if blog_id and user_id:
-        raise TagListingBothFilters()
+    sub_q = sub_q.alias()
+    q = select(*[sub_q.c[field] for field in TagReadList.__fields__ if field in fields])
 
     # Filter by blog
     if blog_id:
-        q = q.where(sub_q.c.blog_id == blog_id)
+        q = q.where(sub_q.c.blog_id == bindparam("blog_id"))
 
     # Filter by subscribed user
     if user_id:
-        q = q.where(sub_q.c.subscribers_ids.any(user_id))
+        q = q.where(
+            select(TagSubscribers.tag_id)
+            .where(TagSubscribers.tag_id == sub_q.c.id, TagSubscribers.subscriber_id == bindparam("user_id"))
+            .exists()
+        )
 
     # Filter by tag name
     if tag_name:
-        q = q.where(sub_q.c.name.ilike(f"%{tag_name}%"))
+        q = q.where(sub_q.c.name.ilike(bindparam("tag_name")))
 
     # Create sorting
     if sort_by == SortTagBy.most_subscribers:
@@ -96,10 +109,54 @@ def get_listed_tags_query(
     # Assign query for count of all records
     q_all = q
     # Add pagination to query
-    q_pag = q.limit(limit).offset(offset)
+    q_pag = q.limit(bindparam("limit")).offset(bindparam("offset"))
     return q_pag, q_all
 
 
+def get_listed_tags_query(
+    limit: int,
+    offset: int,
+    user_id: Optional[UUID] = None,
+    blog_id: Optional[UUID] = None,
+    tag_name: Optional[str] = None,
+    sort_order: SortOrder = SortOrder.ascending,
+    sort_by: SortTagBy = SortTagBy.most_subscribers,
+    fields: FrozenSet[str] = LISTED_TAG_FIELDS,
+):
+    # Raise exception if both filters are defined
+    if blog_id and user_id:
+        raise TagListingBothFilters()
+
+    # Get template for given filters and fields
+    q_pag, q_all = _listed_tags_template(
+        user_id=bool(user_id),
+        blog_id=bool(blog_id),
+        tag_name=bool(tag_name),
+        sort_order=sort_order,
+        sort_by=sort_by,
+        fields=fields,
+    )
+
+    # Collect values of bound parameters
+    params = {"limit": limit, "offset": offset}
+    if user_id:
+        params["user_id"] = user_id
+    if blog_id:
+        params["blog_id"] = blog_id
+    if tag_name:
+        params["tag_name"] = contains_pattern(tag_name)
+
+    return q_pag, q_all, params
+
+
+def get_tags_blogs_query(tag_ids: List[UUID]):
+    q = (
+        select(Tag.id, Tag.blog_id)
+        .where(Tag.id == any_(bindparam("tag_ids", tag_ids, type_=UUID_ARRAY)), Tag.date_deleted.is_(None))
+    )
+    return q
+
+
 def tag_subscription_query(
     tag_id: UUID,
     current_user: AuthUser,
@@ -0,0 +1,189 @@
+import math
+from datetime import datetime
+from typing import Optional, Type, Union
+from uuid import UUID
+
+from sqlalchemy import Float, case, cast, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql.elements import ColumnElement
+from sqlmodel import SQLModel, func
+
+from dw_blog.models.blog import Blog
+from dw_blog.models.post import Post
+from dw_blog.models.trending import NO_TRENDING, BlogTrending, PostTrending
+
+TrendingModel = Union[Type[PostTrending], Type[BlogTrending]]
+
+# Posts and blogs scored by the trending tables
+ENTITY_TABLES = {PostTrending: Post.__table__, BlogTrending: Blog.__table__}
+
+
+def _utc_now():
+    return func.timezone("utc", func.now())
+
+
+def _epoch(value):
+    return cast(func.extract("epoch", value), Float)
+
+
+def _decay(seconds, half_life: int):
+    # Decay factor for given (negative) age, clamped to avoid float underflow
+    return func.power(2, func.greatest(seconds / half_life, -1000))
+
+
+def _log2(value):
+    return func.ln(value) / math.log(2)
+
+
+def _entity_column(model: TrendingModel):
+    return list(model.__table__.primary_key.columns)[0]
+
+
+def _entity_date_created(model: TrendingModel, entity_id):
+    entity = ENTITY_TABLES[model]
+    return select(entity.c.date_created).where(entity.c.id == entity_id).scalar_subquery()
+
+
+def add_trending_score_query(
+    model: TrendingModel,
+    entity_id: UUID,
+    half_life: int,
+    event_date: Optional[Union[datetime, ColumnElement]] = None,
+):
+    """Adds a single event (like/subscription) to the decayed score.
+    Score is rebased to the newest event, so it stays bounded.
+    Args:
+        model (TrendingModel): PostTrending or BlogTrending
+        entity_id (UUID): id of the post/blog
+        half_life (int): half-life of the score in seconds
+        event_date (Optional[datetime]): time of event, defaults to now
+    """
+    table = model.__table__
+    event_date = _utc_now() if event_date is None else event_date
+    q = insert(model).values({
+        _entity_column(model).name: entity_id,
+        "score": 1.0,
+        "decay_epoch": event_date,
+        "trending": _epoch(event_date) / half_life,
+        "date_created": _entity_date_created(model, entity_id),
+    })
+    new_epoch = func.greatest(table.c.decay_epoch, q.excluded.decay_epoch)
+    new_score = (
+        table.c.score * _decay(_epoch(table.c.decay_epoch) - _epoch(new_epoch), half_life)
+        + _decay(_epoch(q.excluded.decay_epoch) - _epoch(new_epoch), half_life)
+    )
+    q = q.on_conflict_do_update(
+        index_elements=[_entity_column(model)],
+        set_={
+            "score": new_score,
+            "decay_epoch": new_epoch,
+            "trending": _epoch(new_epoch) / half_life + _log2(new_score),
+        },
+    )
+    return q
+
+
+def remove_trending_score_query(
+    model: TrendingModel,
+    entity_id: UUID,
+    half_life: int,
+    event_date: Union[datetime, ColumnElement],
+):
+    """Subtracts contribution of a withdrawn event (unlike/unsubscribe)
+    made at `event_date` from the decayed score.
+    """
+    table = model.__table__
+    contribution = _decay(_epoch(event_date) - _epoch(table.c.decay_epoch), half_life)
+    new_score = func.greatest(table.c.score - func.coalesce(contribution, 0), 0)
+    q = (
+        update(model)
+        .where(_entity_column(model) == entity_id)
+        .values(
+            score=new_score,
+            trending=case(
+                (new_score > 0, _epoch(table.c.decay_epoch) / half_life + _log2(new_score)),
+                else_=NO_TRENDING,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return q
+
+
+def reset_decayed_trending_scores_query(
+    model: TrendingModel,
+    half_life: int,
+    min_score: float,
+):
+    """Resets scores which decayed below `min_score`. Rows are kept, so that
+    posts and blogs stay in the trending index after their likes.
+    """
+    table = model.__table__
+    decayed = table.c.score * _decay(_epoch(table.c.decay_epoch) - _epoch(_utc_now()), half_life)
+    q = (
+        update(model)
+        .where(table.c.score > 0, decayed < min_score)
+        .values(score=0, decay_epoch=_utc_now(), trending=NO_TRENDING)
+        .execution_options(synchronize_session=False)
+    )
+    return q
+
+
+def add_empty_trending_scores_query(model: TrendingModel, entities):
+    """Adds empty scores of posts or blogs, sorted after all scored ones
+    Args:
+        model (TrendingModel): PostTrending or BlogTrending
+        entities: selectable with `id` and `date_created` of posts or blogs
+    """
+    table = model.__table__
+    q = (
+        insert(table)
+        .from_select(
+            [_entity_column(model).name, "date_created", "score", "decay_epoch", "trending"],
+            select(
+                entities.c.id,
+                entities.c.date_created,
+                literal(0, Float),
+                _utc_now(),
+                literal(NO_TRENDING, Float),
+            ),
+            include_defaults=False,
+        )
+        .on_conflict_do_nothing()
+    )
+    return q
+
+
+def add_missing_trending_scores_query(model: TrendingModel):
+    """Adds empty scores of posts or blogs which have none, e.g. inserted
+    by fixtures or seeds instead of the API
+    """
+    table, entity = model.__table__, ENTITY_TABLES[model]
+    missing = (
+        select(entity.c.id, entity.c.date_created)
+        .where(~select(table).where(_entity_column(model) == entity.c.id).exists())
+        .subquery()
+    )
+    return add_empty_trending_scores_query(model=model, entities=missing)
+
+
+def renormalise_trending_scores_query(
+    model: TrendingModel,
+    half_life: int,
+):
+    """Rebases all scores to the current time, so that `score`
+    holds the decayed popularity as of now. Sort order is not affected.
+    """
+    table = model.__table__
+    new_score = table.c.score * _decay(_epoch(table.c.decay_epoch) - _epoch(_utc_now()), half_life)
+    q = (
+        update(model)
+        .where(table.c.score > 0)
+        .values(
+            score=new_score,
+            decay_epoch=_utc_now(),
+            trending=_epoch(_utc_now()) / half_life + _log2(new_score),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return q
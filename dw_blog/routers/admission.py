@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, status
+
+from dw_blog.schemas.admission import AdmissionMetricsRead
+from dw_blog.schemas.auth import AuthUser
+from dw_blog.schemas.common import ErrorModel
+from dw_blog.services.admission import AdmissionService
+from dw_blog.utils.auth import get_current_user
+from errors import RouteErrorHandler
+
+router = APIRouter(route_class=RouteErrorHandler)
+
+
+@router.get(
+    "/metrics",
+    response_model=AdmissionMetricsRead,
+    status_code=status.HTTP_200_OK,
+    responses={
+        401: {"model": ErrorModel},
+        403: {"model": ErrorModel},
+    },
+    summary="Get admission control metrics",
+    description="""Get concurrency limits, running and queued requests per
+    route class of this worker, with counts of shed requests and time
+    admitted requests waited in the queue. Allowed for admin.
+    """,
+)
+async def get_admission_metrics(
+    current_user: AuthUser = Depends(get_current_user),
+):
+    return AdmissionService.metrics(current_user=current_user)
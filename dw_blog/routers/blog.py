@@ -1,14 +1,16 @@
 from typing import List, Optional, Union
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, status, Query
+from fastapi import APIRouter, Depends, Header, Response, status, Query
 
 from dw_blog.schemas.auth import AuthUser
-from dw_blog.schemas.blog import (BlogCreate, BlogRead, BlogUpdate,
-                                 ReadBlogsPagination, SortBlogBy)
+from dw_blog.schemas.blog import (BlogCreate, BlogRead, BlogsBatchRead, BlogUpdate,
+                                 ReadBlogsPagination, RecommendedBlogsRead, SortBlogBy)
 from dw_blog.schemas.common import ErrorModel, Pagination, Sort, SortOrder
+from dw_blog.schemas.purge import PurgeRead
 from dw_blog.services.blog import BlogService, get_blog_service
 from dw_blog.utils.auth import get_current_user
+from dw_blog.utils.versioning import if_match_version, version_etag
 from errors import RouteErrorHandler
 
 router = APIRouter(route_class=RouteErrorHandler)
@@ -35,9 +37,58 @@ async def add_blog(
     return await blog_service.create(current_user=current_user, **request.dict())
 
 
+@router.get(
+    "/batch",
+    response_model=BlogsBatchRead,
+    response_model_exclude_unset=True,
+    status_code=status.HTTP_200_OK,
+    responses={
+        400: {"model": ErrorModel},
+        422: {"model": ErrorModel},
+    },
+    summary="Get multiple blogs",
+    description="""Get data of up to BATCH_LIMIT blogs at once. Blogs are keyed
+    by id, ids of not existing blogs are listed as missing. Fields to be
+    returned can be chosen with comma separated fields, e.g. fields=name,authors.
+    """,
+)
+async def batch_get_blogs(
+    ids: List[UUID] = Query(...),
+    fields: Optional[str] = None,
+    blog_service: BlogService = Depends(get_blog_service),
+):
+    data, missing = await blog_service.batch_get(blog_ids=ids, fields=fields)
+    return BlogsBatchRead(data=data, missing=missing)
+
+
+@router.get(
+    "/recommended",
+    response_model=RecommendedBlogsRead,
+    status_code=status.HTTP_200_OK,
+    responses={
+        400: {"model": ErrorModel},
+        401: {"model": ErrorModel},
+    },
+    summary="Get recommended blogs",
+    description="""Get blogs liked and subscribed by the same users as the blogs
+    of current user, best first. Blogs already liked, subscribed or written
+    by the user and archived blogs are left out. Similarities of blogs are
+    rebuilt in the background, so new likes and subscriptions show up with a delay.
+    """,
+)
+async def get_recommended_blogs(
+    limit: int = 10,
+    blog_service: BlogService = Depends(get_blog_service),
+    current_user: AuthUser = Depends(get_current_user),
+):
+    data = await blog_service.recommended(current_user=current_user, limit=limit)
+    return RecommendedBlogsRead(data=data)
+
+
 @router.get(
     "/{blog_id}",
     response_model=BlogRead,
+    response_model_exclude_unset=True,
     status_code=status.HTTP_200_OK,
     responses={
         400: {"model": ErrorModel},
@@ -46,18 +97,28 @@ async def add_blog(
         404: {"model": ErrorModel},
     },
     summary="Get single blog",
-    description="Get single blog data with author information.",
+    description="""Get single blog data with author information. Fields to be
+    returned can be chosen with comma separated fields, e.g. fields=name,authors,
+    data of other fields is not read at all. Version of the blog is returned as
+    ETag (when version is among the fields), to be sent back with update in If-Match header.
+    """,
 )
 async def get_blog(
     blog_id: UUID,
+    response: Response,
+    fields: Optional[str] = None,
     blog_service: BlogService = Depends(get_blog_service),
 ):
-    return await blog_service.get(blog_id=blog_id)
+    blog = await blog_service.get(blog_id=blog_id, fields=fields)
+    if blog.version is not None:
+        response.headers["etag"] = version_etag(blog.version)
+    return blog
 
 
 @router.get(
     "",
     response_model=ReadBlogsPagination,
+    response_model_exclude_unset=True,
     status_code=status.HTTP_200_OK,
     responses={
         400: {"model": ErrorModel},
@@ -67,6 +128,8 @@ async def get_blog(
     summary="Get list of blogs",
     description="""Get list of blogs with authors information.
     Blogs can be searched on the basis of authors names and blog name.
+    Fields to be returned can be chosen with comma separated fields,
+    e.g. fields=name,likes_count, counts not requested are not computed.
     """,
 )
 async def list_blogs(
@@ -78,6 +141,7 @@ async def list_blogs(
     categories_ids: Optional[List[UUID]] = Query(None),
     sort_order: SortOrder = SortOrder.ascending,
     sort_by: SortBlogBy = SortBlogBy.date_created,
+    fields: Optional[str] = None,
     blog_service: BlogService = Depends(get_blog_service),
 ):
     listed_blogs, total = await blog_service.list(
@@ -89,6 +153,7 @@ async def list_blogs(
         categories_ids=categories_ids,
         sort_order=sort_order,
         sort_by=sort_by,
+        fields=fields,
     )
     return ReadBlogsPagination(
         data=listed_blogs,
@@ -266,27 +331,37 @@ async def remove_blog_like(
         401: {"model": ErrorModel},
         403: {"model": ErrorModel},
         404: {"model": ErrorModel},
+        409: {"model": ErrorModel},
         422: {"model": ErrorModel},
     },
     summary="Update blog",
-    description="Allows authors and admin to update blogs name or deactivate the blog.",
+    description="""Allows authors and admin to update blogs name or deactivate the blog.
+    With ETag of the read blog in If-Match header, update is rejected with 409
+    if the blog was modified since.
+    """,
 )
 async def update_blog(
     blog_id: UUID,
     request: BlogUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: AuthUser = Depends(get_current_user),
     blog_service: BlogService = Depends(get_blog_service),
 ):
-    return await blog_service.update(
+    blog = await blog_service.update(
         blog_id=blog_id,
         current_user=current_user,
+        version=if_match_version(if_match),
         **request.dict(),
     )
+    response.headers["etag"] = version_etag(blog.version)
+    return blog
 
 
 @router.delete(
     "/{blog_id}",
-    status_code=status.HTTP_204_NO_CONTENT,
+    response_model=PurgeRead,
+    status_code=status.HTTP_202_ACCEPTED,
     responses={
         400: {"model": ErrorModel},
         401: {"model": ErrorModel},
@@ -294,15 +369,20 @@ async def update_blog(
         404: {"model": ErrorModel},
     },
     summary="Delete blog",
-    description="Allows authors and admin to delete blog.",
+    description="""Allows authors and admin to delete blog. Blog is hidden at once,
+    its dependent data is removed in the background. Progress of the purge
+    can be read from the location returned in the header.
+    """,
 )
 async def delete_blog(
     blog_id: UUID,
+    response: Response,
     current_user: AuthUser = Depends(get_current_user),
     blog_service: BlogService = Depends(get_blog_service),
 ):
-    await blog_service.delete(
+    purge = await blog_service.delete(
         blog_id=blog_id,
         current_user=current_user,
     )
-    return
+    response.headers["location"] = f"/purges/{purge.id}"
+    return purge
@@ -1,13 +1,14 @@
 from uuid import UUID
 from typing import Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Header, Response, status
 
 from dw_blog.schemas.auth import AuthUser
 from dw_blog.schemas.common import ErrorModel, Pagination, Sort, SortOrder
 from dw_blog.schemas.category import CategoryCreate, CategoryRead, SortCategoryBy, ReadCategoriesPagination, CategoryUpdate
 from dw_blog.services.category import CategoryService, get_category_service
 from dw_blog.utils.auth import get_current_user
+from dw_blog.utils.versioning import if_match_version, version_etag
 from errors import RouteErrorHandler
 
 router = APIRouter(route_class=RouteErrorHandler)
@@ -45,18 +46,24 @@ async def add_category(
         404: {"model": ErrorModel},
     },
     summary="Get single category",
-    description="Get single category data with blogs, based on its id.",
+    description="""Get single category data with all of its blogs, most liked first, based on its id. Version
+    of the category is returned as ETag, to be sent back with update in If-Match header.
+    """,
 )
 async def get_category(
     category_id: UUID,
+    response: Response,
     category_service: CategoryService = Depends(get_category_service),
 ):
-    return await category_service.get(category_id=category_id)
+    category = await category_service.get(category_id=category_id)
+    response.headers["etag"] = version_etag(category.version)
+    return category
 
 
 @router.get(
     "",
     response_model=ReadCategoriesPagination,
+    response_model_exclude_unset=True,
     status_code=status.HTTP_200_OK,
     responses={
         400: {"model": ErrorModel},
@@ -64,9 +71,11 @@ async def get_category(
         404: {"model": ErrorModel},
     },
     summary="Get list of categories",
-    description="""Get list of categories with blog information.
-    Categories can be searched on the basis of their name, popularity
-    of blogs (likers) and number of blogs.
+    description="""Get list of categories with blog information, blogs of every
+    category are its CATEGORY_TOP_BLOGS most liked ones. Categories can be
+    searched on the basis of their name, popularity of blogs (likers) and
+    number of blogs. Fields to be returned can be chosen with comma separated
+    fields, e.g. fields=name,blogs_count.
     """,
 )
 async def list_categories(
@@ -76,6 +85,7 @@ async def list_categories(
     approved: Optional[bool] = None,
     sort_order: SortOrder = SortOrder.descending,
     sort_by: SortCategoryBy = SortCategoryBy.blogs_with_most_likes,
+    fields: Optional[str] = None,
     category_service: CategoryService = Depends(get_category_service),
 ):
     data, total = await category_service.list(
@@ -85,6 +95,7 @@ async def list_categories(
         approved=approved,
         sort_order=sort_order,
         sort_by=sort_by,
+        fields=fields,
     )
     return ReadCategoriesPagination(
         data=data,
@@ -109,22 +120,30 @@ async def list_categories(
         401: {"model": ErrorModel},
         403: {"model": ErrorModel},
         404: {"model": ErrorModel},
+        409: {"model": ErrorModel},
         422: {"model": ErrorModel},
     },
     summary="Update category",
-    description="Allows update of category name, approval status.",
+    description="""Allows update of category name, approval status. With ETag of the
+    read category in If-Match header, update is rejected with 409 if the category was modified since.
+    """,
 )
 async def update_category(
     category_id: UUID,
     request: CategoryUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: AuthUser = Depends(get_current_user),
     category_service: CategoryService = Depends(get_category_service),
 ):
-    return await category_service.update(
+    category = await category_service.update(
         category_id=category_id,
         current_user=current_user,
+        version=if_match_version(if_match),
         **request.dict(),
     )
+    response.headers["etag"] = version_etag(category.version)
+    return category
 
 
 @router.delete(
@@ -1,14 +1,162 @@
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, status
 
 from dw_blog.schemas.auth import AuthUser
-from dw_blog.schemas.common import ErrorModel
-from dw_blog.schemas.tag import TagCreate, TagRead, TagUpdate, SortTagBy, ReadTagsPagination
-from dw_blog.services.tag import TagService, get_tag_service
+from dw_blog.schemas.comment import CommentCreate, CommentRead, CommentUpdate, ReadCommentsPage
+from dw_blog.schemas.common import ErrorModel, SortOrder
+from dw_blog.services.comment import CommentService, get_comment_service
 from dw_blog.utils.auth import get_current_user
-from dw_blog.schemas.common import ErrorModel, Pagination, Sort, SortOrder
 from errors import RouteErrorHandler
 
-router = APIRouter(route_class=RouteErrorHandler)
\ No newline at end of file
+router = APIRouter(route_class=RouteErrorHandler)
+
+
+@router.post(
+    "",
+    response_model=CommentRead,
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        400: {"model": ErrorModel},
+        401: {"model": ErrorModel},
+        404: {"model": ErrorModel},
+        422: {"model": ErrorModel},
+    },
+    summary="Create new comment",
+    description="Comment a post or reply to a comment of the post.",
+)
+async def add_comment(
+    request: CommentCreate,
+    comment_service: CommentService = Depends(get_comment_service),
+    current_user: AuthUser = Depends(get_current_user),
+):
+    return await comment_service.create(current_user=current_user, **request.dict())
+
+
+@router.get(
+    "",
+    response_model=ReadCommentsPage,
+    status_code=status.HTTP_200_OK,
+    responses={
+        400: {"model": ErrorModel},
+        404: {"model": ErrorModel},
+        422: {"model": ErrorModel},
+    },
+    summary="Get comments of a post",
+    description="""Get page of top level comments of a post with their replies,
+    in display order (every comment is followed by its replies). Next page is
+    requested with next_cursor of the previous one. With replies_limit only
+    first replies_limit replies of every comment are returned, remaining
+    ones can be loaded through the comment thread.
+    """,
+)
+async def list_comments(
+    post_id: UUID,
+    limit: int = 10,
+    cursor: Optional[str] = Query(None, pattern="^[0-9a-f]{21}$"),
+    sort_order: SortOrder = SortOrder.descending,
+    replies_limit: Optional[int] = Query(None, ge=0),
+    comment_service: CommentService = Depends(get_comment_service),
+):
+    data, next_cursor, comments_count = await comment_service.list(
+        post_id=post_id,
+        limit=limit,
+        cursor=cursor,
+        sort_order=sort_order,
+        replies_limit=replies_limit,
+    )
+    return ReadCommentsPage(
+        data=data,
+        next_cursor=next_cursor,
+        comments_count=comments_count,
+    )
+
+
+@router.get(
+    "/{comment_id}",
+    response_model=CommentRead,
+    status_code=status.HTTP_200_OK,
+    responses={
+        404: {"model": ErrorModel},
+    },
+    summary="Get single comment",
+    description="Get single comment data based on its id.",
+)
+async def get_comment(
+    comment_id: UUID,
+    comment_service: CommentService = Depends(get_comment_service),
+):
+    return await comment_service.get(comment_id=comment_id)
+
+
+@router.get(
+    "/{comment_id}/thread",
+    response_model=List[CommentRead],
+    status_code=status.HTTP_200_OK,
+    responses={
+        404: {"model": ErrorModel},
+        422: {"model": ErrorModel},
+    },
+    summary="Get comment thread",
+    description="""Get comment followed by all its replies in display order.
+    With replies_limit only first replies_limit replies of every comment are returned.
+    """,
+)
+async def get_comment_thread(
+    comment_id: UUID,
+    replies_limit: Optional[int] = Query(None, ge=0),
+    comment_service: CommentService = Depends(get_comment_service),
+):
+    return await comment_service.thread(comment_id=comment_id, replies_limit=replies_limit)
+
+
+@router.patch(
+    "/{comment_id}",
+    response_model=CommentRead,
+    status_code=status.HTTP_200_OK,
+    responses={
+        400: {"model": ErrorModel},
+        401: {"model": ErrorModel},
+        403: {"model": ErrorModel},
+        404: {"model": ErrorModel},
+        422: {"model": ErrorModel},
+    },
+    summary="Update comment",
+    description="Update text of the comment, allowed for its author and admins.",
+)
+async def update_comment(
+    comment_id: UUID,
+    request: CommentUpdate,
+    current_user: AuthUser = Depends(get_current_user),
+    comment_service: CommentService = Depends(get_comment_service),
+):
+    return await comment_service.update(
+        comment_id=comment_id,
+        current_user=current_user,
+        text=request.text,
+    )
+
+
+@router.delete(
+    "/{comment_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={
+        400: {"model": ErrorModel},
+        401: {"model": ErrorModel},
+        403: {"model": ErrorModel},
+        404: {"model": ErrorModel},
+    },
+    summary="Delete comment",
+    description="Delete comment with all its replies, allowed for its author and admins.",
+)
+async def delete_comment(
+    comment_id: UUID,
+    current_user: AuthUser = Depends(get_current_user),
+    comment_service: CommentService = Depends(get_comment_service),
+):
+    await comment_service.delete(
+        comment_id=comment_id,
+        current_user=current_user,
+    )
+    return
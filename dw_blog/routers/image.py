@@ -0,0 +1,195 @@
+from uuid import UUID
+from typing import List
+
+from fastapi import APIRouter, Depends, Path, Request, Response, status
+
+from dw_blog.config import Settings
+from dw_blog.schemas.auth import AuthUser
+from dw_blog.schemas.common import ErrorModel
+from dw_blog.schemas.image import ImageRead, ImageVariant, VariantFormat, VariantMetricsRead
+from dw_blog.services.image import ImageService, get_image_service
+from dw_blog.utils.auth import get_current_user
+from dw_blog.utils.deadline import deadline
+from errors import RouteErrorHandler
+
+settings = Settings()
+
+router = APIRouter(route_class=RouteErrorHandler)
+
+
+@router.post(
+    "",
+    response_model=ImageRead,
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        400: {"model": ErrorModel},
+        401: {"model": ErrorModel},
+        403: {"model": ErrorModel},
+        404: {"model": ErrorModel},
+        413: {"model": ErrorModel},
+        415: {"model": ErrorModel},
+        422: {"model": ErrorModel},
+    },
+    summary="Upload image",
+    description="""Upload image of a post as multipart form, with post_id, title
+    and caption fields followed by the file. File is streamed to disk as it
+    is received and stored under its sha256 hash, so uploading the same
+    file again takes no space.
+    """,
+    # Body is parsed by the service while it is received, so it is described here
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["post_id", "title", "file"],
+                        "properties": {
+                            "post_id": {"type": "string", "format": "uuid"},
+                            "title": {"type": "string", "minLength": 3, "maxLength": 500},
+                            "caption": {"type": "string", "minLength": 5, "maxLength": 2000},
+                            "file": {"type": "string", "format": "binary"},
+                        },
+                    },
+                },
+            },
+        },
+    },
+)
+# Large files take longer to receive than other requests
+@deadline(seconds=settings.IMAGE_UPLOAD_DEADLINE)
+async def upload_image(
+    request: Request,
+    image_service: ImageService = Depends(get_image_service),
+    current_user: AuthUser = Depends(get_current_user),
+):
+    return await image_service.create(current_user=current_user, request=request)
+
+
+@router.get(
+    "",
+    response_model=List[ImageRead],
+    status_code=status.HTTP_200_OK,
+    responses={
+        422: {"model": ErrorModel},
+    },
+    summary="Get images of a post",
+    description="Get data of all images of a post.",
+)
+async def list_images(
+    post_id: UUID,
+    image_service: ImageService = Depends(get_image_service),
+):
+    return await image_service.list(post_id=post_id)
+
+
+@router.get(
+    "/content/{content_hash}",
+    response_class=Response,
+    status_code=status.HTTP_200_OK,
+    responses={
+        206: {"description": "Requested range of the file"},
+        304: {"description": "File not modified"},
+        404: {"model": ErrorModel},
+        416: {"description": "Requested range not satisfiable"},
+    },
+    summary="Get image file",
+    description="""Get image file by its hash (hash field of the image). Content
+    under given hash never changes, responses are cacheable for good.
+    Supports conditional requests (If-None-Match) and byte ranges (Range).
+    """,
+)
+async def get_image_content(
+    request: Request,
+    content_hash: str = Path(..., pattern="^[0-9a-f]{64}$"),
+    image_service: ImageService = Depends(get_image_service),
+):
+    return await image_service.content(request=request, content_hash=content_hash)
+
+
+@router.get(
+    "/content/{content_hash}/{variant}",
+    response_class=Response,
+    status_code=status.HTTP_200_OK,
+    responses={
+        206: {"description": "Requested range of the file"},
+        304: {"description": "File not modified"},
+        400: {"model": ErrorModel},
+        404: {"model": ErrorModel},
+        415: {"model": ErrorModel},
+        416: {"description": "Requested range not satisfiable"},
+    },
+    summary="Get image variant",
+    description="""Get resized rendition of the image (thumbnail, card or full width)
+    in given format. Variants are rendered on first request and cached, caching
+    and range headers work as for the original file.
+    """,
+)
+async def get_image_variant(
+    request: Request,
+    variant: ImageVariant,
+    content_hash: str = Path(..., pattern="^[0-9a-f]{64}$"),
+    format: VariantFormat = VariantFormat.webp,
+    image_service: ImageService = Depends(get_image_service),
+):
+    return await image_service.variant(
+        request=request,
+        content_hash=content_hash,
+        variant=variant,
+        image_format=format,
+    )
+
+
+@router.get(
+    "/variants/metrics",
+    response_model=VariantMetricsRead,
+    status_code=status.HTTP_200_OK,
+    summary="Get image variants metrics",
+    description="""Get cache hit rate and rendering time of image variants,
+    counted by the worker serving the request since its start.
+    """,
+)
+async def get_variant_metrics():
+    return ImageService.variant_metrics()
+
+
+@router.get(
+    "/{image_id}",
+    response_model=ImageRead,
+    status_code=status.HTTP_200_OK,
+    responses={
+        404: {"model": ErrorModel},
+    },
+    summary="Get single image",
+    description="Get single image data based on its id.",
+)
+async def get_image(
+    image_id: UUID,
+    image_service: ImageService = Depends(get_image_service),
+):
+    return await image_service.get(image_id=image_id)
+
+
+@router.delete(
+    "/{image_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={
+        400: {"model": ErrorModel},
+        401: {"model": ErrorModel},
+        403: {"model": ErrorModel},
+        404: {"model": ErrorModel},
+    },
+    summary="Delete image",
+    description="Allows authors of the post blog and admin to delete image.",
+)
+async def delete_image(
+    image_id: UUID,
+    current_user: AuthUser = Depends(get_current_user),
+    image_service: ImageService = Depends(get_image_service),
+):
+    await image_service.delete(
+        image_id=image_id,
+        current_user=current_user,
+    )
+    return
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, status
+
+from dw_blog.schemas.auth import AuthUser
+from dw_blog.schemas.common import ErrorModel
+from dw_blog.schemas.job import JobMetricsRead
+from dw_blog.services.job import JobService, get_job_service
+from dw_blog.utils.auth import get_current_user
+from errors import RouteErrorHandler
+
+router = APIRouter(route_class=RouteErrorHandler)
+
+
+@router.get(
+    "/metrics",
+    response_model=JobMetricsRead,
+    status_code=status.HTTP_200_OK,
+    responses={
+        401: {"model": ErrorModel},
+        403: {"model": ErrorModel},
+    },
+    summary="Get background jobs metrics",
+    description="""Get depth of the job queue per job type and status, wait
+    of jobs for a worker since they were due and their run time, counted
+    over jobs started or finished in the metrics window. Allowed for admin.
+    """,
+)
+async def get_job_metrics(
+    current_user: AuthUser = Depends(get_current_user),
+    job_service: JobService = Depends(get_job_service),
+):
+    return await job_service.metrics(current_user=current_user)
@@ -1,13 +1,17 @@
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, Header, Query, Response, status
+from fastapi.responses import StreamingResponse
 
 from dw_blog.schemas.auth import AuthUser
-from dw_blog.schemas.common import Pagination, Sort, SortOrder
-from dw_blog.schemas.post import PostCreate, PostRead, ReadBlogsPagination, ShortPostResponse, SortPostBy, PostUpdate
+from dw_blog.schemas.common import ExportFormat, Pagination, Sort, SortOrder
+from dw_blog.schemas.post import PostCreate, PostRead, PostsBatchRead, PostsTagsResult, PostsTagsUpdate, ReadBlogsPagination, RelatedPostsRead, ShortPostResponse, SortPostBy, PostUpdate
 from dw_blog.services.post import PostService, get_post_service
 from dw_blog.utils.auth import get_current_user
+from dw_blog.utils.deadline import deadline
+from dw_blog.utils.export import EXPORT_MEDIA_TYPES
+from dw_blog.utils.versioning import if_match_version, version_etag
 from errors import RouteErrorHandler
 
 router = APIRouter(route_class=RouteErrorHandler)
@@ -26,6 +30,40 @@ async def add_post(
     return await post_service.create(current_user=current_user, **request.dict())
 
 
+@router.post(
+    "/bulk_tag",
+    response_model=PostsTagsResult,
+    status_code=status.HTTP_200_OK,
+    summary="Attach tags to posts",
+    description="""Attach every tag to every post of the tag's blog. Errors of all
+    invalid posts and tags are returned together.
+    """,
+)
+async def bulk_tag_posts(
+    request: PostsTagsUpdate,
+    post_service: PostService = Depends(get_post_service),
+    current_user: AuthUser = Depends(get_current_user),
+):
+    return await post_service.bulk_tag(current_user=current_user, **request.dict())
+
+
+@router.post(
+    "/bulk_untag",
+    response_model=PostsTagsResult,
+    status_code=status.HTTP_200_OK,
+    summary="Detach tags from posts",
+    description="""Detach tags from posts. Errors of all invalid posts and tags
+    are returned together.
+    """,
+)
+async def bulk_untag_posts(
+    request: PostsTagsUpdate,
+    post_service: PostService = Depends(get_post_service),
+    current_user: AuthUser = Depends(get_current_user),
+):
+    return await post_service.bulk_untag(current_user=current_user, **request.dict())
+
+
 @router.get(
     "/list_user_posts",
     response_model=ShortPostResponse,
@@ -45,6 +83,70 @@ async def list_user_posts(
     )
 
 
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Export posts",
+    description="Streams posts with tags and authors as NDJSON or CSV. "
+    "Posts can be limited to a blog or an author, exporting all posts requires admin status.",
+)
+# Posts are streamed after the handler returns, in partitions of short queries
+@deadline(seconds=None)
+async def export_posts(
+    export_format: ExportFormat = ExportFormat.ndjson,
+    blog_id: Optional[UUID] = None,
+    author_id: Optional[UUID] = None,
+    post_service: PostService = Depends(get_post_service),
+    current_user: AuthUser = Depends(get_current_user),
+):
+    content = await post_service.export(
+        current_user=current_user,
+        export_format=export_format,
+        blog_id=blog_id,
+        author_id=author_id,
+    )
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="posts.{export_format.value}"'},
+    )
+
+
+@router.get(
+    "/events",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Stream post events",
+    description="Server-sent events of posts published or updated in blogs and tags subscribed by the user. "
+    "Stream resumes after the Last-Event-ID, reset event asks the client to refetch posts.",
+)
+async def stream_post_events(
+    last_event_id: Optional[int] = Header(None),
+    post_service: PostService = Depends(get_post_service),
+    current_user: AuthUser = Depends(get_current_user),
+):
+    content = await post_service.events(current_user=current_user, last_event_id=last_event_id)
+    return StreamingResponse(
+        content,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(
+    "/batch",
+    response_model=PostsBatchRead,
+    status_code=status.HTTP_200_OK,
+)
+async def batch_get_posts(
+    ids: List[UUID] = Query(...),
+    post_service: PostService = Depends(get_post_service),
+):
+    data, missing = await post_service.batch_get(post_ids=ids)
+    return PostsBatchRead(data=data, missing=missing)
+
+
 @router.get(
     "/{post_id}",
     response_model=PostRead,
@@ -52,14 +154,18 @@ async def list_user_posts(
 )
 async def get_post(
     post_id: UUID,
+    response: Response,
     post_service: PostService = Depends(get_post_service),
 ):
-    return await post_service.get(post_id=post_id)
+    post = await post_service.get(post_id=post_id)
+    response.headers["etag"] = version_etag(post.version)
+    return post
 
 
 @router.get(
     "",
     response_model=ReadBlogsPagination,
+    response_model_exclude_unset=True,
     status_code=status.HTTP_200_OK,
 )
 async def list_posts(
@@ -73,6 +179,7 @@ async def list_posts(
     body_search: Optional[str] = None,
     sort_order: SortOrder = SortOrder.ascending, 
     sort_by: SortPostBy = SortPostBy.date_created,
+    fields: Optional[str] = None,
     post_service: PostService = Depends(get_post_service),
 ):
     data, total = await post_service.list(
@@ -86,6 +193,7 @@ async def list_posts(
         body_search=body_search,
         sort_order=sort_order,
         sort_by=sort_by,
+        fields=fields,
     )
 
     return ReadBlogsPagination(
@@ -102,6 +210,25 @@ async def list_posts(
     )
 
 
+@router.get(
+    "/{post_id}/related",
+    response_model=RelatedPostsRead,
+    status_code=status.HTTP_200_OK,
+    summary="Get related posts",
+    description="""Get published posts most similar to the post by shared
+    tags and likers, most similar first. Similarities are precomputed
+    in the background, so new tags and likes show up with a delay.
+    """,
+)
+async def get_related_posts(
+    post_id: UUID,
+    limit: int = 5,
+    post_service: PostService = Depends(get_post_service),
+):
+    data = await post_service.related(post_id=post_id, limit=limit)
+    return RelatedPostsRead(data=data)
+
+
 @router.patch(
     "/{post_id}",
     response_model=PostRead,
@@ -110,14 +237,19 @@ async def list_posts(
 async def update_post(
     post_id: UUID,
     request: PostUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     post_service: PostService = Depends(get_post_service),
     current_user: AuthUser = Depends(get_current_user),
 ):
-    return await post_service.update(
+    post = await post_service.update(
         post_id=post_id,
         current_user=current_user,
+        version=if_match_version(if_match),
         **request.dict(),
     )
+    response.headers["etag"] = version_etag(post.version)
+    return post
 
 
 @router.post(
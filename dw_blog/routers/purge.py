@@ -0,0 +1,34 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, status
+
+from dw_blog.schemas.auth import AuthUser
+from dw_blog.schemas.common import ErrorModel
+from dw_blog.schemas.purge import PurgeRead
+from dw_blog.services.purge import PurgeService, get_purge_service
+from dw_blog.utils.auth import get_current_user
+from errors import RouteErrorHandler
+
+router = APIRouter(route_class=RouteErrorHandler)
+
+
+@router.get(
+    "/{purge_id}",
+    response_model=PurgeRead,
+    status_code=status.HTTP_200_OK,
+    responses={
+        401: {"model": ErrorModel},
+        403: {"model": ErrorModel},
+        404: {"model": ErrorModel},
+    },
+    summary="Get purge status",
+    description="""Get status and progress of the purge of deleted blog, user
+    or tag. Allowed for the user who deleted it and admin.
+    """,
+)
+async def get_purge(
+    purge_id: UUID,
+    current_user: AuthUser = Depends(get_current_user),
+    purge_service: PurgeService = Depends(get_purge_service),
+):
+    return await purge_service.get(purge_id=purge_id, current_user=current_user)
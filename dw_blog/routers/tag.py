@@ -1,13 +1,15 @@
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Header, Query, Response, status
 
 from dw_blog.schemas.auth import AuthUser
 from dw_blog.schemas.common import ErrorModel
-from dw_blog.schemas.tag import TagCreate, TagRead, TagUpdate, SortTagBy, ReadTagsPagination
+from dw_blog.schemas.purge import PurgeRead
+from dw_blog.schemas.tag import TagCreate, TagRead, TagsBatchRead, TagUpdate, SortTagBy, ReadTagsPagination
 from dw_blog.services.tag import TagService, get_tag_service
 from dw_blog.utils.auth import get_current_user
+from dw_blog.utils.versioning import if_match_version, version_etag
 from dw_blog.schemas.common import ErrorModel, Pagination, Sort, SortOrder
 from errors import RouteErrorHandler
 
@@ -38,6 +40,7 @@ async def add_tag(
 @router.get(
     "",
     response_model=ReadTagsPagination,
+    response_model_exclude_unset=True,
     status_code=status.HTTP_200_OK,
     responses={
         400: {"model": ErrorModel},
@@ -47,7 +50,8 @@ async def add_tag(
     summary="Get tags list",
     description="""Get list of tags. Can be subscribed tags of the specific user,
     list of tags according to count of subscriptions or list of tags of a specific
-    blog according to number of subscriptions.
+    blog according to number of subscriptions. Fields to be returned can be
+    chosen with comma separated fields, e.g. fields=name,subscription_count.
     """,
 )
 async def list_tags(
@@ -58,6 +62,7 @@ async def list_tags(
     tag_name: Optional[str] = None,
     sort_order: SortOrder = SortOrder.ascending,
     sort_by: SortTagBy = SortTagBy.most_subscribers,
+    fields: Optional[str] = None,
     tag_service: TagService = Depends(get_tag_service),
 ):
     data, total = await tag_service.list(
@@ -67,7 +72,8 @@ async def list_tags(
         blog_id=blog_id,
         tag_name=tag_name,
         sort_order=sort_order,
-        sort_by=sort_by
+        sort_by=sort_by,
+        fields=fields,
     )
     return ReadTagsPagination(
         data=data,
@@ -83,6 +89,27 @@ async def list_tags(
     )
 
 
+@router.get(
+    "/batch",
+    response_model=TagsBatchRead,
+    status_code=status.HTTP_200_OK,
+    responses={
+        400: {"model": ErrorModel},
+        422: {"model": ErrorModel},
+    },
+    summary="Get multiple tags",
+    description="""Get data of up to BATCH_LIMIT tags at once. Tags are keyed
+    by id, ids of not existing tags are listed as missing.
+    """,
+)
+async def batch_get_tags(
+    ids: List[UUID] = Query(...),
+    tag_service: TagService = Depends(get_tag_service),
+):
+    data, missing = await tag_service.batch_get(tag_ids=ids)
+    return TagsBatchRead(data=data, missing=missing)
+
+
 @router.get(
     "/{tag_id}",
     response_model=TagRead,
@@ -94,13 +121,18 @@ async def list_tags(
         404: {"model": ErrorModel},
     },
     summary="Get single tag",
-    description="Get single tag data based on its id.",
+    description="""Get single tag data based on its id. Version of the tag is
+    returned as ETag, to be sent back with update in If-Match header.
+    """,
 )
 async def get_tag(
     tag_id: UUID,
+    response: Response,
     tag_service: TagService = Depends(get_tag_service),
 ):
-    return await tag_service.get(tag_id=tag_id)
+    tag = await tag_service.get(tag_id=tag_id)
+    response.headers["etag"] = version_etag(tag.version)
+    return tag
 
 
 @router.post(
@@ -162,23 +194,36 @@ async def remove_tag_subscription(
         401: {"model": ErrorModel},
         403: {"model": ErrorModel},
         404: {"model": ErrorModel},
+        409: {"model": ErrorModel},
         422: {"model": ErrorModel},
     },
     summary="Update tag",
-    description="Change name of a single tag.",
+    description="""Change name of a single tag. With ETag of the read tag in
+    If-Match header, update is rejected with 409 if the tag was modified since.
+    """,
 )
 async def update_tag(
     tag_id: UUID,
     request: TagUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: AuthUser = Depends(get_current_user),
     tag_service: TagService = Depends(get_tag_service),
 ):
-    return await tag_service.update(current_user=current_user, tag_id=tag_id, **request.dict())
+    tag = await tag_service.update(
+        current_user=current_user,
+        tag_id=tag_id,
+        version=if_match_version(if_match),
+        **request.dict(),
+    )
+    response.headers["etag"] = version_etag(tag.version)
+    return tag
 
 
 @router.delete(
     "/{tag_id}",
-    status_code=status.HTTP_204_NO_CONTENT,
+    response_model=PurgeRead,
+    status_code=status.HTTP_202_ACCEPTED,
     responses={
         400: {"model": ErrorModel},
         401: {"model": ErrorModel},
@@ -186,15 +231,20 @@ async def update_tag(
         404: {"model": ErrorModel},
     },
     summary="Delete tag",
-    description="Allows authors and admin to delete tag.",
+    description="""Allows authors and admin to delete tag. Tag is hidden at once,
+    its dependent data is removed in the background. Progress of the purge
+    can be read from the location returned in the header.
+    """,
 )
 async def delete_blog(
     tag_id: UUID,
+    response: Response,
     current_user: AuthUser = Depends(get_current_user),
     tag_service: TagService = Depends(get_tag_service),
 ):
-    await tag_service.delete(
+    purge = await tag_service.delete(
         tag_id=tag_id,
         current_user=current_user,
     )
-    return
+    response.headers["location"] = f"/purges/{purge.id}"
+    return purge
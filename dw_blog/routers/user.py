@@ -1,11 +1,12 @@
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, Query, Response, status
 
 from dw_blog.schemas.auth import AuthUser
 from dw_blog.schemas.common import UserType
-from dw_blog.schemas.user import UserCreate, UserdDelete, UserRead, UserUpdate
+from dw_blog.schemas.purge import PurgeRead
+from dw_blog.schemas.user import UserCreate, UserdDelete, UserRead, UsersBatchRead, UserUpdate
 from dw_blog.services.user import UserService, get_user_service
 from dw_blog.utils.auth import get_current_user
 
@@ -24,6 +25,19 @@ async def add_user(
     return await user_service.create(**request.dict())
 
 
+@router.get(
+    "/batch",
+    response_model=UsersBatchRead,
+    status_code=status.HTTP_200_OK,
+)
+async def batch_get_users(
+    ids: List[UUID] = Query(...),
+    user_service: UserService = Depends(get_user_service),
+):
+    data, missing = await user_service.batch_get(user_ids=ids)
+    return UsersBatchRead(data=data, missing=missing)
+
+
 @router.get(
     "/{user_id}",
     response_model=UserRead,
@@ -71,15 +85,18 @@ async def update_user(
 
 @router.delete(
     "",
-    status_code=status.HTTP_204_NO_CONTENT,
+    response_model=PurgeRead,
+    status_code=status.HTTP_202_ACCEPTED,
 )
 async def delete_user(
     user_id: UserdDelete,
+    response: Response,
     user_service: UserService = Depends(get_user_service),
     current_user: AuthUser = Depends(get_current_user),
 ):
-    await user_service.delete(
-        user_id=user_id,
+    purge = await user_service.delete(
+        user_id=user_id.user_id,
         current_user=current_user,
     )
-    return
+    response.headers["location"] = f"/purges/{purge.id}"
+    return purge
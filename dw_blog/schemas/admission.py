@@ -0,0 +1,30 @@
+from enum import Enum
+from typing import List
+
+from sqlmodel import SQLModel
+
+
+class RouteClass(str, Enum):
+    read = "read"
+    write = "write"
+    search = "search"
+    auth = "auth"
+    export = "export"
+
+
+class RouteClassMetricsRead(SQLModel):
+    route_class: RouteClass
+    limit: int
+    queue_size: int
+    running: int
+    queued: int
+    admitted: int
+    shed_queue_full: int
+    shed_timeout: int
+    waited: int
+    wait_seconds_avg: float
+    wait_seconds_max: float
+
+
+class AdmissionMetricsRead(SQLModel):
+    data: List[RouteClassMetricsRead]
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from sqlmodel import Field, SQLModel
 
@@ -13,6 +13,7 @@ class SortBlogBy(str, Enum):
     date_created = "date_created"
     likers = "likers"
     subscribers = "subscribers"
+    trending = "trending"
 
 
 class BlogBase(SQLModel):
@@ -66,28 +67,44 @@ class BlogTag(SQLModel):
     tag_name: Optional[str]
 
 
-class BlogRead(SQLModel):
+class RecommendedBlogRead(SQLModel):
     id: uuid.UUID
     name: str
-    categories_name: List[str]
-    date_created: datetime
-    date_modified: datetime
-    authors: List[BlogAuthor]
+    score: float
+
+
+class RecommendedBlogsRead(SQLModel):
+    data: List[RecommendedBlogRead]
+
+
+class BlogRead(SQLModel):
+    id: uuid.UUID
+    version: Optional[int]
+    name: Optional[str]
+    categories_name: Optional[List[str]]
+    date_created: Optional[datetime]
+    date_modified: Optional[datetime]
+    authors: Optional[List[BlogAuthor]]
     tags: Optional[List[BlogTag]]
     likers: Optional[List[BlogLiker]]
     subscribers: Optional[List[BlogSubscriber]]
-    archived: bool
+    archived: Optional[bool]
+
+
+class BlogsBatchRead(SQLModel):
+    data: Dict[uuid.UUID, BlogRead]
+    missing: List[uuid.UUID]
 
 
 class BlogReadList(SQLModel):
     id: uuid.UUID
-    categories_name: List[str]
-    name: str
-    archived: bool
-    subscription_count: int
-    likes_count: int
-    date_created: datetime
-    date_modified: datetime
+    categories_name: Optional[List[str]]
+    name: Optional[str]
+    archived: Optional[bool]
+    subscription_count: Optional[int]
+    likes_count: Optional[int]
+    date_created: Optional[datetime]
+    date_modified: Optional[datetime]
 
 
 class ReadBlogsPagination(SQLModel):
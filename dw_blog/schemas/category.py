@@ -42,21 +42,23 @@ class CategoryBlogRead(SQLModel):
 
 class CategoryRead(SQLModel):
     id: uuid.UUID
+    version: int
     name: str
     date_created: datetime
     date_modified: datetime
     approved: bool
+    blogs_count: int = 0
     blogs: Optional[List[CategoryBlogRead]]
 
 
 class CategoryReadList(SQLModel):
     id: uuid.UUID
-    name: str
-    approved: bool
-    blogs_count: int
+    name: Optional[str]
+    approved: Optional[bool]
+    blogs_count: Optional[int]
     blogs: Optional[List[CategoryBlogRead]]
-    date_created: datetime
-    date_modified: datetime
+    date_created: Optional[datetime]
+    date_modified: Optional[datetime]
 
 
 class ReadCategoriesPagination(SQLModel):
@@ -1,5 +1,6 @@
 import uuid
 from datetime import datetime
+from typing import List, Optional
 
 from sqlmodel import Field, SQLModel
 
@@ -12,8 +13,6 @@ class CommentBase(SQLModel):
     )
     date_created: datetime = Field(default_factory=datetime.utcnow)
     date_modified: datetime = Field(default_factory=datetime.utcnow)
-    user_id: uuid.UUID = Field(nullable=False)
-    user_nickname: str = Field(nullable=False)
 
 
 class CommentCreate(SQLModel):
@@ -22,15 +21,34 @@ class CommentCreate(SQLModel):
         max_length=10000,
         nullable=False,
     )
+    post_id: uuid.UUID
+    parent_id: Optional[uuid.UUID] = None
 
 
 class CommentRead(CommentBase):
-    pass
+    id: uuid.UUID
+    post_id: uuid.UUID
+    parent_id: Optional[uuid.UUID] = None
+    # Empty for comments of deleted users kept for replies of others
+    author_id: Optional[uuid.UUID] = None
+    author_nickname: Optional[str] = None
+    depth: int
+    replies_count: int
 
 
-class CommentUpdate(CommentCreate):
-    pass
+class CommentUpdate(SQLModel):
+    text: str = Field(
+        min_length=3,
+        max_length=10000,
+        nullable=False,
+    )
 
 
 class CommentDelete(SQLModel):
     id: uuid.UUID
+
+
+class ReadCommentsPage(SQLModel):
+    data: List[CommentRead]
+    next_cursor: Optional[str] = None
+    comments_count: int
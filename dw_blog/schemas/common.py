@@ -14,6 +14,11 @@ class SortOrder(str, Enum):
     descending = "descending"
 
 
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
 class ErrorModel(SQLModel):
     detail: str
     status_code: int
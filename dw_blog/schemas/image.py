@@ -1,4 +1,9 @@
+import uuid
+from datetime import datetime
 from enum import Enum
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
 
 
 class ImageType(str, Enum):
@@ -10,3 +15,47 @@ class ImageType(str, Enum):
     SVG = "image/svg+xml"
     TIFF = "image/tiff"
     WEBP = "image/webp"
+
+
+class ImageVariant(str, Enum):
+    thumbnail = "thumbnail"
+    card = "card"
+    full = "full"
+
+
+class VariantFormat(str, Enum):
+    webp = "webp"
+    jpeg = "jpeg"
+    png = "png"
+
+
+class ImageCreate(SQLModel):
+    post_id: uuid.UUID
+    title: str = Field(min_length=3, max_length=500)
+    caption: Optional[str] = Field(default=None, min_length=5, max_length=2000)
+
+
+class ImageRead(SQLModel):
+    id: uuid.UUID
+    title: str
+    caption: Optional[str] = None
+    size: int
+    img_type: ImageType
+    hash: str
+    post_id: uuid.UUID
+    date_created: datetime
+    date_modified: datetime
+
+
+class VariantMetricsRead(SQLModel):
+    hits: int
+    misses: int
+    coalesced: int
+    hit_rate: float
+    failures: int
+    generations: int
+    generation_seconds_avg: float
+    generation_seconds_max: float
+    cache_entries: int
+    cache_bytes: int
+    evictions: int
@@ -0,0 +1,37 @@
+from enum import Enum
+from typing import List, Optional
+
+from sqlmodel import SQLModel
+
+
+class JobType(str, Enum):
+    purge = "purge"
+    category_stats = "category_stats"
+    trending = "trending"
+    related_posts = "related_posts"
+    related_blogs = "related_blogs"
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class JobTypeMetricsRead(SQLModel):
+    type: JobType
+    queued: int
+    due: int
+    running: int
+    failed: int
+    done: int
+    oldest_due_seconds: Optional[float]
+    wait_seconds_avg: Optional[float]
+    wait_seconds_max: Optional[float]
+    run_seconds_avg: Optional[float]
+
+
+class JobMetricsRead(SQLModel):
+    window_seconds: int
+    data: List[JobTypeMetricsRead]
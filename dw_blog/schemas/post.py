@@ -1,7 +1,7 @@
 from enum import Enum
 import uuid
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 from sqlmodel import Field, SQLModel
 
@@ -12,6 +12,7 @@ class SortPostBy(str, Enum):
     title = "name"
     date_created = "date_created"
     likers = "likers"
+    trending = "trending"
 
 
 class PostBase(SQLModel):
@@ -55,18 +56,29 @@ class LikerOfPost(SQLModel):
 
 class PostRead(PostBase):
     id: uuid.UUID
+    version: int
     notes: Optional[List[str]] = None
     bibliography: Optional[List[str]] = None
     tags: List[TagInPost]
     authors: List[AuthorInPost]
     likers: Optional[List[LikerOfPost]] = None
     blog: BlogInPost
+    comments_count: int = 0
+    word_count: int = 0
+    reading_time: int = 0
+
+
+class PostsBatchRead(SQLModel):
+    data: Dict[uuid.UUID, PostRead]
+    missing: List[uuid.UUID]
 
 
 class ShortPostRead(SQLModel):
     id: uuid.UUID
     title: str
-    body: str
+    excerpt: str
+    word_count: int
+    reading_time: int
     date_created: datetime
     blog_id: uuid.UUID
     blog_name: str
@@ -78,8 +90,21 @@ class ShortPostResponse(SQLModel):
     total: int
 
 
-class PostsRead(PostRead):
-    likes_count: int
+class PostsRead(SQLModel):
+    id: uuid.UUID
+    title: Optional[str]
+    excerpt: Optional[str]
+    word_count: Optional[int]
+    reading_time: Optional[int]
+    published: Optional[bool]
+    date_created: Optional[datetime]
+    date_modified: Optional[datetime]
+    tags: Optional[List[TagInPost]]
+    authors: Optional[List[AuthorInPost]]
+    likers: Optional[List[LikerOfPost]]
+    blog: Optional[BlogInPost]
+    likes_count: Optional[int]
+    comments_count: Optional[int]
 
 
 class PostUpdate(SQLModel):
@@ -92,10 +117,49 @@ class PostUpdate(SQLModel):
     authors_ids: Optional[List[uuid.UUID]]
 
 
+class PostsTagsUpdate(SQLModel):
+    posts_ids: List[uuid.UUID] = Field(min_items=1)
+    tags_ids: List[uuid.UUID] = Field(min_items=1)
+
+
+class PostsTagsResult(SQLModel):
+    posts_ids: List[uuid.UUID]
+    tags_ids: List[uuid.UUID]
+    changed: int
+
+
 class PostDelete(SQLModel):
     id: uuid.UUID
 
 
+class PostEventType(str, Enum):
+    published = "post_published"
+    updated = "post_updated"
+
+
+class PostEventRead(SQLModel):
+    id: int
+    type: PostEventType
+    post_id: uuid.UUID
+    blog_id: uuid.UUID
+    tags_ids: List[uuid.UUID]
+    title: str
+    date_modified: datetime
+
+
+class RelatedPostRead(SQLModel):
+    id: uuid.UUID
+    title: str
+    blog_id: uuid.UUID
+    excerpt: str
+    reading_time: int
+    score: float
+
+
+class RelatedPostsRead(SQLModel):
+    data: List[RelatedPostRead]
+
+
 class ReadBlogsPagination(SQLModel):
     data: List[PostsRead]
     pagination: Pagination
@@ -0,0 +1,34 @@
+import uuid
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from sqlmodel import SQLModel
+
+
+class PurgeEntity(str, Enum):
+    blog = "blog"
+    user = "user"
+    tag = "tag"
+
+
+class PurgeStatus(str, Enum):
+    pending = "pending"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class PurgeRead(SQLModel):
+    id: uuid.UUID
+    entity: PurgeEntity
+    entity_id: uuid.UUID
+    status: PurgeStatus
+    current_table: Optional[str]
+    steps_done: int
+    steps_total: int
+    rows_deleted: int
+    error: Optional[str]
+    date_created: datetime
+    date_modified: datetime
+    date_finished: Optional[datetime]
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional
 from enum import Enum
 
 from sqlmodel import Field, SQLModel
@@ -25,11 +25,11 @@ class TagBase(SQLModel):
 
 class TagReadList(SQLModel):
     id: uuid.UUID
-    name: str
-    subscription_count: int
-    blog_id: uuid.UUID
-    date_created: datetime
-    date_modified: datetime
+    name: Optional[str]
+    subscription_count: Optional[int]
+    blog_id: Optional[uuid.UUID]
+    date_created: Optional[datetime]
+    date_modified: Optional[datetime]
 
 
 class ReadTagsPagination(SQLModel):
@@ -50,10 +50,16 @@ class TagCreate(SQLModel):
 
 class TagRead(TagBase):
     id: uuid.UUID
+    version: int
     blog_id: uuid.UUID
     blog_name: str
 
 
+class TagsBatchRead(SQLModel):
+    data: Dict[uuid.UUID, TagRead]
+    missing: List[uuid.UUID]
+
+
 class TagUpdate(SQLModel):
     name: str = Field(
         min_length=3,
@@ -1,5 +1,5 @@
 import uuid
-from typing import Optional
+from typing import Dict, List, Optional
 
 from sqlmodel import Field, SQLModel
 
@@ -64,6 +64,11 @@ class UserRead(SQLModel):
     description: Optional[str]
 
 
+class UsersBatchRead(SQLModel):
+    data: Dict[uuid.UUID, UserRead]
+    missing: List[uuid.UUID]
+
+
 class UserUpdate(SQLModel):
     user_type: Optional[UserType]
     description: Optional[str] = Field(
@@ -0,0 +1,101 @@
+"""Production entry point, run with `python -m dw_blog.server`.
+
+Runs `WEB_WORKERS` uvicorn workers (CPU count by default) under gunicorn.
+The app is imported once in the master and shared by forked workers, every
+worker warms its own DB pools on startup. SIGTERM makes workers stop
+accepting connections, finish in-flight requests within
+`WEB_GRACEFUL_TIMEOUT` and close their pools. Workers are replaced after
+`WEB_MAX_REQUESTS` requests (plus jitter, so they do not restart together).
+Background jobs are run by `python -m dw_blog.worker`, start the server
+with `JOB_WORKER_IN_PROCESS=false` then.
+"""
+import logging
+import multiprocessing
+import os
+import resource
+import time
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+from dw_blog.config import Settings
+
+settings = Settings()
+logger = logging.getLogger("gunicorn.error")
+launch_time = time.monotonic()
+
+
+class Worker(UvicornWorker):
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
+
+
+def get_rss_mb() -> float:
+    """Returns resident set size of current process in MB"""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        # Peak RSS, reported in kB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def when_ready(server):
+    logger.info(
+        "Master %s ready in %.2fs, RSS %.1f MB",
+        os.getpid(),
+        time.monotonic() - launch_time,
+        get_rss_mb(),
+    )
+
+
+def post_fork(server, worker):
+    worker.fork_time = time.monotonic()
+
+
+def post_worker_init(worker):
+    logger.info(
+        "Worker %s booted in %.2fs, RSS %.1f MB",
+        worker.pid,
+        time.monotonic() - worker.fork_time,
+        get_rss_mb(),
+    )
+
+
+def worker_exit(server, worker):
+    logger.info("Worker %s exited, RSS %.1f MB", worker.pid, get_rss_mb())
+
+
+class Server(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from main import app
+
+        return app
+
+
+def get_options() -> dict:
+    return {
+        "bind": f"{settings.WEB_HOST}:{settings.WEB_PORT}",
+        "workers": settings.WEB_WORKERS or multiprocessing.cpu_count(),
+        "worker_class": "dw_blog.server.Worker",
+        "preload_app": True,
+        "max_requests": settings.WEB_MAX_REQUESTS,
+        "max_requests_jitter": settings.WEB_MAX_REQUESTS_JITTER,
+        "graceful_timeout": settings.WEB_GRACEFUL_TIMEOUT,
+        "when_ready": when_ready,
+        "post_fork": post_fork,
+        "post_worker_init": post_worker_init,
+        "worker_exit": worker_exit,
+    }
+
+
+if __name__ == "__main__":
+    Server(get_options()).run()
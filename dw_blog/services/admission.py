@@ -0,0 +1,54 @@
+from dw_blog.config import Settings
+from dw_blog.exceptions.common import AdminStatusRequired
+from dw_blog.schemas.admission import AdmissionMetricsRead, RouteClass, RouteClassMetricsRead
+from dw_blog.schemas.auth import AuthUser
+from dw_blog.schemas.common import UserType
+from dw_blog.utils.admission import AdmissionController, AdmissionLimiter
+
+settings = Settings()
+
+admission_controller = AdmissionController(
+    limiters={
+        route_class: AdmissionLimiter(limit=limit, queue_size=queue_size, timeout=settings.ADMISSION_QUEUE_TIMEOUT)
+        for route_class, limit, queue_size in [
+            (RouteClass.read, settings.ADMISSION_READ_LIMIT, settings.ADMISSION_READ_QUEUE),
+            (RouteClass.write, settings.ADMISSION_WRITE_LIMIT, settings.ADMISSION_WRITE_QUEUE),
+            (RouteClass.search, settings.ADMISSION_SEARCH_LIMIT, settings.ADMISSION_SEARCH_QUEUE),
+            (RouteClass.auth, settings.ADMISSION_AUTH_LIMIT, settings.ADMISSION_AUTH_QUEUE),
+            (RouteClass.export, settings.ADMISSION_EXPORT_LIMIT, settings.ADMISSION_EXPORT_QUEUE),
+        ]
+    },
+    retry_after=settings.ADMISSION_RETRY_AFTER,
+)
+
+
+class AdmissionService:
+    @staticmethod
+    def metrics(current_user: AuthUser) -> AdmissionMetricsRead:
+        """Get load and shed requests per route class of this worker
+        Args:
+            current_user (AuthUser): current user object
+        Raises:
+            AdminStatusRequired: raised if current user is not an admin
+        Returns:
+            AdmissionMetricsRead: metrics of every route class
+        """
+        if current_user["user_type"] != UserType.admin:
+            raise AdminStatusRequired(operation="admission metrics read")
+        data = []
+        for route_class, limiter in admission_controller.limiters.items():
+            metrics = limiter.metrics
+            data.append(RouteClassMetricsRead(
+                route_class=route_class,
+                limit=limiter.limit,
+                queue_size=limiter.queue_size,
+                running=limiter.running,
+                queued=len(limiter.waiters),
+                admitted=metrics.admitted,
+                shed_queue_full=metrics.shed_queue_full,
+                shed_timeout=metrics.shed_timeout,
+                waited=metrics.waited,
+                wait_seconds_avg=metrics.wait_seconds / metrics.waited if metrics.waited else 0.0,
+                wait_seconds_max=metrics.wait_seconds_max,
+            ))
+        return AdmissionMetricsRead(data=data)
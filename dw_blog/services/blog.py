@@ -1,9 +1,10 @@
 from datetime import datetime
-from typing import List, Optional, Union
+from typing import Dict, FrozenSet, List, Optional, Tuple, Union
 from uuid import UUID
 
 from fastapi import Depends
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
 from sqlmodel import Session, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
@@ -25,19 +26,31 @@ from dw_blog.exceptions.common import (
     EntityFailedAdd,
     EntityUpdateFail,
     EntityDeleteFail,
+    EntityVersionConflict,
 )
 from dw_blog.exceptions.user import UserNotFound
 from dw_blog.schemas.auth import AuthUser
 from dw_blog.models.blog import Blog, BlogAuthors, BlogLikes, BlogSubscribers
-from dw_blog.schemas.blog import BlogAuthor, BlogLiker, BlogRead, BlogReadList, BlogSubscriber, BlogTag, SortBlogBy
+from dw_blog.schemas.blog import (BlogAuthor, BlogLiker, BlogRead, BlogReadList, BlogSubscriber, BlogTag,
+                                  RecommendedBlogRead, SortBlogBy)
 from dw_blog.schemas.common import SortOrder
+from dw_blog.schemas.purge import PurgeEntity, PurgeRead
 from dw_blog.schemas.user import UserType
 from dw_blog.models.category import Category
+from dw_blog.queries.category import get_categories_query
 from dw_blog.queries.blog import (check_like_query, check_subscription_query,
-                                  delete_author_query, get_listed_blogs_query,
-                                  get_single_blog_query, is_author_query)
+                                  count_blog_authors_query, delete_author_query, get_authors_blogs_query,
+                                  get_batch_blogs_query,
+                                  get_listed_blogs_query, get_single_blog_query, is_author_query)
 from dw_blog.services.user import UserService
 from dw_blog.services.category import CategoryService
+from dw_blog.services.purge import PurgeService
+from dw_blog.services.related import RelatedService
+from dw_blog.services.trending import TrendingService
+from dw_blog.models.trending import BlogTrending
+from dw_blog.utils.batch import get_batch_ids
+from dw_blog.utils.fields import get_fields
+from dw_blog.utils.deadline import is_deadline_error
 
 
 class BlogService:
@@ -45,6 +58,8 @@ class BlogService:
         self.db_session = db_session
         self.user_service = UserService(db_session)
         self.category_service = CategoryService(db_session)
+        self.trending_service = TrendingService(db_session)
+        self.related_service = RelatedService(db_session)
 
     async def check_author_blogs(self, user_id: UUID):
         """Checks if user has reachead limit of the blogs
@@ -53,12 +68,22 @@ class BlogService:
         Raises:
             BlogLimitReached: raised if user has already 3 blogs
         """
-        q = select(BlogAuthors).where(BlogAuthors.author_id == user_id)
-        result = await self.db_session.exec(q)
-        user_blogs = result.fetchall()
-        if len(user_blogs) >= 3:
+        q = get_authors_blogs_query(authors_ids=[user_id])
+        result = await self.db_session.execute(q)
+        user = result.first()
+        if user and user.blogs_count >= 3:
             raise BlogLimitReached(user_id=user_id)
 
+    async def get_categories(self, categories_ids: List[UUID]) -> Dict[UUID, Category]:
+        """Gets categories of given ids with single query
+        Args:
+            categories_ids (List[UUID]): ids of categories
+        Returns:
+            Dict[UUID, Category]: found categories by their ids
+        """
+        result = await self.db_session.exec(get_categories_query(categories_ids=categories_ids))
+        return {category.id: category for category in result.all()}
+
     async def create(
         self,
         current_user: AuthUser,
@@ -72,6 +97,8 @@ class BlogService:
             categories_id (List[UUID]): list of categories id
         Raises:
             BlogLimitReached: raised if user already has 3 blogs
+            CategoryNotFound: raised if category does not exist
+            ListException: raised if more categories do not exist
             EntityFailedAdd: raised if blog addition failed
         Returns:
             BlogRead: Created blog with author data
@@ -80,8 +107,18 @@ class BlogService:
         user = await self.user_service.get(user_id=str(current_user["user_id"]))
         await self.check_author_blogs(user.id)
 
-        # Get categories
-        categories = [await self.db_session.get(Category, category_id) for category_id in categories_id]
+        # Get categories with single query
+        found_categories = await self.get_categories(categories_ids=categories_id)
+        categories_errors = [
+            CategoryNotFound(category_id=category_id)
+            for category_id in categories_id
+            if category_id not in found_categories
+        ]
+        if len(categories_errors) == 1:
+            raise categories_errors[0]
+        if categories_errors:
+            raise ListException(detail=categories_errors)
+        categories = [found_categories[category_id] for category_id in categories_id]
 
         # Try to add new blog
         try:
@@ -93,9 +130,15 @@ class BlogService:
                 categories=categories,
             )
             self.db_session.add(blog)
+            await self.db_session.flush()
+            # Blog is listed by trending before it has any score
+            self.db_session.add(BlogTrending(blog_id=blog.id, date_created=blog.date_created))
+            await self.category_service.refresh_stats(category_ids=categories_id)
             await self.db_session.commit()
             await self.db_session.refresh(blog)
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityFailedAdd(entity_name="blog")
 
         # Return created blog
@@ -105,18 +148,23 @@ class BlogService:
     async def get(
         self,
         blog_id: UUID,
+        fields: Optional[str] = None,
     ) -> BlogRead:
         """Get blog data from database
         Args:
             blog_id (UUID): id of blog to be read
+            fields (Optional[str], optional): comma separated fields to be read. Defaults to all.
         Raises:
             BlogNotFound: raised if blog does not exist
+            FieldsNotAllowed: raised if any field is not a field of BlogRead
         Returns:
             BlogRead: Read blog with author data
         """
-        # Construct query with joined authors data
-        q = get_single_blog_query(blog_id=blog_id)
-        result = await self.db_session.exec(q)
+        fields = get_fields(fields, BlogRead)
+        # Construct query with joined data of requested fields
+        q = get_single_blog_query(blog_id=blog_id, fields=fields)
+        # Executed for rows, also when only id is selected
+        result = await self.db_session.execute(q)
         blog = result.first()
 
         # If no blog was found raise an exception
@@ -124,33 +172,60 @@ class BlogService:
             raise BlogNotFound(blog_id=blog_id)
 
         # Prepare and send response
-        return BlogRead(
-            id=blog.id,
-            name=blog.name,
-            date_created=blog.date_created,
-            date_modified=blog.date_modified,
-            authors=[
+        return self.to_blog_read(blog, fields)
+
+    async def batch_get(
+        self,
+        blog_ids: List[UUID],
+        fields: Optional[str] = None,
+    ) -> Tuple[Dict[UUID, BlogRead], List[UUID]]:
+        """Get data of multiple blogs with single query
+        Args:
+            blog_ids (List[UUID]): ids of blogs to be read
+            fields (Optional[str], optional): comma separated fields to be read. Defaults to all.
+        Raises:
+            BatchLimitSurpassed: raised if too many ids were requested
+            FieldsNotAllowed: raised if any field is not a field of BlogRead
+        Returns:
+            Tuple[Dict[UUID, BlogRead], List[UUID]]: blogs by id and ids of not existing blogs
+        """
+        blog_ids = get_batch_ids(blog_ids)
+        fields = get_fields(fields, BlogRead)
+        result = await self.db_session.execute(get_batch_blogs_query(blog_ids=blog_ids, fields=fields))
+        blogs = {blog.id: self.to_blog_read(blog, fields) for blog in result.fetchall()}
+        missing = [blog_id for blog_id in blog_ids if blog_id not in blogs]
+        return blogs, missing
+
+    @staticmethod
+    def to_blog_read(blog, fields: FrozenSet[str]) -> BlogRead:
+        """Builds blog data setting only requested fields, which are the only ones returned"""
+        data = {field: getattr(blog, field) for field in fields - {"authors", "tags", "likers", "subscribers"}}
+        if "authors" in fields:
+            data["authors"] = [
                 BlogAuthor(author_id=author_id, nickname=nickname)
                 for author_id, nickname in zip(blog.author_id, blog.author_nickname)
-            ],
-            tags=[BlogTag(tag_id=tag_id, tag_name=tag_name) for tag_id, tag_name in zip(blog.tag_id, blog.tag_name)],
-            likers=[
+            ]
+        if "tags" in fields:
+            data["tags"] = [
+                BlogTag(tag_id=tag_id, tag_name=tag_name) for tag_id, tag_name in zip(blog.tag_id, blog.tag_name)
+            ]
+        if "likers" in fields:
+            data["likers"] = [
                 BlogLiker(
                     liker_id=liker_id,
                     nickname=nickname,
                 )
                 for liker_id, nickname in zip(blog.likers_id, blog.likers_nicknames)
-            ],
-            subscribers=[
+            ]
+        if "subscribers" in fields:
+            data["subscribers"] = [
                 BlogSubscriber(
                     subscriber_id=subscriber_id,
                     nickname=nickname,
                 )
                 for subscriber_id, nickname in zip(blog.subscriber_id, blog.subscriber_nicknames)
-            ],
-            archived=blog.archived,
-            categories_name=blog.categories_name,
-        )
+            ]
+        return BlogRead(**data)
 
     async def list(
         self,
@@ -162,6 +237,7 @@ class BlogService:
         categories_ids: Optional[List[UUID]] = None,
         sort_order: SortOrder = SortOrder.ascending,
         sort_by: SortBlogBy = SortBlogBy.date_created,
+        fields: Optional[str] = None,
     ) -> Union[List[BlogReadList], int]:
         """Get listed blogs based - either all or based on authors_name or blog_name
         Args:
@@ -169,9 +245,11 @@ class BlogService:
             offset [int]: how many records should be skipped
             blog_name (Optional[str], optional): Name of the blog. Defaults to None.
             author_id (Optional[str], optional): Id of the author. Defaults to None.
+            fields (Optional[str], optional): comma separated fields to be read. Defaults to all.
         Raises:
             BlogNotFound: raised if no blog matching criteria exists
             PaginationLimitSurpassed: raised if limit was suprassed
+            FieldsNotAllowed: raised if any field is not a field of BlogReadList
         Returns:
             List[BlogRead]: List of blogs matching users criteria
         """
@@ -180,7 +258,7 @@ class BlogService:
             raise PaginationLimitSurpassed()
 
         # Create query
-        q_pag, q_all = get_listed_blogs_query(
+        q_pag, q_all, params = get_listed_blogs_query(
             limit=limit,
             offset=offset,
             blog_name=blog_name,
@@ -189,15 +267,35 @@ class BlogService:
             categories_ids=categories_ids,
             sort_order=sort_order,
             sort_by=sort_by,
+            fields=get_fields(fields, BlogReadList),
         )
         # Execute queries with and without limit
-        blogs_result = await self.db_session.exec(q_pag)
-        all_result = await self.db_session.exec(q_all)
+        blogs_result = await self.db_session.execute(q_pag, params=params)
+        all_result = await self.db_session.execute(q_all, params=params)
         blogs = blogs_result.fetchall()
         total = all_result.fetchall()
 
         return blogs, len(total)
 
+    async def recommended(
+        self,
+        current_user: AuthUser,
+        limit: int = 10,
+    ) -> List[RecommendedBlogRead]:
+        """Get blogs similar to the ones liked or subscribed by the user,
+        scored from the neighbour table rebuilt in the background
+        Args:
+            current_user (AuthUser): logged user object
+            limit (int, optional): number of recommended blogs. Defaults to 10.
+        Raises:
+            PaginationLimitSurpassed: raised if limit is higher than 20
+        Returns:
+            List[RecommendedBlogRead]: recommended blogs, best first
+        """
+        if limit > 20:
+            raise PaginationLimitSurpassed()
+        return await self.related_service.recommend_blogs(user_id=current_user["user_id"], limit=limit)
+
     async def check_blog_permissions(
         self,
         blog_id: UUID,
@@ -213,7 +311,7 @@ class BlogService:
             NotYourBlog: raised if user is not an author/ admin
         """
         # Check if blog exists
-        blog = await self.get(blog_id=blog_id)
+        blog = await self.get(blog_id=blog_id, fields="authors")
         # Chek user permissions
         authors_ids = []
         for author in blog.authors:
@@ -264,28 +362,32 @@ class BlogService:
             current_user=current_user,
             operation="author addition",
         )
+        add_author_ids = get_batch_ids(add_author_ids)
         # Check if blog already reached limit of five authors
-        q = select(BlogAuthors).where(BlogAuthors.blog_id == blog_id)
-        blog_authors_result = await self.db_session.exec(q)
-        blog_authors = blog_authors_result.fetchall()
+        authors_count_result = await self.db_session.exec(count_blog_authors_query(blog_id=blog_id))
+        authors_count = authors_count_result.one()
 
-        if len(blog_authors) > 5 or (len(blog_authors) + len(add_author_ids) > 5):
+        if authors_count + len(add_author_ids) > 5:
             raise BlogAuthorsLimitReached(blog_id=blog_id)
 
+        # Check all users with single query
+        users_result = await self.db_session.execute(
+            get_authors_blogs_query(authors_ids=add_author_ids, blog_id=blog_id)
+        )
+        users = {user.id: user for user in users_result.fetchall()}
+
         authors_errors = []
         add_authors = []
         for author_id in add_author_ids:
-            author_already = await self.is_author_already(blog_id=blog_id, author_id=author_id)
-            try:
-                # Check if user exists
-                await self.user_service.get(user_id=author_id)
-                # Check if user already reached the limit of the blogs
-                await self.check_author_blogs(author_id)
-            except (BlogLimitReached, UserNotFound) as exc:
-                authors_errors.append(exc)
+            user = users.get(author_id)
+            # Check if user exists and has not reached the limit of the blogs
+            if user is None:
+                authors_errors.append(UserNotFound(error_message=f"User with id {author_id} not found"))
+            elif user.blogs_count >= 3:
+                authors_errors.append(BlogLimitReached(user_id=author_id))
 
             # Check if user is already author of this blog
-            if author_already:
+            if user is not None and user.is_author:
                 authors_errors.append(BlogAlreadyAuthor(author_id=author_id))
             # If user has less than 3 blogs and is not author of the specified blog
             # add him/her as author
@@ -301,7 +403,9 @@ class BlogService:
             for blog_author in add_authors:
                 self.db_session.add(blog_author)
             await self.db_session.commit()
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise BlogActionFail(blog_id=blog_id, action="add author(s)")
 
         blog_read = await self.get(blog_id=blog_id)
@@ -341,7 +445,7 @@ class BlogService:
             )
 
         # Check count of authors
-        blog = await self.get(blog_id=blog_id)
+        blog = await self.get(blog_id=blog_id, fields="authors")
         if len(blog.authors) == 1:
             raise BlogLastAuthor()
 
@@ -350,7 +454,9 @@ class BlogService:
         try:
             await self.db_session.exec(q)
             await self.db_session.commit()
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise BlogActionFail(blog_id=blog_id, action="remove author")
 
         return await self.get(blog_id=blog_id)
@@ -415,7 +521,7 @@ class BlogService:
             BlogRead: blog data
         """
         # Check if blog exists and is active
-        blog = await self.get(blog_id=blog_id)
+        blog = await self.get(blog_id=blog_id, fields="archived")
         if blog.archived:
             raise BlogArchived(blog_id=blog_id)
 
@@ -428,9 +534,12 @@ class BlogService:
         try:
             subscription = BlogSubscribers(blog_id=blog_id, subscriber_id=current_user["user_id"])
             self.db_session.add(subscription)
+            await self.trending_service.add_score(BlogTrending, blog_id, event_date=subscription.date_created)
             await self.db_session.commit()
             await self.db_session.refresh(subscription)
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise BlogActionFail(blog_id=blog_id, action="add subscription")
 
         return await self.get(blog_id=blog_id)
@@ -453,7 +562,7 @@ class BlogService:
             BlogRead: blog data
         """
         # Check if blog exists
-        await self.get(blog_id=blog_id)
+        await self.get(blog_id=blog_id, fields="id")
         # Check if user is not already a subscriber
         already_subscribes = await self.check_subscription(blog_id=blog_id, current_user=current_user)
         if not already_subscribes:
@@ -461,9 +570,12 @@ class BlogService:
 
         # Delete subscription
         try:
+            await self.trending_service.remove_score(BlogTrending, blog_id, event_date=already_subscribes.date_created)
             await self.db_session.delete(already_subscribes)
             await self.db_session.commit()
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise BlogActionFail(blog_id=blog_id, action="remove subscription")
         return await self.get(blog_id=blog_id)
 
@@ -483,7 +595,7 @@ class BlogService:
             BlogRead: blog data
         """
         # Check if blog exists and is active
-        blog = await self.get(blog_id=blog_id)
+        blog = await self.get(blog_id=blog_id, fields="archived")
         if blog.archived:
             raise BlogArchived(blog_id=blog_id)
 
@@ -496,9 +608,13 @@ class BlogService:
         try:
             like = BlogLikes(blog_id=blog_id, liker_id=current_user["user_id"])
             self.db_session.add(like)
+            await self.trending_service.add_score(BlogTrending, blog_id, event_date=like.date_created)
+            self.category_service.mark_blogs([blog_id])
             await self.db_session.commit()
             await self.db_session.refresh(like)
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise BlogActionFail(blog_id=blog_id, action="add like")
 
         return await self.get(blog_id=blog_id)
@@ -519,7 +635,7 @@ class BlogService:
             BlogRead: blog data
         """
         # Check if blog exists
-        await self.get(blog_id=blog_id)
+        await self.get(blog_id=blog_id, fields="id")
         # Check if user is not already a subscriber
         already_likes = await self.check_like(blog_id=blog_id, current_user=current_user)
         if not already_likes:
@@ -527,9 +643,13 @@ class BlogService:
 
         # Delete subscription
         try:
+            await self.trending_service.remove_score(BlogTrending, blog_id, event_date=already_likes.date_created)
             await self.db_session.delete(already_likes)
+            self.category_service.mark_blogs([blog_id])
             await self.db_session.commit()
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise BlogActionFail(blog_id=blog_id, action="remove like")
         return await self.get(blog_id=blog_id)
 
@@ -541,6 +661,7 @@ class BlogService:
         archived: Optional[bool] = None,
         add_categories_id: List[UUID] = None,
         remove_categories_id: List[UUID] = None,
+        version: Optional[int] = None,
     ) -> BlogRead:
         """Updates blog data
         Args:
@@ -549,7 +670,16 @@ class BlogService:
             name (str): new blog name
             archived (bool): archive the blog
             categories_id (List[UUID]): list of categories id
+            version (Optional[int], optional): version of the blog the update
+            is based on. Defaults to None, update of any version.
         Raises:
+            EntityVersionConflict: raised if blog was modified since
+            the given version was read
+            BlogCategoryLimit: raised if blog would have more than 3 or no categories
+            BlogAlreadyInCategory: raised if added category is already assigned
+            BlogNotInCategory: raised if removed category is not assigned
+            CategoryNotFound: raised if category does not exist
+            ListException: raised if more categories are invalid
             EntityUpdateFail: raised if blog update failed
         Returns:
             BlogRead: Read blog with author data
@@ -566,6 +696,8 @@ class BlogService:
         )
         if not (update_blog := update_blog_results.first()):
             raise BlogNotFound(blog_id=blog_id)
+        if version is not None and version != update_blog.version:
+            raise EntityVersionConflict(entity_id=blog_id, entity_name="blog")
 
         # Update blog name
         if name:
@@ -577,46 +709,66 @@ class BlogService:
 
         # Update blog categories
         if add_categories_id or remove_categories_id:
-            already_categories = [] if len(update_blog.categories) == 0 else [category.id for category in update_blog.categories]
+            already_categories = {category.id for category in update_blog.categories}
+
+            # Check if adding categories will not exceed maximum category count per blog
+            if add_categories_id and len(update_blog.categories) + len(add_categories_id) > 3:
+                raise BlogCategoryLimit(
+                    blog_id=blog_id,
+                    blog_cat_already=len(update_blog.categories),
+                    blog_cat_add=len(add_categories_id)
+                )
+
+            # Get added and removed categories with single query
+            categories = await self.get_categories(
+                categories_ids=(add_categories_id or []) + (remove_categories_id or []),
+            )
+            categories_errors = []
 
             # Add categories to blog
-            if add_categories_id:
-                # Check if adding categories will not exceed maximum category count per blog
-                if len(update_blog.categories) + len(add_categories_id) > 3:
-                    raise BlogCategoryLimit(
-                        blog_id=blog_id,
-                        blog_cat_already=len(update_blog.categories),
-                        blog_cat_add=len(add_categories_id)
-                    )
-                for category_id in add_categories_id:
-                    # Check if the blog is not already in the category
-                    if category_id in already_categories:
-                        raise BlogAlreadyInCategory(category_id=category_id, blog_id=blog_id)
-                    # Check if the category exist
-                    if not (adding_category := await self.db_session.get(Category, category_id)):
-                        raise CategoryNotFound(category_id=category_id)
-                    # Add blog to category
-                    update_blog.categories.append(adding_category)
+            for category_id in add_categories_id or []:
+                # Check if the blog is not already in the category and the category exists
+                if category_id in already_categories:
+                    categories_errors.append(BlogAlreadyInCategory(category_id=category_id, blog_id=blog_id))
+                elif category_id not in categories:
+                    categories_errors.append(CategoryNotFound(category_id=category_id))
+                else:
+                    update_blog.categories.append(categories[category_id])
 
             # Remove categories from blog
-            if remove_categories_id:
-                for category_id in remove_categories_id:
-                    # Check if category to be removed exists
-                    if not (removing_category := await self.db_session.get(Category, category_id)):
-                        raise CategoryNotFound(category_id=category_id)
-                    # Check if category to be removed is assigned to the blog
-                    if category_id not in already_categories:
-                        raise BlogNotInCategory(category_id=category_id, blog_id=blog_id)
-                    # Remove category from the blog
-                    update_blog.categories.remove(removing_category)
-                    # Check if blog has any categories after removal
-                    if len(update_blog.categories) == 0:
-                        raise BlogCategoryLimit(blog_id=blog_id)
-
+            for category_id in remove_categories_id or []:
+                # Check if category to be removed exists and is assigned to the blog
+                if category_id not in categories:
+                    categories_errors.append(CategoryNotFound(category_id=category_id))
+                elif category_id not in already_categories:
+                    categories_errors.append(BlogNotInCategory(category_id=category_id, blog_id=blog_id))
+                else:
+                    update_blog.categories.remove(categories[category_id])
+
+            if len(categories_errors) == 1:
+                raise categories_errors[0]
+            if categories_errors:
+                raise ListException(detail=categories_errors)
+            # Check if blog has any categories after removal
+            if len(update_blog.categories) == 0:
+                raise BlogCategoryLimit(blog_id=blog_id)
+
+        # Version is checked and incremented also when only categories change
+        update_blog.date_modified = datetime.now()
         try:
             self.db_session.add(update_blog)
+            # Blog name and categories are part of category read model
+            if name or add_categories_id or remove_categories_id:
+                await self.category_service.refresh_stats(
+                    category_ids=(add_categories_id or []) + (remove_categories_id or []),
+                    blog_ids=[blog_id],
+                )
             await self.db_session.commit()
-        except Exception:
+        except StaleDataError:
+            raise EntityVersionConflict(entity_id=blog_id, entity_name="blog")
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityUpdateFail(entity_id=blog_id, entity_name="blog")
 
         return await self.get(blog_id=blog_id)
@@ -625,14 +777,17 @@ class BlogService:
         self,
         blog_id: UUID,
         current_user: AuthUser,
-    ):
-        """Deletes blog
+    ) -> PurgeRead:
+        """Marks blog as deleted, so that it is hidden at once, its posts,
+        tags and links are removed by the background purge
         Args:
             blog_id (UUID): blog id
             current_user (AuthUser): current user object
 
         Raises:
             EntityDeleteFail: sed if blog delete fails
+        Returns:
+            PurgeRead: enqueued purge of the blog
         """
         await self.check_blog_permissions(
             blog_id=blog_id,
@@ -641,12 +796,24 @@ class BlogService:
         )
 
         # Delete blog
-        delete_blog = await self.db_session.get(Blog, blog_id)
+        delete_blog = await self.db_session.get(Blog, blog_id, options=[selectinload(Blog.categories)])
+        purge_service = PurgeService(self.db_session)
         try:
-            self.db_session.delete(delete_blog)
+            delete_blog.date_deleted = datetime.utcnow()
+            self.db_session.add(delete_blog)
+            purge = purge_service.create(entity=PurgeEntity.blog, entity_id=blog_id, current_user=current_user)
+            # Deleted blog is no longer counted in its categories, links are
+            # purged in the background, so categories are passed directly
+            self.category_service.mark_blogs(
+                [blog_id],
+                category_ids=[category.id for category in delete_blog.categories],
+            )
             await self.db_session.commit()
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityDeleteFail(entity_id=blog_id, entity_name="blog")
+        return purge_service.to_purge_read(purge)
 
 
 async def get_blog_service(session: AsyncSession = Depends(get_session)):
@@ -1,22 +1,37 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from uuid import UUID
 from typing import Optional, Union, List
 
 from fastapi import Depends
 from sqlmodel import Session
 from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
 
+from dw_blog.config import Settings
 from dw_blog.db.db import get_session
 from dw_blog.schemas.common import SortOrder
 from dw_blog.exceptions.category import CategoryNotFound, CategoryHasBlogs
-from dw_blog.exceptions.common import PaginationLimitSurpassed, AdminStatusRequired, EntityFailedAdd, EntityUpdateFail, EntityDeleteFail
+from dw_blog.exceptions.common import (
+    AdminStatusRequired,
+    EntityDeleteFail,
+    EntityFailedAdd,
+    EntityUpdateFail,
+    EntityVersionConflict,
+    PaginationLimitSurpassed,
+)
 from dw_blog.schemas.auth import AuthUser
 from dw_blog.models.category import Category
 from dw_blog.schemas.category import CategoryRead, CategoryBlogRead, SortCategoryBy, CategoryReadList
 from dw_blog.models.user import User
+from dw_blog.schemas.job import JobType
 from dw_blog.schemas.user import UserType
-from dw_blog.queries.category import get_single_category_query, get_listed_categories_query, get_blogs_for_category_query
+from dw_blog.services.job import JobService, job_handler
+from dw_blog.utils.fields import get_fields
+from dw_blog.utils.deadline import is_deadline_error
+from dw_blog.queries.category import (get_single_category_query, get_listed_categories_query,
+                                      get_blogs_for_category_query, refresh_category_stats_query)
 
+settings = Settings()
 
 
 class CategoryService:
@@ -52,7 +67,9 @@ class CategoryService:
             self.db_session.add(category)
             await self.db_session.commit()
             await self.db_session.refresh(category)
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityFailedAdd(category_name=name)
 
         return await self.get(category_id=category.id)
@@ -81,10 +98,12 @@ class CategoryService:
 
         return CategoryRead(
             id=category.id,
+            version=category.version,
             name=category.name,
             approved=category.approved,
             date_created=category.date_created,
             date_modified=category.date_modified,
+            blogs_count=category.blogs_count,
             blogs=[
                 CategoryBlogRead(blog_id=blog_id, blog_name=blog_name)
                 for blog_id, blog_name in (zip(category.blog_ids, category.blog_names))
@@ -99,6 +118,7 @@ class CategoryService:
         approved: Optional[bool] = None,
         sort_order: SortOrder = SortOrder.ascending,
         sort_by: SortCategoryBy = SortCategoryBy.date_created,
+        fields: Optional[str] = None,
     ) -> Union[List[CategoryReadList], int]:
         """Get listed categories based - either all or based on category_name or approved
         Args:
@@ -106,8 +126,10 @@ class CategoryService:
             offset [int]: how many records should be skipped
             category_name (Optional[str], optional): Name of the category. Defaults to None.
             approved (Optional[bool], approved): If the categories should be approved. Defaults to True.
+            fields (Optional[str], optional): comma separated fields to be read. Defaults to all.
         Raises:
             PaginationLimitSurpassed: raised if limit was suprassed
+            FieldsNotAllowed: raised if any field is not a field of CategoryReadList
         Returns:
             Union[List[CategoryReadList], id]: List of categories with count of blogs
         """
@@ -116,25 +138,28 @@ class CategoryService:
             raise PaginationLimitSurpassed()
 
         # Create query
-        q_pag, q_all = get_listed_categories_query(
+        fields = get_fields(fields, CategoryReadList)
+        q_pag, q_all, params = get_listed_categories_query(
             limit=limit,
             offset=offset,
             category_name=category_name,
             approved=approved,
             sort_order=sort_order,
             sort_by=sort_by,
+            fields=fields,
         )
-        # Execute queries with and without limit
-        category_result = await self.db_session.exec(q_pag)
-        all_result = await self.db_session.exec(q_all)
+        # Execute queries with and without limit, for rows also when only id is selected
+        category_result = await self.db_session.execute(q_pag, params=params)
+        all_result = await self.db_session.execute(q_all, params=params)
         categories = category_result.fetchall()
         total = all_result.fetchall()
 
-        listed_data = [
-            CategoryReadList(
-                id=single_category.id,
-                approved=single_category.approved,
-                blogs=[
+        # Only requested fields are set
+        listed_data = []
+        for single_category in categories:
+            data = {field: getattr(single_category, field) for field in fields - {"blogs"}}
+            if "blogs" in fields:
+                data["blogs"] = [
                     CategoryBlogRead(
                         blog_id=blog_id,
                         blog_name=blog_name
@@ -142,13 +167,8 @@ class CategoryService:
                         single_category.blog_ids,
                         single_category.blog_names
                     )
-                ],
-                blogs_count=single_category.blogs_count,
-                name=single_category.name,
-                date_created=single_category.date_created,
-                date_modified=single_category.date_modified,
-            ) for single_category in categories
-        ]
+                ]
+            listed_data.append(CategoryReadList(**data))
 
         return listed_data, len(total)
 
@@ -158,6 +178,7 @@ class CategoryService:
         current_user: AuthUser,
         name: Optional[str] = None,
         approved: Optional[bool] = None,
+        version: Optional[int] = None,
     ) -> CategoryRead:
         """Updates category data
         Args:
@@ -165,7 +186,11 @@ class CategoryService:
             current_user (AuthUser): current user object
             name (str): new category name
             approved (bool): approved the category
+            version (Optional[int], optional): version of the category the update
+            is based on. Defaults to None, update of any version.
         Raises:
+            EntityVersionConflict: raised if category was modified since
+            the given version was read
             EntityUpdateFail: raised if category update failed
             AdminStatusRequired: raised if user performing update is not admin
         Returns:
@@ -180,6 +205,8 @@ class CategoryService:
         update_category = await self.db_session.get(Category, category_id)
         if update_category is None:
             raise CategoryNotFound(category_id=category_id)
+        if version is not None and version != update_category.version:
+            raise EntityVersionConflict(entity_id=category_id, entity_name="category")
 
         # Update category name
         if name:
@@ -188,11 +215,16 @@ class CategoryService:
         # Update category status
         if approved:
             update_category.approved = approved
+        update_category.date_modified = datetime.now()
 
         try:
             self.db_session.add(update_category)
             await self.db_session.commit()
-        except Exception:
+        except StaleDataError:
+            raise EntityVersionConflict(entity_id=category_id, entity_name="category")
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityUpdateFail(entity_id=category_id, entity_name="category")
 
         return await self.get(category_id=category_id)
@@ -230,10 +262,67 @@ class CategoryService:
         try:
             self.db_session.delete(delete_category)
             await self.db_session.commit()
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityDeleteFail(entity_id=category_id, entity_name="category")
 
         return True
 
+    def mark_blogs(self, blog_ids: List[UUID], category_ids: Optional[List[UUID]] = None):
+        """Queues refresh of categories of the blogs in the current transaction,
+        so that it is committed with the write. Frequent writes (likes) do not
+        lock stats rows of popular categories, refreshes queued within
+        the refresh interval are run together.
+        Args:
+            blog_ids (List[UUID]): blogs whose likes or categories changed
+            category_ids (Optional[List[UUID]]): categories refreshed as well,
+            e.g. of a deleted blog whose links may be purged before the refresh
+        """
+        payload = {"blog_ids": [str(blog_id) for blog_id in blog_ids]}
+        if category_ids:
+            payload["category_ids"] = [str(category_id) for category_id in category_ids]
+        JobService(self.db_session).enqueue(
+            job_type=JobType.category_stats,
+            payload=payload,
+            run_at=datetime.utcnow() + timedelta(seconds=settings.CATEGORY_STATS_REFRESH_INTERVAL),
+        )
+
+    async def refresh_stats(
+        self,
+        category_ids: Optional[List[UUID]] = None,
+        blog_ids: Optional[List[UUID]] = None,
+    ):
+        """Recomputes category read model (blogs count and most liked blogs)
+        in the current transaction. Caller is responsible for the commit.
+        Args:
+            category_ids (Optional[List[UUID]]): categories to refresh
+            blog_ids (Optional[List[UUID]]): refresh categories of these blogs
+            If neither is passed, all categories are refreshed.
+        """
+        q = refresh_category_stats_query(
+            top_blogs=settings.CATEGORY_TOP_BLOGS,
+            category_ids=category_ids,
+            blog_ids=blog_ids,
+        )
+        await self.db_session.exec(q)
+
+
+@job_handler(JobType.category_stats, every=settings.CATEGORY_STATS_FULL_REFRESH_INTERVAL)
+async def refresh_category_stats(session: AsyncSession, payload: dict):
+    """Refreshes categories of the blogs marked by writes, queued refreshes
+    are run together with the job. Periodic job refreshes all categories.
+    """
+    payloads = [payload, *await JobService(session).take_queued(job_type=JobType.category_stats)]
+    blog_ids, category_ids = None, None
+    if all("blog_ids" in payload for payload in payloads):
+        blog_ids = list({UUID(blog_id) for payload in payloads for blog_id in payload["blog_ids"]})
+        category_ids = list({
+            UUID(category_id) for payload in payloads for category_id in payload.get("category_ids", [])
+        })
+    await CategoryService(session).refresh_stats(category_ids=category_ids, blog_ids=blog_ids)
+    await session.commit()
+
+
 async def get_category_service(session: AsyncSession = Depends(get_session)):
     yield CategoryService(session)
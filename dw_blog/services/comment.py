@@ -0,0 +1,302 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import Depends
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from dw_blog.config import Settings
+from dw_blog.db.db import get_session
+from dw_blog.exceptions.comment import CommentMaxDepth, CommentNotFound, CommentNotThisPost
+from dw_blog.exceptions.common import AdminOrAuthorRequired, EntityDeleteFail, EntityFailedAdd, EntityUpdateFail, PaginationLimitSurpassed
+from dw_blog.exceptions.post import PostNotFound
+from dw_blog.models.comment import Comment
+from dw_blog.models.post import Post
+from dw_blog.queries.comment import (PATH_END, change_post_comments_count_query, change_replies_count_query,
+                                     comment_path_segment, delete_comment_subtree_query, get_comments_range_query,
+                                     get_single_comment_query, get_top_comments_query)
+from dw_blog.schemas.auth import AuthUser
+from dw_blog.schemas.comment import CommentRead
+from dw_blog.schemas.common import SortOrder, UserType
+from dw_blog.utils.deadline import is_deadline_error
+
+settings = Settings()
+
+
+class CommentService:
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    async def create(
+        self,
+        current_user: AuthUser,
+        post_id: UUID,
+        text: str,
+        parent_id: Optional[UUID] = None,
+    ) -> CommentRead:
+        """Add new comment or reply to the post, post comments
+        count and parent replies count are updated in the same transaction
+        Args:
+            current_user (AuthUser): current user object
+            post_id (UUID): id of the commented post
+            text (str): text of the comment
+            parent_id (Optional[UUID], optional): id of the replied comment. Defaults to None.
+        Raises:
+            CommentNotFound: raised if replied comment does not exist
+            CommentNotThisPost: raised if replied comment belongs to other post
+            CommentMaxDepth: raised if reply would be nested too deep
+            PostNotFound: raised if post does not exist
+            EntityFailedAdd: raised if comment addition failed
+        Returns:
+            CommentRead: comment data
+        """
+        comment = Comment(
+            post_id=post_id,
+            parent_id=parent_id,
+            author_id=UUID(str(current_user["user_id"])),
+            text=text,
+            path="",
+        )
+        segment = comment_path_segment(comment_id=comment.id, date_created=comment.date_created)
+
+        # Reply extends path of the replied comment
+        if parent_id:
+            if not (parent := await self.db_session.get(Comment, parent_id)):
+                raise CommentNotFound(comment_id=parent_id)
+            if parent.post_id != post_id:
+                raise CommentNotThisPost(comment_id=parent_id, post_id=post_id)
+            if parent.depth >= settings.COMMENT_MAX_DEPTH:
+                raise CommentMaxDepth(max_depth=settings.COMMENT_MAX_DEPTH)
+            comment.depth = parent.depth + 1
+            comment.path = parent.path + segment
+        else:
+            comment.path = segment
+
+        # Increment counters, post update also checks that post exists
+        result = await self.db_session.exec(change_post_comments_count_query(post_id=post_id, change=1))
+        if result.first() is None:
+            await self.db_session.rollback()
+            raise PostNotFound(post_id=post_id)
+        if parent_id:
+            await self.db_session.exec(change_replies_count_query(comment_id=parent_id, change=1))
+
+        try:
+            self.db_session.add(comment)
+            await self.db_session.commit()
+        except Exception as exc:
+            await self.db_session.rollback()
+            if is_deadline_error(exc):
+                raise
+            raise EntityFailedAdd(entity_name="comment")
+
+        return await self.get(comment_id=comment.id)
+
+    async def get(
+        self,
+        comment_id: UUID,
+    ) -> CommentRead:
+        """Get single comment based on its id
+        Args:
+            comment_id (UUID): id of the comment
+        Raises:
+            CommentNotFound: raised if comment does not exist
+        Returns:
+            CommentRead: comment data with author nickname
+        """
+        result = await self.db_session.exec(get_single_comment_query(comment_id=comment_id))
+        if not (comment := result.first()):
+            raise CommentNotFound(comment_id=comment_id)
+        return comment
+
+    async def list(
+        self,
+        post_id: UUID,
+        limit: int,
+        cursor: Optional[str] = None,
+        sort_order: SortOrder = SortOrder.descending,
+        replies_limit: Optional[int] = None,
+    ) -> Tuple[List[CommentRead], Optional[str], int]:
+        """Get page of top level comments of the post with their replies.
+        Pages are selected by path of the last top level comment of the
+        previous page, so every page costs the same regardless of its position
+        Args:
+            post_id (UUID): id of the post
+            limit (int): up to how many top level comments per page
+            cursor (Optional[str], optional): cursor returned with previous page. Defaults to None.
+            sort_order (SortOrder, optional): order of top level comments. Defaults to descending.
+            replies_limit (Optional[int], optional): if given only first replies_limit
+            replies of every comment are returned. Defaults to None.
+        Raises:
+            PaginationLimitSurpassed: raised if limit was surpassed
+            PostNotFound: raised if post does not exist
+        Returns:
+            Tuple[List[CommentRead], Optional[str], int]: comments in display order,
+            cursor of the next page and comments count of the post
+        """
+        if limit > 20:
+            raise PaginationLimitSurpassed()
+        if not (post := await self.db_session.get(Post, post_id)):
+            raise PostNotFound(post_id=post_id)
+
+        # Get paths of the page roots, one more to know if there is a next page
+        q, params = get_top_comments_query(
+            post_id=post_id,
+            limit=limit + 1,
+            cursor=cursor,
+            sort_order=sort_order,
+        )
+        result = await self.db_session.exec(q, params=params)
+        paths = result.all()
+        next_cursor = paths[limit - 1] if len(paths) > limit else None
+        paths = paths[:limit]
+        if not paths:
+            return [], None, post.comments_count
+
+        # Threads of the page are adjacent, read them as a single range
+        q, params = get_comments_range_query(
+            post_id=post_id,
+            low=min(paths),
+            high=max(paths) + PATH_END,
+            depth=0,
+            replies_limit=replies_limit,
+        )
+        result = await self.db_session.exec(q, params=params)
+        comments = result.fetchall()
+
+        # Range is ordered by path, reverse order of threads if needed
+        if sort_order == SortOrder.descending:
+            threads = []
+            for comment in comments:
+                if comment.depth == 0:
+                    threads.append([])
+                threads[-1].append(comment)
+            comments = [comment for thread in reversed(threads) for comment in thread]
+
+        return comments, next_cursor, post.comments_count
+
+    async def thread(
+        self,
+        comment_id: UUID,
+        replies_limit: Optional[int] = None,
+    ) -> List[CommentRead]:
+        """Get comment with all its replies
+        Args:
+            comment_id (UUID): id of the comment
+            replies_limit (Optional[int], optional): if given only first replies_limit
+            replies of every comment are returned. Defaults to None.
+        Raises:
+            CommentNotFound: raised if comment does not exist
+        Returns:
+            List[CommentRead]: comment followed by its replies in display order
+        """
+        if not (comment := await self.db_session.get(Comment, comment_id)):
+            raise CommentNotFound(comment_id=comment_id)
+
+        q, params = get_comments_range_query(
+            post_id=comment.post_id,
+            low=comment.path,
+            high=comment.path + PATH_END,
+            depth=comment.depth,
+            replies_limit=replies_limit,
+        )
+        result = await self.db_session.exec(q, params=params)
+        return result.fetchall()
+
+    async def check_comment_permissions(
+        self,
+        comment_id: UUID,
+        current_user: AuthUser,
+        operation: str,
+    ) -> Comment:
+        """Checks if user is author of the comment or admin
+        Args:
+            comment_id (UUID): id of the comment
+            current_user (AuthUser): current user object
+            operation (str): name of the operation
+        Raises:
+            CommentNotFound: raised if comment does not exist
+            AdminOrAuthorRequired: raised if user is neither author nor admin
+        Returns:
+            Comment: comment object
+        """
+        if not (comment := await self.db_session.get(Comment, comment_id)):
+            raise CommentNotFound(comment_id=comment_id)
+        is_admin = current_user["user_type"] == UserType.admin
+        if str(comment.author_id) != str(current_user["user_id"]) and not is_admin:
+            raise AdminOrAuthorRequired(operation=operation, entity="comment")
+        return comment
+
+    async def update(
+        self,
+        comment_id: UUID,
+        current_user: AuthUser,
+        text: str,
+    ) -> CommentRead:
+        """Updates text of the comment
+        Args:
+            comment_id (UUID): id of the comment
+            current_user (AuthUser): current user object
+            text (str): new text of the comment
+        Raises:
+            EntityUpdateFail: raised if comment update failed
+        Returns:
+            CommentRead: comment data
+        """
+        comment = await self.check_comment_permissions(
+            comment_id=comment_id,
+            current_user=current_user,
+            operation="comment update",
+        )
+
+        comment.text = text
+        comment.date_modified = datetime.utcnow()
+        try:
+            self.db_session.add(comment)
+            await self.db_session.commit()
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
+            raise EntityUpdateFail(entity_id=comment_id, entity_name="comment")
+
+        return await self.get(comment_id=comment_id)
+
+    async def delete(
+        self,
+        comment_id: UUID,
+        current_user: AuthUser,
+    ) -> None:
+        """Deletes comment with all its replies and updates counters
+        Args:
+            comment_id (UUID): id of the comment
+            current_user (AuthUser): current user object
+        Raises:
+            EntityDeleteFail: raised if comment deletion failed
+        """
+        comment = await self.check_comment_permissions(
+            comment_id=comment_id,
+            current_user=current_user,
+            operation="comment deletion",
+        )
+
+        try:
+            # Whole subtree is a single range of paths
+            result = await self.db_session.exec(
+                delete_comment_subtree_query(post_id=comment.post_id, path=comment.path)
+            )
+            await self.db_session.exec(
+                change_post_comments_count_query(post_id=comment.post_id, change=-result.rowcount)
+            )
+            if comment.parent_id:
+                await self.db_session.exec(change_replies_count_query(comment_id=comment.parent_id, change=-1))
+            await self.db_session.commit()
+        except Exception as exc:
+            await self.db_session.rollback()
+            if is_deadline_error(exc):
+                raise
+            raise EntityDeleteFail(entity_id=comment_id, entity_name="comment")
+        self.db_session.expunge(comment)
+
+
+async def get_comment_service(session: AsyncSession = Depends(get_session)):
+    yield CommentService(session)
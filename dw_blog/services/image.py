@@ -0,0 +1,336 @@
+import logging
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Tuple
+from uuid import UUID
+
+from fastapi import Depends, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from dw_blog.config import Settings
+from dw_blog.db.db import get_session
+from dw_blog.exceptions.common import EntityDeleteFail, EntityFailedAdd
+from dw_blog.exceptions.image import ImageContentNotFound, ImageNotFound, ImageTypeNotSupported, ImageVariantFailed
+from dw_blog.exceptions.post import PostNotFound
+from dw_blog.models.image import Image
+from dw_blog.models.post import Post
+from dw_blog.queries.image import (count_content_references_query, get_content_type_query, get_post_images_query,
+                                   lock_content_query)
+from dw_blog.schemas.auth import AuthUser
+from dw_blog.schemas.image import ImageCreate, ImageRead, ImageType, ImageVariant, VariantFormat, VariantMetricsRead
+from dw_blog.services.blog import BlogService
+from dw_blog.utils.files import immutable_file_response, not_modified_response
+from dw_blog.utils.storage import content_path, discard, move_to_storage, remove_content, store_multipart_upload
+from dw_blog.utils.variants import VariantGenerator
+from dw_blog.utils.deadline import is_deadline_error
+
+settings = Settings()
+logger = logging.getLogger(__name__)
+
+variant_generator = VariantGenerator(
+    directory=settings.IMAGE_VARIANTS_DIR,
+    max_bytes=settings.IMAGE_VARIANTS_CACHE_SIZE,
+    workers=settings.IMAGE_VARIANTS_WORKERS,
+)
+
+
+class ImageService:
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+        self.blog_service = BlogService(db_session)
+
+    async def get_post(
+        self,
+        post_id: UUID,
+        current_user: AuthUser,
+        operation: str,
+    ) -> Post:
+        """Gets post and checks if user is author of its blog or admin"""
+        if not (post := await self.db_session.get(Post, post_id)):
+            raise PostNotFound(post_id=post_id)
+        await self.blog_service.check_blog_permissions(
+            blog_id=post.blog_id,
+            current_user=current_user,
+            operation=operation,
+        )
+        return post
+
+    async def check_upload(
+        self,
+        current_user: AuthUser,
+        fields: Dict[str, str],
+        content_type: str,
+    ) -> Tuple[ImageCreate, ImageType]:
+        """Checks form fields and type of the uploaded file before it is stored
+        Args:
+            current_user (AuthUser): current user object
+            fields (Dict[str, str]): text fields of the form
+            content_type (str): content type of the file
+        Raises:
+            RequestValidationError: raised if fields are not valid
+            ImageTypeNotSupported: raised if file is not a supported image
+            PostNotFound: raised if post does not exist
+        Returns:
+            Tuple[ImageCreate, ImageType]: image data and type of the image
+        """
+        try:
+            image_data = ImageCreate(**fields)
+        except ValidationError as exc:
+            raise RequestValidationError(exc.errors())
+        try:
+            img_type = ImageType(content_type)
+        except ValueError:
+            raise ImageTypeNotSupported(content_type=content_type)
+        await self.get_post(post_id=image_data.post_id, current_user=current_user, operation="image upload")
+        return image_data, img_type
+
+    async def create(
+        self,
+        current_user: AuthUser,
+        request: Request,
+    ) -> ImageRead:
+        """Stores image uploaded as multipart form under its content hash
+        and links it to the post. File is streamed from the request body,
+        after fields of the form are checked.
+        Args:
+            current_user (AuthUser): current user object
+            request (Request): request with the form (post_id, title, caption, file)
+        Raises:
+            ImageUploadInvalid: raised if body is not a form with a file
+            RequestValidationError: raised if fields are not valid
+            ImageTypeNotSupported: raised if file is not a supported image
+            PostNotFound: raised if post does not exist
+            ImageTooLarge: raised if file is too large
+            EntityFailedAdd: raised if image addition failed
+        Returns:
+            ImageRead: image data
+        """
+        (image_data, img_type), content_hash, size, tmp_path = await store_multipart_upload(
+            request=request,
+            directory=settings.IMAGES_DIR,
+            max_size=settings.IMAGE_MAX_SIZE,
+            file_field="file",
+            on_file=partial(self.check_upload, current_user),
+        )
+        image = Image(
+            post_id=image_data.post_id,
+            title=image_data.title,
+            caption=image_data.caption,
+            size=size,
+            img_type=img_type,
+            hash=content_hash,
+        )
+        try:
+            # File can't be removed by deletion of the last image sharing it until commit
+            await self.db_session.exec(lock_content_query(content_hash=content_hash))
+            move_to_storage(tmp_path=tmp_path, directory=settings.IMAGES_DIR, content_hash=content_hash)
+            self.db_session.add(image)
+            await self.db_session.commit()
+            await self.db_session.refresh(image)
+        except Exception as exc:
+            await self.db_session.rollback()
+            if is_deadline_error(exc):
+                raise
+            raise EntityFailedAdd(entity_name="image")
+        finally:
+            discard(tmp_path)
+
+        return image
+
+    async def get(
+        self,
+        image_id: UUID,
+    ) -> ImageRead:
+        """Get single image data based on its id
+        Args:
+            image_id (UUID): id of the image
+        Raises:
+            ImageNotFound: raised if image does not exist
+        Returns:
+            ImageRead: image data
+        """
+        if not (image := await self.db_session.get(Image, image_id)):
+            raise ImageNotFound(image_id=image_id)
+        return image
+
+    async def list(
+        self,
+        post_id: UUID,
+    ) -> List[ImageRead]:
+        """Get images of the post
+        Args:
+            post_id (UUID): id of the post
+        Returns:
+            List[ImageRead]: images data
+        """
+        result = await self.db_session.exec(get_post_images_query(post_id=post_id))
+        return result.all()
+
+    async def content(
+        self,
+        request: Request,
+        content_hash: str,
+    ) -> Response:
+        """Serves stored file. Content never changes under its hash,
+        so it is cached for good and conditional requests are answered
+        without touching database or disk
+        Args:
+            request (Request): request of the file
+            content_hash (str): sha256 hash of the file
+        Raises:
+            ImageContentNotFound: raised if no image has given content
+        Returns:
+            Response: file response
+        """
+        if not_modified := not_modified_response(
+            request=request,
+            etag=content_hash,
+            max_age=settings.IMAGE_CACHE_MAX_AGE,
+        ):
+            return not_modified
+
+        img_type, path = await self.get_content(content_hash=content_hash)
+        return immutable_file_response(
+            request=request,
+            path=path,
+            etag=content_hash,
+            media_type=img_type.value,
+            max_age=settings.IMAGE_CACHE_MAX_AGE,
+        )
+
+    async def get_content(
+        self,
+        content_hash: str,
+    ) -> Tuple[ImageType, Path]:
+        """Get type and path of stored file
+        Args:
+            content_hash (str): sha256 hash of the file
+        Raises:
+            ImageContentNotFound: raised if no image has given content
+        Returns:
+            Tuple[ImageType, Path]: type of the image and path of the file
+        """
+        result = await self.db_session.exec(get_content_type_query(content_hash=content_hash))
+        img_type = result.first()
+        path = content_path(settings.IMAGES_DIR, content_hash)
+        if img_type is None or not path.is_file():
+            raise ImageContentNotFound(image_hash=content_hash)
+        return ImageType(img_type), path
+
+    async def variant(
+        self,
+        request: Request,
+        content_hash: str,
+        variant: ImageVariant,
+        image_format: VariantFormat,
+    ) -> Response:
+        """Serves variant of stored image, rendered on first request
+        in the process pool and cached on disk
+        Args:
+            request (Request): request of the file
+            content_hash (str): sha256 hash of the original image
+            variant (ImageVariant): size of the variant
+            image_format (VariantFormat): format of the variant
+        Raises:
+            ImageContentNotFound: raised if no image has given content
+            ImageTypeNotSupported: raised if image can't be rendered (SVG)
+            ImageVariantFailed: raised if rendering failed
+        Returns:
+            Response: file response
+        """
+        etag = variant_generator.key(content_hash=content_hash, variant=variant.value, image_format=image_format.value)
+        if not_modified := not_modified_response(
+            request=request,
+            etag=etag,
+            max_age=settings.IMAGE_CACHE_MAX_AGE,
+        ):
+            return not_modified
+
+        img_type, source = await self.get_content(content_hash=content_hash)
+        # Vector images are not rasterised
+        if img_type == ImageType.SVG:
+            raise ImageTypeNotSupported(content_type=img_type.value)
+        try:
+            path = await variant_generator.get(
+                source=source,
+                content_hash=content_hash,
+                variant=variant.value,
+                image_format=image_format.value,
+            )
+        except Exception:
+            raise ImageVariantFailed(image_hash=content_hash, variant=variant.value)
+
+        return immutable_file_response(
+            request=request,
+            path=path,
+            etag=etag,
+            media_type=f"image/{image_format.value}",
+            max_age=settings.IMAGE_CACHE_MAX_AGE,
+        )
+
+    @staticmethod
+    def variant_metrics() -> VariantMetricsRead:
+        """Metrics of variants rendering and cache of this worker"""
+        metrics = variant_generator.metrics
+        cache = variant_generator.cache
+        requests = metrics.hits + metrics.misses + metrics.coalesced
+        return VariantMetricsRead(
+            hits=metrics.hits,
+            misses=metrics.misses,
+            coalesced=metrics.coalesced,
+            hit_rate=metrics.hits / requests if requests else 0.0,
+            failures=metrics.failures,
+            generations=metrics.generations,
+            generation_seconds_avg=metrics.generation_seconds / metrics.generations if metrics.generations else 0.0,
+            generation_seconds_max=metrics.generation_seconds_max,
+            cache_entries=len(cache.entries or ()),
+            cache_bytes=cache.size,
+            evictions=cache.evictions,
+        )
+
+    async def delete(
+        self,
+        image_id: UUID,
+        current_user: AuthUser,
+    ) -> None:
+        """Deletes image, its file is removed with the last image using it
+        Args:
+            image_id (UUID): id of the image
+            current_user (AuthUser): current user object
+        Raises:
+            ImageNotFound: raised if image does not exist
+            EntityDeleteFail: raised if image deletion failed
+        """
+        if not (image := await self.db_session.get(Image, image_id)):
+            raise ImageNotFound(image_id=image_id)
+        await self.get_post(post_id=image.post_id, current_user=current_user, operation="image deletion")
+
+        content_hash = image.hash
+        try:
+            await self.db_session.delete(image)
+            await self.db_session.commit()
+        except Exception as exc:
+            await self.db_session.rollback()
+            if is_deadline_error(exc):
+                raise
+            raise EntityDeleteFail(entity_id=image_id, entity_name="image")
+
+        # File is removed only after the deletion is committed, under the lock
+        # serialising it with uploads, so that images committed meanwhile keep it
+        try:
+            await self.db_session.exec(lock_content_query(content_hash=content_hash))
+            result = await self.db_session.exec(count_content_references_query(content_hash=content_hash))
+            if result.one() == 0:
+                remove_content(directory=settings.IMAGES_DIR, content_hash=content_hash)
+            await self.db_session.commit()
+        except Exception:
+            # Unreferenced file only takes space, deletion of the image stands
+            await self.db_session.rollback()
+            logger.exception("Removal of image content %s failed", content_hash)
+
+
+async def get_image_service(session: AsyncSession = Depends(get_session)):
+    yield ImageService(session)
@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+from uuid import UUID
+
+from fastapi import Depends
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from dw_blog.config import Settings
+from dw_blog.db.db import get_session, job_session_maker
+from dw_blog.models.job import Job
+from dw_blog.exceptions.common import AdminStatusRequired
+from dw_blog.queries.job import (claim_jobs_query, delete_finished_jobs_query, extend_jobs_lease_query,
+                                 fail_job_query, finish_job_query, get_pending_schedules_query, job_metrics_query,
+                                 lock_job_type_query, requeue_expired_jobs_query, retry_job_query,
+                                 schedule_jobs_query, take_queued_jobs_query)
+from dw_blog.schemas.auth import AuthUser
+from dw_blog.schemas.common import UserType
+from dw_blog.schemas.job import JobMetricsRead, JobType, JobTypeMetricsRead
+from dw_blog.utils.background import PeriodicTask
+
+settings = Settings()
+logger = logging.getLogger(__name__)
+
+JobRun = Callable[[AsyncSession, dict], Awaitable[None]]
+
+
+class JobHandler(NamedTuple):
+    """Runs job of a type with its own session, committing its work. At
+    most `concurrency` jobs of the type run at once across all workers.
+    Periodic job types are also enqueued with an empty payload once
+    every `every` seconds across all workers.
+    """
+    run: JobRun
+    concurrency: int
+    every: Optional[int] = None
+
+
+JOB_HANDLERS: Dict[JobType, JobHandler] = {}
+
+
+def job_handler(
+    job_type: JobType,
+    concurrency: int = 1,
+    every: Optional[int] = None,
+) -> Callable[[JobRun], JobRun]:
+    """Registers decorated coroutine as handler of the job type, periodic
+    if `every` is set. Workers claim and schedule only jobs of registered
+    types, so modules with handlers have to be imported by the worker.
+    """
+    def register(run: JobRun) -> JobRun:
+        JOB_HANDLERS[job_type] = JobHandler(run=run, concurrency=concurrency, every=every)
+        return run
+    return register
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff after the given number of failed attempts"""
+    return min(settings.JOB_RETRY_DELAY * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_DELAY)
+
+
+class JobService:
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    def enqueue(
+        self,
+        job_type: JobType,
+        payload: dict,
+        run_at: Optional[datetime] = None,
+        max_attempts: int = settings.JOB_MAX_ATTEMPTS,
+    ) -> Job:
+        """Adds job to the session, so that it is committed together with
+        the write which triggers it. Caller is responsible for the commit.
+        Args:
+            job_type (JobType): type of the job
+            payload (dict): JSON serializable arguments of the handler
+            run_at (Optional[datetime], optional): not run before this (UTC) time. Defaults to now.
+            max_attempts (int): attempts before the job is failed
+        Returns:
+            Job: queued job
+        """
+        job = Job(type=job_type, payload=payload, max_attempts=max_attempts)
+        if run_at:
+            job.run_at = run_at
+        self.db_session.add(job)
+        return job
+
+    async def claim(self, batch_size: int) -> List[Job]:
+        """Marks due jobs of registered types as running by this worker,
+        within concurrency limits of their types. Jobs claimed by other
+        workers are skipped without waiting for their locks.
+        Args:
+            batch_size (int): most jobs to be claimed
+        Returns:
+            List[Job]: claimed jobs
+        """
+        jobs = []
+        for job_type, handler in JOB_HANDLERS.items():
+            if len(jobs) >= batch_size:
+                break
+            await self.db_session.execute(lock_job_type_query(job_type=job_type))
+            q, params = claim_jobs_query(
+                job_type=job_type,
+                batch_size=batch_size - len(jobs),
+                concurrency=handler.concurrency,
+            )
+            result = await self.db_session.execute(q, params)
+            jobs.extend(Job(**row._mapping) for row in result.all())
+        await self.db_session.commit()
+        return jobs
+
+    async def take_queued(self, job_type: JobType, limit: int = settings.JOB_COALESCE_LIMIT) -> List[dict]:
+        """Removes queued jobs of the type in the current transaction, so that
+        the running job of the type does their work with its own. Rollback
+        returns them to the queue. Caller is responsible for the commit.
+        Args:
+            job_type (JobType): type of the jobs
+            limit (int): most jobs to be taken
+        Returns:
+            List[dict]: payloads of the taken jobs
+        """
+        result = await self.db_session.execute(take_queued_jobs_query(job_type=job_type, limit=limit))
+        return result.scalars().all()
+
+    async def schedule(self) -> List[JobType]:
+        """Enqueues periodic jobs whose next run passed, once across all workers
+        Returns:
+            List[JobType]: types of enqueued jobs
+        """
+        intervals = {job_type: handler.every for job_type, handler in JOB_HANDLERS.items() if handler.every}
+        result = await self.db_session.execute(get_pending_schedules_query())
+        for job_type in result.scalars().all():
+            intervals.pop(job_type, None)
+        if not intervals:
+            return []
+        result = await self.db_session.execute(schedule_jobs_query(intervals=intervals))
+        job_types = result.scalars().all()
+        for job_type in job_types:
+            self.enqueue(job_type=job_type, payload={})
+        await self.db_session.commit()
+        return job_types
+
+    async def extend_lease(self, job_ids: List[UUID]):
+        await self.db_session.execute(extend_jobs_lease_query(job_ids=job_ids))
+        await self.db_session.commit()
+
+    async def requeue_expired(self):
+        await self.db_session.execute(requeue_expired_jobs_query(lease=settings.JOB_LEASE))
+        await self.db_session.commit()
+
+    async def finish(self, job: Job):
+        await self.db_session.execute(finish_job_query(job_id=job.id))
+        await self.db_session.commit()
+
+    async def fail(self, job: Job, error: str):
+        """Queues failed job again with backoff, or fails it for good
+        if it ran out of attempts
+        Args:
+            job (Job): claimed job
+            error (str): error of the attempt
+        """
+        if job.attempts >= job.max_attempts:
+            q = fail_job_query(job_id=job.id, error=error)
+        else:
+            q = retry_job_query(job_id=job.id, error=error, delay=retry_delay(job.attempts))
+        await self.db_session.execute(q)
+        await self.db_session.commit()
+
+    async def delete_finished(self, limit: int = 1000):
+        await self.db_session.execute(delete_finished_jobs_query(retention=settings.JOB_RETENTION, limit=limit))
+        await self.db_session.commit()
+
+    async def metrics(self, current_user: AuthUser) -> JobMetricsRead:
+        """Get queue depth and latency of jobs per type
+        Args:
+            current_user (AuthUser): current user object
+        Raises:
+            AdminStatusRequired: raised if current user is not an admin
+        Returns:
+            JobMetricsRead: metrics of types which have any queued,
+            running or failed jobs, or jobs done in the window
+        """
+        if current_user["user_type"] != UserType.admin:
+            raise AdminStatusRequired(operation="jobs metrics read")
+        result = await self.db_session.execute(job_metrics_query(window=settings.JOB_METRICS_WINDOW))
+        return JobMetricsRead(
+            window_seconds=settings.JOB_METRICS_WINDOW,
+            data=[JobTypeMetricsRead(**row._mapping) for row in result.all()],
+        )
+
+
+class JobWorker(PeriodicTask):
+    """Claims due jobs every interval and runs every one in its own task,
+    keeping at most `batch_size` running in this process. Jobs and the poll
+    use the pool of jobs, apart from requests. Leases of running jobs are
+    extended on every poll, so jobs of a stopped worker are returned to the
+    queue once their lease expires. Periodic jobs are enqueued on the poll
+    after their next run passes.
+    """
+
+    def __init__(self, interval: float, batch_size: int):
+        super().__init__(interval=interval)
+        self.batch_size = batch_size
+        self.running: Dict[asyncio.Task, Job] = {}
+        self.cleaned_at = 0.0
+
+    async def execute(self):
+        async with job_session_maker() as session:
+            job_service = JobService(session)
+            if self.running:
+                await job_service.extend_lease(job_ids=[job.id for job in self.running.values()])
+            await job_service.requeue_expired()
+            await job_service.schedule()
+            if time.monotonic() - self.cleaned_at > settings.JOB_CLEANUP_INTERVAL:
+                await job_service.delete_finished()
+                self.cleaned_at = time.monotonic()
+            if len(self.running) >= self.batch_size:
+                return
+            jobs = await job_service.claim(batch_size=self.batch_size - len(self.running))
+
+        for job in jobs:
+            task = asyncio.create_task(self.perform(job))
+            self.running[task] = job
+            task.add_done_callback(self.running.pop)
+
+    async def perform(self, job: Job):
+        handler = JOB_HANDLERS[job.type]
+        async with job_session_maker() as session:
+            job_service = JobService(session)
+            try:
+                await handler.run(session, job.payload)
+            except Exception as exc:
+                logger.exception("Job %s %s failed, attempt %s", job.type.value, job.id, job.attempts)
+                await session.rollback()
+                await job_service.fail(job, error=str(exc))
+            else:
+                await job_service.finish(job)
+
+    async def stop(self):
+        await super().stop()
+        # Cancelled jobs are queued again once their lease expires
+        for task in list(self.running):
+            task.cancel()
+        await asyncio.gather(*self.running, return_exceptions=True)
+
+
+job_worker = JobWorker(interval=settings.JOB_POLL_INTERVAL, batch_size=settings.JOB_BATCH_SIZE)
+
+
+async def get_job_service(session: AsyncSession = Depends(get_session)):
+    yield JobService(session)
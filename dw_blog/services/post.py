@@ -1,27 +1,56 @@
 from datetime import datetime
-from typing import List, Optional, Union
-from uuid import UUID
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+from uuid import UUID, uuid4
 
 from fastapi import Depends
+from sqlalchemy import any_, bindparam
 from sqlmodel import Session, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
 
 
+from dw_blog.config import Settings
 from dw_blog.db.db import get_session
-from dw_blog.exceptions.tag import TagNotThisBlog
-from dw_blog.queries.post import get_listed_posts_query, get_listed_user_posts_query
+from dw_blog.exceptions.tag import TagNotFound, TagNotThisBlog
+from dw_blog.exceptions.blog import BlogNotFound
+from dw_blog.queries.post import (RETURNED_POST_COLUMNS, add_posts_tags_query, get_create_post_query,
+                                  get_export_posts_query, get_listed_posts_query,
+                                  get_listed_user_posts_query, get_posts_permissions_query,
+                                  get_user_subscriptions_query, notify_post_event_query,
+                                  remove_posts_tags_query, POST_EVENTS_CHANNEL)
+from dw_blog.queries.tag import get_tags_blogs_query
 from dw_blog.schemas.auth import AuthUser
 from dw_blog.exceptions.post import PostAlreadyLiked, PostAlreadyMarked, PostAuthorLike, PostNotFound, PostNotLiked, PostNotMarked, PostTitleDuplicate
-from dw_blog.exceptions.common import AuthorStatusRequired, EntityDeleteFail, EntityFailedAdd, EntityUpdateFail, PaginationLimitSurpassed
-from dw_blog.models.post import Post
-from dw_blog.models.post import Blog
-from dw_blog.schemas.common import SortOrder
-from dw_blog.schemas.post import BlogInPost, PostRead, AuthorInPost, PostsRead, ShortPostRead, SortPostBy, TagInPost, LikerOfPost
+from dw_blog.exceptions.common import AdminOrAuthorRequired, AdminStatusRequired, AuthorStatusRequired, ListException, EntityDeleteFail, EntityFailedAdd, EntityUpdateFail, EntityVersionConflict, PaginationLimitSurpassed
+from dw_blog.models.blog import Blog
+from dw_blog.models.post import Post, PostLikers
+from dw_blog.models.user import User
+from dw_blog.schemas.common import ExportFormat, SortOrder, UserType
+from dw_blog.schemas.post import BlogInPost, PostEventType, PostRead, RelatedPostRead, AuthorInPost, PostsRead, PostsTagsResult, ShortPostRead, SortPostBy, TagInPost, LikerOfPost
 from dw_blog.services.user import UserService
 from dw_blog.services.blog import BlogService
 from dw_blog.services.tag import TagService
+from dw_blog.services.related import RelatedService
+from dw_blog.services.trending import TrendingService
+from dw_blog.models.trending import PostTrending
+from dw_blog.queries.common import UUID_ARRAY, deleted_ids
+from dw_blog.utils.batch import get_batch_ids
+from dw_blog.utils.excerpt import reading_metadata
+from dw_blog.utils.fields import get_fields
+from dw_blog.utils.events import PostEventBroker, stream_events
+from dw_blog.utils.export import stream_export
+from dw_blog.utils.deadline import is_deadline_error
+
+settings = Settings()
+post_event_broker = PostEventBroker(
+    url=settings.DATABASE_URL,
+    channel=POST_EVENTS_CHANNEL,
+    buffer_size=settings.SSE_BUFFER_SIZE,
+    replay_size=settings.SSE_REPLAY_SIZE,
+    heartbeat=settings.SSE_HEARTBEAT_INTERVAL,
+)
 
 
 class PostService:
@@ -30,6 +59,8 @@ class PostService:
         self.user_service = UserService(db_session)
         self.blog_service = BlogService(db_session)
         self.tag_service = TagService(db_session)
+        self.trending_service = TrendingService(db_session)
+        self.related_service = RelatedService(db_session)
 
     async def create(
         self,
@@ -43,56 +74,90 @@ class PostService:
         bibliography: Optional[List[str]] = None,
         notes: Optional[List[str]] = None,
     ) -> PostRead:
-        # Check if user that adds post is author/ admin
-        await self.blog_service.check_blog_permissions(
-            blog_id=blog_id,
-            current_user=current_user,
-            operation="post addition",
-        )
-
-        # Get blog with authors and tags
-        blog = await self.blog_service.get(blog_id=blog_id)
-        # Get raw blog
-        raw_blog = await self.db_session.get(Blog, blog_id)
-
-        # Check if submitted data is valid
-        await self.validate(
+        """Validates and creates post with its authors and tags in single
+        statement, see get_create_post_query
+        Args:
+            current_user (AuthUser): current user object
+            tags_ids (List[UUID]): ids of tags of the blog
+            authors_ids (List[UUID]): ids of authors of the blog
+            blog_id (UUID): id of the blog
+            title (str): title unique within the blog
+            body (str): body of the post
+            published (bool): publish the post
+            bibliography (Optional[List[str]]): bibliography of the post
+            notes (Optional[List[str]]): notes of the post
+        Raises:
+            BlogNotFound: raised if blog does not exist
+            AdminOrAuthorRequired: raised if user is not an author of the blog/ admin
+            AuthorStatusRequired: raised if any of authors is not an author of the blog
+            TagNotThisBlog: raised if any of tags does not belong to the blog
+            PostTitleDuplicate: raised if the blog already has post of the title
+            EntityFailedAdd: raised if post addition failed
+        Returns:
+            PostRead: Created post with its blog, authors and tags
+        """
+        authors_ids = list(dict.fromkeys(authors_ids))
+        tags_ids = list(dict.fromkeys(tags_ids))
+        q, params = get_create_post_query(
             blog_id=blog_id,
+            user_id=UUID(str(current_user["user_id"])),
+            is_admin=current_user["user_type"] == UserType.admin,
             authors_ids=authors_ids,
-            blog_authors=blog.authors,
             tags_ids=tags_ids,
-            blog_tags=blog.tags,
-        )
-
-        # Get authors and tags
-        authors = await self.user_service.bulk_get(authors_ids)
-        tags = await self.tag_service.bulk_get(tags_ids)
-
-        # Create post
-        post = Post(
+            id=uuid4(),
             title=title,
             body=body,
             published=published,
-            authors=authors,
-            tags=tags,
-            blog=raw_blog,
             date_created=datetime.now(),
             date_modified=datetime.now(),
-            blog_id=blog_id,
             bibliography=bibliography,
             notes=notes,
+            **self.get_reading_metadata(body),
         )
-
         try:
-            self.db_session.add(post)
+            result = await self.db_session.execute(q, params)
+            post = result.first()
+            if post is not None and post.id is not None and post.published:
+                await self.db_session.execute(notify_post_event_query(
+                    event_type=PostEventType.published,
+                    post_id=post.id,
+                    blog_id=post.blog_id,
+                    tags_ids=post.tags_ids,
+                    title=post.title,
+                    date_modified=post.date_modified,
+                ))
+            if post is not None and post.id is not None:
+                self.related_service.mark_posts([post.id])
             await self.db_session.commit()
-            await self.db_session.refresh(post)
         except IntegrityError:
             raise PostTitleDuplicate(title=title, blog_id=blog_id)
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityFailedAdd(entity_name="post")
 
-        return await self.get(post_id=post.id)
+        # Nothing was inserted if the blog did not pass validation
+        if post is None:
+            raise BlogNotFound(blog_id=blog_id)
+        if not post.permitted:
+            raise AdminOrAuthorRequired(operation="post addition", entity="blog")
+        for author_id in authors_ids:
+            if author_id not in post.authors_ids:
+                raise AuthorStatusRequired(operation="post addition", user_id=author_id, blog_id=blog_id)
+        for tag_id in tags_ids:
+            if tag_id not in post.tags_ids:
+                raise TagNotThisBlog(tag_id=tag_id, blog_id=blog_id)
+
+        return PostRead(
+            **{column: getattr(post, column) for column in RETURNED_POST_COLUMNS},
+            blog=BlogInPost(id=post.blog_id, name=post.blog_name),
+            authors=[
+                AuthorInPost(id=author_id, nickname=nickname)
+                for author_id, nickname in zip(post.authors_ids, post.authors_nicknames)
+            ],
+            tags=[TagInPost(id=tag_id, name=tag_name) for tag_id, tag_name in zip(post.tags_ids, post.tags_names)],
+            likers=[],
+        )
 
     async def get(
         self,
@@ -101,13 +166,14 @@ class PostService:
         q = (
             select(Post)
             .options(
-                selectinload(Post.authors),
+                # Deleted users are hidden until they are purged
+                selectinload(Post.authors.and_(User.date_deleted.is_(None))),
                 selectinload(Post.blog),
                 selectinload(Post.tags),
-                selectinload(Post.likers),
+                selectinload(Post.likers.and_(User.date_deleted.is_(None))),
                 selectinload(Post.favouriters),
             )
-            .where(Post.id == post_id)
+            .where(Post.id == post_id, Post.blog_id.not_in(deleted_ids(Blog)))
         )
         result = await self.db_session.exec(q)
 
@@ -116,6 +182,66 @@ class PostService:
 
         return post
 
+    async def batch_get(
+        self,
+        post_ids: List[UUID],
+    ) -> Tuple[Dict[UUID, Post], List[UUID]]:
+        """Get multiple posts, relations of all posts are loaded
+        with single query per relation
+        Args:
+            post_ids (List[UUID]): ids of posts to be read
+        Raises:
+            BatchLimitSurpassed: raised if too many ids were requested
+        Returns:
+            Tuple[Dict[UUID, Post], List[UUID]]: posts by id and ids of not existing posts
+        """
+        post_ids = get_batch_ids(post_ids)
+        q = (
+            select(Post)
+            .options(
+                selectinload(Post.authors.and_(User.date_deleted.is_(None))),
+                selectinload(Post.blog),
+                selectinload(Post.tags),
+                selectinload(Post.likers.and_(User.date_deleted.is_(None))),
+            )
+            .where(
+                Post.id == any_(bindparam("post_ids", post_ids, type_=UUID_ARRAY)),
+                Post.blog_id.not_in(deleted_ids(Blog)),
+            )
+        )
+        result = await self.db_session.exec(q)
+        posts = {post.id: post for post in result.fetchall()}
+        missing = [post_id for post_id in post_ids if post_id not in posts]
+        return posts, missing
+
+    async def related(
+        self,
+        post_id: UUID,
+        limit: int = 5,
+    ) -> List[RelatedPostRead]:
+        """Get most similar published posts by shared tags and likers,
+        read from the neighbour table refreshed in the background
+        Args:
+            post_id (UUID): id of the post
+            limit (int, optional): number of related posts. Defaults to 5.
+        Raises:
+            PaginationLimitSurpassed: raised if limit is higher than 20
+            PostNotFound: raised if post does not exist
+        Returns:
+            List[RelatedPostRead]: related posts, most similar first
+        """
+        if limit > 20:
+            raise PaginationLimitSurpassed()
+        related = await self.related_service.list(post_id=post_id, limit=limit)
+        # Neighbours are missing for new posts as well, only then the post is checked
+        if not related:
+            result = await self.db_session.exec(
+                select(Post.id).where(Post.id == post_id, Post.blog_id.not_in(deleted_ids(Blog)))
+            )
+            if result.first() is None:
+                raise PostNotFound(post_id=post_id)
+        return related
+
     async def list(
         self,
         limit: int = 10,
@@ -128,13 +254,15 @@ class PostService:
         body_search: Optional[str] = None,
         sort_order: SortOrder = SortOrder.ascending,
         sort_by: SortPostBy = SortPostBy.date_created,
+        fields: Optional[str] = None,
     ):
         # Check limit
         if limit > 20:
             raise PaginationLimitSurpassed()
         
         # Create query
-        q_pag, q_all = get_listed_posts_query(
+        fields = get_fields(fields, PostsRead)
+        q_pag, q_all, params = get_listed_posts_query(
             limit=limit,
             offset=offset,
             published=published,
@@ -145,54 +273,49 @@ class PostService:
             body_search=body_search,
             sort_order=sort_order,
             sort_by=sort_by,
+            fields=fields,
         )
 
-        # Execute queries with and without limit
-        post_results = await self.db_session.exec(q_pag)
-        all_result = await self.db_session.exec(q_all)
+        # Execute queries with and without limit, for rows also when only id is selected
+        post_results = await self.db_session.execute(q_pag, params=params)
+        all_result = await self.db_session.execute(q_all, params=params)
         posts = post_results.fetchall()
         total = all_result.fetchall()
 
+        # Only requested fields are set
         data = []
         for post in posts:
-            data.append(
-                PostsRead(
-                    id=post.id,
-                    title=post.title,
-                    published=post.published,
-                    date_created=post.date_created,
-                    date_modified=post.date_modified,
-                    body=post.body,
-                    notes=post.notes,
-                    bibliography=post.bibliography,
-                    tags=[
-                        TagInPost(
-                            id=tag_id,
-                            name=tag_name,
-                        )
-                        for tag_id, tag_name in zip(post.tags_ids, post.tags_names)
-                    ],
-                    authors=[
-                        AuthorInPost(
-                            id=author_id,
-                            nickname=author_nickname,
-                        )
-                        for author_id, author_nickname in zip(post.authors_ids, post.authors_nicknames)
-                    ],
-                    likers=[
-                        LikerOfPost(
-                            id=liker_id,
-                            nickname=liker_nickname,
-                        )
-                        for liker_id, liker_nickname in zip(post.likers_ids, post.likers_nicknames) if liker_id
-                    ],
-                    blog=BlogInPost(
-                        id=post.blog_id,
-                        name=post.blog_name,
-                    ),
-                    likes_count=post.likes_count,
+            values = {field: getattr(post, field) for field in fields - {"tags", "authors", "likers", "blog"}}
+            if "tags" in fields:
+                values["tags"] = [
+                    TagInPost(
+                        id=tag_id,
+                        name=tag_name,
+                    )
+                    for tag_id, tag_name in zip(post.tags_ids, post.tags_names) if tag_id
+                ]
+            if "authors" in fields:
+                values["authors"] = [
+                    AuthorInPost(
+                        id=author_id,
+                        nickname=author_nickname,
+                    )
+                    for author_id, author_nickname in zip(post.authors_ids, post.authors_nicknames)
+                ]
+            if "likers" in fields:
+                values["likers"] = [
+                    LikerOfPost(
+                        id=liker_id,
+                        nickname=liker_nickname,
+                    )
+                    for liker_id, liker_nickname in zip(post.likers_ids, post.likers_nicknames) if liker_id
+                ]
+            if "blog" in fields:
+                values["blog"] = BlogInPost(
+                    id=post.blog_id,
+                    name=post.blog_name,
                 )
-            )
+            data.append(PostsRead(**values))
         
         # Return data
         return data, len(total)
@@ -208,11 +331,16 @@ class PostService:
         notes: Optional[List[str]] = None,
         tags_ids: Optional[List[UUID]] = None,
         authors_ids: Optional[List[UUID]] = None,
+        version: Optional[int] = None,
     ) -> PostRead:
         # Get post
         post = await self.get(post_id=post_id)
+        was_published = post.published
+        # Check if post was not modified since the version the update is based on
+        if version is not None and version != post.version:
+            raise EntityVersionConflict(entity_id=post_id, entity_name="post")
         # Get blog with authors and tags
-        blog = await self.blog_service.get(blog_id=post.blog_id)
+        blog = await self.blog_service.get(blog_id=post.blog_id, fields="authors,tags")
 
         # Check if user that updates post is author/ admin
         await self.blog_service.check_blog_permissions(
@@ -243,6 +371,8 @@ class PostService:
             post.title = title
         if body:
             post.body = body
+            for key, value in self.get_reading_metadata(body).items():
+                setattr(post, key, value)
         if published is not None:
             post.published = published
         if bibliography:
@@ -252,15 +382,150 @@ class PostService:
         post.date_modified = datetime.now()
 
         try:
+            # Subscribers are notified of published posts only
+            if post.published:
+                await self.db_session.execute(notify_post_event_query(
+                    event_type=PostEventType.updated if was_published else PostEventType.published,
+                    post_id=post.id,
+                    blog_id=post.blog_id,
+                    tags_ids=[tag.id for tag in post.tags],
+                    title=post.title,
+                    date_modified=post.date_modified,
+                ))
+            self.related_service.mark_posts([post_id])
             await self.db_session.commit()
             await self.db_session.refresh(post)
+        except StaleDataError:
+            raise EntityVersionConflict(entity_id=post_id, entity_name="post")
         except IntegrityError:
             raise PostTitleDuplicate(title=title, blog_id=post.blog_id)
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityUpdateFail(entity_id=post_id, entity_name="post")
 
         return await self.get(post_id=post_id)
 
+    async def bulk_tag(
+        self,
+        current_user: AuthUser,
+        posts_ids: List[UUID],
+        tags_ids: List[UUID],
+    ) -> PostsTagsResult:
+        """Attaches tags to posts. Every tag is attached to every
+        post of its blog, tags already attached are skipped
+        Args:
+            current_user (AuthUser): current user object
+            posts_ids (List[UUID]): ids of posts to be tagged
+            tags_ids (List[UUID]): ids of tags to attach
+        Raises:
+            ListException: raised if any post or tag is invalid
+            EntityUpdateFail: raised if tags were not attached
+        Returns:
+            PostsTagsResult: count of created post tags
+        """
+        posts_ids, tags_ids = await self.validate_bulk_tags(
+            current_user=current_user,
+            posts_ids=posts_ids,
+            tags_ids=tags_ids,
+            check_blogs=True,
+        )
+        try:
+            result = await self.db_session.exec(add_posts_tags_query(posts_ids=posts_ids, tags_ids=tags_ids))
+            self.related_service.mark_posts(posts_ids)
+            await self.db_session.commit()
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
+            raise EntityUpdateFail(entity_id=posts_ids, entity_name="posts")
+
+        return PostsTagsResult(posts_ids=posts_ids, tags_ids=tags_ids, changed=result.rowcount)
+
+    async def bulk_untag(
+        self,
+        current_user: AuthUser,
+        posts_ids: List[UUID],
+        tags_ids: List[UUID],
+    ) -> PostsTagsResult:
+        """Detaches tags from posts
+        Args:
+            current_user (AuthUser): current user object
+            posts_ids (List[UUID]): ids of posts to be untagged
+            tags_ids (List[UUID]): ids of tags to detach
+        Raises:
+            ListException: raised if any post or tag is invalid
+            EntityUpdateFail: raised if tags were not detached
+        Returns:
+            PostsTagsResult: count of removed post tags
+        """
+        posts_ids, tags_ids = await self.validate_bulk_tags(
+            current_user=current_user,
+            posts_ids=posts_ids,
+            tags_ids=tags_ids,
+            check_blogs=False,
+        )
+        try:
+            result = await self.db_session.exec(remove_posts_tags_query(posts_ids=posts_ids, tags_ids=tags_ids))
+            self.related_service.mark_posts(posts_ids)
+            await self.db_session.commit()
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
+            raise EntityUpdateFail(entity_id=posts_ids, entity_name="posts")
+
+        return PostsTagsResult(posts_ids=posts_ids, tags_ids=tags_ids, changed=result.rowcount)
+
+    async def validate_bulk_tags(
+        self,
+        current_user: AuthUser,
+        posts_ids: List[UUID],
+        tags_ids: List[UUID],
+        check_blogs: bool,
+    ) -> Tuple[List[UUID], List[UUID]]:
+        """Checks with two queries that all posts and tags exist, user
+        is an author of posts blogs/ admin and optionally that tags belong
+        to blogs of the posts they are attached to
+        Raises:
+            BatchLimitSurpassed: raised if too many ids were submitted
+            ListException: raised with an error for every invalid item
+        Returns:
+            Tuple[List[UUID], List[UUID]]: unique posts and tags ids
+        """
+        posts_ids = get_batch_ids(posts_ids)
+        tags_ids = get_batch_ids(tags_ids)
+        user_id = UUID(str(current_user["user_id"]))
+        is_admin = current_user["user_type"] == UserType.admin
+
+        posts_result = await self.db_session.exec(get_posts_permissions_query(posts_ids=posts_ids, user_id=user_id))
+        posts = {post.id: post for post in posts_result.fetchall()}
+        tags_result = await self.db_session.exec(get_tags_blogs_query(tag_ids=tags_ids))
+        tags_blogs = {tag.id: tag.blog_id for tag in tags_result.fetchall()}
+
+        errors = []
+        # Check posts and permissions, once per blog
+        forbidden_blogs = set()
+        for post_id in posts_ids:
+            post = posts.get(post_id)
+            if post is None:
+                errors.append(PostNotFound(post_id=post_id))
+            elif not post.is_author and not is_admin and post.blog_id not in forbidden_blogs:
+                forbidden_blogs.add(post.blog_id)
+                errors.append(AuthorStatusRequired(operation="posts tagging", user_id=user_id, blog_id=post.blog_id))
+
+        # Check tags, tag has to belong to blog of at least one post
+        posts_blogs = {post.blog_id for post in posts.values()}
+        for tag_id in tags_ids:
+            if tag_id not in tags_blogs:
+                errors.append(TagNotFound(tag_id=tag_id))
+            elif check_blogs and tags_blogs[tag_id] not in posts_blogs:
+                for blog_id in posts_blogs:
+                    errors.append(TagNotThisBlog(tag_id=tag_id, blog_id=blog_id))
+
+        if errors:
+            raise ListException(detail=errors)
+
+        return posts_ids, tags_ids
+
     async def like(
         self,
         post_id: UUID,
@@ -285,9 +550,13 @@ class PostService:
 
         # Try to save in the db
         try:
+            await self.trending_service.add_score(PostTrending, post_id)
+            self.related_service.mark_posts([post_id])
             await self.db_session.commit()
             await self.db_session.refresh(post)
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityUpdateFail(entity_id=post_id, entity_name="post")
 
         return await self.get(post_id=post_id)
@@ -305,14 +574,25 @@ class PostService:
         if str(current_user["user_id"]) not in post_likers_ids:
             raise PostNotLiked(post_id=post_id, user_id=current_user["user_id"])
 
+        # Withdraw like from trending score, it needs the like date
+        liked_at = (
+            select(PostLikers.date_created)
+            .where(PostLikers.post_id == post_id, PostLikers.liker_id == current_user["user_id"])
+            .scalar_subquery()
+        )
+        await self.trending_service.remove_score(PostTrending, post_id, event_date=liked_at)
+
         # Unlike post
         post.likers = [liker for liker in post.likers if str(liker.id) != str(current_user["user_id"])]
 
         # Try to save in the db
         try:
+            self.related_service.mark_posts([post_id])
             await self.db_session.commit()
             await self.db_session.refresh(post)
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityUpdateFail(entity_id=post_id, entity_name="post")
 
         return await self.get(post_id=post_id)
@@ -338,7 +618,9 @@ class PostService:
         try:
             await self.db_session.commit()
             await self.db_session.refresh(post)
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityUpdateFail(entity_id=post_id, entity_name="post")
 
         return await self.get(post_id=post_id)
@@ -363,7 +645,9 @@ class PostService:
         try:
             await self.db_session.commit()
             await self.db_session.refresh(post)
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityUpdateFail(entity_id=post_id, entity_name="post")
 
         return await self.get(post_id=post_id)
@@ -376,15 +660,15 @@ class PostService:
     ) -> Union[List[ShortPostRead], int]:
         user_id = current_user["user_id"] 
         # Create query
-        q_pag, q_all = get_listed_user_posts_query(
+        q_pag, q_all, params = get_listed_user_posts_query(
             user_id=user_id,
             liked=liked,
             offset=offset,
         )
         
         # Execute queries with and without limit
-        post_results = await self.db_session.exec(q_pag)
-        all_result = await self.db_session.exec(q_all)
+        post_results = await self.db_session.exec(q_pag, params=params)
+        all_result = await self.db_session.exec(q_all, params=params)
         posts = post_results.fetchall()
         total = all_result.fetchall()
         
@@ -394,15 +678,93 @@ class PostService:
                 ShortPostRead(
                     id=post.id,
                     title=post.title,
-                    body=post.body[:31].strip() + "...",
-                    blog_id=post.blog.id,
-                    blog_name=post.blog.name,
+                    excerpt=post.excerpt,
+                    word_count=post.word_count,
+                    reading_time=post.reading_time,
+                    blog_id=post.blog_id,
+                    blog_name=post.blog_name,
                     date_created=post.date_created,
                 )
             )
 
         return data, len(total)
 
+    async def export(
+        self,
+        current_user: AuthUser,
+        export_format: ExportFormat = ExportFormat.ndjson,
+        blog_id: Optional[UUID] = None,
+        author_id: Optional[UUID] = None,
+    ) -> AsyncIterator[str]:
+        """Exports posts with their tags and authors. Permissions are
+        checked before anything is streamed, rows are then read
+        from the server side cursor in partitions.
+        Args:
+            current_user (AuthUser): current user object
+            export_format (ExportFormat): ndjson or csv
+            blog_id (UUID): export posts of the blog only
+            author_id (UUID): export posts of the author only
+        Raises:
+            AdminStatusRequired: raised if non admin exports all posts
+            AdminOrAuthorRequired: raised if user exports posts of other author
+            NotYourBlog: raised if user is not an author of exported blog/ admin
+        Returns:
+            AsyncIterator[str]: chunks of serialized posts
+        """
+        # Check permissions
+        is_admin = current_user["user_type"] == UserType.admin
+        if not blog_id and not author_id and not is_admin:
+            raise AdminStatusRequired(operation="posts export")
+        if blog_id:
+            await self.blog_service.check_blog_permissions(
+                blog_id=blog_id,
+                current_user=current_user,
+                operation="posts export",
+            )
+        if author_id and str(author_id) != current_user["user_id"] and not is_admin:
+            raise AdminOrAuthorRequired(operation="posts export", entity="posts")
+
+        # Open server side cursor
+        q = get_export_posts_query(blog_id=blog_id, author_id=author_id)
+        partition_size = settings.EXPORT_PARTITION_SIZE
+        result = await self.db_session.stream(
+            q,
+            execution_options={"yield_per": partition_size},
+        )
+        return stream_export(
+            result=result,
+            export_format=export_format,
+            partition_size=partition_size,
+        )
+
+    async def events(
+        self,
+        current_user: AuthUser,
+        last_event_id: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """Streams events of posts published or updated in blogs and tags
+        subscribed by the user. Subscriptions are read when the stream starts,
+        events are pushed by the broker of the worker, see PostEventBroker.
+        Args:
+            current_user (AuthUser): current user object
+            last_event_id (Optional[int], optional): id of the last event received
+            by the client, stream resumes after it. Defaults to None.
+        Returns:
+            AsyncIterator[str]: server-sent events
+        """
+        result = await self.db_session.execute(get_user_subscriptions_query(user_id=current_user["user_id"]))
+        subscriptions = result.one()
+        # Connection is not held for the life of the stream
+        await self.db_session.close()
+        return stream_events(
+            broker=post_event_broker,
+            blogs_ids=subscriptions.blogs_ids or [],
+            tags_ids=subscriptions.tags_ids or [],
+            last_event_id=last_event_id,
+            heartbeat=settings.SSE_HEARTBEAT_INTERVAL,
+            retry=settings.SSE_RETRY,
+        )
+
     async def delete(
         self,
         post_id: UUID,
@@ -422,9 +784,22 @@ class PostService:
         try:
             self.db_session.delete(post)
             await self.db_session.commit()
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityDeleteFail(entity_id=post_id, entity_name="post")
 
+    @staticmethod
+    def get_reading_metadata(body: str) -> Dict[str, Union[str, int]]:
+        """Excerpt, word count and reading time stored with the body,
+        so listings never have to read the body itself
+        """
+        return reading_metadata(
+            body=body,
+            excerpt_length=settings.POST_EXCERPT_LENGTH,
+            words_per_minute=settings.POST_WORDS_PER_MINUTE,
+        )
+
     async def validate(
         self,
         blog_id: UUID,
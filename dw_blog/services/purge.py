@@ -0,0 +1,184 @@
+import asyncio
+import logging
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import Depends
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from dw_blog.config import Settings
+from dw_blog.db.db import get_session
+from dw_blog.exceptions.common import AdminStatusRequired
+from dw_blog.exceptions.purge import PurgeNotFound
+from dw_blog.models.purge import Purge
+from dw_blog.queries.image import count_content_references_query, lock_content_query
+from dw_blog.queries.purge import (PURGE_STEPS, claim_purge_query, finish_purge_query,
+                                   get_purge_chunk_query, update_purge_progress_query)
+from dw_blog.schemas.auth import AuthUser
+from dw_blog.schemas.common import UserType
+from dw_blog.schemas.job import JobType
+from dw_blog.schemas.purge import PurgeEntity, PurgeRead, PurgeStatus
+from dw_blog.services.job import JobService, job_handler
+from dw_blog.utils.storage import remove_content
+
+settings = Settings()
+logger = logging.getLogger(__name__)
+
+
+class PurgeService:
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    def create(
+        self,
+        entity: PurgeEntity,
+        entity_id: UUID,
+        current_user: AuthUser,
+    ) -> Purge:
+        """Adds purge of the deleted entity with its job to the session, so that
+        they are committed together with the deletion. Caller is responsible for the commit.
+        Args:
+            entity (PurgeEntity): type of the deleted entity
+            entity_id (UUID): id of the deleted entity
+            current_user (AuthUser): user who deleted the entity
+        Returns:
+            Purge: pending purge
+        """
+        purge = Purge(entity=entity, entity_id=entity_id, requested_by=current_user["user_id"])
+        self.db_session.add(purge)
+        JobService(self.db_session).enqueue(job_type=JobType.purge, payload={"purge_id": str(purge.id)})
+        return purge
+
+    @staticmethod
+    def to_purge_read(purge: Purge) -> PurgeRead:
+        """Builds purge status with its progress through the steps"""
+        steps = PURGE_STEPS[purge.entity]
+        return PurgeRead(
+            id=purge.id,
+            entity=purge.entity,
+            entity_id=purge.entity_id,
+            status=purge.status,
+            current_table=steps[purge.step].table.name if purge.step < len(steps) else None,
+            steps_done=purge.step,
+            steps_total=len(steps),
+            rows_deleted=purge.rows_deleted,
+            error=purge.error,
+            date_created=purge.date_created,
+            date_modified=purge.date_modified,
+            date_finished=purge.date_finished,
+        )
+
+    async def get(
+        self,
+        purge_id: UUID,
+        current_user: AuthUser,
+    ) -> PurgeRead:
+        """Get status of the purge
+        Args:
+            purge_id (UUID): id of the purge
+            current_user (AuthUser): current user object
+        Raises:
+            PurgeNotFound: raised if purge does not exist
+            AdminStatusRequired: raised if purge was requested by other user
+            and current user is not an admin
+        Returns:
+            PurgeRead: status and progress of the purge
+        """
+        if not (purge := await self.db_session.get(Purge, purge_id)):
+            raise PurgeNotFound(purge_id=purge_id)
+        if str(purge.requested_by) != str(current_user["user_id"]) and current_user["user_type"] != UserType.admin:
+            raise AdminStatusRequired(operation="purge status read")
+        return self.to_purge_read(purge)
+
+    async def claim(self, purge_id: UUID) -> Optional[Purge]:
+        """Marks purge as running
+        Args:
+            purge_id (UUID): id of the purge
+        Returns:
+            Optional[Purge]: claimed purge, None if it is already done
+        """
+        result = await self.db_session.execute(claim_purge_query(purge_id=purge_id))
+        row = result.first()
+        await self.db_session.commit()
+        return Purge(**row._mapping) if row else None
+
+    async def run(
+        self,
+        purge: Purge,
+        chunk_size: int = settings.PURGE_CHUNK_SIZE,
+        throttle: float = settings.PURGE_THROTTLE,
+    ):
+        """Removes rows of the claimed purge table by table in chunks. Every
+        chunk is committed with the progress, so that locks are held only
+        for a chunk and the purge can be resumed from the last one. Files
+        of purged images are removed once no image uses them.
+        Args:
+            purge (Purge): claimed purge
+            chunk_size (int): rows removed in a single transaction
+            throttle (float): seconds to wait after every chunk which removed rows
+        """
+        steps = PURGE_STEPS[purge.entity]
+        step = purge.step
+        try:
+            while step < len(steps):
+                q, params = get_purge_chunk_query(
+                    entity=purge.entity,
+                    step=step,
+                    entity_id=purge.entity_id,
+                    chunk_size=chunk_size,
+                )
+                result = await self.db_session.execute(q, params)
+                row = result.one()
+                deleted = row.deleted
+                # Table is done when its chunk was not full
+                if deleted < chunk_size:
+                    step += 1
+                await self.db_session.execute(
+                    update_purge_progress_query(purge_id=purge.id, step=step, rows_deleted=deleted)
+                )
+                await self.db_session.commit()
+                if content_hashes := row._mapping.get("content_hashes"):
+                    await self.remove_unreferenced_content(content_hashes=content_hashes)
+                if deleted:
+                    await asyncio.sleep(throttle)
+            await self.db_session.execute(finish_purge_query(purge_id=purge.id, status=PurgeStatus.done))
+            await self.db_session.commit()
+        except Exception as exc:
+            await self.db_session.rollback()
+            await self.db_session.execute(
+                finish_purge_query(purge_id=purge.id, status=PurgeStatus.failed, error=str(exc))
+            )
+            await self.db_session.commit()
+            raise
+
+    async def remove_unreferenced_content(self, content_hashes: List[str]):
+        """Removes stored files of purged images, which no other image uses.
+        File is removed after the images are committed, under the lock
+        serialising it with uploads, so that images committed meanwhile keep it.
+        Args:
+            content_hashes (List[str]): hashes of files of purged images
+        """
+        for content_hash in content_hashes:
+            try:
+                await self.db_session.exec(lock_content_query(content_hash=content_hash))
+                result = await self.db_session.exec(count_content_references_query(content_hash=content_hash))
+                if result.one() == 0:
+                    remove_content(directory=settings.IMAGES_DIR, content_hash=content_hash)
+                await self.db_session.commit()
+            except Exception:
+                # Unreferenced file only takes space, the purge goes on
+                await self.db_session.rollback()
+                logger.exception("Removal of image content %s failed", content_hash)
+
+
+@job_handler(JobType.purge, concurrency=settings.PURGE_CONCURRENCY)
+async def run_purge(session: AsyncSession, payload: dict):
+    purge_service = PurgeService(session)
+    if purge := await purge_service.claim(purge_id=UUID(payload["purge_id"])):
+        logger.info("Purging %s %s", purge.entity.value, purge.entity_id)
+        await purge_service.run(purge)
+
+
+async def get_purge_service(session: AsyncSession = Depends(get_session)):
+    yield PurgeService(session)
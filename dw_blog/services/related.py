@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from uuid import UUID
+
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from dw_blog.config import Settings
+from dw_blog.queries.related import (create_related_blogs_staging_queries, delete_related_posts_query,
+                                     get_recommended_blogs_query, get_related_affected_posts_query,
+                                     get_related_posts_query, index_related_blogs_staging_queries,
+                                     refresh_related_blogs_query, refresh_related_posts_query,
+                                     set_related_blogs_lock_timeout_query, set_related_blogs_work_mem_query,
+                                     swap_related_blogs_queries)
+from dw_blog.schemas.blog import RecommendedBlogRead
+from dw_blog.schemas.job import JobType
+from dw_blog.schemas.post import RelatedPostRead
+from dw_blog.services.job import JobService, job_handler
+
+settings = Settings()
+
+
+class RelatedService:
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    def mark_posts(self, posts_ids: List[UUID]):
+        """Queues refresh of neighbours affected by the posts in the current
+        transaction, so that it is committed with the write. Refreshes queued
+        within the refresh interval are run together.
+        Args:
+            posts_ids (List[UUID]): posts whose tags or likers changed
+        """
+        JobService(self.db_session).enqueue(
+            job_type=JobType.related_posts,
+            payload={"posts_ids": [str(post_id) for post_id in posts_ids]},
+            run_at=datetime.utcnow() + timedelta(seconds=settings.RELATED_POSTS_REFRESH_INTERVAL),
+        )
+
+    async def refresh(self, posts_ids: Optional[List[UUID]] = None):
+        """Recomputes top-K neighbour table in the current transaction.
+        Caller is responsible for the commit.
+        Args:
+            posts_ids (Optional[List[UUID]]): posts whose tags or likers changed,
+            neighbours of every post affected by them are recomputed.
+            If not passed, all posts are refreshed.
+        """
+        if posts_ids is not None:
+            result = await self.db_session.execute(get_related_affected_posts_query(posts_ids=posts_ids))
+            posts_ids = result.scalars().all()
+            if not posts_ids:
+                return
+        await self.db_session.execute(delete_related_posts_query(posts_ids=posts_ids))
+        await self.db_session.execute(refresh_related_posts_query(
+            top_k=settings.RELATED_POSTS_TOP_K,
+            tag_weight=settings.RELATED_POSTS_TAG_WEIGHT,
+            like_weight=settings.RELATED_POSTS_LIKE_WEIGHT,
+            posts_ids=posts_ids,
+        ))
+
+    async def list(self, post_id: UUID, limit: int) -> List[RelatedPostRead]:
+        result = await self.db_session.execute(get_related_posts_query(post_id=post_id, limit=limit))
+        return [RelatedPostRead(**row._mapping) for row in result.all()]
+
+    async def refresh_blogs(self):
+        """Rebuilds top-K neighbour table of blogs in a staging table and swaps
+        it in, committing both. Recommendations read the previous table until
+        the swap, which only waits for locks up to the swap lock timeout.
+        Rebuilds must not run at once, related blogs job runs one at a time.
+        """
+        # Step 1: Build the staging table, which nothing else reads
+        for q in create_related_blogs_staging_queries():
+            await self.db_session.execute(q)
+        await self.db_session.execute(set_related_blogs_work_mem_query(work_mem=settings.RELATED_BLOGS_WORK_MEM))
+        await self.db_session.execute(refresh_related_blogs_query(
+            top_k=settings.RELATED_BLOGS_TOP_K,
+            like_weight=settings.RELATED_BLOGS_LIKE_WEIGHT,
+            subscribe_weight=settings.RELATED_BLOGS_SUBSCRIBE_WEIGHT,
+            user_interactions_max=settings.RELATED_BLOGS_USER_INTERACTIONS_MAX,
+        ))
+        for q in index_related_blogs_staging_queries():
+            await self.db_session.execute(q)
+        await self.db_session.commit()
+
+        # Step 2: Swap the tables in a short transaction
+        await self.db_session.execute(
+            set_related_blogs_lock_timeout_query(lock_timeout=settings.RELATED_BLOGS_SWAP_LOCK_TIMEOUT)
+        )
+        for q in swap_related_blogs_queries():
+            await self.db_session.execute(q)
+        await self.db_session.commit()
+
+    async def recommend_blogs(self, user_id: UUID, limit: int) -> List[RecommendedBlogRead]:
+        result = await self.db_session.execute(get_recommended_blogs_query(
+            user_id=user_id,
+            like_weight=settings.RELATED_BLOGS_LIKE_WEIGHT,
+            subscribe_weight=settings.RELATED_BLOGS_SUBSCRIBE_WEIGHT,
+            user_interactions_max=settings.RELATED_BLOGS_USER_INTERACTIONS_MAX,
+            limit=limit,
+        ))
+        return [RecommendedBlogRead(**row._mapping) for row in result.all()]
+
+
+@job_handler(JobType.related_posts, every=settings.RELATED_POSTS_FULL_REFRESH_INTERVAL)
+async def refresh_related_posts(session: AsyncSession, payload: dict):
+    """Recomputes neighbours affected by the posts marked by writes, queued
+    refreshes are run together with the job. Periodic job refreshes all posts.
+    """
+    payloads = [payload, *await JobService(session).take_queued(job_type=JobType.related_posts)]
+    posts_ids = None
+    if all("posts_ids" in payload for payload in payloads):
+        posts_ids = list({UUID(post_id) for payload in payloads for post_id in payload["posts_ids"]})
+    await RelatedService(session).refresh(posts_ids=posts_ids)
+    await session.commit()
+
+
+@job_handler(JobType.related_blogs, every=settings.RELATED_BLOGS_REFRESH_INTERVAL)
+async def refresh_related_blogs(session: AsyncSession, payload: dict):
+    """Rebuilds neighbour table of blogs as a batch, likes and subscriptions
+    show up in recommendations after the next rebuild
+    """
+    await RelatedService(session).refresh_blogs()
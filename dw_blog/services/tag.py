@@ -1,23 +1,35 @@
 from datetime import datetime
 from uuid import UUID
-from typing import Optional, Union, List
+from typing import Dict, Optional, Tuple, Union, List
 
 from fastapi import Depends
 from sqlmodel import Session, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
 
 from dw_blog.db.db import get_session
 from dw_blog.exceptions.tag import TagNotFound, TagAlreadySubscribed, TagNotYetSubscribed
 from dw_blog.exceptions.user import UserNotFound
-from dw_blog.exceptions.common import EntityUpdateFail, EntityDeleteFail, EntityFailedAdd, PaginationLimitSurpassed
+from dw_blog.exceptions.common import (
+    EntityDeleteFail,
+    EntityFailedAdd,
+    EntityUpdateFail,
+    EntityVersionConflict,
+    PaginationLimitSurpassed,
+)
 from dw_blog.schemas.auth import AuthUser
 from dw_blog.models.tag import Tag
+from dw_blog.schemas.purge import PurgeEntity, PurgeRead
 from dw_blog.schemas.tag import TagRead, TagReadList, SortTagBy
 from dw_blog.models.user import User
 from dw_blog.services.blog import BlogService
-from dw_blog.queries.tag import get_single_tag_query, get_listed_tags_query, tag_subscription_query
+from dw_blog.services.purge import PurgeService
+from dw_blog.queries.tag import get_batch_tags_query, get_single_tag_query, get_listed_tags_query, tag_subscription_query
 from dw_blog.schemas.common import SortOrder
+from dw_blog.utils.batch import get_batch_ids
+from dw_blog.utils.fields import get_fields
+from dw_blog.utils.deadline import is_deadline_error
 
 
 class TagService:
@@ -60,7 +72,9 @@ class TagService:
             self.db_session.add(tag)
             await self.db_session.commit()
             await self.db_session.refresh(tag)
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityFailedAdd(entity_name="tag")
 
         return await self.get(tag_id=tag.id)
@@ -74,6 +88,7 @@ class TagService:
         tag_name: Optional[str] = None,
         sort_order: SortOrder = SortOrder.ascending,
         sort_by: SortTagBy = SortTagBy.most_subscribers,
+        fields: Optional[str] = None,
     ) -> Union[List[TagReadList], int]:
         """Get tags based on it's id
         Args:
@@ -84,8 +99,10 @@ class TagService:
             tag_name (Optional[str], optional): Name of the tag. Defaults to None.
             sort_order [SortOrder]: order of sorting retrieved records. Defaults to ascending.
             sort_by [SortTagBy]: prop to sort records by. Defaults to most_subscribers.
+            fields (Optional[str], optional): comma separated fields to be read. Defaults to all.
         Raises:
             PaginationLimitSurpassed: raised if limit was suprassed
+            FieldsNotAllowed: raised if any field is not a field of TagReadList
         Returns:
             Union[List[TagReadList], int]: List of tags data and total count of tags
         """
@@ -93,7 +110,7 @@ class TagService:
         if limit > 20:
             raise PaginationLimitSurpassed()
         # Create query
-        q_pag, q_all = get_listed_tags_query(
+        q_pag, q_all, params = get_listed_tags_query(
             limit=limit,
             offset=offset,
             user_id=user_id,
@@ -101,11 +118,12 @@ class TagService:
             tag_name=tag_name,
             sort_order=sort_order,
             sort_by=sort_by,
+            fields=get_fields(fields, TagReadList),
         )
 
-        # Execute queries with and without limit
-        tags_result = await self.db_session.exec(q_pag)
-        all_result = await self.db_session.exec(q_all)
+        # Execute queries with and without limit, for rows also when only id is selected
+        tags_result = await self.db_session.execute(q_pag, params=params)
+        all_result = await self.db_session.execute(q_all, params=params)
         tags = tags_result.fetchall()
         total = all_result.fetchall()
 
@@ -135,6 +153,24 @@ class TagService:
 
         return tag
 
+    async def batch_get(
+        self,
+        tag_ids: List[UUID],
+    ) -> Tuple[Dict[UUID, TagRead], List[UUID]]:
+        """Get multiple tags with single query
+        Args:
+            tag_ids (List[UUID]): ids of tags to be read
+        Raises:
+            BatchLimitSurpassed: raised if too many ids were requested
+        Returns:
+            Tuple[Dict[UUID, TagRead], List[UUID]]: tags by id and ids of not existing tags
+        """
+        tag_ids = get_batch_ids(tag_ids)
+        result = await self.db_session.exec(get_batch_tags_query(tag_ids=tag_ids))
+        tags = {tag.id: tag for tag in result.fetchall()}
+        missing = [tag_id for tag_id in tag_ids if tag_id not in tags]
+        return tags, missing
+
     async def bulk_get(self, tag_ids: List[UUID]) -> List[Tag]:
         """Get multiple tags based on their ids
         Args:
@@ -145,7 +181,7 @@ class TagService:
         Returns:
             List[Tag]: List of tag data
         """
-        q = select(Tag).where(Tag.id.in_(tag_ids))
+        q = select(Tag).where(Tag.id.in_(tag_ids), Tag.date_deleted.is_(None))
         result = await self.db_session.exec(q)
         tags = result.fetchall()
         if len(tags) != len(tag_ids):
@@ -173,7 +209,11 @@ class TagService:
             TagRead: tag data
         """
         # Try to get the tag
-        q = (select(Tag).options(selectinload(Tag.subscribers)).where(Tag.id == tag_id))
+        q = (
+            select(Tag)
+            .options(selectinload(Tag.subscribers))
+            .where(Tag.id == tag_id, Tag.date_deleted.is_(None))
+        )
         sub_tag_results = await self.db_session.exec(q)
         if not (sub_tag := sub_tag_results.first()):
             raise TagNotFound(tag_id=tag_id)
@@ -192,7 +232,9 @@ class TagService:
             sub_tag.subscribers.append(adding_user)
             self.db_session.add(sub_tag)
             await self.db_session.commit()
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityUpdateFail(entity_id=tag_id, entity_name="tag")
 
         return await self.get(tag_id=tag_id)
@@ -229,7 +271,9 @@ class TagService:
         try:
             await self.db_session.delete(sub_tag)
             await self.db_session.commit()
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityUpdateFail(entity_id=tag_id, entity_name="tag")
         return await self.get(tag_id=tag_id)
 
@@ -238,32 +282,45 @@ class TagService:
         tag_id: UUID,
         current_user: AuthUser,
         name: str,
+        version: Optional[int] = None,
     ) -> TagRead:
         """Updates tag data
         Args:
             tag_id (UUID): id of blog to be updated
             current_user (AuthUser): current user object
             name (str): new tag name
+            version (Optional[int], optional): version of the tag the update
+            is based on. Defaults to None, update of any version.
         Raises:
+            EntityVersionConflict: raised if tag was modified since
+            the given version was read
             EntityUpdateFail: raised if tag update failed
         Returns:
             TagRead: Read tag
         """
-        if not (update_tag := await self.db_session.get(Tag, tag_id)):
+        update_tag = await self.db_session.get(Tag, tag_id)
+        if not update_tag or update_tag.date_deleted:
             raise TagNotFound(tag_id=tag_id)
         await self.blog_service.check_blog_permissions(
             blog_id=update_tag.blog_id,
             current_user=current_user,
             operation="tag update",
         )
+        if version is not None and version != update_tag.version:
+            raise EntityVersionConflict(entity_id=tag_id, entity_name="tag")
 
         # Update blog name
         if name:
             update_tag.name = name
+        update_tag.date_modified = datetime.now()
         try:
             self.db_session.add(update_tag)
             await self.db_session.commit()
-        except Exception:
+        except StaleDataError:
+            raise EntityVersionConflict(entity_id=tag_id, entity_name="tag")
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityUpdateFail(entity_id=tag_id, entity_name="tag")
 
         return await self.get(tag_id=tag_id)
@@ -272,16 +329,21 @@ class TagService:
         self,
         tag_id: UUID,
         current_user: AuthUser,
-    ) -> None:
-        """Deletes tag based on its id and
-        user permissions
+    ) -> PurgeRead:
+        """Marks tag as deleted based on its id and
+        user permissions, its posts links and subscriptions
+        are removed by the background purge
         Args:
             tag_id (UUID): tag id
             current_user (AuthUser): current user object
         Raises:
+            TagNotFound: raised if tag does not exist
             EntityDeleteFail: raised if failed to delete tag
+        Returns:
+            PurgeRead: enqueued purge of the tag
         """
-        if not (delete_tag := await self.db_session.get(Tag, tag_id)):
+        delete_tag = await self.db_session.get(Tag, tag_id)
+        if not delete_tag or delete_tag.date_deleted:
             raise TagNotFound(tag_id=tag_id)
         await self.blog_service.check_blog_permissions(
             blog_id=delete_tag.blog_id,
@@ -289,12 +351,19 @@ class TagService:
             operation="tag delete",
         )
 
-        # Delete blog
+        # Delete tag
+        purge_service = PurgeService(self.db_session)
         try:
-            self.db_session.delete(delete_tag)
-            self.db_session.commit()
-        except Exception:
+            delete_tag.date_deleted = datetime.utcnow()
+            self.db_session.add(delete_tag)
+            purge = purge_service.create(entity=PurgeEntity.tag, entity_id=tag_id, current_user=current_user)
+            await self.db_session.commit()
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise EntityDeleteFail(entity_id=tag_id, entity_name="tag")
+        return purge_service.to_purge_read(purge)
+
 
 async def get_tag_service(session: AsyncSession = Depends(get_session)):
     yield TagService(session)
@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import Optional, Union
+from uuid import UUID
+
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from dw_blog.config import Settings
+from dw_blog.models.trending import BlogTrending, PostTrending
+from dw_blog.queries.trending import (TrendingModel,
+                                      add_missing_trending_scores_query,
+                                      add_trending_score_query,
+                                      remove_trending_score_query,
+                                      renormalise_trending_scores_query,
+                                      reset_decayed_trending_scores_query)
+from dw_blog.schemas.job import JobType
+from dw_blog.services.job import job_handler
+
+settings = Settings()
+
+
+class TrendingService:
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+        self.half_life = settings.TRENDING_HALF_LIFE * 3600
+
+    async def add_score(
+        self,
+        model: TrendingModel,
+        entity_id: UUID,
+        event_date: Optional[datetime] = None,
+    ):
+        """Adds like/subscription to the trending score of post or blog
+        in the current transaction.
+        Args:
+            model (TrendingModel): PostTrending or BlogTrending
+            entity_id (UUID): id of the post or blog
+            event_date (Optional[datetime]): when the event happened. Defaults to now.
+        """
+        q = add_trending_score_query(
+            model=model,
+            entity_id=entity_id,
+            half_life=self.half_life,
+            event_date=event_date,
+        )
+        await self.db_session.exec(q)
+
+    async def remove_score(
+        self,
+        model: TrendingModel,
+        entity_id: UUID,
+        event_date: Union[datetime, ColumnElement],
+    ):
+        """Removes withdrawn like/subscription from the trending score
+        of post or blog in the current transaction.
+        Args:
+            model (TrendingModel): PostTrending or BlogTrending
+            entity_id (UUID): id of the post or blog
+            event_date (Union[datetime, ColumnElement]): when withdrawn event happened
+        """
+        q = remove_trending_score_query(
+            model=model,
+            entity_id=entity_id,
+            half_life=self.half_life,
+            event_date=event_date,
+        )
+        await self.db_session.exec(q)
+
+    async def renormalise(self):
+        """Resets decayed scores, rebases the rest to the current time
+        and adds missing rows of posts and blogs, so that every one of them
+        is listed by trending"""
+        for model in (PostTrending, BlogTrending):
+            await self.db_session.exec(
+                reset_decayed_trending_scores_query(
+                    model=model,
+                    half_life=self.half_life,
+                    min_score=settings.TRENDING_MIN_SCORE,
+                )
+            )
+            await self.db_session.exec(renormalise_trending_scores_query(model=model, half_life=self.half_life))
+            await self.db_session.exec(add_missing_trending_scores_query(model=model))
+
+
+@job_handler(JobType.trending, every=settings.TRENDING_RENORMALISE_INTERVAL)
+async def renormalise_trending_scores(session: AsyncSession, payload: dict):
+    await TrendingService(session).renormalise()
+    await session.commit()
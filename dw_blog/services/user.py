@@ -1,7 +1,9 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from uuid import UUID
 
 from fastapi import Depends, HTTPException, status
+from sqlalchemy import any_, bindparam
 from sqlmodel import Session, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
@@ -10,8 +12,13 @@ from dw_blog.exceptions.user import UserNotFound
 from dw_blog.schemas.auth import AuthUser
 from dw_blog.schemas.common import UserType
 from dw_blog.models.user import User
+from dw_blog.schemas.purge import PurgeEntity, PurgeRead
 from dw_blog.schemas.user import UserRead
+from dw_blog.queries.common import UUID_ARRAY
+from dw_blog.services.purge import PurgeService
 from dw_blog.utils.auth import check_user, get_password_hash
+from dw_blog.utils.batch import get_batch_ids
+from dw_blog.utils.deadline import is_deadline_error
 
 
 class UserService:
@@ -41,6 +48,8 @@ class UserService:
             await self.db_session.commit()
             await self.db_session.refresh(user)
         except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Failed to add user!")
         return user
 
@@ -49,7 +58,7 @@ class UserService:
         user_id: Optional[UUID] = None,
         user_email: Optional[str] = None,
     ):
-        q = select(User)
+        q = select(User).where(User.date_deleted.is_(None))
         if user_id:
             err_msg = f"User with id {user_id} not found"
             q = q.where(User.id == user_id)
@@ -65,8 +74,30 @@ class UserService:
 
         return user
 
+    async def batch_get(
+        self,
+        user_ids: List[UUID],
+    ) -> Tuple[Dict[UUID, User], List[UUID]]:
+        """Get multiple users with single query
+        Args:
+            user_ids (List[UUID]): ids of users to be read
+        Raises:
+            BatchLimitSurpassed: raised if too many ids were requested
+        Returns:
+            Tuple[Dict[UUID, User], List[UUID]]: users by id and ids of not existing users
+        """
+        user_ids = get_batch_ids(user_ids)
+        q = select(User).where(
+            User.id == any_(bindparam("user_ids", user_ids, type_=UUID_ARRAY)),
+            User.date_deleted.is_(None),
+        )
+        result = await self.db_session.exec(q)
+        users = {user.id: user for user in result.fetchall()}
+        missing = [user_id for user_id in user_ids if user_id not in users]
+        return users, missing
+
     async def bulk_get(self, user_ids: List[UUID]) -> User:
-        q = select(User).where(User.id.in_(user_ids))
+        q = select(User).where(User.id.in_(user_ids), User.date_deleted.is_(None))
         result = await self.db_session.exec(q)
         users = result.fetchall()
         if len(users) != len(user_ids):
@@ -79,7 +110,7 @@ class UserService:
         nickname: Optional[str] = None,
         user_type: Optional[UserType] = None,
     ) -> List[UserRead]:
-        q = select(User)
+        q = select(User).where(User.date_deleted.is_(None))
         if users_ids:
             q = q.where(User.id.in_(users_ids))
         if nickname:
@@ -146,7 +177,9 @@ class UserService:
         try:
             self.db_session.add(user)
             await self.db_session.commit()
-        except Exception:
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Failed to update user!",
@@ -158,24 +191,41 @@ class UserService:
         self,
         user_id: UUID,
         current_user: AuthUser,
-    ):
+    ) -> PurgeRead:
+        """Marks user as deleted, their comments, likes, subscriptions
+        and authorships are removed by the background purge
+        Args:
+            user_id (UUID): user id
+            current_user (AuthUser): current user object
+        Raises:
+            UserNotFound: raised if user does not exist
+            HTTPException: raised if failed to delete user
+        Returns:
+            PurgeRead: enqueued purge of the user
+        """
         # Check if user exists
         user = await self.get(user_id=user_id)
         # Chek user permissions
         check_user(
             user_id=str(user_id),
             current_user_id=str(current_user["user_id"]),
-            user_type=user.user_type,
+            user_type=current_user["user_type"],
         )
 
+        purge_service = PurgeService(self.db_session)
         try:
-            self.db_session.delete(user)
-            self.db_session.commit()
-        except Exception:
+            user.date_deleted = datetime.utcnow()
+            self.db_session.add(user)
+            purge = purge_service.create(entity=PurgeEntity.user, entity_id=user_id, current_user=current_user)
+            await self.db_session.commit()
+        except Exception as exc:
+            if is_deadline_error(exc):
+                raise
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Failed to delete user!",
             )
+        return purge_service.to_purge_read(purge)
 
 
 async def get_user_service(session: AsyncSession = Depends(get_session)):
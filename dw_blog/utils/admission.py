@@ -0,0 +1,152 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import QueryParams
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from dw_blog.exceptions.common import ServiceOverloaded
+from dw_blog.schemas.admission import RouteClass
+
+# Always admitted, so that health checks and metrics answer under overload
+# and event streams, which hold no database connection, are not counted
+EXEMPT_PATHS = frozenset({"/", "/health", "/admission/metrics", "/posts/events"})
+# Query parameters of pattern searches, which scan far more rows than other reads
+SEARCH_PARAMS = frozenset({"title_search", "body_search", "blog_name", "category_name", "tag_name", "nickname"})
+# Streamed exports hold their slot for the whole stream, so they don't take slots of searches
+EXPORT_PATHS = frozenset({"/posts/export"})
+
+
+class AdmissionMetrics:
+    def __init__(self):
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.waited += 1
+        self.wait_seconds += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+class AdmissionLimiter:
+    """Admits at most `limit` requests at once. Further requests wait
+    in a queue of at most `queue_size`, in arrival order, for at most
+    `timeout` seconds. Requests which can't be queued or time out
+    are shed, instead of waiting for a database connection.
+    """
+
+    def __init__(self, limit: int, queue_size: int, timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.running = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.metrics = AdmissionMetrics()
+
+    async def acquire(self) -> bool:
+        """Waits for a free slot
+        Returns:
+            bool: whether the request was admitted, admitted request has to release its slot
+        """
+        if self.running < self.limit and not self.waiters:
+            self.running += 1
+            self.metrics.admitted += 1
+            return True
+        if len(self.waiters) >= self.queue_size:
+            self.metrics.shed_queue_full += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            self.metrics.shed_timeout += 1
+            return False
+        except asyncio.CancelledError:
+            # Slot might have been handed over just before the client went away
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+        self.metrics.admitted += 1
+        self.metrics.record_wait(time.monotonic() - started)
+        return True
+
+    def release(self):
+        # Slot is handed over to the first waiter, so it can't be taken by a newcomer
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.running -= 1
+
+
+class AdmissionController:
+    """Limits requests per class of routes, so that slow searches or
+    a burst of writes don't take every connection of the pool
+    """
+
+    def __init__(self, limiters: Dict[RouteClass, AdmissionLimiter], retry_after: int):
+        self.limiters = limiters
+        self.retry_after = retry_after
+
+    @staticmethod
+    def classify(method: str, path: str, query_params: QueryParams) -> Optional[RouteClass]:
+        """Route class of the request, None if it is exempt from admission control"""
+        path = path.rstrip("/") or "/"
+        if path in EXEMPT_PATHS:
+            return None
+        if path.startswith("/auth"):
+            return RouteClass.auth
+        if method not in ("GET", "HEAD"):
+            return RouteClass.write
+        if path in EXPORT_PATHS:
+            return RouteClass.export
+        if not SEARCH_PARAMS.isdisjoint(query_params.keys()):
+            return RouteClass.search
+        return RouteClass.read
+
+
+class AdmissionMiddleware:
+    """Admits HTTP requests through the limiter of their route class,
+    shed requests get 503 with Retry-After. Slot is held until the
+    response is sent, as streamed responses keep reading the database.
+    """
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        route_class = self.controller.classify(
+            method=scope["method"],
+            path=scope["path"],
+            query_params=QueryParams(scope["query_string"]),
+        )
+        limiter = self.controller.limiters.get(route_class)
+        if limiter is None:
+            return await self.app(scope, receive, send)
+
+        if not await limiter.acquire():
+            exc = ServiceOverloaded(retry_after=self.controller.retry_after)
+            response = JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers=exc.headers)
+            return await response(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
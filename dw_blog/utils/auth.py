@@ -5,8 +5,12 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from dw_blog.config import Settings
+from dw_blog.db.db import get_session
+from dw_blog.models.user import User
 from dw_blog.schemas.common import UserType
 
 settings = Settings()
@@ -36,7 +40,10 @@ def create_access_token(
     return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(token: str = Depends(auth_schema)):
+async def get_current_user(
+    token: str = Depends(auth_schema),
+    session: AsyncSession = Depends(get_session),
+):
     exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials!")
 
     try:
@@ -45,10 +52,17 @@ def get_current_user(token: str = Depends(auth_schema)):
         user_type = payload.get("user_type")
         if user_id is None or user_type is None:
             raise exception
-        auth_user = {"user_id": user_id, "user_type": user_type}
-        return auth_user
-    except JWTError:
+        user_uuid = UUID(user_id)
+    except (JWTError, ValueError):
+        raise exception
+
+    # Tokens of deleted users are rejected before they expire,
+    # read from the partial index of deleted users
+    deleted = await session.exec(select(User.id).where(User.id == user_uuid, User.date_deleted.is_not(None)))
+    if deleted.first() is not None:
         raise exception
+    auth_user = {"user_id": user_id, "user_type": user_type}
+    return auth_user
 
 
 def check_user(user_id: str, current_user_id: str, user_type: UserType):
@@ -0,0 +1,39 @@
+import asyncio
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Runs `execute` every `interval` seconds in the background
+    of the application. Subclasses implement `execute`.
+    """
+
+    def __init__(self, interval: int):
+        self.interval = interval
+        self.task: Optional[asyncio.Task] = None
+
+    async def execute(self):
+        raise NotImplementedError
+
+    async def run(self):
+        while True:
+            try:
+                await self.execute()
+            except Exception:
+                logger.exception("%s failed", self.__class__.__name__)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
@@ -0,0 +1,22 @@
+from typing import List
+from uuid import UUID
+
+from dw_blog.config import Settings
+from dw_blog.exceptions.common import BatchLimitSurpassed
+
+settings = Settings()
+
+
+def get_batch_ids(ids: List[UUID]) -> List[UUID]:
+    """Removes duplicated ids keeping their order
+    Args:
+        ids (List[UUID]): requested ids
+    Raises:
+        BatchLimitSurpassed: raised if there are more unique ids than allowed
+    Returns:
+        List[UUID]: unique ids
+    """
+    unique_ids = list(dict.fromkeys(ids))
+    if len(unique_ids) > settings.BATCH_LIMIT:
+        raise BatchLimitSurpassed(limit=settings.BATCH_LIMIT)
+    return unique_ids
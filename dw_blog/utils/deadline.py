@@ -0,0 +1,160 @@
+import asyncio
+import hmac
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from dw_blog.config import Settings
+from dw_blog.exceptions.common import DeadlineExceeded
+
+settings = Settings()
+
+# Lets clients ask for a shorter deadline, and internal callers (jobs, other services) for a longer one
+DEADLINE_HEADER = "X-Request-Deadline"
+# Proves the caller is internal, carries `INTERNAL_SECRET`
+INTERNAL_SECRET_HEADER = "X-Internal-Secret"
+# Status logged for requests of clients which went away, nothing is sent to them
+CLIENT_CLOSED_REQUEST = 499
+QUERY_CANCELED = "57014"
+
+Endpoint = TypeVar("Endpoint", bound=Callable)
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+
+def deadline(seconds: Optional[float]) -> Callable[[Endpoint], Endpoint]:
+    """Sets deadline of the decorated endpoint, instead of `REQUEST_DEADLINE`.
+    None disables it, e.g. for streamed responses which outlive the handler.
+    """
+    def set_deadline(endpoint: Endpoint) -> Endpoint:
+        endpoint.deadline = seconds
+        return endpoint
+    return set_deadline
+
+
+def is_internal_request(request: Request) -> bool:
+    """Whether the request carries the shared internal secret. No request
+    is internal if the secret is not set.
+    """
+    secret = request.headers.get(INTERNAL_SECRET_HEADER)
+    return bool(settings.INTERNAL_SECRET) and secret is not None and hmac.compare_digest(
+        secret.encode(), settings.INTERNAL_SECRET.encode()
+    )
+
+
+def request_deadline(request: Request, endpoint: Callable) -> Optional[Deadline]:
+    """Deadline of the endpoint, overridden by the deadline header. Internal
+    requests may extend it up to `REQUEST_DEADLINE_MAX` seconds, the others
+    only shorten it, as it also bounds the statement timeout of their queries.
+    """
+    seconds = getattr(endpoint, "deadline", settings.REQUEST_DEADLINE)
+    header = request.headers.get(DEADLINE_HEADER)
+    if header is not None:
+        try:
+            requested = float(header)
+        except ValueError:
+            requested = 0
+        if requested > 0:
+            if is_internal_request(request):
+                seconds = min(requested, settings.REQUEST_DEADLINE_MAX)
+            elif seconds is None or requested < seconds:
+                seconds = requested
+    return Deadline(seconds) if seconds is not None else None
+
+
+def set_statement_timeout(session: AsyncSession, request_deadline: Optional[Deadline]):
+    """Limits statements of every transaction of the session to the
+    time left until the deadline, so that Postgres cancels them itself
+    """
+    if request_deadline is None:
+        return
+
+    @event.listens_for(session.sync_session, "after_begin")
+    def after_begin(sync_session, transaction, connection):
+        remaining = request_deadline.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(seconds=request_deadline.seconds)
+        # SET can't take bound parameters, the value is an integer
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(int(remaining * 1000), 1)}")
+
+
+def is_query_canceled(exc: BaseException) -> bool:
+    return isinstance(exc, DBAPIError) and getattr(exc.orig, "sqlstate", None) == QUERY_CANCELED
+
+
+def is_deadline_error(exc: BaseException) -> bool:
+    """Whether the error is caused by the deadline, services re-raise
+    such errors instead of wrapping them, so that they end up as 504
+    """
+    return isinstance(exc, DeadlineExceeded) or is_query_canceled(exc)
+
+
+async def run_until_deadline(
+    handler: Callable[[Request], Awaitable[Response]],
+    request: Request,
+    request_deadline: Optional[Deadline],
+) -> Response:
+    """Runs route handler until it returns, the deadline passes or the
+    client disconnects. Handler is cancelled in the two latter cases,
+    cancelling its running query.
+    Args:
+        handler (Callable[[Request], Awaitable[Response]]): route handler
+        request (Request): request of the handler
+        request_deadline (Optional[Deadline]): deadline, None for no deadline
+    Raises:
+        DeadlineExceeded: handler didn't return or its query was cancelled by the statement timeout
+    Returns:
+        Response: response of the handler
+    """
+    request.state.deadline = request_deadline
+    # Single message is read ahead, so that the body is received only as fast as the handler reads it
+    messages: asyncio.Queue = asyncio.Queue(maxsize=1)
+    disconnected = asyncio.Event()
+
+    # Step 1: Receive messages on behalf of the handler, noting disconnect
+    async def receive_messages():
+        while True:
+            message = await request.receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            await messages.put(message)
+            if disconnected.is_set():
+                return
+
+    handler_task = asyncio.create_task(handler(Request(request.scope, receive=messages.get)))
+    receive_task = asyncio.create_task(receive_messages())
+    disconnect_task = asyncio.create_task(disconnected.wait())
+    try:
+        # Step 2: Wait for the first of response, disconnect and deadline
+        await asyncio.wait(
+            {handler_task, disconnect_task},
+            timeout=request_deadline.remaining() if request_deadline is not None else None,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+    finally:
+        receive_task.cancel()
+        disconnect_task.cancel()
+        if not handler_task.done():
+            handler_task.cancel()
+            await asyncio.gather(handler_task, return_exceptions=True)
+
+    # Step 3: Map the outcome
+    if handler_task.cancelled():
+        if disconnected.is_set():
+            return Response(status_code=CLIENT_CLOSED_REQUEST)
+        raise DeadlineExceeded(seconds=request_deadline.seconds)
+    exc = handler_task.exception()
+    if exc is not None and request_deadline is not None and is_query_canceled(exc):
+        raise DeadlineExceeded(seconds=request_deadline.seconds) from exc
+    return handler_task.result()
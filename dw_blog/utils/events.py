@@ -0,0 +1,195 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict, deque
+from typing import AsyncIterator, Deque, Dict, Iterable, Optional, Set
+from uuid import UUID
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from dw_blog.schemas.post import PostEventRead
+
+logger = logging.getLogger(__name__)
+
+# Queued instead of an event when events might have been missed
+RESET = None
+
+
+class PostEventSubscription:
+    """Events of posts of the subscribed blogs and tags, buffered until
+    they are sent. Subscription is dropped when its buffer is full.
+    """
+
+    def __init__(self, blogs_ids: Iterable[UUID], tags_ids: Iterable[UUID], buffer_size: int):
+        self.blogs_ids: Set[UUID] = set(blogs_ids)
+        self.tags_ids: Set[UUID] = set(tags_ids)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self.dropped = False
+
+    def matches(self, event: PostEventRead) -> bool:
+        return event.blog_id in self.blogs_ids or not self.tags_ids.isdisjoint(event.tags_ids)
+
+
+class PostEventBroker:
+    """Listens for post events on a single connection per worker and fans
+    them out to subscriptions, which are indexed by their blogs and tags.
+    Last events are kept for replay, so that a reconnecting client resumes
+    after its last event. Workers receive notifications in the same (commit)
+    order, so the client can resume on any of them.
+    """
+
+    def __init__(self, url: str, channel: str, buffer_size: int, replay_size: int, heartbeat: int):
+        self.dsn = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+        self.buffer_size = buffer_size
+        self.heartbeat = heartbeat
+        self.replay: Deque[PostEventRead] = deque(maxlen=replay_size)
+        self.by_blog: Dict[UUID, Set[PostEventSubscription]] = defaultdict(set)
+        self.by_tag: Dict[UUID, Set[PostEventSubscription]] = defaultdict(set)
+        self.subscriptions: Set[PostEventSubscription] = set()
+        self.task: Optional[asyncio.Task] = None
+
+    def on_notification(self, connection, pid: int, channel: str, payload: str):
+        # Payload is id of the event and its JSON, see notify_post_event_query
+        event_id, data = payload.split(":", 1)
+        self.publish(PostEventRead(id=int(event_id), **json.loads(data)))
+
+    def publish(self, event: PostEventRead):
+        self.replay.append(event)
+        subscriptions = set(self.by_blog.get(event.blog_id, ()))
+        for tag_id in event.tags_ids:
+            subscriptions.update(self.by_tag.get(tag_id, ()))
+        for subscription in subscriptions:
+            self.deliver(subscription, event)
+
+    def deliver(self, subscription: PostEventSubscription, event: Optional[PostEventRead]):
+        try:
+            subscription.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer, after reconnecting it resumes from the replayed events
+            subscription.dropped = True
+            self.unsubscribe(subscription)
+
+    def subscribe(
+        self,
+        blogs_ids: Iterable[UUID],
+        tags_ids: Iterable[UUID],
+        last_event_id: Optional[int] = None,
+    ) -> PostEventSubscription:
+        """Subscribes to events of posts of the blogs and tags
+        Args:
+            blogs_ids (Iterable[UUID]): ids of subscribed blogs
+            tags_ids (Iterable[UUID]): ids of subscribed tags
+            last_event_id (Optional[int], optional): id of the last event received by
+            the client, events after it are queued at once. If it is not among replayed
+            events, reset is queued instead. Defaults to None, only new events.
+        Returns:
+            PostEventSubscription: subscription with queue of events
+        """
+        subscription = PostEventSubscription(blogs_ids=blogs_ids, tags_ids=tags_ids, buffer_size=self.buffer_size)
+        self.subscriptions.add(subscription)
+        for blog_id in subscription.blogs_ids:
+            self.by_blog[blog_id].add(subscription)
+        for tag_id in subscription.tags_ids:
+            self.by_tag[tag_id].add(subscription)
+
+        if last_event_id is not None:
+            replayed = list(self.replay)
+            position = next((i for i, event in enumerate(replayed) if event.id == last_event_id), None)
+            if position is None:
+                self.deliver(subscription, RESET)
+            else:
+                for event in replayed[position + 1:]:
+                    if subscription.matches(event):
+                        self.deliver(subscription, event)
+        return subscription
+
+    def unsubscribe(self, subscription: PostEventSubscription):
+        self.subscriptions.discard(subscription)
+        for index, keys in ((self.by_blog, subscription.blogs_ids), (self.by_tag, subscription.tags_ids)):
+            for key in keys:
+                subscribed = index.get(key)
+                if subscribed is not None:
+                    subscribed.discard(subscription)
+                    if not subscribed:
+                        del index[key]
+
+    def reset(self):
+        """Events might have been missed, so they can't be replayed"""
+        self.replay.clear()
+        for subscription in list(self.subscriptions):
+            self.deliver(subscription, RESET)
+
+    async def listen(self):
+        connection = await asyncpg.connect(self.dsn)
+        try:
+            await connection.add_listener(self.channel, self.on_notification)
+            while True:
+                await asyncio.sleep(self.heartbeat)
+                # Detects broken connection, notifications are pushed by the server
+                await connection.execute("SELECT 1")
+        finally:
+            connection.terminate()
+
+    async def run(self):
+        while True:
+            try:
+                await self.listen()
+            except Exception:
+                logger.exception("Listening on %s failed", self.channel)
+            self.reset()
+            await asyncio.sleep(1)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
+def format_event(event: Optional[PostEventRead]) -> str:
+    if event is RESET:
+        return "event: reset\ndata: {}\n\n"
+    return f"id: {event.id}\nevent: {event.type.value}\ndata: {event.json()}\n\n"
+
+
+async def stream_events(
+    broker: PostEventBroker,
+    blogs_ids: Iterable[UUID],
+    tags_ids: Iterable[UUID],
+    last_event_id: Optional[int],
+    heartbeat: int,
+    retry: int,
+) -> AsyncIterator[str]:
+    """Subscribes to the broker and serializes events as server-sent events.
+    Comment is sent when there was no event for heartbeat seconds, so that
+    proxies keep the connection open. Stream ends when the subscription
+    is dropped, subscription ends with the stream.
+    Args:
+        broker (PostEventBroker): broker to subscribe to
+        blogs_ids (Iterable[UUID]): ids of subscribed blogs
+        tags_ids (Iterable[UUID]): ids of subscribed tags
+        last_event_id (Optional[int]): id of the last event received by the client
+        heartbeat (int): seconds between heartbeats
+        retry (int): milliseconds before client reconnects
+    """
+    subscription = broker.subscribe(blogs_ids=blogs_ids, tags_ids=tags_ids, last_event_id=last_event_id)
+    try:
+        yield f"retry: {retry}\n\n"
+        while not subscription.dropped or not subscription.queue.empty():
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
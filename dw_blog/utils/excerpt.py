@@ -0,0 +1,36 @@
+import math
+from typing import Dict, Union
+
+EXCERPT_END = "..."
+
+
+def make_excerpt(text: str, length: int) -> str:
+    """Shortens text to at most `length` characters (plus ending),
+    cutting at the end of the last whole word. Whitespace is collapsed,
+    so line breaks of the body don't end up in listings.
+    """
+    text = " ".join(text.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length + 1]
+    # Single word longer than excerpt is cut in the middle
+    if " " in cut:
+        cut = cut[:cut.rindex(" ")]
+    return cut[:length].rstrip(" ,.;:-") + EXCERPT_END
+
+
+def reading_metadata(body: str, excerpt_length: int, words_per_minute: int) -> Dict[str, Union[str, int]]:
+    """Computes values stored with the post on every write of its body
+    Args:
+        body (str): body of the post
+        excerpt_length (int): max length of the excerpt
+        words_per_minute (int): reading speed
+    Returns:
+        Dict[str, Union[str, int]]: excerpt, word_count and reading_time in minutes
+    """
+    word_count = len(body.split())
+    return {
+        "excerpt": make_excerpt(body, excerpt_length),
+        "word_count": word_count,
+        "reading_time": math.ceil(word_count / words_per_minute),
+    }
@@ -0,0 +1,52 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, List
+
+from sqlalchemy.ext.asyncio import AsyncResult
+
+from dw_blog.schemas.common import ExportFormat
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return json.dumps(value, default=str)
+    return value
+
+
+async def stream_export(
+    result: AsyncResult,
+    export_format: ExportFormat,
+    partition_size: int,
+) -> AsyncIterator[str]:
+    """Serializes rows of streamed query result to NDJSON or CSV.
+    Rows are fetched from the server side cursor one partition at a time,
+    so only a single partition is kept in memory.
+    Args:
+        result (AsyncResult): result of AsyncSession.stream
+        export_format (ExportFormat): output format
+        partition_size (int): how many rows are fetched and sent at once
+    """
+    columns: List[str] = list(result.keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    if export_format == ExportFormat.csv:
+        writer.writerow(columns)
+        yield buffer.getvalue()
+
+    async for partition in result.partitions(partition_size):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in partition:
+            if export_format == ExportFormat.csv:
+                writer.writerow([_csv_value(value) for value in row])
+            else:
+                buffer.write(json.dumps(dict(zip(columns, row)), default=str))
+                buffer.write("\n")
+        yield buffer.getvalue()
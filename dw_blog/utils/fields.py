@@ -0,0 +1,26 @@
+from typing import FrozenSet, Optional, Type
+
+from sqlmodel import SQLModel
+
+from dw_blog.exceptions.common import FieldsNotAllowed
+
+
+def get_fields(fields: Optional[str], model: Type[SQLModel]) -> FrozenSet[str]:
+    """Parses comma separated sparse fieldset of the response model.
+    Id is always returned, without fieldset all fields are returned
+    Args:
+        fields (Optional[str]): requested fields, e.g. "name,likes_count"
+        model (Type[SQLModel]): response model the fields are chosen from
+    Raises:
+        FieldsNotAllowed: raised if any field is not a field of the model
+    Returns:
+        FrozenSet[str]: requested fields, hashable so queries can be cached per fieldset
+    """
+    allowed = list(model.__fields__)
+    if not fields:
+        return frozenset(allowed)
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    if unknown := requested.difference(allowed):
+        raise FieldsNotAllowed(fields=sorted(unknown), allowed=allowed)
+    return frozenset(requested | {"id"})
@@ -0,0 +1,172 @@
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import anyio
+from fastapi import Request, Response, status
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parses single range `Range` header into inclusive byte range.
+    Returns None when whole file should be sent (no, unsupported or
+    multiple ranges, which is a valid answer for them).
+    Raises:
+        RangeNotSatisfiable: raised if range starts past the end of file
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+    spec = range_header[len("bytes="):].strip()
+    if "," in spec:
+        return None
+    start, _, end = spec.partition("-")
+    try:
+        if not start:
+            # Suffix range, last `end` bytes
+            suffix = int(end)
+            if suffix == 0:
+                raise RangeNotSatisfiable()
+            return max(size - suffix, 0), size - 1
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+class RangeFileResponse(FileResponse):
+    """File response sending whole file or its inclusive [start, end] range.
+    File is handed over to the server when it supports zero-copy extensions
+    (pathsend for whole file, zerocopysend for ranges), otherwise it is
+    read in chunks.
+    """
+
+    def __init__(self, path: Path, byte_range: Optional[Tuple[int, int]] = None, **kwargs):
+        super().__init__(path, **kwargs)
+        self.byte_range = byte_range
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        extensions = scope.get("extensions") or {}
+        start, end = self.byte_range or (0, self.stat_result.st_size - 1)
+        count = end - start + 1
+
+        if self.send_header_only or count <= 0:
+            await super().__call__(scope, receive, send)
+            return
+
+        if self.byte_range is None and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        elif "http.response.zerocopysend" in extensions:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": start,
+                    "count": count,
+                })
+        else:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(start)
+                remaining = count
+                while remaining:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    remaining -= len(chunk)
+                    await send({
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": bool(remaining and chunk),
+                    })
+                    if not chunk:
+                        break
+
+        if self.background is not None:
+            await self.background()
+
+
+def cache_headers(etag: str, max_age: int) -> Dict[str, str]:
+    return {
+        "etag": f'"{etag}"',
+        "cache-control": f"public, max-age={max_age}, immutable",
+        "accept-ranges": "bytes",
+    }
+
+
+def not_modified_response(request: Request, etag: str, max_age: int) -> Optional[Response]:
+    """Returns 304 response if client already has file with given entity tag"""
+    headers = cache_headers(etag=etag, max_age=max_age)
+    if etag_matches(request.headers.get("if-none-match"), headers["etag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
+
+
+def immutable_file_response(
+    request: Request,
+    path: Path,
+    etag: str,
+    media_type: str,
+    max_age: int,
+) -> Response:
+    """Builds response serving file which content never changes under its
+    URL, so it can be cached for max_age. Handles conditional GET
+    (If-None-Match) and byte ranges (Range, If-Range).
+    Args:
+        request (Request): request of the file
+        path (Path): path of the file
+        etag (str): entity tag of the file, without quotes
+        media_type (str): media type of the file
+        max_age (int): how long clients and proxies may cache the file in seconds
+    Returns:
+        Response: 304, 206, 416 or 200 response
+    """
+    # Client already has the file
+    if not_modified := not_modified_response(request=request, etag=etag, max_age=max_age):
+        return not_modified
+    headers = cache_headers(etag=etag, max_age=max_age)
+
+    stat_result = os.stat(path)
+    size = stat_result.st_size
+
+    # Range is ignored if client has other version of the file
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range != headers["etag"]:
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        headers["content-range"] = f"bytes */{size}"
+        return Response(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, headers=headers)
+
+    status_code = status.HTTP_200_OK
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["content-range"] = f"bytes {start}-{end}/{size}"
+        headers["content-length"] = str(end - start + 1)
+
+    return RangeFileResponse(
+        path,
+        byte_range=byte_range,
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type,
+        stat_result=stat_result,
+        method=request.method,
+    )
@@ -0,0 +1,195 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Tuple, TypeVar
+
+from fastapi import Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+from dw_blog.exceptions.image import ImageTooLarge, ImageUploadInvalid
+
+# Text fields of the form are held in memory, unlike the file
+FORM_FIELDS_MAX_SIZE = 64 * 1024
+
+T = TypeVar("T")
+
+
+def content_path(directory: Path, content_hash: str) -> Path:
+    """Path of a stored file, fanned out by hash prefix"""
+    return directory / content_hash[:2] / content_hash[2:4] / content_hash
+
+
+def _write_chunk(target, digest, chunk: bytes):
+    # hashlib releases the GIL, so both run outside of the event loop
+    digest.update(chunk)
+    target.write(chunk)
+
+
+class _MultipartEvents:
+    """Collects events of the multipart parser, which calls back synchronously,
+    so that they are handled asynchronously after every chunk of the body
+    """
+
+    def __init__(self):
+        self.events: List[Tuple[str, Any]] = []
+        self.headers: Dict[bytes, bytes] = {}
+        self.header_field = b""
+        self.header_value = b""
+
+    def callbacks(self) -> Dict[str, Callable]:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self):
+        self.headers = {}
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        self.events.append(("data", data[start:end]))
+
+    def on_part_end(self):
+        self.events.append(("end", None))
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self.header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        self.headers[self.header_field.lower()] = self.header_value
+        self.header_field = b""
+        self.header_value = b""
+
+    def on_headers_finished(self):
+        _, disposition = parse_options_header(self.headers.get(b"content-disposition", b""))
+        content_type = self.headers.get(b"content-type", b"").decode("latin-1")
+        self.events.append(("part", (disposition.get(b"name"), disposition.get(b"filename"), content_type)))
+
+    def pop(self) -> List[Tuple[str, Any]]:
+        events, self.events = self.events, []
+        return events
+
+
+async def store_multipart_upload(
+    request: Request,
+    directory: Path,
+    max_size: int,
+    file_field: str,
+    on_file: Callable[[Dict[str, str], str], Awaitable[T]],
+) -> Tuple[T, str, int, Path]:
+    """Streams file of a multipart form chunk by chunk, as the body is received,
+    to a temporary file next to the storage, hashing it on the way. Only one
+    chunk is held in memory at a time and the body is read no further once
+    the file is too large. `on_file` gets text fields and content type of
+    the file before any of it is stored, so form fields have to precede
+    the file. File is moved under its hash with `move_to_storage`.
+    Args:
+        request (Request): request with multipart/form-data body
+        directory (Path): root directory of the storage
+        max_size (int): max size of the file in bytes
+        file_field (str): name of the file field of the form
+        on_file (Callable[[Dict[str, str], str], Awaitable[T]]): checks fields and type of the file
+    Raises:
+        ImageUploadInvalid: raised if body is not a multipart form with a single file
+        ImageTooLarge: raised if file is larger than max_size
+    Returns:
+        Tuple[T, str, int, Path]: result of on_file, sha256 hash, size and path of the temporary file
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise ImageUploadInvalid(field=file_field)
+
+    tmp_dir = directory / "tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    events = _MultipartEvents()
+    parser = MultipartParser(boundary, callbacks=events.callbacks())
+    fields: Dict[str, bytes] = {}
+    fields_size = 0
+    field = None
+    checked = None
+    target = None
+    tmp_path = None
+    in_file = False
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async for body_chunk in request.stream():
+            parser.write(body_chunk)
+            chunk = []
+            for event, value in events.pop():
+                if event == "part":
+                    name, filename, part_type = value
+                    if filename is None:
+                        field = (name or b"").decode("latin-1")
+                        fields[field] = b""
+                    elif name == file_field.encode() and tmp_path is None:
+                        try:
+                            text_fields = {key: text.decode() for key, text in fields.items()}
+                        except UnicodeDecodeError:
+                            raise ImageUploadInvalid(field=file_field)
+                        checked = await on_file(text_fields, part_type)
+                        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+                        target = os.fdopen(fd, "wb")
+                        in_file = True
+                    else:
+                        raise ImageUploadInvalid(field=file_field)
+                elif event == "data" and in_file:
+                    size += len(value)
+                    if size > max_size:
+                        raise ImageTooLarge(max_size=max_size)
+                    chunk.append(value)
+                elif event == "data":
+                    fields_size += len(value)
+                    if fields_size > FORM_FIELDS_MAX_SIZE:
+                        raise ImageUploadInvalid(field=file_field)
+                    fields[field] += value
+                elif event == "end":
+                    in_file = False
+            if chunk:
+                await run_in_threadpool(_write_chunk, target, digest, b"".join(chunk))
+        parser.finalize()
+        if tmp_path is None:
+            raise ImageUploadInvalid(field=file_field)
+    except BaseException as exc:
+        if target is not None:
+            target.close()
+            os.unlink(tmp_path)
+        if isinstance(exc, MultipartParseError):
+            raise ImageUploadInvalid(field=file_field) from exc
+        raise
+    target.close()
+
+    return checked, digest.hexdigest(), size, Path(tmp_path)
+
+
+def move_to_storage(tmp_path: Path, directory: Path, content_hash: str) -> Path:
+    """Moves file under its hash. Storing the same content again
+    replaces the file with identical one, so duplicates take no space.
+    """
+    path = content_path(directory, content_hash)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Atomic, readers see either no file or the whole one
+    os.replace(tmp_path, path)
+    return path
+
+
+def discard(path: Path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def remove_content(directory: Path, content_hash: str):
+    discard(content_path(directory, content_hash))
@@ -0,0 +1,232 @@
+"""Image variants (resized or converted renditions of stored images).
+
+Variants are rendered lazily by `VariantGenerator` in a process pool and
+kept in a size bounded on-disk cache evicting least recently used files.
+Concurrent requests of the same variant wait for a single rendering.
+This module is imported by pool processes, so it imports only what
+rendering needs.
+"""
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+# Variant name: (width, height, crop to exact size)
+VARIANT_SIZES: Dict[str, Tuple[int, int, bool]] = {
+    "thumbnail": (200, 200, True),
+    "card": (600, 400, True),
+    "full": (1600, 1600, False),
+}
+PIL_FORMATS = {"webp": "WEBP", "jpeg": "JPEG", "png": "PNG"}
+
+
+def render_variant(source: str, target: str, variant: str, image_format: str) -> int:
+    """Renders variant of the source image to target path, runs in pool processes
+    Returns:
+        int: size of the rendered file in bytes
+    """
+    width, height, crop = VARIANT_SIZES[variant]
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if crop:
+            image = ImageOps.fit(image, (width, height), method=Image.LANCZOS)
+        else:
+            # Fits into the box keeping aspect ratio, never upscales
+            image.thumbnail((width, height), resample=Image.LANCZOS)
+        if image_format == "jpeg" and image.mode != "RGB":
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA")
+
+        fd, tmp_path = tempfile.mkstemp(dir=Path(target).parent)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                image.save(file, format=PIL_FORMATS[image_format], quality=82)
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return os.path.getsize(target)
+
+
+class VariantCache:
+    """On-disk cache of rendered variants bounded by `max_bytes`. Order of use
+    is kept in memory (rebuilt from modification times on first use),
+    least recently used files are removed when the cache is full.
+    Directory is shared by all workers, so it is scanned again once this
+    worker rendered `rescan_bytes` since the last scan and files of other
+    workers are evicted with its own. Disk use exceeds `max_bytes` by at
+    most `rescan_bytes` per worker. Scans, touches and removals of files
+    run in threads, so that a large cache doesn't block the event loop.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, rescan_bytes: Optional[int] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.rescan_bytes = rescan_bytes if rescan_bytes is not None else max_bytes // 16
+        self.entries: Optional["OrderedDict[str, int]"] = None
+        self.size = 0
+        self.unscanned = 0
+        self.evictions = 0
+        self.scanning: Optional[asyncio.Future] = None
+
+    def path(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def scan(self) -> List[Tuple[str, int]]:
+        """Keys and sizes of cached files, least recently used first"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = [(path.stat(), path.name) for path in self.directory.glob("*/*") if path.is_file()]
+        return [(key, stat_result.st_size) for stat_result, key in sorted(files, key=lambda file: file[0].st_mtime)]
+
+    def remove(self, keys: List[str]):
+        for key in keys:
+            try:
+                os.unlink(self.path(key))
+            except FileNotFoundError:
+                pass
+
+    async def load(self):
+        files = await asyncio.to_thread(self.scan)
+        self.entries = OrderedDict(files)
+        self.size = sum(self.entries.values())
+        self.unscanned = 0
+        await self.evict()
+
+    async def scanned(self, rescan: bool = False):
+        """Waits for the scan of the directory, so that requests coming
+        before the first scan finishes wait for it instead of starting their own
+        """
+        if self.scanning is None or (self.scanning.done() and (rescan or self.entries is None)):
+            self.scanning = asyncio.ensure_future(self.load())
+        # Scan goes on for other requests if this one is cancelled
+        await asyncio.shield(self.scanning)
+
+    async def get(self, key: str) -> Optional[Path]:
+        await self.scanned()
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        path = self.path(key)
+        try:
+            # Modification time keeps order of use across restarts
+            await asyncio.to_thread(os.utime, path)
+        except FileNotFoundError:
+            # Removed by other process sharing the directory
+            self.size -= self.entries.pop(key, 0)
+            return None
+        return path
+
+    async def put(self, key: str, size: int):
+        await self.scanned()
+        self.size += size - self.entries.pop(key, 0)
+        self.entries[key] = size
+        self.unscanned += size
+        if self.unscanned >= self.rescan_bytes:
+            # Counts variants rendered by other workers since the last scan
+            await self.scanned(rescan=True)
+        else:
+            await self.evict()
+
+    async def evict(self):
+        # Newest entry stays even if it alone is larger than the cache
+        evicted = []
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            key, size = self.entries.popitem(last=False)
+            self.size -= size
+            self.evictions += 1
+            evicted.append(key)
+        if evicted:
+            await asyncio.to_thread(self.remove, evicted)
+
+
+class VariantMetrics:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.generations = 0
+        self.generation_seconds = 0.0
+        self.generation_seconds_max = 0.0
+
+    def record_generation(self, seconds: float):
+        self.generations += 1
+        self.generation_seconds += seconds
+        self.generation_seconds_max = max(self.generation_seconds_max, seconds)
+
+
+class VariantGenerator:
+    """Returns paths of cached variants, rendering missing ones in
+    a process pool (created on first use, so after forking workers)
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, workers: int):
+        self.cache = VariantCache(directory=directory, max_bytes=max_bytes)
+        self.workers = workers
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.pending: Dict[str, asyncio.Task] = {}
+        self.metrics = VariantMetrics()
+
+    @staticmethod
+    def key(content_hash: str, variant: str, image_format: str) -> str:
+        return f"{content_hash}-{variant}.{image_format}"
+
+    async def get(self, source: Path, content_hash: str, variant: str, image_format: str) -> Path:
+        """Returns path of the variant, renders it if it's not cached
+        Args:
+            source (Path): path of the original image
+            content_hash (str): hash of the original image
+            variant (str): name of the variant
+            image_format (str): format of the variant
+        Returns:
+            Path: path of the rendered variant
+        """
+        key = self.key(content_hash=content_hash, variant=variant, image_format=image_format)
+        if (path := await self.cache.get(key)) is not None:
+            self.metrics.hits += 1
+            return path
+
+        # Join rendering started by other request
+        if task := self.pending.get(key):
+            self.metrics.coalesced += 1
+        else:
+            self.metrics.misses += 1
+            task = asyncio.create_task(self.render(key, source, variant, image_format))
+            self.pending[key] = task
+            task.add_done_callback(lambda _: self.pending.pop(key, None))
+        # Rendering goes on for other requests if this one is cancelled
+        return await asyncio.shield(task)
+
+    async def render(self, key: str, source: Path, variant: str, image_format: str) -> Path:
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        path = self.cache.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        start = time.perf_counter()
+        try:
+            size = await asyncio.get_running_loop().run_in_executor(
+                self.pool, render_variant, str(source), str(path), variant, image_format,
+            )
+        except Exception:
+            self.metrics.failures += 1
+            raise
+        self.metrics.record_generation(time.perf_counter() - start)
+        await self.cache.put(key, size)
+        return path
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
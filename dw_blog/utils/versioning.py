@@ -0,0 +1,17 @@
+from typing import Optional
+
+
+def version_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def if_match_version(header: Optional[str]) -> Optional[int]:
+    """Parses If-Match header into version of the entity the client has read.
+    Returns None when header is missing or `*`, update is then applied
+    to any version. Tags which are not versions are parsed to 0, which
+    never matches (versions start from 1), so update is rejected.
+    """
+    if not header or header.strip() == "*":
+        return None
+    tag = header.strip().removeprefix("W/").strip('"')
+    return int(tag) if tag.isdigit() else 0
@@ -0,0 +1,41 @@
+"""Job worker entry point, run with `python -m dw_blog.worker`.
+
+Runs background jobs apart from the API, which then should be started with
+`JOB_WORKER_IN_PROCESS=false`. Any number of workers can run at once, jobs
+are claimed with `FOR UPDATE SKIP LOCKED` and concurrency limits of job
+types are shared by all of them. Periodic jobs (category stats, trending
+scores, related posts and blogs) are enqueued once per interval by
+whichever worker polls first. SIGTERM stops claiming, running jobs are
+cancelled and queued again once their lease expires.
+"""
+import asyncio
+import logging
+import signal
+
+# Register job handlers
+import dw_blog.services.category  # noqa: F401
+import dw_blog.services.purge  # noqa: F401
+import dw_blog.services.related  # noqa: F401
+import dw_blog.services.trending  # noqa: F401
+from dw_blog.db.db import close_db
+from dw_blog.services.job import JOB_HANDLERS, job_worker
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopping.set)
+
+    job_worker.start()
+    logger.info("Job worker started, job types: %s", ", ".join(job_type.value for job_type in JOB_HANDLERS))
+    await stopping.wait()
+    await job_worker.stop()
+    await close_db()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -8,6 +8,7 @@ from fastapi.routing import APIRoute
 from pydantic import ValidationError
 
 from dw_blog.exceptions.common import ListException
+from dw_blog.utils.deadline import request_deadline, run_until_deadline
 
 generic_msg = "Server error! Try again and if problem persist, please contact your admin."
 
@@ -22,7 +23,11 @@ class RouteErrorHandler(APIRoute):
 
         async def custom_route_handler(request: Request) -> Response:
             try:
-                return await original_route_handler(request)
+                return await run_until_deadline(
+                    original_route_handler,
+                    request,
+                    request_deadline(request, self.endpoint),
+                )
             except Exception as exc:
                 exc_message = str(exc) if str(exc) else None
                 status_code = 500
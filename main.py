@@ -1,17 +1,31 @@
 from fastapi import FastAPI
 
-from dw_blog.db.db import init_db
+from dw_blog.config import Settings
+from dw_blog.db.db import close_db, init_db, replica_lag_monitor, warm_up_db
+from dw_blog.routers.admission import router as admission_router
 from dw_blog.routers.auth import router as auth_router
 from dw_blog.routers.blog import router as blog_router
+from dw_blog.routers.comments import router as comment_router
+from dw_blog.routers.image import router as image_router
+from dw_blog.routers.job import router as job_router
 from dw_blog.routers.post import router as post_router
+from dw_blog.routers.purge import router as purge_router
 from dw_blog.routers.tag import router as tag_router
 from dw_blog.routers.user import router as user_router
 from dw_blog.routers.category import router as category_router
+from dw_blog.services.admission import admission_controller
+from dw_blog.services.image import variant_generator
+from dw_blog.services.job import job_worker
+from dw_blog.services.post import post_event_broker
+from dw_blog.utils.admission import AdmissionMiddleware
+
+settings = Settings()
 
 app = FastAPI(
     title="DW Blogging App",
     version="0.0.1",
 )
+app.add_middleware(AdmissionMiddleware, controller=admission_controller)
 
 app.include_router(auth_router, tags=["Auth"], prefix="/auth")
 app.include_router(user_router, tags=["Users"], prefix="/users")
@@ -19,13 +33,37 @@ app.include_router(category_router, tags=["Categories"], prefix="/categories")
 app.include_router(blog_router, tags=["Blogs"], prefix="/blogs")
 app.include_router(tag_router, tags=["Tags"], prefix="/tags")
 app.include_router(post_router, tags=["Posts"], prefix="/posts")
+app.include_router(comment_router, tags=["Comments"], prefix="/comments")
+app.include_router(image_router, tags=["Images"], prefix="/images")
+app.include_router(purge_router, tags=["Purges"], prefix="/purges")
+app.include_router(job_router, tags=["Jobs"], prefix="/jobs")
+app.include_router(admission_router, tags=["Admission"], prefix="/admission")
 
 
 @app.on_event("startup")
 async def on_startup():
     await init_db()
+    await warm_up_db()
+    replica_lag_monitor.start()
+    post_event_broker.start()
+    if settings.JOB_WORKER_IN_PROCESS:
+        job_worker.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await replica_lag_monitor.stop()
+    await post_event_broker.stop()
+    await job_worker.stop()
+    variant_generator.close()
+    await close_db()
 
 
 @app.get("/")
 def read_root():
     return {"Hello": "World"}
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
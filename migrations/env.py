@@ -18,6 +18,14 @@ from dw_blog.models import (
     BlogSubscribers,
     CategoryBlogs,
     Category,
+    CategoryStats,
+    PostTrending,
+    BlogTrending,
+    Purge,
+    Job,
+    JobSchedule,
+    PostRelated,
+    BlogRelated,
 )
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,37 @@
+"""add related blogs
+
+Revision ID: 0b7d3e91c4a2
+Revises: f5a2c8e1d934
+Create Date: 2026-10-21 10:17:24.318906
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b7d3e91c4a2'
+down_revision: Union[str, None] = 'f5a2c8e1d934'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('blogrelated',
+    sa.Column('blog_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('related_blog_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('date_refreshed', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['blog_id'], ['blog.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['related_blog_id'], ['blog.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('blog_id', 'related_blog_id')
+    )
+    op.create_index(op.f('ix_blogrelated_related_blog_id'), 'blogrelated', ['related_blog_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_blogrelated_related_blog_id'), table_name='blogrelated')
+    op.drop_table('blogrelated')
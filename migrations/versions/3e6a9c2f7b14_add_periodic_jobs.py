@@ -0,0 +1,45 @@
+"""add periodic jobs
+
+Revision ID: 3e6a9c2f7b14
+Revises: 0b7d3e91c4a2
+Create Date: 2026-10-22 09:12:40.581337
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e6a9c2f7b14'
+down_revision: Union[str, None] = '0b7d3e91c4a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PERIODIC_JOB_TYPES = ('category_stats', 'trending', 'related_posts', 'related_blogs')
+
+
+def upgrade() -> None:
+    # New values can't be used in this transaction, rows are added by the workers
+    for job_type in PERIODIC_JOB_TYPES:
+        op.execute(f"ALTER TYPE jobtype ADD VALUE IF NOT EXISTS '{job_type}'")
+    op.create_table('jobschedule',
+    sa.Column('job_type', postgresql.ENUM(name='jobtype', create_type=False), nullable=False),
+    sa.Column('next_run_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('job_type')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('jobschedule')
+    # Values can't be dropped from an enum, the type is recreated without them
+    op.execute(
+        "DELETE FROM job WHERE type IN ("
+        + ", ".join(f"'{job_type}'" for job_type in PERIODIC_JOB_TYPES) + ")"
+    )
+    op.execute("ALTER TYPE jobtype RENAME TO jobtype_old")
+    op.execute("CREATE TYPE jobtype AS ENUM ('purge')")
+    op.execute("ALTER TABLE job ALTER COLUMN type TYPE jobtype USING type::text::jobtype")
+    op.execute("DROP TYPE jobtype_old")
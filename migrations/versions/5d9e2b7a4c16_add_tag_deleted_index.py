@@ -0,0 +1,31 @@
+"""add tag deleted index
+
+Revision ID: 5d9e2b7a4c16
+Revises: 8c1f4a7d2e59
+Create Date: 2026-10-22 16:40:52.913024
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d9e2b7a4c16'
+down_revision: Union[str, None] = '8c1f4a7d2e59'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tag_deleted_id', 'tag', ['id'],
+            unique=False, postgresql_where=sa.text('date_deleted IS NOT NULL'), postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tag_deleted_id', table_name='tag', postgresql_concurrently=True)
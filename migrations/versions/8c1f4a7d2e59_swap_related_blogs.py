@@ -0,0 +1,29 @@
+"""swap related blogs
+
+Revision ID: 8c1f4a7d2e59
+Revises: 3e6a9c2f7b14
+Create Date: 2026-10-22 14:03:11.207415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1f4a7d2e59'
+down_revision: Union[str, None] = '3e6a9c2f7b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_constraint('blogrelated_blog_id_fkey', 'blogrelated', type_='foreignkey')
+    op.drop_constraint('blogrelated_related_blog_id_fkey', 'blogrelated', type_='foreignkey')
+    op.execute('DROP TABLE IF EXISTS blogrelated_staging')
+
+
+def downgrade() -> None:
+    op.execute('DELETE FROM blogrelated WHERE blog_id NOT IN (SELECT id FROM blog) OR related_blog_id NOT IN (SELECT id FROM blog)')
+    op.create_foreign_key('blogrelated_blog_id_fkey', 'blogrelated', 'blog', ['blog_id'], ['id'], ondelete='CASCADE')
+    op.create_foreign_key('blogrelated_related_blog_id_fkey', 'blogrelated', 'blog', ['related_blog_id'], ['id'], ondelete='CASCADE')
@@ -0,0 +1,56 @@
+"""add trending rows of all posts and blogs
+
+Revision ID: a7c4e2f9d318
+Revises: 5d9e2b7a4c16
+Create Date: 2026-10-23 10:12:37.402518
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c4e2f9d318'
+down_revision: Union[str, None] = '5d9e2b7a4c16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Trending table, scored table and its key column
+TRENDING_TABLES = (
+    ('posttrending', 'post', 'post_id'),
+    ('blogtrending', 'blog', 'blog_id'),
+)
+
+
+def upgrade() -> None:
+    for table, entity, key in TRENDING_TABLES:
+        op.add_column(table, sa.Column('date_created', sa.DateTime(), nullable=True))
+        op.execute(f"""
+            UPDATE {table} SET date_created = {entity}.date_created
+            FROM {entity}
+            WHERE {entity}.id = {table}.{key}
+        """)
+        # Posts and blogs without likes get empty scores, sorted after all others
+        op.execute(f"""
+            INSERT INTO {table} ({key}, score, decay_epoch, trending, date_created)
+            SELECT id, 0, timezone('utc', now()), '-Infinity', date_created
+            FROM {entity}
+            WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {table}.{key} = {entity}.id)
+        """)
+        op.execute(f"UPDATE {table} SET trending = '-Infinity' WHERE trending IS NULL")
+        op.alter_column(table, 'date_created', nullable=False)
+        op.alter_column(table, 'trending', nullable=False, server_default=sa.text("'-Infinity'"))
+        op.drop_index(f'ix_{table}_trending', table_name=table)
+        op.create_index(f'ix_{table}_trending_date_created', table, ['trending', 'date_created'], unique=False)
+
+
+def downgrade() -> None:
+    for table, entity, key in TRENDING_TABLES:
+        op.drop_index(f'ix_{table}_trending_date_created', table_name=table)
+        op.create_index(f'ix_{table}_trending', table, ['trending'], unique=False)
+        op.alter_column(table, 'trending', nullable=True, server_default=None)
+        op.execute(f"DELETE FROM {table} WHERE score = 0")
+        op.execute(f"UPDATE {table} SET trending = NULL WHERE trending = '-Infinity'")
+        op.drop_column(table, 'date_created')
@@ -0,0 +1,50 @@
+"""add lookup indexes
+
+Revision ID: a9c3e5f71d28
+Revises: f2b8d4c6a913
+Create Date: 2026-10-19 18:42:15.630127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c3e5f71d28'
+down_revision: Union[str, None] = 'f2b8d4c6a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Link tables are indexed by their primary keys only from the left side,
+# reverse lookups (e.g. blogs of an author) and foreign keys need their own
+INDEXES = [
+    ('ix_blogauthors_author_id', 'blogauthors', ['author_id']),
+    ('ix_bloglikes_liker_id', 'bloglikes', ['liker_id']),
+    ('ix_blogsubscribers_subscriber_id', 'blogsubscribers', ['subscriber_id']),
+    ('ix_categoryblogs_blog_id', 'categoryblogs', ['blog_id']),
+    ('ix_postauthors_author_id', 'postauthors', ['author_id']),
+    ('ix_postlikers_liker_id', 'postlikers', ['liker_id']),
+    ('ix_postfavourites_favouriter_id', 'postfavourites', ['favouriter_id']),
+    ('ix_tagposts_post_id', 'tagposts', ['post_id']),
+    ('ix_tagsubscribers_subscriber_id', 'tagsubscribers', ['subscriber_id']),
+    ('ix_tag_blog_id', 'tag', ['blog_id']),
+    ('ix_post_blog_id_date_created', 'post', ['blog_id', 'date_created']),
+    ('ix_post_date_created', 'post', ['date_created']),
+    ('ix_blog_date_created', 'blog', ['date_created']),
+    ('ix_tag_date_created', 'tag', ['date_created']),
+    ('ix_category_date_created', 'category', ['date_created']),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY does not block writes, but can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,67 @@
+"""add category stats
+
+Revision ID: b3e1f0c6a2d4
+Revises: 70e795d98f18
+Create Date: 2026-10-19 09:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+from dw_blog.config import Settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e1f0c6a2d4'
+down_revision: Union[str, None] = '70e795d98f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('categorystats',
+    sa.Column('category_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('blogs_count', sa.Integer(), nullable=False),
+    sa.Column('top_likes_count', sa.Integer(), nullable=False),
+    sa.Column('top_blog_ids', postgresql.ARRAY(postgresql.UUID(as_uuid=True)), server_default='{}', nullable=False),
+    sa.Column('top_blog_names', postgresql.ARRAY(sa.String(length=500)), server_default='{}', nullable=False),
+    sa.Column('date_refreshed', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['category.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('category_id')
+    )
+    # Backfill read model, later it is kept up to date by the application,
+    # blogs are ranked within the configured CATEGORY_TOP_BLOGS as the application does
+    op.execute(sa.text("""
+        INSERT INTO categorystats (category_id, blogs_count, top_likes_count, top_blog_ids, top_blog_names, date_refreshed)
+        SELECT category.id,
+               coalesce(max(ranked.blogs_count), 0),
+               coalesce(max(ranked.likes_count), 0),
+               coalesce(array_agg(ranked.blog_id ORDER BY ranked.rank) FILTER (WHERE ranked.rank <= :top_blogs), '{}'),
+               coalesce(array_agg(ranked.blog_name ORDER BY ranked.rank) FILTER (WHERE ranked.rank <= :top_blogs), '{}'),
+               timezone('utc', now())
+        FROM category
+        LEFT OUTER JOIN (
+            SELECT categoryblogs.category_id,
+                   blog.id AS blog_id,
+                   blog.name AS blog_name,
+                   coalesce(likes.likes_count, 0) AS likes_count,
+                   row_number() OVER (
+                       PARTITION BY categoryblogs.category_id
+                       ORDER BY coalesce(likes.likes_count, 0) DESC, blog.name
+                   ) AS rank,
+                   count(*) OVER (PARTITION BY categoryblogs.category_id) AS blogs_count
+            FROM categoryblogs
+            JOIN blog ON blog.id = categoryblogs.blog_id
+            LEFT OUTER JOIN (
+                SELECT blog_id, count(*) AS likes_count FROM bloglikes GROUP BY blog_id
+            ) AS likes ON likes.blog_id = blog.id
+        ) AS ranked ON ranked.category_id = category.id
+        GROUP BY category.id
+    """).bindparams(top_blogs=Settings().CATEGORY_TOP_BLOGS))
+
+
+def downgrade() -> None:
+    op.drop_table('categorystats')
@@ -0,0 +1,31 @@
+"""add row versions
+
+Revision ID: b4e8d2a6c310
+Revises: a9c3e5f71d28
+Create Date: 2026-10-19 19:05:37.218440
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8d2a6c310'
+down_revision: Union[str, None] = 'a9c3e5f71d28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ['blog', 'post', 'tag', 'category']
+
+
+def upgrade() -> None:
+    # Constant default is stored in the catalog, existing rows are not rewritten
+    for table in TABLES:
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    for table in reversed(TABLES):
+        op.drop_column(table, 'version')
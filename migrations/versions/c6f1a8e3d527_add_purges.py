@@ -0,0 +1,63 @@
+"""add purges
+
+Revision ID: c6f1a8e3d527
+Revises: b4e8d2a6c310
+Create Date: 2026-10-19 20:14:09.482317
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6f1a8e3d527'
+down_revision: Union[str, None] = 'b4e8d2a6c310'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SOFT_DELETED_TABLES = ['blog', 'user', 'tag']
+
+
+def upgrade() -> None:
+    for table in SOFT_DELETED_TABLES:
+        op.add_column(table, sa.Column('date_deleted', sa.DateTime(), nullable=True))
+    op.create_index(
+        'ix_blog_deleted_id', 'blog', ['id'],
+        unique=False, postgresql_where=sa.text('date_deleted IS NOT NULL'),
+    )
+    op.create_table('purge',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('entity', sa.Enum('blog', 'user', 'tag', name='purgeentity'), nullable=False),
+    sa.Column('entity_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('requested_by', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('status', sa.Enum('pending', 'running', 'done', 'failed', name='purgestatus'), nullable=False),
+    sa.Column('step', sa.Integer(), nullable=False),
+    sa.Column('rows_deleted', sa.Integer(), nullable=False),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('date_created', sa.DateTime(), nullable=False),
+    sa.Column('date_modified', sa.DateTime(), nullable=False),
+    sa.Column('date_finished', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_purge_status_date_modified', 'purge', ['status', 'date_modified'], unique=False)
+    # Comments of deleted users are purged from the top of their threads
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_comment_author_id_depth', 'comment', ['author_id', 'depth'],
+            unique=False, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_comment_author_id_depth', table_name='comment', postgresql_concurrently=True)
+    op.drop_index('ix_purge_status_date_modified', table_name='purge')
+    op.drop_table('purge')
+    sa.Enum(name='purgestatus').drop(op.get_bind())
+    sa.Enum(name='purgeentity').drop(op.get_bind())
+    op.drop_index('ix_blog_deleted_id', table_name='blog')
+    for table in reversed(SOFT_DELETED_TABLES):
+        op.drop_column(table, 'date_deleted')
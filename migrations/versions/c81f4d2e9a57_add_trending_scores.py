@@ -0,0 +1,79 @@
+"""add trending scores
+
+Revision ID: c81f4d2e9a57
+Revises: b3e1f0c6a2d4
+Create Date: 2026-10-19 11:03:52.118640
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+from dw_blog.config import Settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81f4d2e9a57'
+down_revision: Union[str, None] = 'b3e1f0c6a2d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ('postlikers', 'bloglikes', 'blogsubscribers'):
+        op.add_column(table, sa.Column(
+            'date_created',
+            sa.DateTime(),
+            server_default=sa.text("timezone('utc', now())"),
+            nullable=False,
+        ))
+    op.create_table('posttrending',
+    sa.Column('post_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('decay_epoch', sa.DateTime(), nullable=False),
+    sa.Column('trending', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['post_id'], ['post.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('post_id')
+    )
+    op.create_index('ix_posttrending_trending', 'posttrending', ['trending'], unique=False)
+    op.create_table('blogtrending',
+    sa.Column('blog_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('decay_epoch', sa.DateTime(), nullable=False),
+    sa.Column('trending', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['blog_id'], ['blog.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('blog_id')
+    )
+    op.create_index('ix_blogtrending_trending', 'blogtrending', ['trending'], unique=False)
+    # Existing likes and subscriptions have no dates, count them as made now,
+    # trending is in half-lives of the configured TRENDING_HALF_LIFE
+    half_life = Settings().TRENDING_HALF_LIFE * 3600
+    op.execute(sa.text("""
+        INSERT INTO posttrending (post_id, score, decay_epoch, trending)
+        SELECT post_id, count(*), timezone('utc', now()),
+               extract(epoch FROM timezone('utc', now()))::float / :half_life + ln(count(*)) / ln(2)
+        FROM postlikers
+        GROUP BY post_id
+    """).bindparams(half_life=half_life))
+    op.execute(sa.text("""
+        INSERT INTO blogtrending (blog_id, score, decay_epoch, trending)
+        SELECT blog_id, count(*), timezone('utc', now()),
+               extract(epoch FROM timezone('utc', now()))::float / :half_life + ln(count(*)) / ln(2)
+        FROM (
+            SELECT blog_id FROM bloglikes
+            UNION ALL
+            SELECT blog_id FROM blogsubscribers
+        ) AS events
+        GROUP BY blog_id
+    """).bindparams(half_life=half_life))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_blogtrending_trending', table_name='blogtrending')
+    op.drop_table('blogtrending')
+    op.drop_index('ix_posttrending_trending', table_name='posttrending')
+    op.drop_table('posttrending')
+    for table in ('postlikers', 'bloglikes', 'blogsubscribers'):
+        op.drop_column(table, 'date_created')
@@ -0,0 +1,75 @@
+"""add threaded comments
+
+Revision ID: d5a3b7c19f42
+Revises: c81f4d2e9a57
+Create Date: 2026-10-19 14:21:07.512384
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a3b7c19f42'
+down_revision: Union[str, None] = 'c81f4d2e9a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('post', sa.Column('comments_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Link comments to their authors instead of copying nickname
+    op.alter_column('comment', 'user_id', new_column_name='author_id')
+    op.drop_column('comment', 'user_nickname')
+    op.create_foreign_key('comment_author_id_fkey', 'comment', 'user', ['author_id'], ['id'])
+    op.drop_constraint('comment_post_id_fkey', 'comment', type_='foreignkey')
+    op.create_foreign_key('comment_post_id_fkey', 'comment', 'post', ['post_id'], ['id'], ondelete='CASCADE')
+
+    op.add_column('comment', sa.Column('parent_id', sqlmodel.sql.sqltypes.GUID(), nullable=True))
+    op.create_foreign_key('comment_parent_id_fkey', 'comment', 'comment', ['parent_id'], ['id'])
+    op.add_column('comment', sa.Column('path', sa.String(collation='C'), nullable=True))
+    op.add_column('comment', sa.Column('depth', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('comment', sa.Column('replies_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Existing comments become top level ones, path segment is creation time and id
+    op.execute("""
+        UPDATE comment
+        SET path = lpad(to_hex((extract(epoch FROM date_created) * 1000000)::bigint), 13, '0')
+                   || substr(replace(id::text, '-', ''), 1, 8)
+    """)
+    op.alter_column('comment', 'path', nullable=False)
+    op.execute("""
+        UPDATE post
+        SET comments_count = counts.comments_count
+        FROM (SELECT post_id, count(*) AS comments_count FROM comment GROUP BY post_id) AS counts
+        WHERE post.id = counts.post_id
+    """)
+
+    op.create_index('ix_comment_post_id_path', 'comment', ['post_id', 'path'], unique=True)
+    op.create_index('ix_comment_post_id_depth_path', 'comment', ['post_id', 'depth', 'path'], unique=False)
+    op.create_index('ix_comment_parent_id_path', 'comment', ['parent_id', 'path'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comment_parent_id_path', table_name='comment')
+    op.drop_index('ix_comment_post_id_depth_path', table_name='comment')
+    op.drop_index('ix_comment_post_id_path', table_name='comment')
+    op.drop_constraint('comment_parent_id_fkey', 'comment', type_='foreignkey')
+    op.drop_column('comment', 'replies_count')
+    op.drop_column('comment', 'depth')
+    op.drop_column('comment', 'path')
+    op.drop_column('comment', 'parent_id')
+
+    op.drop_constraint('comment_post_id_fkey', 'comment', type_='foreignkey')
+    op.create_foreign_key('comment_post_id_fkey', 'comment', 'post', ['post_id'], ['id'])
+    op.drop_constraint('comment_author_id_fkey', 'comment', type_='foreignkey')
+    op.add_column('comment', sa.Column('user_nickname', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    op.execute('UPDATE comment SET user_nickname = "user".nickname FROM "user" WHERE "user".id = comment.author_id')
+    op.alter_column('comment', 'user_nickname', nullable=False)
+    op.alter_column('comment', 'author_id', new_column_name='user_id')
+
+    op.drop_column('post', 'comments_count')
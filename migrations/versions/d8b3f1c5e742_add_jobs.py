@@ -0,0 +1,63 @@
+"""add jobs
+
+Revision ID: d8b3f1c5e742
+Revises: c6f1a8e3d527
+Create Date: 2026-10-19 23:41:27.106539
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b3f1c5e742'
+down_revision: Union[str, None] = 'c6f1a8e3d527'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('job',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('type', sa.Enum('purge', name='jobtype'), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('status', sa.Enum('queued', 'running', 'done', 'failed', name='jobstatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('date_created', sa.DateTime(), nullable=False),
+    sa.Column('date_started', sa.DateTime(), nullable=True),
+    sa.Column('date_finished', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_job_type_run_at_queued', 'job', ['type', 'run_at'],
+        unique=False, postgresql_where=sa.text("status = 'queued'"),
+    )
+    op.create_index(
+        'ix_job_type_locked_at_running', 'job', ['type', 'locked_at'],
+        unique=False, postgresql_where=sa.text("status = 'running'"),
+    )
+    op.create_index('ix_job_status_date_finished', 'job', ['status', 'date_finished'], unique=False)
+    # Purges are run by their jobs, unfinished ones get a job each
+    op.execute(
+        "INSERT INTO job (id, type, payload, status, attempts, max_attempts, run_at, date_created) "
+        "SELECT gen_random_uuid(), 'purge', jsonb_build_object('purge_id', id::text), 'queued', 0, 5, "
+        "timezone('utc', now()), timezone('utc', now()) FROM purge WHERE status != 'done'"
+    )
+    op.drop_index('ix_purge_status_date_modified', table_name='purge')
+
+
+def downgrade() -> None:
+    op.create_index('ix_purge_status_date_modified', 'purge', ['status', 'date_modified'], unique=False)
+    op.drop_index('ix_job_status_date_finished', table_name='job')
+    op.drop_index('ix_job_type_locked_at_running', table_name='job')
+    op.drop_index('ix_job_type_run_at_queued', table_name='job')
+    op.drop_table('job')
+    sa.Enum(name='jobstatus').drop(op.get_bind())
+    sa.Enum(name='jobtype').drop(op.get_bind())
@@ -0,0 +1,35 @@
+"""add user deleted index, keep comments of purged users
+
+Revision ID: e4b8c1d6f273
+Revises: a7c4e2f9d318
+Create Date: 2026-10-23 14:27:05.661930
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b8c1d6f273'
+down_revision: Union[str, None] = 'a7c4e2f9d318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Comments of purged users with replies of others are kept without author
+    op.alter_column('comment', 'author_id', nullable=True)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_deleted_id', 'user', ['id'],
+            unique=False, postgresql_where=sa.text('date_deleted IS NOT NULL'), postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_deleted_id', table_name='user', postgresql_concurrently=True)
+    op.execute("DELETE FROM comment WHERE author_id IS NULL")
+    op.alter_column('comment', 'author_id', nullable=False)
@@ -0,0 +1,26 @@
+"""add post event sequence
+
+Revision ID: e4c9a7b2d615
+Revises: d8b3f1c5e742
+Create Date: 2026-10-20 10:12:45.318027
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4c9a7b2d615'
+down_revision: Union[str, None] = 'd8b3f1c5e742'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(sa.schema.CreateSequence(sa.Sequence('post_event_id_seq')))
+
+
+def downgrade() -> None:
+    op.execute(sa.schema.DropSequence(sa.Sequence('post_event_id_seq')))
@@ -0,0 +1,37 @@
+"""add image storage
+
+Revision ID: e7c4a9d2b1f8
+Revises: d5a3b7c19f42
+Create Date: 2026-10-19 16:02:44.730195
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c4a9d2b1f8'
+down_revision: Union[str, None] = 'd5a3b7c19f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Images could not be stored so far, rows without files are useless
+    op.execute("DELETE FROM image")
+    op.add_column('image', sa.Column('hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False))
+    op.add_column('image', sa.Column('post_id', sqlmodel.sql.sqltypes.GUID(), nullable=False))
+    op.create_foreign_key('image_post_id_fkey', 'image', 'post', ['post_id'], ['id'], ondelete='CASCADE')
+    op.create_index(op.f('ix_image_hash'), 'image', ['hash'], unique=False)
+    op.create_index(op.f('ix_image_post_id'), 'image', ['post_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_image_post_id'), table_name='image')
+    op.drop_index(op.f('ix_image_hash'), table_name='image')
+    op.drop_constraint('image_post_id_fkey', 'image', type_='foreignkey')
+    op.drop_column('image', 'post_id')
+    op.drop_column('image', 'hash')
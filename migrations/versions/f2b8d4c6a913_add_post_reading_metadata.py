@@ -0,0 +1,62 @@
+"""add post reading metadata
+
+Revision ID: f2b8d4c6a913
+Revises: e7c4a9d2b1f8
+Create Date: 2026-10-19 17:21:08.402816
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d4c6a913'
+down_revision: Union[str, None] = 'e7c4a9d2b1f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Defaults of POST_EXCERPT_LENGTH and POST_WORDS_PER_MINUTE
+EXCERPT_LENGTH = 200
+WORDS_PER_MINUTE = 200
+
+
+def upgrade() -> None:
+    op.add_column('post', sa.Column('excerpt', sqlmodel.sql.sqltypes.AutoString(), server_default='', nullable=False))
+    op.add_column('post', sa.Column('word_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('post', sa.Column('reading_time', sa.Integer(), server_default='0', nullable=False))
+    # Same rules as dw_blog.utils.excerpt: whitespace collapsed, cut at the last whole word
+    op.execute(f"""
+        WITH normalized AS (
+            SELECT id, btrim(regexp_replace(body, '\\s+', ' ', 'g')) AS body
+            FROM post
+        ),
+        metadata AS (
+            SELECT
+                id,
+                CASE
+                    WHEN length(body) <= {EXCERPT_LENGTH} THEN body
+                    ELSE rtrim(
+                        left(regexp_replace(left(body, {EXCERPT_LENGTH + 1}), ' [^ ]*$', ''), {EXCERPT_LENGTH}),
+                        ' ,.;:-'
+                    ) || '...'
+                END AS excerpt,
+                CASE WHEN body = '' THEN 0 ELSE array_length(string_to_array(body, ' '), 1) END AS word_count
+            FROM normalized
+        )
+        UPDATE post
+        SET
+            excerpt = metadata.excerpt,
+            word_count = metadata.word_count,
+            reading_time = ceil(metadata.word_count / {WORDS_PER_MINUTE}.0)
+        FROM metadata
+        WHERE post.id = metadata.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('post', 'reading_time')
+    op.drop_column('post', 'word_count')
+    op.drop_column('post', 'excerpt')
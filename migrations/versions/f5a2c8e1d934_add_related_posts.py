@@ -0,0 +1,37 @@
+"""add related posts
+
+Revision ID: f5a2c8e1d934
+Revises: e4c9a7b2d615
+Create Date: 2026-10-20 14:03:52.664710
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5a2c8e1d934'
+down_revision: Union[str, None] = 'e4c9a7b2d615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('postrelated',
+    sa.Column('post_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('related_post_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('date_refreshed', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['post.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['related_post_id'], ['post.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('post_id', 'related_post_id')
+    )
+    op.create_index(op.f('ix_postrelated_related_post_id'), 'postrelated', ['related_post_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_postrelated_related_post_id'), table_name='postrelated')
+    op.drop_table('postrelated')
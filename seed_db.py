@@ -7,6 +7,8 @@ from sqlalchemy_utils import database_exists, create_database, drop_database
 from sqlmodel import create_engine
 
 from dw_blog.config import Settings
+from dw_blog.models.trending import BlogTrending, PostTrending
+from dw_blog.queries.trending import add_missing_trending_scores_query
 
 
 settings = Settings()
@@ -57,5 +59,8 @@ if environment == "dev":
                 for line in split_content:
                     if line.strip() != "":
                         conn.execute(text(line.strip()))
+        # Fixtures are inserted directly, posts and blogs get their trending rows after them
+        for model in (PostTrending, BlogTrending):
+            conn.execute(add_missing_trending_scores_query(model=model))
 else:
     print("Not in dev environment, skipping seed")
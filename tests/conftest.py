@@ -15,11 +15,14 @@ from dw_blog.config import Settings
 from dw_blog.db.db import get_session
 from dw_blog.models.blog import BlogAuthors, BlogLikes, BlogSubscribers
 from dw_blog.models.category import CategoryBlogs
+from dw_blog.models.trending import BlogTrending, PostTrending
 from dw_blog.schemas.common import UserType
 from dw_blog.models.user import User
+from dw_blog.queries.category import refresh_category_stats_query
+from dw_blog.queries.trending import add_missing_trending_scores_query
 from dw_blog.utils.auth import create_access_token
 from main import app
-from tests.factories import ADMIN_EMAIL, ADMIN_ID, BlogFactory, UserFactory, CategoryFactory, TagFactory
+from tests.factories import ADMIN_EMAIL, ADMIN_ID, BlogFactory, UserFactory, CategoryFactory, TagFactory, PostFactory
 
 settings = Settings()
 db_url_test_sync = settings.DATABASE_URL_TEST_SYNC
@@ -105,10 +108,22 @@ async def _add_user(db_session, **kwargs):
     return user
 
 
+async def _refresh_category_stats(db_session):
+    await db_session.exec(refresh_category_stats_query(top_blogs=settings.CATEGORY_TOP_BLOGS))
+    await db_session.commit()
+
+
+async def _add_trending_scores(db_session, model):
+    await db_session.exec(add_missing_trending_scores_query(model=model))
+    await db_session.commit()
+
+
 async def _add_blog(db_session, **kwargs):
     blog = BlogFactory(**kwargs)
     db_session.add(blog)
     await db_session.commit()
+    await _add_trending_scores(db_session, BlogTrending)
+    await _refresh_category_stats(db_session)
     return blog
 
 
@@ -119,6 +134,14 @@ async def _add_tag(db_session, **kwargs):
     return blog
 
 
+async def _add_post(db_session, **kwargs):
+    post = PostFactory(**kwargs)
+    db_session.add(post)
+    await db_session.commit()
+    await _add_trending_scores(db_session, PostTrending)
+    return post
+
+
 async def _add_author_to_blog(db_session, user_id: UUID, blog_id: UUID):
     blog_author = BlogAuthors(blog_id=blog_id, author_id=user_id)
     db_session.add(blog_author)
@@ -137,6 +160,7 @@ async def _add_likers_to_blog(db_session, user_id: UUID, blog_id: UUID):
     blog_liker = BlogLikes(blog_id=blog_id, liker_id=user_id)
     db_session.add(blog_liker)
     await db_session.commit()
+    await _refresh_category_stats(db_session)
     return blog_liker
 
 
@@ -144,6 +168,7 @@ async def _add_category(db_session, **kwargs):
     cat = CategoryFactory(**kwargs)
     db_session.add(cat)
     await db_session.commit()
+    await _refresh_category_stats(db_session)
     return cat
 
 
@@ -151,6 +176,7 @@ async def _add_blog_to_category(db_session, category_id: UUID, blog_id: UUID):
     cat = CategoryBlogs(category_id=category_id, blog_id=blog_id)
     db_session.add(cat)
     await db_session.commit()
+    await _refresh_category_stats(db_session)
     return cat
 
 
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from pydantic import ValidationError
+from starlette.datastructures import QueryParams
+
+from dw_blog.config import Settings
+from dw_blog.schemas.admission import RouteClass
+from dw_blog.services.admission import admission_controller
+from dw_blog.utils.admission import AdmissionController, AdmissionLimiter
+from tests.conftest import _add_blog
+
+
+@pytest.mark.asyncio
+async def test__admission_503_shed_and_queued_admitted(
+    async_client: AsyncClient,
+    access_token,
+    async_session,
+    monkeypatch,
+):
+    blog = await _add_blog(async_session)
+    limiter = AdmissionLimiter(limit=1, queue_size=1, timeout=0.2)
+    monkeypatch.setitem(admission_controller.limiters, RouteClass.read, limiter)
+    # Slot is taken, so that requests have to wait in the queue
+    assert await limiter.acquire() is True
+
+    timed_out = await async_client.get(f"/blogs/{blog.id}")
+    limiter.timeout = 5
+    queued = asyncio.create_task(async_client.get(f"/blogs/{blog.id}"))
+    await asyncio.sleep(0.1)
+    queue_full = await async_client.get(f"/blogs/{blog.id}")
+    health = await async_client.get("/health")
+    limiter.release()
+    admitted = await queued
+
+    for response in (timed_out, queue_full):
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["retry-after"] == str(admission_controller.retry_after)
+        assert response.json()["detail"] == "Service is overloaded, retry later!"
+    assert health.status_code == status.HTTP_200_OK
+    assert admitted.status_code == status.HTTP_200_OK
+    assert (limiter.running, len(limiter.waiters)) == (0, 0)
+
+    response = await async_client.get("/admission/metrics", headers={"Authorization": f"Bearer {access_token}"})
+
+    assert response.status_code == status.HTTP_200_OK
+    metrics = next(item for item in response.json()["data"] if item["route_class"] == "read")
+    assert (metrics["limit"], metrics["queue_size"]) == (1, 1)
+    assert (metrics["admitted"], metrics["shed_queue_full"], metrics["shed_timeout"]) == (2, 1, 1)
+    assert metrics["waited"] == 1
+    assert 0 < metrics["wait_seconds_avg"] <= metrics["wait_seconds_max"]
+
+
+@pytest.mark.parametrize(
+    "method,path,query,expected",
+    [
+        ("GET", "/health", "", None),
+        ("GET", "/posts/events", "", None),
+        ("POST", "/auth/token", "", RouteClass.auth),
+        ("PATCH", "/posts/1", "", RouteClass.write),
+        ("GET", "/posts", "title_search=news&limit=5", RouteClass.search),
+        ("GET", "/posts/export", "", RouteClass.export),
+        ("GET", "/posts/export", "title_search=news", RouteClass.export),
+        ("GET", "/posts", "limit=5", RouteClass.read),
+    ],
+)
+def test__admission_classify(method, path, query, expected):
+    assert AdmissionController.classify(method=method, path=path, query_params=QueryParams(query)) == expected
+
+
+@pytest.mark.asyncio
+async def test__get_admission_metrics_403_not_admin(
+    async_client: AsyncClient,
+    other_user_access_token,
+):
+    response = await async_client.get(
+        "/admission/metrics", headers={"Authorization": f"Bearer {other_user_access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test__admission_limits_fit_pool():
+    settings = Settings()
+    limits = [limiter.limit for limiter in admission_controller.limiters.values()]
+    assert sum(limits) <= settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+
+    with pytest.raises(ValidationError):
+        Settings(DB_POOL_SIZE=5, DB_MAX_OVERFLOW=10, ADMISSION_READ_LIMIT=20)
@@ -5,6 +5,9 @@ import pytest
 from fastapi import status
 from httpx import AsyncClient
 
+from dw_blog.schemas.common import UserType
+from dw_blog.services.related import RelatedService
+from dw_blog.utils.auth import create_access_token
 from tests.conftest import (_add_author_to_blog, _add_blog,
                             _add_likers_to_blog, _add_subscriber_to_blog,
                             _add_user, _add_category)
@@ -81,6 +84,39 @@ async def test__get_blog_200(
     assert response.json()["name"] == blog_1.name
 
 
+async def test__get_blog_200_sparse_fields(
+    async_client: AsyncClient,
+    async_session,
+):
+    blog_1 = await _add_blog(async_session, name=f"Sparse blog {uuid.uuid4()}")
+
+    response = await async_client.get(f"/blogs/{blog_1.id}", params={"fields": "name,likers"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert set(response.json()) == {"id", "name", "likers"}
+    assert [liker["liker_id"] for liker in response.json()["likers"]] == [str(blog_1.likers[0].id)]
+
+    response = await async_client.get(
+        "/blogs",
+        params={"blog_name": blog_1.name, "fields": "name,likes_count"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["data"] == [{"id": str(blog_1.id), "name": blog_1.name, "likes_count": 1}]
+
+
+async def test__get_blog_400_unknown_fields(
+    async_client: AsyncClient,
+    async_session,
+):
+    blog_1 = await _add_blog(async_session)
+
+    response = await async_client.get(f"/blogs/{blog_1.id}", params={"fields": "name,password"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"].startswith("Fields password are not allowed")
+
+
 async def test__get_blog_404_nonexistent(
     async_client: AsyncClient,
 ):
@@ -226,6 +262,32 @@ async def test__list_blogs_200_sort_name(
     assert order_asc != order_dsc
 
 
+async def test__list_blogs_200_sort_trending(
+    async_client: AsyncClient,
+    access_token,
+    async_session,
+):
+    blog_1 = await _add_blog(async_session, name="Trending blog 1", likers=[], subscribers=[])
+    blog_2 = await _add_blog(async_session, name="Trending blog 2", likers=[], subscribers=[])
+    await async_client.post(f"/blogs/{blog_2.id}/like", headers={"Authorization": f"Bearer {access_token}"})
+    await async_client.post(f"/blogs/{blog_2.id}/subscribe", headers={"Authorization": f"Bearer {access_token}"})
+
+    response_trending = await async_client.get(
+        f"/blogs?limit=10&offset=0&blog_name=Trending blog&sort_by=trending&sort_order=descending",
+    )
+    await async_client.post(f"/blogs/{blog_2.id}/unlike", headers={"Authorization": f"Bearer {access_token}"})
+    await async_client.post(f"/blogs/{blog_2.id}/unsubscribe", headers={"Authorization": f"Bearer {access_token}"})
+    await async_client.post(f"/blogs/{blog_1.id}/like", headers={"Authorization": f"Bearer {access_token}"})
+    response_withdrawn = await async_client.get(
+        f"/blogs?limit=10&offset=0&blog_name=Trending blog&sort_by=trending&sort_order=descending",
+    )
+
+    assert response_trending.status_code == status.HTTP_200_OK
+    assert response_withdrawn.status_code == status.HTTP_200_OK
+    assert [blog["id"] for blog in response_trending.json()["data"]] == [str(blog_2.id), str(blog_1.id)]
+    assert [blog["id"] for blog in response_withdrawn.json()["data"]] == [str(blog_1.id), str(blog_2.id)]
+
+
 async def test__list_blogs_200_search_name(
     async_client: AsyncClient,
     async_session,
@@ -479,6 +541,33 @@ async def test__add_blog_authors_422_nonexisting_user(
     assert response.json()["detail"][0]["detail"] == f"User with id {user_1} not found"
 
 
+async def test__add_blog_authors_422_errors_of_every_user(
+    async_client: AsyncClient,
+    access_token,
+    async_session,
+):
+    user_1 = await _add_user(async_session)
+    user_2 = await _add_user(async_session)
+    user_3 = await _add_user(async_session)
+    user_4 = uuid.uuid4()
+    for _ in range(3):
+        await _add_blog(async_session, authors=[user_2])
+    blog_1 = await _add_blog(async_session, authors=[user_3])
+
+    response = await async_client.post(
+        f"/blogs/{blog_1.id}/add_authors",
+        json=[f"{user_1.id}", f"{user_2.id}", f"{user_3.id}", f"{user_4}"],
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["detail"] == [
+        {"status_code": status.HTTP_403_FORBIDDEN, "detail": f"User {user_2.id} already has 3 blogs!"},
+        {"status_code": status.HTTP_403_FORBIDDEN, "detail": f"User {user_3.id} is already an author!"},
+        {"status_code": status.HTTP_404_NOT_FOUND, "detail": f"User with id {user_4} not found"},
+    ]
+
+
 async def test__add_blog_authors_404_nonexisting_blog(
     async_client: AsyncClient,
     access_token,
@@ -825,6 +914,35 @@ async def test__update_blog_200_name(
     assert response.json()["name"] == payload["name"]
 
 
+async def test__update_blog_409_stale_version(
+    async_client: AsyncClient,
+    access_token,
+    async_session,
+):
+    blog_1 = await _add_blog(async_session)
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    read = await async_client.get(f"/blogs/{blog_1.id}")
+    first = await async_client.patch(
+        f"/blogs/{blog_1.id}",
+        headers={**headers, "If-Match": read.headers["etag"]},
+        json={"name": "Name of the first writer"},
+    )
+    second = await async_client.patch(
+        f"/blogs/{blog_1.id}",
+        headers={**headers, "If-Match": read.headers["etag"]},
+        json={"name": "Name of the second writer"},
+    )
+
+    assert first.status_code == status.HTTP_200_OK
+    assert first.headers["etag"] == f'"{read.json()["version"] + 1}"'
+    assert second.status_code == status.HTTP_409_CONFLICT
+    assert second.json()["detail"] == (
+        f"The blog {blog_1.id} was modified since it was read, read it again and retry!"
+    )
+    assert (await async_client.get(f"/blogs/{blog_1.id}")).json()["name"] == "Name of the first writer"
+
+
 async def test__update_blog_200_add_category(
     async_client: AsyncClient,
     access_token,
@@ -903,6 +1021,30 @@ async def test__update_blog_404_add_category_nonexistent(
     assert response.json()["detail"] == f"Failed to fetch category {cat_2}!"
 
 
+async def test__update_blog_422_invalid_categories(
+    async_client: AsyncClient,
+    access_token,
+    async_session,
+):
+    cat_1 = await _add_category(async_session, name="category12")
+    cat_2 = await _add_category(async_session, name="category13")
+    blog_1 = await _add_blog(async_session, categories=[cat_1])
+    cat_3 = uuid.uuid4()
+    payload = {"add_categories_id": [f"{cat_1.id}", f"{cat_3}"], "remove_categories_id": [f"{cat_2.id}"]}
+
+    response = await async_client.patch(
+        f"/blogs/{blog_1.id}", headers={"Authorization": f"Bearer {access_token}"},
+        json=payload,
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert [error["detail"] for error in response.json()["detail"]] == [
+        f"Blog {blog_1.id} already belongs to category {cat_1.id}!",
+        f"Failed to fetch category {cat_3}!",
+        f"Blog {blog_1.id} does not belong to category {cat_2.id}!",
+    ]
+
+
 async def test__update_blog_200_remove_category(
     async_client: AsyncClient,
     access_token,
@@ -1050,7 +1192,7 @@ async def test__update_blog_404_nonexistent_blog(
     assert response.json()["detail"] == f"Blog {blog_1} not found!"
 
 
-async def test__delete_blog_204(
+async def test__delete_blog_202(
     async_client: AsyncClient,
     access_token,
     async_session,
@@ -1062,7 +1204,7 @@ async def test__delete_blog_204(
         f"/blogs/{blog_1.id}", headers={"Authorization": f"Bearer {access_token}"},
     )
 
-    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert response.status_code == status.HTTP_202_ACCEPTED
 
 
 async def test__delete_blog_403_other_user_blog(
@@ -1078,3 +1220,84 @@ async def test__delete_blog_403_other_user_blog(
 
     assert response.status_code == status.HTTP_403_FORBIDDEN
     assert response.json()["detail"] == "To perform blog deletion you need either to be an admin or author of the blog!"
+
+
+@pytest.mark.asyncio
+async def test__batch_get_blogs_200(
+    async_client: AsyncClient,
+    async_session,
+):
+    blog_1 = await _add_blog(async_session)
+    blog_2 = await _add_blog(async_session)
+    missing_id = str(uuid.uuid4())
+
+    response = await async_client.get(
+        "/blogs/batch",
+        params={"ids": [str(blog_1.id), str(blog_2.id), missing_id, str(blog_1.id)]},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert set(response.json()["data"]) == {str(blog_1.id), str(blog_2.id)}
+    assert response.json()["data"][str(blog_2.id)]["name"] == blog_2.name
+    assert response.json()["missing"] == [missing_id]
+
+
+@pytest.mark.asyncio
+async def test__batch_get_blogs_400_limit_surpassed(
+    async_client: AsyncClient,
+):
+    response = await async_client.get(
+        "/blogs/batch",
+        params={"ids": [str(uuid.uuid4()) for _ in range(51)]},
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Batch cannot contain more than 50 ids!"
+
+
+@pytest.mark.asyncio
+async def test__get_recommended_blogs_200(
+    async_client: AsyncClient,
+    async_session,
+):
+    user = await _add_user(async_session, user_type=UserType.regular)
+    blog_a, blog_b, blog_c, blog_e, blog_f = [
+        await _add_blog(async_session, likers=[], subscribers=[]) for _ in range(5)
+    ]
+    blog_d = await _add_blog(async_session, likers=[], subscribers=[], archived=True)
+    await _add_subscriber_to_blog(async_session, user_id=user.id, blog_id=blog_a.id)
+    await _add_likers_to_blog(async_session, user_id=user.id, blog_id=blog_f.id)
+    await _add_author_to_blog(async_session, user_id=user.id, blog_id=blog_e.id)
+    for blogs in ([blog_a, blog_b, blog_f], [blog_a, blog_c], [blog_a, blog_d], [blog_a, blog_e]):
+        other_user = await _add_user(async_session, user_type=UserType.regular)
+        for blog in blogs:
+            await _add_likers_to_blog(async_session, user_id=other_user.id, blog_id=blog.id)
+    await RelatedService(async_session).refresh_blogs()
+
+    response = await async_client.get(
+        "/blogs/recommended",
+        headers={"Authorization": f"Bearer {create_access_token(user_id=user.id, user_type=UserType.regular)}"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    recommended = response.json()["data"]
+    # Followed, archived and own blogs are not recommended
+    assert [blog["id"] for blog in recommended] == [str(blog_b.id), str(blog_c.id)]
+    # Subscription of blog A weighs 2, like of blog F 1
+    assert recommended[0]["score"] == pytest.approx(2 / 8 ** 0.5 + 1 / 2 ** 0.5)
+    assert recommended[1]["score"] == pytest.approx(2 / 8 ** 0.5)
+
+
+@pytest.mark.asyncio
+async def test__get_recommended_blogs_400_limit_surpassed(
+    async_client: AsyncClient,
+    access_token,
+):
+    response = await async_client.get(
+        "/blogs/recommended",
+        params={"limit": 21},
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Pagination limit cannot be higher than 20!"
@@ -5,12 +5,15 @@ import pytest
 from fastapi import status
 from httpx import AsyncClient
 
+from dw_blog.config import Settings
 from tests.conftest import (_add_blog,
                             _add_likers_to_blog,
                             _add_user,
                             _add_category)
 from tests.factories import ADMIN_ID
 
+settings = Settings()
+
 
 @pytest.mark.asyncio
 async def test__add_category_201_admin(
@@ -201,6 +204,47 @@ async def test__list_categories_200_sort_by_blog_likes_count(
     assert order_asc != order_dsc
 
 
+async def test__get_category_200_top_liked_blogs(
+    async_client: AsyncClient,
+    access_token,
+    async_session,
+):
+    user_1 = await _add_user(async_session)
+    user_2 = await _add_user(async_session)
+    blog_1 = await _add_blog(async_session, likers=[user_1])
+    blog_2 = await _add_blog(async_session, likers=[user_1, user_2])
+    blog_3 = await _add_blog(async_session, likers=[])
+    cat_1 = await _add_category(async_session, blogs=[blog_1, blog_2, blog_3])
+
+    response = await async_client.get(
+        f"/categories/{cat_1.id}", headers={"Authorization": f"Bearer {access_token}"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["blogs_count"] == 3
+    assert [blog["blog_id"] for blog in response.json()["blogs"]] == [str(blog_2.id), str(blog_1.id), str(blog_3.id)]
+
+
+async def test__get_category_200_all_blogs(
+    async_client: AsyncClient,
+    access_token,
+    async_session,
+):
+    blogs = [await _add_blog(async_session, likers=[]) for _ in range(settings.CATEGORY_TOP_BLOGS + 1)]
+    cat_1 = await _add_category(async_session, blogs=blogs)
+
+    response = await async_client.get(
+        f"/categories/{cat_1.id}", headers={"Authorization": f"Bearer {access_token}"}
+    )
+    response_list = await async_client.get("/categories", params={"category_name": cat_1.name})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["blogs_count"] == len(blogs)
+    assert {blog["blog_id"] for blog in response.json()["blogs"]} == {str(blog.id) for blog in blogs}
+    # Listing serves only the most liked blogs of the category
+    assert len(response_list.json()["data"][0]["blogs"]) == settings.CATEGORY_TOP_BLOGS
+
+
 async def test__list_categories_200_approved(
     async_client: AsyncClient,
     access_token,
@@ -247,6 +291,34 @@ async def test__update_category_200(
     assert response.json()["approved"] == payload["approved"]
 
 
+async def test__update_category_409_stale_version(
+    async_client: AsyncClient,
+    access_token,
+    async_session,
+):
+    cat_1 = await _add_category(async_session, name="before_versions")
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    read = await async_client.get(f"/categories/{cat_1.id}")
+    any_version = await async_client.patch(
+        f"/categories/{cat_1.id}",
+        json={"name": "any_version"},
+        headers={**headers, "If-Match": "*"},
+    )
+    stale = await async_client.patch(
+        f"/categories/{cat_1.id}",
+        json={"name": "stale_version"},
+        headers={**headers, "If-Match": read.headers["etag"]},
+    )
+
+    assert any_version.status_code == status.HTTP_200_OK
+    assert any_version.json()["version"] == read.json()["version"] + 1
+    assert stale.status_code == status.HTTP_409_CONFLICT
+    assert stale.json()["detail"] == (
+        f"The category {cat_1.id} was modified since it was read, read it again and retry!"
+    )
+
+
 async def test__update_category_404_nonexistent_category(
     async_client: AsyncClient,
     access_token,
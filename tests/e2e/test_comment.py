@@ -0,0 +1,156 @@
+import uuid
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlmodel import select
+
+from dw_blog.models.comment import Comment
+from dw_blog.models.post import Post
+from tests.conftest import _add_blog, _add_post
+
+
+async def _add_comment(async_client, access_token, post_id, parent_id=None, text="Some comment"):
+    payload = {"post_id": str(post_id), "text": text}
+    if parent_id:
+        payload["parent_id"] = str(parent_id)
+    response = await async_client.post(
+        "/comments",
+        json=payload,
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test__add_comment_201_reply(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+):
+    blog = await _add_blog(async_session)
+    post = await _add_post(async_session, blog_id=blog.id)
+
+    comment = await _add_comment(async_client, access_token, post.id)
+    reply = await _add_comment(async_client, access_token, post.id, parent_id=comment["id"], text="Some reply")
+
+    assert reply["parent_id"] == comment["id"]
+    assert reply["depth"] == 1
+    assert reply["author_nickname"] == comment["author_nickname"]
+
+    response = await async_client.get(f"/comments/{comment['id']}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["replies_count"] == 1
+    result = await async_session.exec(select(Post.comments_count).where(Post.id == post.id))
+    assert result.one() == 2
+
+
+@pytest.mark.asyncio
+async def test__add_comment_400_parent_of_other_post(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+):
+    blog = await _add_blog(async_session)
+    post = await _add_post(async_session, blog_id=blog.id)
+    other_post = await _add_post(async_session, blog_id=blog.id)
+    comment = await _add_comment(async_client, access_token, other_post.id)
+
+    response = await async_client.post(
+        "/comments",
+        json={"post_id": str(post.id), "parent_id": comment["id"], "text": "Some reply"},
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == f"Comment {comment['id']} does not belong to post {post.id}!"
+
+
+@pytest.mark.asyncio
+async def test__list_comments_200_cursor_and_collapsed(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+):
+    blog = await _add_blog(async_session)
+    post = await _add_post(async_session, blog_id=blog.id)
+    top = [await _add_comment(async_client, access_token, post.id, text=f"Top {i}") for i in range(3)]
+    replies = [
+        await _add_comment(async_client, access_token, post.id, parent_id=top[2]["id"], text=f"Reply {i}")
+        for i in range(3)
+    ]
+    nested = await _add_comment(async_client, access_token, post.id, parent_id=replies[0]["id"], text="Nested")
+
+    # Newest thread first, replies follow their parents
+    response = await async_client.get("/comments", params={"post_id": str(post.id), "limit": 2})
+    assert response.status_code == status.HTTP_200_OK
+    page = response.json()
+    assert page["comments_count"] == 7
+    assert [comment["id"] for comment in page["data"]] == [
+        top[2]["id"], replies[0]["id"], nested["id"], replies[1]["id"], replies[2]["id"], top[1]["id"],
+    ]
+
+    response = await async_client.get(
+        "/comments",
+        params={"post_id": str(post.id), "limit": 2, "cursor": page["next_cursor"]},
+    )
+    assert [comment["id"] for comment in response.json()["data"]] == [top[0]["id"]]
+    assert response.json()["next_cursor"] is None
+
+    # Only first reply of every comment
+    response = await async_client.get(
+        "/comments",
+        params={"post_id": str(post.id), "limit": 1, "replies_limit": 1},
+    )
+    assert [comment["id"] for comment in response.json()["data"]] == [top[2]["id"], replies[0]["id"], nested["id"]]
+
+    response = await async_client.get(f"/comments/{replies[0]['id']}/thread")
+    assert [comment["id"] for comment in response.json()] == [replies[0]["id"], nested["id"]]
+
+
+@pytest.mark.asyncio
+async def test__delete_comment_204_with_replies(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+):
+    blog = await _add_blog(async_session)
+    post = await _add_post(async_session, blog_id=blog.id)
+    comment = await _add_comment(async_client, access_token, post.id)
+    reply = await _add_comment(async_client, access_token, post.id, parent_id=comment["id"])
+    await _add_comment(async_client, access_token, post.id, parent_id=reply["id"])
+    other_reply = await _add_comment(async_client, access_token, post.id, parent_id=comment["id"])
+
+    response = await async_client.delete(
+        f"/comments/{reply['id']}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    result = await async_session.exec(select(Comment.id).where(Comment.post_id == post.id))
+    assert {str(comment_id) for comment_id in result.all()} == {comment["id"], other_reply["id"]}
+    result = await async_session.exec(select(Post.comments_count).where(Post.id == post.id))
+    assert result.one() == 2
+    result = await async_session.exec(select(Comment.replies_count).where(Comment.id == uuid.UUID(comment["id"])))
+    assert result.one() == 1
+
+
+@pytest.mark.asyncio
+async def test__update_comment_403_not_author(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+    other_user_access_token,
+):
+    blog = await _add_blog(async_session)
+    post = await _add_post(async_session, blog_id=blog.id)
+    comment = await _add_comment(async_client, access_token, post.id)
+
+    response = await async_client.patch(
+        f"/comments/{comment['id']}",
+        json={"text": "Changed text"},
+        headers={"Authorization": f"Bearer {other_user_access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,178 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+from fastapi import Request, Response, status
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from dw_blog.db.db import get_session, replica_router
+from dw_blog.services.post import PostService
+from dw_blog.utils import deadline as deadline_utils
+from dw_blog.utils.deadline import (CLIENT_CLOSED_REQUEST, DEADLINE_HEADER, INTERNAL_SECRET_HEADER, QUERY_CANCELED,
+                                    Deadline, is_query_canceled, request_deadline, run_until_deadline)
+from main import app
+from tests.conftest import _add_blog, async_engine
+
+
+@pytest.mark.asyncio
+async def test__get_post_504_deadline_exceeded(
+    async_client: AsyncClient,
+    monkeypatch,
+):
+    async def get_slowly(self, post_id):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(PostService, "get", get_slowly)
+
+    response = await async_client.get(f"/posts/{uuid.uuid4()}", headers={DEADLINE_HEADER: "0.2"})
+
+    assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+    assert response.json()["detail"] == "Request did not finish within its deadline of 0.2 seconds!"
+
+
+@pytest.mark.asyncio
+async def test__get_post_504_statement_timeout(
+    async_client: AsyncClient,
+    monkeypatch,
+):
+    errors = []
+
+    async def get_stuck(self, post_id):
+        query = asyncio.ensure_future(self.db_session.execute(text("SELECT pg_sleep(5)")))
+        try:
+            await asyncio.shield(query)
+        except asyncio.CancelledError:
+            # Handler does not stop its query, Postgres does on the statement timeout
+            errors.extend(await asyncio.gather(query, return_exceptions=True))
+            raise
+
+    monkeypatch.setattr(PostService, "get", get_stuck)
+    # Sessions of the request are opened by the app, with their statement timeout
+    monkeypatch.delitem(app.dependency_overrides, get_session)
+    monkeypatch.setattr(replica_router, "primary", async_engine)
+    start = time.monotonic()
+
+    response = await async_client.get(f"/posts/{uuid.uuid4()}", headers={DEADLINE_HEADER: "0.5"})
+
+    assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+    assert response.json()["detail"] == "Request did not finish within its deadline of 0.5 seconds!"
+    assert time.monotonic() - start < 3
+    assert len(errors) == 1 and is_query_canceled(errors[0])
+
+
+@pytest.mark.asyncio
+async def test__get_post_504_deadline_header_only_shortens(
+    async_client: AsyncClient,
+    monkeypatch,
+):
+    async def get_slowly(self, post_id):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(PostService, "get", get_slowly)
+    monkeypatch.setattr(deadline_utils.settings, "REQUEST_DEADLINE", 0.2)
+    monkeypatch.setattr(deadline_utils.settings, "INTERNAL_SECRET", "internal")
+
+    response = await async_client.get(
+        f"/posts/{uuid.uuid4()}",
+        headers={DEADLINE_HEADER: "60", INTERNAL_SECRET_HEADER: "guessed"},
+    )
+
+    assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+    assert response.json()["detail"] == "Request did not finish within its deadline of 0.2 seconds!"
+
+
+def test__request_deadline_extended_by_internal_request(monkeypatch):
+    monkeypatch.setattr(deadline_utils.settings, "INTERNAL_SECRET", "internal")
+
+    def request(headers):
+        headers = [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+        return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+    def endpoint():
+        pass
+
+    internal = request({DEADLINE_HEADER: "120", INTERNAL_SECRET_HEADER: "internal"})
+    shorter = request({DEADLINE_HEADER: "1"})
+
+    assert request_deadline(internal, endpoint).seconds == 120
+    assert request_deadline(shorter, endpoint).seconds == 1
+    assert request_deadline(request({}), endpoint).seconds == deadline_utils.settings.REQUEST_DEADLINE
+
+
+@pytest.mark.asyncio
+async def test__add_tag_504_query_canceled_not_wrapped(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+):
+    class QueryCanceled(Exception):
+        sqlstate = QUERY_CANCELED
+
+    async def canceled_commit():
+        raise DBAPIError("INSERT INTO tag", {}, QueryCanceled("canceling statement due to statement timeout"))
+
+    blog = await _add_blog(async_session)
+    async_session.commit = canceled_commit
+    response = await async_client.post(
+        "/tags",
+        json={"name": "#canceled", "blog_id": str(blog.id)},
+        headers={"Authorization": f"Bearer {access_token}", DEADLINE_HEADER: "5"},
+    )
+    del async_session.commit
+    await async_session.rollback()
+
+    assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+    assert response.json()["detail"] == "Request did not finish within its deadline of 5 seconds!"
+
+
+@pytest.mark.asyncio
+async def test__run_until_deadline_cancelled_on_disconnect():
+    messages = [{"type": "http.request", "body": b"", "more_body": False}, {"type": "http.disconnect"}]
+
+    async def receive():
+        await asyncio.sleep(0.1)
+        return messages.pop(0)
+
+    cancelled = asyncio.Event()
+
+    async def handler(request: Request) -> Response:
+        assert (await request.receive())["type"] == "http.request"
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return Response()
+
+    request = Request({"type": "http", "method": "GET", "path": "/", "headers": []}, receive=receive)
+
+    response = await run_until_deadline(handler, request, Deadline(10))
+
+    assert response.status_code == CLIENT_CLOSED_REQUEST
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test__run_until_deadline_body_read_by_handler():
+    received = []
+
+    async def receive():
+        received.append(len(received))
+        return {"type": "http.request", "body": b"chunk", "more_body": True}
+
+    async def handler(request: Request) -> Response:
+        await asyncio.sleep(0.2)
+        assert (await request.receive())["body"] == b"chunk"
+        await asyncio.sleep(0.2)
+        return Response()
+
+    request = Request({"type": "http", "method": "POST", "path": "/", "headers": []}, receive=receive)
+
+    response = await run_until_deadline(handler, request, Deadline(10))
+
+    assert response.status_code == status.HTTP_200_OK
+    # Message in the queue and the one waiting for it, however long the handler takes
+    assert len(received) <= 3
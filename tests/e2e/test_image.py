@@ -0,0 +1,316 @@
+import asyncio
+import hashlib
+import io
+import uuid
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from PIL import Image as PILImage
+
+from dw_blog.services import image as image_service
+from dw_blog.utils.storage import content_path
+from dw_blog.utils.variants import VariantCache, VariantGenerator
+from tests.conftest import _add_blog, _add_post
+
+CONTENT = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 40
+
+
+@pytest.fixture
+def images_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_service.settings, "IMAGES_DIR", tmp_path)
+    return tmp_path
+
+
+async def _upload_image(async_client, access_token, post_id, content=CONTENT, content_type="image/png"):
+    return await async_client.post(
+        "/images",
+        data={"post_id": str(post_id), "title": "Some image"},
+        files={"file": ("image.png", content, content_type)},
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+
+@pytest.mark.asyncio
+async def test__upload_image_201_content_addressed(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+    images_dir,
+):
+    blog = await _add_blog(async_session)
+    post = await _add_post(async_session, blog_id=blog.id)
+    other_post = await _add_post(async_session, blog_id=blog.id)
+
+    response = await _upload_image(async_client, access_token, post.id)
+    other_response = await _upload_image(async_client, access_token, other_post.id)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    content_hash = hashlib.sha256(CONTENT).hexdigest()
+    assert response.json()["hash"] == content_hash
+    assert response.json()["size"] == len(CONTENT)
+    assert other_response.json()["hash"] == content_hash
+    assert other_response.json()["id"] != response.json()["id"]
+    stored = [path for path in images_dir.rglob("*") if path.is_file()]
+    assert stored == [content_path(images_dir, content_hash)]
+
+    response = await async_client.get("/images", params={"post_id": str(post.id)})
+    assert [image["hash"] for image in response.json()] == [content_hash]
+
+
+@pytest.mark.asyncio
+async def test__get_image_content_200_range_and_conditional(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+    images_dir,
+):
+    blog = await _add_blog(async_session)
+    post = await _add_post(async_session, blog_id=blog.id)
+    content_hash = (await _upload_image(async_client, access_token, post.id)).json()["hash"]
+
+    response = await async_client.get(f"/images/content/{content_hash}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == CONTENT
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["etag"] == f'"{content_hash}"'
+    assert "immutable" in response.headers["cache-control"]
+
+    response = await async_client.get(f"/images/content/{content_hash}", headers={"Range": "bytes=10-2057"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == CONTENT[10:2058]
+    assert response.headers["content-range"] == f"bytes 10-2057/{len(CONTENT)}"
+
+    response = await async_client.get(f"/images/content/{content_hash}", headers={"Range": "bytes=-8"})
+    assert response.content == CONTENT[-8:]
+
+    response = await async_client.get(
+        f"/images/content/{content_hash}",
+        headers={"Range": f"bytes={len(CONTENT)}-"},
+    )
+    assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+
+    response = await async_client.get(
+        f"/images/content/{content_hash}",
+        headers={"If-None-Match": f'"{content_hash}"'},
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+
+
+@pytest.mark.asyncio
+async def test__upload_image_415_not_an_image(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+    images_dir,
+):
+    blog = await _add_blog(async_session)
+    post = await _add_post(async_session, blog_id=blog.id)
+
+    response = await _upload_image(async_client, access_token, post.id, content_type="text/plain")
+
+    assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    assert response.json()["detail"] == "Image type text/plain is not supported!"
+
+
+@pytest.mark.asyncio
+async def test__upload_image_413_too_large_not_received(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+    images_dir,
+    monkeypatch,
+):
+    blog = await _add_blog(async_session)
+    post = await _add_post(async_session, blog_id=blog.id)
+    monkeypatch.setattr(image_service.settings, "IMAGE_MAX_SIZE", 4096)
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"post_id\"\r\n\r\n{post.id}\r\n"
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"title\"\r\n\r\nSome image\r\n"
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"image.png\"\r\n"
+        "Content-Type: image/png\r\n\r\n"
+    ).encode()
+    sent = []
+
+    async def body():
+        yield head
+        for _ in range(100):
+            sent.append(1024)
+            yield CONTENT[:1024]
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    response = await async_client.post(
+        "/images",
+        content=body(),
+        headers={
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+        },
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    # Body is read no further than the chunk over the limit and two read ahead, nothing is left on disk
+    assert sum(sent) <= 4096 + 3 * 1024
+    assert [path for path in images_dir.rglob("*") if path.is_file()] == []
+
+
+@pytest.mark.asyncio
+async def test__upload_image_422_fields_after_file(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+    images_dir,
+):
+    blog = await _add_blog(async_session)
+    post = await _add_post(async_session, blog_id=blog.id)
+
+    response = await async_client.post(
+        "/images",
+        files=[
+            ("file", ("image.png", CONTENT, "image/png")),
+            ("post_id", (None, str(post.id))),
+            ("title", (None, "Some image")),
+        ],
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["location"] == "post_id"
+    assert [path for path in images_dir.rglob("*") if path.is_file()] == []
+
+
+@pytest.mark.asyncio
+async def test__delete_image_204_shared_content(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+    images_dir,
+):
+    blog = await _add_blog(async_session)
+    post = await _add_post(async_session, blog_id=blog.id)
+    content = CONTENT + uuid.uuid4().bytes
+    image = (await _upload_image(async_client, access_token, post.id, content=content)).json()
+    other_image = (await _upload_image(async_client, access_token, post.id, content=content)).json()
+    path = content_path(images_dir, image["hash"])
+
+    response = await async_client.delete(
+        f"/images/{image['id']}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert path.is_file()
+
+    await async_client.delete(
+        f"/images/{other_image['id']}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert not path.exists()
+
+
+@pytest.mark.asyncio
+async def test__delete_image_400_failed_commit_keeps_content(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+    images_dir,
+):
+    blog = await _add_blog(async_session)
+    post = await _add_post(async_session, blog_id=blog.id)
+    image = (await _upload_image(async_client, access_token, post.id, content=CONTENT + uuid.uuid4().bytes)).json()
+    path = content_path(images_dir, image["hash"])
+
+    async def failed_commit():
+        raise RuntimeError("Connection lost")
+
+    async_session.commit = failed_commit
+    response = await async_client.delete(
+        f"/images/{image['id']}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    del async_session.commit
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert path.is_file()
+    response = await async_client.get(f"/images/content/{image['hash']}")
+    assert response.status_code == status.HTTP_200_OK
+
+
+def _png(width, height):
+    content = io.BytesIO()
+    PILImage.new("RGBA", (width, height), (200, 30, 30, 255)).save(content, format="PNG")
+    return content.getvalue()
+
+
+@pytest.mark.asyncio
+async def test__get_image_variant_200_rendered_once(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+    images_dir,
+    tmp_path_factory,
+    monkeypatch,
+):
+    generator = VariantGenerator(directory=tmp_path_factory.mktemp("variants"), max_bytes=10 ** 7, workers=1)
+    monkeypatch.setattr(image_service, "variant_generator", generator)
+    blog = await _add_blog(async_session)
+    post = await _add_post(async_session, blog_id=blog.id)
+    content_hash = (await _upload_image(async_client, access_token, post.id, content=_png(900, 300))).json()["hash"]
+    url = f"/images/content/{content_hash}/card"
+
+    # Concurrent requests wait for the same rendering
+    responses = await asyncio.gather(*[async_client.get(url) for _ in range(3)])
+    response = await async_client.get(url, params={"format": "jpeg"})
+    cached = await async_client.get(url)
+    generator.close()
+
+    assert [response.status_code for response in responses] == [status.HTTP_200_OK] * 3
+    assert responses[0].headers["content-type"] == "image/webp"
+    assert responses[0].headers["etag"] == f'"{content_hash}-card.webp"'
+    with PILImage.open(io.BytesIO(responses[0].content)) as variant:
+        assert (variant.format, variant.size) == ("WEBP", (600, 400))
+    with PILImage.open(io.BytesIO(response.content)) as variant:
+        assert variant.format == "JPEG"
+    assert cached.content == responses[0].content
+
+    response = await async_client.get("/images/variants/metrics")
+    metrics = response.json()
+    assert (metrics["generations"], metrics["misses"], metrics["coalesced"], metrics["hits"]) == (2, 2, 2, 1)
+    assert metrics["cache_entries"] == 2
+
+
+@pytest.mark.asyncio
+async def test__variant_cache_shared_directory_bounded(tmp_path):
+    # Two workers sharing the directory, each rescans after two variants
+    caches = [VariantCache(directory=tmp_path, max_bytes=1000, rescan_bytes=200) for _ in range(2)]
+    for number in range(20):
+        cache = caches[number % 2]
+        key = f"{number:02d}-thumbnail.webp"
+        path = cache.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * 100)
+        await cache.put(key, 100)
+
+    usage = sum(path.stat().st_size for path in tmp_path.glob("*/*"))
+    assert usage <= 1000 + 2 * 200
+    assert await caches[1].get("19-thumbnail.webp") is not None
+
+
+@pytest.mark.asyncio
+async def test__variant_cache_scanned_once(tmp_path, monkeypatch):
+    cache = VariantCache(directory=tmp_path, max_bytes=1000)
+    scans = []
+    scan = cache.scan
+
+    def counted_scan():
+        scans.append(1)
+        return scan()
+
+    monkeypatch.setattr(cache, "scan", counted_scan)
+
+    # Requests before the first scan finishes wait for it
+    results = await asyncio.gather(*[cache.get("missing-thumbnail.webp") for _ in range(5)])
+
+    assert results == [None] * 5
+    assert len(scans) == 1
@@ -0,0 +1,207 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlmodel import delete, select
+
+from dw_blog.config import Settings
+from dw_blog.models.job import Job, JobSchedule
+from dw_blog.schemas.job import JobStatus, JobType
+from dw_blog.services.category import refresh_category_stats
+from dw_blog.services.job import JOB_HANDLERS, JobService
+from tests.conftest import _add_author_to_blog, _add_blog, _add_category, _add_user
+from tests.factories import ADMIN_ID
+
+settings = Settings()
+
+
+async def _clear_jobs(async_session):
+    await async_session.exec(delete(Job))
+    await async_session.commit()
+
+
+@pytest.mark.asyncio
+async def test__delete_blog_enqueues_purge_job(
+    async_client: AsyncClient,
+    access_token,
+    async_session,
+):
+    await _clear_jobs(async_session)
+    blog_1 = await _add_blog(async_session)
+    await _add_author_to_blog(async_session, user_id=ADMIN_ID, blog_id=blog_1.id)
+
+    response = await async_client.delete(
+        f"/blogs/{blog_1.id}", headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    result = await async_session.exec(select(Job).where(Job.type == JobType.purge))
+    job = result.one()
+    assert job.type == JobType.purge
+    assert job.status == JobStatus.queued
+    assert job.payload == {"purge_id": response.json()["id"]}
+
+
+@pytest.mark.asyncio
+async def test__claim_jobs_concurrency_limit_and_retry(
+    async_session,
+):
+    await _clear_jobs(async_session)
+    job_service = JobService(async_session)
+    for _ in range(settings.PURGE_CONCURRENCY + 1):
+        job_service.enqueue(job_type=JobType.purge, payload={}, max_attempts=2)
+    await async_session.commit()
+
+    # Purge jobs are limited by their concurrency, not by the batch size
+    jobs = await job_service.claim(batch_size=10)
+    assert len(jobs) == settings.PURGE_CONCURRENCY
+    assert all(job.attempts == 1 for job in jobs)
+    assert await job_service.claim(batch_size=10) == []
+
+    # Failed job is retried after the backoff, its slot is taken by the next one
+    await job_service.fail(jobs[0], error="Some error")
+    retried = await async_session.get(Job, jobs[0].id)
+    await async_session.refresh(retried)
+    assert retried.status == JobStatus.queued
+    assert retried.error == "Some error"
+    assert retried.run_at > jobs[0].run_at
+    claimed = await job_service.claim(batch_size=10)
+    assert len(claimed) == 1
+    assert claimed[0].id != jobs[0].id
+
+    # Job is failed for good once it runs out of attempts
+    jobs[1].attempts = 2
+    await job_service.fail(jobs[1], error="Other error")
+    failed = await async_session.get(Job, jobs[1].id)
+    await async_session.refresh(failed)
+    assert failed.status == JobStatus.failed
+    assert failed.date_finished is not None
+
+
+@pytest.mark.asyncio
+async def test__get_job_metrics_200(
+    async_client: AsyncClient,
+    access_token,
+    async_session,
+):
+    await _clear_jobs(async_session)
+    job_service = JobService(async_session)
+    for _ in range(3):
+        job_service.enqueue(job_type=JobType.purge, payload={})
+    await async_session.commit()
+    job = (await job_service.claim(batch_size=1))[0]
+    await job_service.finish(job)
+
+    response = await async_client.get("/jobs/metrics", headers={"Authorization": f"Bearer {access_token}"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["window_seconds"] == settings.JOB_METRICS_WINDOW
+    metrics = response.json()["data"][0]
+    assert metrics["type"] == "purge"
+    assert metrics["queued"] == 2
+    assert metrics["due"] == 2
+    assert metrics["running"] == 0
+    assert metrics["done"] == 1
+    assert metrics["wait_seconds_avg"] >= 0
+    assert metrics["run_seconds_avg"] >= 0
+
+
+@pytest.mark.asyncio
+async def test__get_job_metrics_403_not_admin(
+    async_client: AsyncClient,
+    other_user_access_token,
+):
+    response = await async_client.get(
+        "/jobs/metrics", headers={"Authorization": f"Bearer {other_user_access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.asyncio
+async def test__schedule_periodic_jobs_once(
+    async_session,
+):
+    await _clear_jobs(async_session)
+    await async_session.exec(delete(JobSchedule))
+    await async_session.commit()
+    job_service = JobService(async_session)
+    periodic = {job_type for job_type, handler in JOB_HANDLERS.items() if handler.every}
+
+    # Every periodic type is enqueued on the first poll, not again before its next run
+    assert set(await job_service.schedule()) == periodic
+    assert await job_service.schedule() == []
+    jobs = (await async_session.exec(select(Job))).all()
+    assert sorted(job.type for job in jobs) == sorted(periodic)
+    assert all(job.payload == {} for job in jobs)
+
+    # Type is enqueued again once its next run passes
+    schedule = await async_session.get(JobSchedule, JobType.trending)
+    schedule.next_run_at = datetime.utcnow() - timedelta(seconds=1)
+    await async_session.commit()
+    assert await job_service.schedule() == [JobType.trending]
+
+
+@pytest.mark.asyncio
+async def test__like_blog_refreshes_category_stats_together(
+    async_client: AsyncClient,
+    access_token,
+    other_user_access_token,
+    async_session,
+):
+    user_1 = await _add_user(async_session)
+    blog_1 = await _add_blog(async_session, likers=[user_1])
+    blog_2 = await _add_blog(async_session, likers=[])
+    cat_1 = await _add_category(async_session, blogs=[blog_1, blog_2])
+    await _clear_jobs(async_session)
+
+    for token in (access_token, other_user_access_token):
+        response = await async_client.post(
+            f"/blogs/{blog_2.id}/like", headers={"Authorization": f"Bearer {token}"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+    # Likes only queue refreshes, which are run by the first job
+    jobs = (await async_session.exec(select(Job).where(Job.type == JobType.category_stats))).all()
+    assert len(jobs) == 2
+    assert all(job.payload == {"blog_ids": [str(blog_2.id)]} for job in jobs)
+    # Listing is served from the stats, which are not refreshed yet
+    response = await async_client.get("/categories", params={"category_name": cat_1.name})
+    assert response.json()["data"][0]["blogs"][0]["blog_id"] == str(blog_1.id)
+
+    await async_session.exec(delete(Job).where(Job.id == jobs[0].id))
+    await refresh_category_stats(async_session, jobs[0].payload)
+
+    assert (await async_session.exec(select(Job))).all() == []
+    response = await async_client.get("/categories", params={"category_name": cat_1.name})
+    assert response.json()["data"][0]["blogs"][0]["blog_id"] == str(blog_2.id)
+
+
+@pytest.mark.asyncio
+async def test__delete_blog_refreshes_category_stats(
+    async_client: AsyncClient,
+    access_token,
+    async_session,
+):
+    blog_1 = await _add_blog(async_session, likers=[])
+    blog_2 = await _add_blog(async_session, likers=[])
+    cat_1 = await _add_category(async_session, blogs=[blog_1, blog_2])
+    await _clear_jobs(async_session)
+
+    response = await async_client.delete(f"/blogs/{blog_1.id}", headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == status.HTTP_202_ACCEPTED
+
+    # Deletion only queues the refresh, categories are passed as links are purged aside
+    job = (await async_session.exec(select(Job).where(Job.type == JobType.category_stats))).one()
+    assert job.payload["blog_ids"] == [str(blog_1.id)]
+    assert str(cat_1.id) in job.payload["category_ids"]
+    response = await async_client.get("/categories", params={"category_name": cat_1.name})
+    assert response.json()["data"][0]["blogs_count"] == 2
+
+    await async_session.exec(delete(Job).where(Job.id == job.id))
+    await refresh_category_stats(async_session, job.payload)
+
+    response = await async_client.get("/categories", params={"category_name": cat_1.name})
+    assert response.json()["data"][0]["blogs_count"] == 1
+    assert [blog["blog_id"] for blog in response.json()["data"][0]["blogs"]] == [str(blog_2.id)]
@@ -1,17 +1,42 @@
-# import uuid
-# from datetime import datetime, timedelta
-#
-# import pytest
-# from fastapi import status
-# from httpx import AsyncClient
-#
-# from tests.conftest import (_add_blog,
-#                             _add_likers_to_blog,
-#                             _add_user,
-#                             _add_category)
-# from tests.factories import ADMIN_ID
-#
-#
+import asyncio
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlmodel import delete, select
+
+from dw_blog.config import Settings
+from dw_blog.models.job import Job
+from dw_blog.models.post import Post
+from dw_blog.models.tag import TagPosts, TagSubscribers
+from dw_blog.queries.post import POST_EVENTS_CHANNEL
+from dw_blog.schemas.job import JobType
+from dw_blog.schemas.post import PostEventRead, PostEventType
+from dw_blog.services.post import PostService, post_event_broker
+from dw_blog.services.related import RelatedService, refresh_related_posts
+from dw_blog.utils.events import RESET, PostEventBroker, stream_events
+from tests.conftest import _add_blog, _add_post, _add_subscriber_to_blog, _add_tag, _add_user
+
+settings = Settings()
+
+
+def _post_event(event_id, blog_id, tags_ids=()):
+    return PostEventRead(
+        id=event_id,
+        type=PostEventType.published,
+        post_id=uuid.uuid4(),
+        blog_id=blog_id,
+        tags_ids=list(tags_ids),
+        title=f"Post {event_id}",
+        date_modified=datetime.utcnow(),
+    )
+
+
 # @pytest.mark.asyncio
 # async def test__add_post_201(
 #     async_client: AsyncClient,
@@ -26,3 +51,609 @@
 #     assert response.status_code == status.HTTP_201_CREATED
 #     assert response.json()["name"] == payload["name"]
 #     assert response.json()["approved"] is True
+
+
+@pytest.mark.asyncio
+async def test__add_post_201(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+):
+    blog = await _add_blog(async_session)
+    tags = [await _add_tag(async_session, blog=blog, blog_id=blog.id, name=f"Tag {name}") for name in "ba"]
+    payload = {
+        "title": "Newest post!",
+        "body": "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
+        "published": True,
+        "notes": ["First note"],
+        "tags_ids": [str(tag.id) for tag in tags],
+        "authors_ids": [str(blog.authors[0].id)],
+        "blog_id": str(blog.id),
+    }
+
+    response = await async_client.post("/posts", json=payload, headers={"Authorization": f"Bearer {access_token}"})
+
+    assert response.status_code == status.HTTP_201_CREATED
+    post = response.json()
+    assert (post["title"], post["notes"], post["likers"]) == (payload["title"], payload["notes"], [])
+    assert post["blog"] == {"id": str(blog.id), "name": blog.name}
+    assert post["authors"] == [{"id": str(blog.authors[0].id), "nickname": blog.authors[0].nickname}]
+    assert post["tags"] == [{"id": str(tag.id), "name": tag.name} for tag in reversed(tags)]
+    assert post["version"] == 1
+
+    response = await async_client.get(f"/posts/{post['id']}")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert {tag["id"] for tag in response.json()["tags"]} == set(payload["tags_ids"])
+    assert [author["id"] for author in response.json()["authors"]] == payload["authors_ids"]
+
+    response = await async_client.post("/posts", json=payload, headers={"Authorization": f"Bearer {access_token}"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == f"Post with title {payload['title']} already exists for blog {blog.id}!"
+
+
+@pytest.mark.asyncio
+async def test__add_post_invalid_nothing_added(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+    other_user_access_token,
+):
+    blog = await _add_blog(async_session)
+    other_blog = await _add_blog(async_session)
+    tag = await _add_tag(async_session, blog=other_blog, blog_id=other_blog.id)
+    payload = {
+        "title": "Invalid post",
+        "body": "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
+        "published": True,
+        "tags_ids": [str(tag.id)],
+        "authors_ids": [str(blog.authors[0].id)],
+        "blog_id": str(blog.id),
+    }
+
+    response = await async_client.post("/posts", json=payload, headers={"Authorization": f"Bearer {access_token}"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == f"Tag {tag.id} does not belong to blog {blog.id}!"
+
+    response = await async_client.post(
+        "/posts",
+        json={**payload, "tags_ids": [], "authors_ids": [str(other_blog.authors[0].id)]},
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert response.json()["detail"] == (
+        f"To perform post addition user {other_blog.authors[0].id} needs author status for blog {blog.id}!"
+    )
+
+    response = await async_client.post(
+        "/posts",
+        json={**payload, "tags_ids": []},
+        headers={"Authorization": f"Bearer {other_user_access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert response.json()["detail"] == "To perform post addition you need either to be an admin or author of the blog!"
+
+    response = await async_client.post(
+        "/posts",
+        json={**payload, "blog_id": str(uuid.uuid4())},
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    result = await async_session.exec(select(Post).where(Post.title == payload["title"]))
+    assert result.all() == []
+
+
+@pytest.mark.asyncio
+async def test__export_posts_200_ndjson(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+):
+    blog = await _add_blog(async_session)
+    other_blog = await _add_blog(async_session)
+    tag = await _add_tag(async_session, name="#export_b", blog=blog, blog_id=blog.id)
+    other_tag = await _add_tag(async_session, name="#export_a", blog=blog, blog_id=blog.id)
+    deleted_tag = await _add_tag(
+        async_session, name="#export_c", blog=blog, blog_id=blog.id, date_deleted=datetime.utcnow(),
+    )
+    post_1 = await _add_post(async_session, blog_id=blog.id, tags=[tag, other_tag, deleted_tag])
+    post_2 = await _add_post(async_session, blog_id=blog.id)
+    await _add_post(async_session, blog_id=other_blog.id)
+
+    response = await async_client.get(
+        "/posts/export",
+        params={"blog_id": str(blog.id)},
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = {row["id"]: row for row in map(json.loads, response.text.splitlines())}
+    assert set(rows) == {str(post_1.id), str(post_2.id)}
+    # Ids and names pair up, deleted tags are left out
+    assert list(zip(rows[str(post_1.id)]["tags_ids"], rows[str(post_1.id)]["tags_names"])) == [
+        (str(other_tag.id), other_tag.name),
+        (str(tag.id), tag.name),
+    ]
+    assert rows[str(post_1.id)]["authors_nicknames"] == [post_1.authors[0].nickname]
+    assert rows[str(post_2.id)]["tags_ids"] == []
+
+
+@pytest.mark.asyncio
+async def test__export_posts_200_csv_author(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+):
+    blog = await _add_blog(async_session)
+    post = await _add_post(async_session, blog_id=blog.id)
+    await _add_post(async_session, blog_id=blog.id)
+
+    response = await async_client.get(
+        "/posts/export",
+        params={"author_id": str(post.authors[0].id), "export_format": "csv"},
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert rows[0]["id"] == str(post.id)
+    assert json.loads(rows[0]["authors_ids"]) == [str(post.authors[0].id)]
+
+
+@pytest.mark.asyncio
+async def test__export_posts_403_all_posts_not_admin(
+    async_client: AsyncClient,
+    other_user_access_token,
+):
+    response = await async_client.get(
+        "/posts/export",
+        headers={"Authorization": f"Bearer {other_user_access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert response.json()["detail"] == "To perform posts export you need admin status!"
+
+
+@pytest.mark.asyncio
+async def test__list_posts_200_search_tags_and_authors(
+    async_client: AsyncClient,
+    async_session,
+):
+    blog = await _add_blog(async_session)
+    tag_1 = await _add_tag(async_session, blog=blog, blog_id=blog.id)
+    tag_2 = await _add_tag(async_session, blog=blog, blog_id=blog.id)
+    tag_3 = await _add_tag(async_session, blog=blog, blog_id=blog.id)
+    post_1 = await _add_post(async_session, blog_id=blog.id, tags=[tag_1])
+    post_2 = await _add_post(async_session, blog_id=blog.id, tags=[tag_2])
+    await _add_post(async_session, blog_id=blog.id, tags=[tag_3])
+
+    response = await async_client.get(
+        "/posts",
+        params={"blog_id": str(blog.id), "tags_ids": [str(tag_1.id), str(tag_2.id)]},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["pagination"]["total_records"] == 2
+    assert {post["id"] for post in response.json()["data"]} == {str(post_1.id), str(post_2.id)}
+
+    response = await async_client.get(
+        "/posts",
+        params={
+            "blog_id": str(blog.id),
+            "authors_ids": [str(post_2.authors[0].id)],
+            "title_search": post_2.title,
+        },
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["pagination"]["total_records"] == 1
+    assert response.json()["data"][0]["id"] == str(post_2.id)
+
+    response = await async_client.get(
+        "/posts",
+        params={"blog_id": str(blog.id), "tags_ids": [str(tag_1.id)], "fields": "title,tags"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["data"] == [
+        {"id": str(post_1.id), "title": post_1.title, "tags": [{"id": str(tag_1.id), "name": tag_1.name}]},
+    ]
+
+
+@pytest.mark.asyncio
+async def test__list_posts_200_tags_paired_by_name(
+    async_client: AsyncClient,
+    async_session,
+):
+    blog = await _add_blog(async_session)
+    tags = [await _add_tag(async_session, blog=blog, blog_id=blog.id, name=f"Tag {name}") for name in "cab"]
+    post = await _add_post(async_session, blog_id=blog.id, tags=tags)
+    await _add_post(async_session, blog_id=blog.id)
+
+    response = await async_client.get(
+        "/posts",
+        params={"blog_id": str(blog.id), "fields": "tags"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    listed = {row["id"]: row for row in response.json()["data"]}
+    assert [row["tags"] for post_id, row in listed.items() if post_id != str(post.id)] == [[]]
+    assert listed[str(post.id)]["tags"] == [
+        {"id": str(tag.id), "name": tag.name} for tag in sorted(tags, key=lambda tag: tag.name)
+    ]
+
+
+@pytest.mark.asyncio
+async def test__list_posts_200_excerpt_instead_of_body(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+):
+    blog = await _add_blog(async_session)
+    body = "Lorem ipsum dolor sit amet,\n\nconsectetur adipiscing elit. " * 30
+    payload = {
+        "title": "Long read",
+        "body": body,
+        "published": True,
+        "tags_ids": [],
+        "authors_ids": [str(blog.authors[0].id)],
+        "blog_id": str(blog.id),
+    }
+    response = await async_client.post("/posts", json=payload, headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == status.HTTP_201_CREATED
+    post_id = response.json()["id"]
+    assert (response.json()["word_count"], response.json()["reading_time"]) == (240, 2)
+
+    response = await async_client.get("/posts", params={"blog_id": str(blog.id), "body_search": "adipiscing"})
+
+    assert response.status_code == status.HTTP_200_OK
+    post = response.json()["data"][0]
+    assert post["id"] == post_id
+    assert "body" not in post and "notes" not in post
+    # Cut after the last whole word, trailing comma dropped
+    assert post["excerpt"] == " ".join(body.split())[:197].rstrip(",") + "..."
+    assert post["excerpt"].endswith("dolor sit amet...")
+    assert (post["word_count"], post["reading_time"]) == (240, 2)
+
+    await async_client.post(f"/posts/{post_id}/like", headers={"Authorization": f"Bearer {access_token}"})
+    response = await async_client.get("/posts/list_user_posts", headers={"Authorization": f"Bearer {access_token}"})
+
+    assert response.status_code == status.HTTP_200_OK
+    post = next(post for post in response.json()["data"] if post["id"] == post_id)
+    assert post["excerpt"].endswith("dolor sit amet...")
+    assert post["blog_name"] == blog.name
+
+
+@pytest.mark.asyncio
+async def test__list_posts_200_sort_trending(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+):
+    blog = await _add_blog(async_session)
+    post_1 = await _add_post(async_session, blog_id=blog.id)
+    post_2 = await _add_post(async_session, blog_id=blog.id)
+    # Post created through the API is listed by trending before any like
+    payload = {
+        "title": "Trending post",
+        "body": "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
+        "published": True,
+        "tags_ids": [],
+        "authors_ids": [str(blog.authors[0].id)],
+        "blog_id": str(blog.id),
+    }
+    response = await async_client.post("/posts", json=payload, headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == status.HTTP_201_CREATED
+    post_3_id = response.json()["id"]
+    await async_client.post(f"/posts/{post_2.id}/like", headers={"Authorization": f"Bearer {access_token}"})
+
+    response_trending = await async_client.get(
+        "/posts",
+        params={"blog_id": str(blog.id), "sort_by": "trending", "sort_order": "descending"},
+    )
+    await async_client.post(f"/posts/{post_2.id}/unlike", headers={"Authorization": f"Bearer {access_token}"})
+    await async_client.post(f"/posts/{post_1.id}/like", headers={"Authorization": f"Bearer {access_token}"})
+    response_withdrawn = await async_client.get(
+        "/posts",
+        params={"blog_id": str(blog.id), "sort_by": "trending", "sort_order": "descending"},
+    )
+
+    assert response_trending.status_code == status.HTTP_200_OK
+    assert response_withdrawn.status_code == status.HTTP_200_OK
+    # Posts without likes follow by date of creation
+    assert [post["id"] for post in response_trending.json()["data"]] == [str(post_2.id), post_3_id, str(post_1.id)]
+    assert [post["id"] for post in response_withdrawn.json()["data"]] == [str(post_1.id), post_3_id, str(post_2.id)]
+
+
+@pytest.mark.asyncio
+async def test__batch_get_posts_200(
+    async_client: AsyncClient,
+    async_session,
+):
+    blog = await _add_blog(async_session)
+    tag = await _add_tag(async_session, blog=blog, blog_id=blog.id)
+    post_1 = await _add_post(async_session, blog_id=blog.id, tags=[tag])
+    post_2 = await _add_post(async_session, blog_id=blog.id)
+    missing_id = str(uuid.uuid4())
+
+    response = await async_client.get(
+        "/posts/batch",
+        params={"ids": [str(post_1.id), missing_id, str(post_2.id)]},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()["data"]
+    assert set(data) == {str(post_1.id), str(post_2.id)}
+    assert data[str(post_1.id)]["tags"] == [{"id": str(tag.id), "name": tag.name}]
+    assert data[str(post_2.id)]["blog"]["id"] == str(blog.id)
+    assert response.json()["missing"] == [missing_id]
+
+
+@pytest.mark.asyncio
+async def test__update_post_409_stale_version(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+):
+    blog = await _add_blog(async_session)
+    post = await _add_post(async_session, blog_id=blog.id)
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    read = await async_client.get(f"/posts/{post.id}")
+    first = await async_client.patch(
+        f"/posts/{post.id}",
+        json={"title": "Title of the first writer"},
+        headers={**headers, "If-Match": read.headers["etag"]},
+    )
+    second = await async_client.patch(
+        f"/posts/{post.id}",
+        json={"title": "Title of the second writer"},
+        headers={**headers, "If-Match": read.headers["etag"]},
+    )
+
+    assert read.headers["etag"] == '"1"'
+    assert first.status_code == status.HTTP_200_OK
+    assert (first.json()["version"], first.headers["etag"]) == (2, '"2"')
+    assert second.status_code == status.HTTP_409_CONFLICT
+    assert second.json()["detail"] == (
+        f"The post {post.id} was modified since it was read, read it again and retry!"
+    )
+    assert (await async_client.get(f"/posts/{post.id}")).json()["title"] == "Title of the first writer"
+
+
+@pytest.mark.asyncio
+async def test__bulk_tag_posts_200(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+):
+    blog = await _add_blog(async_session)
+    tag_1 = await _add_tag(async_session, blog=blog, blog_id=blog.id)
+    tag_2 = await _add_tag(async_session, blog=blog, blog_id=blog.id)
+    post_1 = await _add_post(async_session, blog_id=blog.id, tags=[tag_1])
+    post_2 = await _add_post(async_session, blog_id=blog.id)
+    payload = {"posts_ids": [str(post_1.id), str(post_2.id)], "tags_ids": [str(tag_1.id), str(tag_2.id)]}
+
+    response = await async_client.post(
+        "/posts/bulk_tag",
+        json=payload,
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["changed"] == 3
+
+    response = await async_client.post(
+        "/posts/bulk_untag",
+        json={"posts_ids": payload["posts_ids"], "tags_ids": [str(tag_1.id)]},
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["changed"] == 2
+    result = await async_session.exec(select(TagPosts).where(TagPosts.post_id.in_([post_1.id, post_2.id])))
+    assert {post_tag.tag_id for post_tag in result.all()} == {tag_2.id}
+
+
+@pytest.mark.asyncio
+async def test__bulk_tag_posts_422_invalid_items(
+    async_client: AsyncClient,
+    async_session,
+    other_user_access_token,
+):
+    blog = await _add_blog(async_session)
+    other_blog = await _add_blog(async_session)
+    tag = await _add_tag(async_session, blog=other_blog, blog_id=other_blog.id)
+    post = await _add_post(async_session, blog_id=blog.id)
+    missing_id = uuid.uuid4()
+
+    response = await async_client.post(
+        "/posts/bulk_tag",
+        json={"posts_ids": [str(post.id), str(missing_id)], "tags_ids": [str(tag.id)]},
+        headers={"Authorization": f"Bearer {other_user_access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    errors = response.json()["detail"]
+    assert [error["status_code"] for error in errors] == [403, 404, 400]
+    assert errors[1]["detail"] == f"Post with id {missing_id} not found!"
+    assert errors[2]["detail"] == f"Tag {tag.id} does not belong to blog {blog.id}!"
+
+
+@pytest.mark.asyncio
+async def test__post_events_published_and_updated(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+):
+    blog = await _add_blog(async_session)
+    tag = await _add_tag(async_session, blog=blog, blog_id=blog.id, name="Tag events")
+    other_blog = await _add_blog(async_session)
+    broker = PostEventBroker(
+        url=settings.DATABASE_URL_TEST, channel=POST_EVENTS_CHANNEL, buffer_size=10, replay_size=10, heartbeat=1,
+    )
+    broker.start()
+    await asyncio.sleep(1)
+    subscription = broker.subscribe(blogs_ids=[], tags_ids=[tag.id])
+    headers = {"Authorization": f"Bearer {access_token}"}
+    payload = {
+        "title": "Post with events",
+        "body": "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
+        "tags_ids": [str(tag.id)],
+        "authors_ids": [str(blog.authors[0].id)],
+        "blog_id": str(blog.id),
+    }
+
+    try:
+        published = await async_client.post("/posts", json={**payload, "published": True}, headers=headers)
+        await async_client.post(
+            "/posts", json={**payload, "title": "Draft", "published": False}, headers=headers,
+        )
+        await _add_post(async_session, blog_id=other_blog.id)
+        updated = await async_client.patch(
+            f"/posts/{published.json()['id']}", json={"title": "Post with events updated"}, headers=headers,
+        )
+        first = await asyncio.wait_for(subscription.queue.get(), timeout=5)
+        second = await asyncio.wait_for(subscription.queue.get(), timeout=5)
+    finally:
+        await broker.stop()
+
+    assert updated.status_code == status.HTTP_200_OK
+    # Drafts and posts of other blogs are not sent
+    assert subscription.queue.empty()
+    assert (first.type, str(first.post_id), first.tags_ids) == (
+        PostEventType.published, published.json()["id"], [tag.id],
+    )
+    assert (second.type, second.title, second.blog_id) == (PostEventType.updated, "Post with events updated", blog.id)
+    assert second.id > first.id
+
+
+@pytest.mark.asyncio
+async def test__post_events_resume_reset_and_drop():
+    blog_id, other_blog_id, tag_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    broker = PostEventBroker(
+        url=settings.DATABASE_URL_TEST, channel=POST_EVENTS_CHANNEL, buffer_size=2, replay_size=3, heartbeat=1,
+    )
+    for event_id, event_blog_id, tags_ids in [
+        (1, blog_id, []), (2, other_blog_id, []), (3, other_blog_id, [tag_id]), (4, blog_id, []),
+    ]:
+        broker.publish(_post_event(event_id, event_blog_id, tags_ids))
+
+    # Events after the last one are replayed, those of other blogs and tags are skipped
+    resumed = broker.subscribe(blogs_ids=[blog_id], tags_ids=[tag_id], last_event_id=2)
+    assert [resumed.queue.get_nowait().id for _ in range(2)] == [3, 4]
+    # First event is no longer kept, so the client has to refetch
+    reset = broker.subscribe(blogs_ids=[blog_id], tags_ids=[], last_event_id=1)
+    assert reset.queue.get_nowait() is RESET
+
+    # Slow consumer is dropped once its buffer is full, it is sent what was buffered
+    for event_id in (5, 6, 7):
+        broker.publish(_post_event(event_id, blog_id))
+    assert (resumed.dropped, reset.dropped) == (True, True)
+    assert broker.subscriptions == set()
+    assert broker.by_tag == {}
+    assert [event.id for event in broker.replay] == [5, 6, 7]
+
+    stream = stream_events(
+        broker=broker, blogs_ids=[blog_id], tags_ids=[], last_event_id=5, heartbeat=0.1, retry=1000,
+    )
+    assert await stream.__anext__() == "retry: 1000\n\n"
+    assert (await stream.__anext__()).startswith("id: 6\nevent: post_published\ndata: {")
+    assert (await stream.__anext__()).startswith("id: 7\n")
+    assert await stream.__anext__() == ": heartbeat\n\n"
+    await stream.aclose()
+    assert broker.subscriptions == set()
+
+
+@pytest.mark.asyncio
+async def test__post_events_of_user_subscriptions(
+    async_session,
+):
+    user = await _add_user(async_session)
+    blog = await _add_blog(async_session)
+    other_blog = await _add_blog(async_session)
+    tag = await _add_tag(async_session, blog=other_blog, blog_id=other_blog.id, name="Tag subscribed")
+    await _add_subscriber_to_blog(async_session, user_id=user.id, blog_id=blog.id)
+    async_session.add(TagSubscribers(tag_id=tag.id, subscriber_id=user.id))
+    await async_session.commit()
+
+    stream = await PostService(async_session).events(current_user={"user_id": str(user.id), "user_type": "regular"})
+    await stream.__anext__()
+    post_event_broker.publish(_post_event(1, uuid.uuid4()))
+    post_event_broker.publish(_post_event(2, other_blog.id, [tag.id]))
+    post_event_broker.publish(_post_event(3, blog.id))
+    events = [await stream.__anext__() for _ in range(2)]
+    await stream.aclose()
+
+    assert [event.split("\n")[0] for event in events] == ["id: 2", "id: 3"]
+    assert post_event_broker.subscriptions == set()
+
+
+@pytest.mark.asyncio
+async def test__stream_post_events_401(
+    async_client: AsyncClient,
+):
+    response = await async_client.get("/posts/events")
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test__get_related_posts_200_refreshed_incrementally(
+    async_client: AsyncClient,
+    async_session,
+    access_token,
+):
+    blog = await _add_blog(async_session)
+    tag_1, tag_2, tag_3 = [await _add_tag(async_session, blog=blog, blog_id=blog.id) for _ in range(3)]
+    post_1 = await _add_post(async_session, blog_id=blog.id, tags=[tag_1, tag_2])
+    post_2 = await _add_post(async_session, blog_id=blog.id, tags=[tag_1, tag_2])
+    post_3 = await _add_post(async_session, blog_id=blog.id, tags=[tag_1])
+    post_4 = await _add_post(async_session, blog_id=blog.id, tags=[tag_3])
+    await _add_post(async_session, blog_id=blog.id, tags=[tag_1, tag_2], published=False)
+    await RelatedService(async_session).refresh()
+    await async_session.commit()
+
+    response = await async_client.get(f"/posts/{post_1.id}/related")
+
+    assert response.status_code == status.HTTP_200_OK
+    related = response.json()["data"]
+    # Unpublished posts and posts without shared tags are not related
+    assert [post["id"] for post in related] == [str(post_2.id), str(post_3.id)]
+    assert related[0]["score"] == pytest.approx(1)
+    assert related[1]["score"] == pytest.approx(1 / 2 ** 0.5)
+
+    await async_session.exec(delete(Job))
+    await async_session.commit()
+    response = await async_client.post(
+        "/posts/bulk_tag",
+        json={"posts_ids": [str(post_4.id)], "tags_ids": [str(tag_1.id), str(tag_2.id)]},
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    job = (await async_session.exec(select(Job))).one()
+    assert (job.type, job.payload) == (JobType.related_posts, {"posts_ids": [str(post_4.id)]})
+    # Neighbours of the post with new tags are recomputed as well
+    await refresh_related_posts(async_session, job.payload)
+
+    response = await async_client.get(f"/posts/{post_1.id}/related", params={"limit": 2})
+
+    assert [post["id"] for post in response.json()["data"]] == [str(post_2.id), str(post_4.id)]
+
+
+@pytest.mark.asyncio
+async def test__get_related_posts_404(
+    async_client: AsyncClient,
+):
+    post_id = uuid.uuid4()
+
+    response = await async_client.get(f"/posts/{post_id}/related")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
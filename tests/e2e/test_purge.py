@@ -0,0 +1,262 @@
+import uuid
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlmodel import select
+
+from dw_blog.models.blog import Blog, BlogLikes
+from dw_blog.models.comment import Comment
+from dw_blog.models.post import Post, PostAuthors, PostLikers
+from dw_blog.models.related import BlogRelated
+from dw_blog.models.tag import Tag
+from dw_blog.models.user import User
+from dw_blog.queries.purge import ANONYMISED_COMMENT_TEXT
+from dw_blog.schemas.common import UserType
+from dw_blog.services import purge as purge_service
+from dw_blog.services.purge import PurgeService
+from dw_blog.utils.auth import create_access_token
+from dw_blog.utils.storage import content_path
+from tests.conftest import _add_author_to_blog, _add_blog, _add_likers_to_blog, _add_post, _add_tag, _add_user
+from tests.e2e.test_comment import _add_comment
+from tests.e2e.test_image import CONTENT, _upload_image, images_dir  # noqa: F401
+from tests.factories import ADMIN_ID
+
+
+async def _run_purge(async_session, purge_id):
+    purge_service = PurgeService(async_session)
+    purge = await purge_service.claim(purge_id=purge_id)
+    assert purge is not None
+    # Small chunks, so that tables are purged in a few chunks
+    await purge_service.run(purge, chunk_size=2, throttle=0)
+
+
+@pytest.mark.asyncio
+async def test__delete_blog_202_purged(
+    async_client: AsyncClient,
+    access_token,
+    async_session,
+):
+    blog_1 = await _add_blog(async_session)
+    await _add_author_to_blog(async_session, user_id=ADMIN_ID, blog_id=blog_1.id)
+    liker = await _add_user(async_session, user_type=UserType.regular)
+    await _add_likers_to_blog(async_session, user_id=liker.id, blog_id=blog_1.id)
+    await _add_tag(async_session, name="#purge_test", blog=blog_1, blog_id=blog_1.id)
+    posts = [await _add_post(async_session, blog_id=blog_1.id) for _ in range(3)]
+    comment = await _add_comment(async_client, access_token, posts[0].id)
+    await _add_comment(async_client, access_token, posts[0].id, parent_id=comment["id"])
+    # Neighbour table of blogs has no foreign keys, its rows are purged too
+    blog_2 = await _add_blog(async_session)
+    async_session.add(BlogRelated(blog_id=blog_1.id, related_blog_id=blog_2.id, score=1))
+    async_session.add(BlogRelated(blog_id=blog_2.id, related_blog_id=blog_1.id, score=1))
+    await async_session.commit()
+
+    response = await async_client.delete(
+        f"/blogs/{blog_1.id}", headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    purge = response.json()
+    assert response.headers["location"] == f"/purges/{purge['id']}"
+    assert purge["status"] == "pending"
+    assert purge["steps_done"] == 0
+    # Deleted blog and its posts are hidden before the purge
+    assert (await async_client.get(f"/blogs/{blog_1.id}")).status_code == status.HTTP_404_NOT_FOUND
+    assert (await async_client.get(f"/posts/{posts[0].id}")).status_code == status.HTTP_404_NOT_FOUND
+
+    await _run_purge(async_session, purge["id"])
+
+    response = await async_client.get(
+        f"/purges/{purge['id']}", headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == "done"
+    assert response.json()["steps_done"] == response.json()["steps_total"]
+    assert response.json()["current_table"] is None
+    assert response.json()["rows_deleted"] > 0
+    for model, where in [
+        (Blog, Blog.id == blog_1.id),
+        (BlogLikes, BlogLikes.blog_id == blog_1.id),
+        (Tag, Tag.blog_id == blog_1.id),
+        (Post, Post.blog_id == blog_1.id),
+        (Comment, Comment.post_id == posts[0].id),
+        (BlogRelated, BlogRelated.blog_id == blog_1.id),
+        (BlogRelated, BlogRelated.related_blog_id == blog_1.id),
+    ]:
+        result = await async_session.exec(select(model).where(where))
+        assert result.first() is None
+
+
+@pytest.mark.asyncio
+async def test__delete_blog_202_image_files_removed(
+    async_client: AsyncClient,
+    access_token,
+    async_session,
+    images_dir,
+    monkeypatch,
+):
+    monkeypatch.setattr(purge_service.settings, "IMAGES_DIR", images_dir)
+    blog_1 = await _add_blog(async_session)
+    blog_2 = await _add_blog(async_session)
+    await _add_author_to_blog(async_session, user_id=ADMIN_ID, blog_id=blog_1.id)
+    post_1 = await _add_post(async_session, blog_id=blog_1.id)
+    post_2 = await _add_post(async_session, blog_id=blog_2.id)
+    own_content = CONTENT + b"own"
+    own_hash = (await _upload_image(async_client, access_token, post_1.id, content=own_content)).json()["hash"]
+    shared_hash = (await _upload_image(async_client, access_token, post_1.id)).json()["hash"]
+    await _upload_image(async_client, access_token, post_2.id)
+
+    response = await async_client.delete(
+        f"/blogs/{blog_1.id}", headers={"Authorization": f"Bearer {access_token}"},
+    )
+    await _run_purge(async_session, response.json()["id"])
+
+    # File used by an image of other blog is kept
+    assert not content_path(images_dir, own_hash).exists()
+    assert content_path(images_dir, shared_hash).is_file()
+
+
+@pytest.mark.asyncio
+async def test__delete_user_202_comment_threads_purged(
+    async_client: AsyncClient,
+    access_token,
+    async_session,
+):
+    blog_1 = await _add_blog(async_session)
+    post_1 = await _add_post(async_session, blog_id=blog_1.id)
+    user = await _add_user(async_session, user_type=UserType.regular)
+    user_token = create_access_token(user_id=user.id, user_type=UserType.regular)
+    admin_comment = await _add_comment(async_client, access_token, post_1.id)
+    user_reply = await _add_comment(async_client, user_token, post_1.id, parent_id=admin_comment["id"])
+    admin_reply = await _add_comment(async_client, access_token, post_1.id, parent_id=user_reply["id"])
+    user_own_reply = await _add_comment(async_client, user_token, post_1.id, parent_id=admin_comment["id"])
+    await _add_comment(async_client, user_token, post_1.id, parent_id=user_own_reply["id"])
+    await _add_comment(async_client, user_token, post_1.id)
+
+    response = await async_client.request(
+        "DELETE",
+        "/users",
+        json={"user_id": str(user.id)},
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.json()["entity"] == "user"
+
+    await _run_purge(async_session, response.json()["id"])
+
+    # Threads of the user alone are removed, comments with replies of others are anonymised
+    result = await async_session.exec(select(Comment.id).where(Comment.post_id == post_1.id))
+    assert {str(comment_id) for comment_id in result.all()} == {
+        admin_comment["id"], user_reply["id"], admin_reply["id"],
+    }
+    response = await async_client.get(f"/comments/{admin_comment['id']}")
+    assert response.json()["replies_count"] == 1
+    response = await async_client.get(f"/comments/{user_reply['id']}")
+    assert response.status_code == status.HTTP_200_OK
+    assert (response.json()["author_id"], response.json()["author_nickname"]) == (None, None)
+    assert response.json()["text"] == ANONYMISED_COMMENT_TEXT
+    assert response.json()["replies_count"] == 1
+    result = await async_session.exec(select(Post.comments_count).where(Post.id == post_1.id))
+    assert result.one() == 3
+    result = await async_session.exec(select(User).where(User.id == user.id))
+    assert result.first() is None
+
+
+@pytest.mark.asyncio
+async def test__delete_user_202_hidden(
+    async_client: AsyncClient,
+    access_token,
+    async_session,
+):
+    blog_1 = await _add_blog(async_session)
+    post_1 = await _add_post(async_session, blog_id=blog_1.id)
+    user = await _add_user(async_session, user_type=UserType.regular)
+    user_token = create_access_token(user_id=user.id, user_type=UserType.regular)
+    await _add_author_to_blog(async_session, user_id=user.id, blog_id=blog_1.id)
+    await _add_likers_to_blog(async_session, user_id=user.id, blog_id=blog_1.id)
+    async_session.add(PostAuthors(post_id=post_1.id, author_id=user.id))
+    async_session.add(PostLikers(post_id=post_1.id, liker_id=user.id))
+    await async_session.commit()
+    # Relations of the post are loaded by the request, not taken from the session
+    blog_id, post_id, user_id = blog_1.id, post_1.id, user.id
+    async_session.expire_all()
+
+    response = await async_client.request(
+        "DELETE",
+        "/users",
+        json={"user_id": str(user_id)},
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    # Deleted user is hidden and signed out before the purge
+    response = await async_client.get(f"/blogs/{blog_id}")
+    assert str(user_id) not in [author["author_id"] for author in response.json()["authors"]]
+    assert str(user_id) not in [liker["liker_id"] for liker in response.json()["likers"]]
+    response = await async_client.get(f"/posts/{post_id}")
+    assert str(user_id) not in [author["id"] for author in response.json()["authors"]]
+    assert str(user_id) not in [liker["id"] for liker in response.json()["likers"]]
+    response = await async_client.patch(
+        f"/users/{user_id}",
+        json={"description": "Still here"},
+        headers={"Authorization": f"Bearer {user_token}"},
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test__delete_tag_202_hidden(
+    async_client: AsyncClient,
+    access_token,
+    async_session,
+):
+    blog_1 = await _add_blog(async_session)
+    await _add_author_to_blog(async_session, user_id=ADMIN_ID, blog_id=blog_1.id)
+    tag_1 = await _add_tag(async_session, name="#purge_hidden", blog=blog_1, blog_id=blog_1.id)
+
+    response = await async_client.delete(
+        f"/tags/{tag_1.id}", headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert (await async_client.get(f"/tags/{tag_1.id}")).status_code == status.HTTP_404_NOT_FOUND
+    response = await async_client.delete(
+        f"/tags/{tag_1.id}", headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test__get_purge_403_other_user(
+    async_client: AsyncClient,
+    access_token,
+    other_user_access_token,
+    async_session,
+):
+    blog_1 = await _add_blog(async_session)
+    await _add_author_to_blog(async_session, user_id=ADMIN_ID, blog_id=blog_1.id)
+    response = await async_client.delete(
+        f"/blogs/{blog_1.id}", headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    response = await async_client.get(
+        f"/purges/{response.json()['id']}", headers={"Authorization": f"Bearer {other_user_access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.asyncio
+async def test__get_purge_404(
+    async_client: AsyncClient,
+    access_token,
+):
+    purge_id = uuid.uuid4()
+
+    response = await async_client.get(
+        f"/purges/{purge_id}", headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json()["detail"] == f"Purge {purge_id} not found!"
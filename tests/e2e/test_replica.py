@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from dw_blog.db import db
+from dw_blog.db.replica import ReplicaRouter
+from tests.conftest import async_engine, db_url_test
+
+
+@pytest.mark.asyncio
+async def test__replica_router_reads_from_replica():
+    replica = create_async_engine(db_url_test)
+    router = ReplicaRouter(primary=async_engine, replicas=[replica], sticky_seconds=5, max_lag=5)
+
+    await router.check_lag()
+
+    assert router.healthy == [replica]
+    assert router.get_engine(read_only=True, user_id="reader") is replica
+    assert router.get_engine(read_only=False, user_id="reader") is async_engine
+    await replica.dispose()
+
+
+@pytest.mark.asyncio
+async def test__replica_router_sticks_writer_to_primary():
+    replica = create_async_engine(db_url_test)
+    router = ReplicaRouter(primary=async_engine, replicas=[replica], sticky_seconds=5, max_lag=5)
+
+    router.mark_write("writer")
+
+    assert router.get_engine(read_only=True, user_id="writer") is async_engine
+    assert router.get_engine(read_only=True, user_id="reader") is replica
+    assert router.get_engine(read_only=True) is replica
+    await replica.dispose()
+
+
+@pytest.mark.asyncio
+async def test__replica_router_unreachable_replica_out_of_rotation():
+    replica = create_async_engine(db_url_test.replace(db_url_test.rsplit("/", 1)[-1], "nonexistent_replica_db"))
+    router = ReplicaRouter(primary=async_engine, replicas=[replica], sticky_seconds=5, max_lag=5)
+
+    await router.check_lag()
+
+    assert router.healthy == []
+    assert router.get_engine(read_only=True, user_id="reader") is async_engine
+    await replica.dispose()
+
+
+@pytest.mark.asyncio
+async def test__warm_up_db_unreachable_replica(monkeypatch):
+    replica = create_async_engine(db_url_test.replace(db_url_test.rsplit("/", 1)[-1], "nonexistent_replica_db"))
+    monkeypatch.setattr(db, "engine", async_engine)
+    monkeypatch.setattr(db, "replica_engines", [replica])
+
+    await db.warm_up_db()
+
+    assert async_engine.pool.checkedin() >= db.settings.DB_POOL_SIZE
+    await replica.dispose()
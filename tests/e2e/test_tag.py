@@ -400,6 +400,39 @@ async def test__update_tag_200_name(
     assert response.json()["name"] == payload["name"]
 
 
+async def test__update_tag_409_stale_version(
+    async_client: AsyncClient,
+    access_token,
+    async_session,
+):
+    blog_1 = await _add_blog(async_session)
+    tag_1 = await _add_tag(async_session, name="#update_test_409", blog=blog_1, blog_id=blog_1.id)
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    read = await async_client.get(f"/tags/{tag_1.id}")
+    first = await async_client.patch(
+        f"/tags/{tag_1.id}",
+        json={"name": "#first_change"},
+        headers={**headers, "If-Match": read.headers["etag"]},
+    )
+    second = await async_client.patch(
+        f"/tags/{tag_1.id}",
+        json={"name": "#second_change"},
+        headers={**headers, "If-Match": read.headers["etag"]},
+    )
+
+    version = read.json()["version"]
+    assert read.headers["etag"] == f'"{version}"'
+    assert first.status_code == status.HTTP_200_OK
+    assert first.json()["version"] == version + 1
+    assert first.headers["etag"] == f'"{version + 1}"'
+    assert second.status_code == status.HTTP_409_CONFLICT
+    assert second.json()["detail"] == (
+        f"The tag {tag_1.id} was modified since it was read, read it again and retry!"
+    )
+    assert (await async_client.get(f"/tags/{tag_1.id}")).json()["name"] == "#first_change"
+
+
 async def test__update_tag_404_tag_nonexistent(
     async_client: AsyncClient,
     access_token,
@@ -436,7 +469,7 @@ async def test__update_tag_403_other_user_blog(
     assert response.json()["detail"] == "To perform tag update you need either to be an admin or author of the blog!"
 
 
-async def test__delete_blog_200(
+async def test__delete_blog_202(
     async_client: AsyncClient,
     access_token,
     async_session,
@@ -450,7 +483,7 @@ async def test__delete_blog_200(
         headers={"Authorization": f"Bearer {access_token}"},
     )
 
-    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert response.status_code == status.HTTP_202_ACCEPTED
 
 
 async def test__delete_blog_404_tag_nonexistent(
@@ -483,3 +516,23 @@ async def test__delete_blog_403_other_user_blog(
 
     assert response.status_code == status.HTTP_403_FORBIDDEN
     assert response.json()["detail"] == "To perform tag delete you need either to be an admin or author of the blog!"
+
+
+@pytest.mark.asyncio
+async def test__batch_get_tags_200(
+    async_client: AsyncClient,
+    async_session,
+):
+    blog = await _add_blog(async_session)
+    tag = await _add_tag(async_session, blog=blog, blog_id=blog.id)
+    missing_id = str(uuid.uuid4())
+
+    response = await async_client.get(
+        "/tags/batch",
+        params={"ids": [str(tag.id), missing_id]},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["data"][str(tag.id)]["name"] == tag.name
+    assert response.json()["data"][str(tag.id)]["blog_name"] == blog.name
+    assert response.json()["missing"] == [missing_id]
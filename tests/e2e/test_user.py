@@ -1,3 +1,5 @@
+import uuid
+
 import pytest
 from fastapi import status
 from httpx import AsyncClient
@@ -5,6 +7,7 @@ from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from dw_blog.schemas.common import UserType
+from tests.conftest import _add_user
 from tests.factories import ADMIN_ID, ADMIN_TOKEN
 
 
@@ -20,3 +23,22 @@ async def test__get_user_200(
     assert response.status_code == status.HTTP_200_OK
     assert response.json()["user_type"] == UserType.admin.value
     assert response.json()["id"] == ADMIN_ID
+
+
+@pytest.mark.asyncio
+async def test__batch_get_users_200(
+    async_client: AsyncClient,
+    async_session,
+):
+    user = await _add_user(async_session)
+    missing_id = str(uuid.uuid4())
+
+    response = await async_client.get(
+        "/users/batch",
+        params={"ids": [missing_id, str(user.id)]},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["data"][str(user.id)]["nickname"] == user.nickname
+    assert "password" not in response.json()["data"][str(user.id)]
+    assert response.json()["missing"] == [missing_id]
@@ -3,6 +3,7 @@ from datetime import datetime
 import factory.fuzzy
 
 from dw_blog.models.blog import Blog
+from dw_blog.models.post import Post
 from dw_blog.schemas.common import UserType
 from dw_blog.models.tag import Tag
 from dw_blog.models.user import User
@@ -65,6 +66,20 @@ class BlogFactory(factory.Factory):
     tags = []
 
 
+class PostFactory(factory.Factory):
+    class Meta:
+        model = Post
+
+    id = factory.Faker("uuid4")
+    title = factory.Sequence(lambda n: f"Post title {n}")
+    body = factory.fuzzy.FuzzyText(prefix="Body", length=60)
+    published = True
+    date_created = datetime.now()
+    date_modified = datetime.now()
+    authors = factory.List([factory.SubFactory(UserFactory)])
+    tags = []
+
+
 # factory.fuzzy.FuzzyInteger(1,5)
 # factory.fuzzy.FuzzyInteger(1,5)
 # factory.fuzzy.FuzzyInteger(1,5)
@@ -0,0 +1,98 @@
+import json
+import os
+import random
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy_utils import create_database, database_exists, drop_database
+from sqlmodel import SQLModel
+
+from benchmarks.index_audit import seed
+from dw_blog.config import Settings
+from dw_blog.queries.category import refresh_category_stats_query
+from dw_blog.queries.related import (create_related_blogs_staging_queries, index_related_blogs_staging_queries,
+                                     refresh_related_blogs_query, refresh_related_posts_query,
+                                     swap_related_blogs_queries)
+
+settings = Settings()
+db_url_plans = f"{settings.DATABASE_URL_TEST}_plans"
+db_url_plans_sync = f"{settings.DATABASE_URL_TEST_SYNC}_plans"
+
+BASELINES_PATH = Path(__file__).parent / "baselines.json"
+UPDATE_BASELINES = bool(os.getenv("UPDATE_PLAN_BASELINES"))
+
+DATASET = {"user": 5000, "blog": 5000, "category": 1000, "tag": 5000, "post": 20000}
+SEED = 2137
+# Plans don't depend on configuration of the server, statistics are
+# computed from all rows (up to 300 * target), so they are the same on every run
+SERVER_SETTINGS = {
+    "jit": "off",
+    "max_parallel_workers_per_gather": "0",
+    "work_mem": "4MB",
+    "default_statistics_target": "1000",
+}
+
+
+@pytest.fixture(scope="session")
+async def plans_db():
+    """Creates database with the generated dataset, yields its engine
+    and ids of inserted rows
+    """
+    sync_engine = create_engine(db_url_plans_sync)
+    if database_exists(sync_engine.url):
+        drop_database(sync_engine.url)
+    create_database(sync_engine.url)
+
+    engine = create_async_engine(db_url_plans, connect_args={"server_settings": SERVER_SETTINGS})
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+        ids = await seed(connection, dataset=DATASET, rng=random.Random(SEED))
+        await connection.execute(refresh_category_stats_query(top_blogs=settings.CATEGORY_TOP_BLOGS))
+        await connection.execute(refresh_related_posts_query(
+            top_k=settings.RELATED_POSTS_TOP_K,
+            tag_weight=settings.RELATED_POSTS_TAG_WEIGHT,
+            like_weight=settings.RELATED_POSTS_LIKE_WEIGHT,
+        ))
+        for q in create_related_blogs_staging_queries():
+            await connection.execute(q)
+        await connection.execute(refresh_related_blogs_query(
+            top_k=settings.RELATED_BLOGS_TOP_K,
+            like_weight=settings.RELATED_BLOGS_LIKE_WEIGHT,
+            subscribe_weight=settings.RELATED_BLOGS_SUBSCRIBE_WEIGHT,
+            user_interactions_max=settings.RELATED_BLOGS_USER_INTERACTIONS_MAX,
+        ))
+        for q in [*index_related_blogs_staging_queries(), *swap_related_blogs_queries()]:
+            await connection.execute(q)
+    # Visibility map is set as well, so that index only scans are planned as in production
+    async with engine.connect() as connection:
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.execute(text("VACUUM ANALYZE"))
+
+    yield engine, ids
+
+    await engine.dispose()
+    drop_database(sync_engine.url)
+
+
+@pytest.fixture(scope="session")
+async def plans_baselines(plans_db):
+    """Yields checked in baselines, with UPDATE_PLAN_BASELINES set
+    captured plans are written back at the end of the session
+    """
+    engine, _ = plans_db
+    async with engine.connect() as connection:
+        server_version = int((await connection.execute(text("SHOW server_version_num"))).scalar()) // 10000
+
+    baselines = json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.is_file() else {}
+    if UPDATE_BASELINES:
+        baselines = {"postgres": server_version, "plans": {}}
+    elif baselines.get("postgres") != server_version:
+        pytest.skip(f"Plan baselines were captured on Postgres {baselines.get('postgres')}, not {server_version}")
+
+    yield baselines["plans"]
+
+    if UPDATE_BASELINES:
+        baselines["plans"] = dict(sorted(baselines["plans"].items()))
+        BASELINES_PATH.write_text(json.dumps(baselines, indent=2) + "\n")
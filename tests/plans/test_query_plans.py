@@ -0,0 +1,305 @@
+"""Plan regression tests of the query builders. Every filter and every
+sort of the listings and the single entity queries are run with
+EXPLAIN (ANALYZE, BUFFERS) against the generated dataset. A test fails on:
+- sequential scan of a table bigger than MIN_ROWS, unless the listing
+  is sorted by values computed for every row,
+- sort or hash spilled to disk,
+- plan shape different from the baseline,
+- estimated cost or buffers read grown by more than MAX_GROWTH.
+
+After intended changes of queries or indexes, capture new baselines with
+`UPDATE_PLAN_BASELINES=1 pytest tests/plans` and commit baselines.json.
+"""
+import json
+from functools import partial
+from typing import Callable, Dict, FrozenSet, Iterator, Tuple
+
+import pytest
+from sqlalchemy import text
+
+from benchmarks.index_audit import MIN_ROWS, seq_scans
+from dw_blog.config import Settings
+from dw_blog.queries.blog import (
+    check_like_query,
+    check_subscription_query,
+    count_blog_authors_query,
+    get_authors_blogs_query,
+    get_batch_blogs_query,
+    get_listed_blogs_query,
+    get_single_blog_query,
+    is_author_query,
+)
+from dw_blog.queries.category import (
+    get_blogs_for_category_query,
+    get_categories_query,
+    get_listed_categories_query,
+    get_single_category_query,
+)
+from dw_blog.queries.post import get_listed_posts_query, get_listed_user_posts_query, get_posts_permissions_query
+from dw_blog.queries.related import get_recommended_blogs_query, get_related_posts_query, refresh_related_posts_query
+from dw_blog.queries.tag import (
+    get_batch_tags_query,
+    get_listed_tags_query,
+    get_single_tag_query,
+    get_tags_blogs_query,
+    tag_subscription_query,
+)
+from dw_blog.schemas.blog import SortBlogBy
+from dw_blog.schemas.category import SortCategoryBy
+from dw_blog.schemas.common import SortOrder
+from dw_blog.schemas.post import SortPostBy
+from dw_blog.schemas.tag import SortTagBy
+from tests.plans.conftest import UPDATE_BASELINES
+
+settings = Settings()
+
+MAX_GROWTH = 0.2
+# Buffers of small plans change by a few pages with layout of the data
+BUFFERS_SLACK = 10
+PAGE = {"limit": 10, "offset": 0}
+
+# Listings sorted by values computed for every row have to read the whole
+# tables, posts are joined with their blogs and categories with their stats
+# before sorting
+COMPUTED_SORTS = {
+    "blogs": (frozenset({"blog"}), {SortBlogBy.likers, SortBlogBy.subscribers}),
+    "posts": (frozenset({"post", "blog"}), {SortPostBy.likers, SortPostBy.title}),
+    "tags": (frozenset({"tag"}), {SortTagBy.most_subscribers}),
+    "categories": (
+        frozenset({"category", "categorystats"}),
+        {SortCategoryBy.most_blogs, SortCategoryBy.blogs_with_most_likes},
+    ),
+}
+
+# Filters of the listings, values are taken from the generated dataset
+LISTINGS = {
+    "blogs": (get_listed_blogs_query, SortBlogBy, {}, {
+        "blog_name": lambda values: "Audit",
+        "author_id": lambda values: values["author_id"],
+        "archived": lambda values: True,
+        "active": lambda values: False,
+        "categories_ids": lambda values: [values["category_id"]],
+    }),
+    "posts": (get_listed_posts_query, SortPostBy, {"published": True}, {
+        "blog_id": lambda values: values["blog_id"],
+        "unpublished": lambda values: False,
+        "authors_ids": lambda values: [values["post_author_id"]],
+        "tags_ids": lambda values: [values["tag_id"]],
+        "title_search": lambda values: "Audit",
+        "body_search": lambda values: "bbb",
+    }),
+    "tags": (get_listed_tags_query, SortTagBy, {}, {
+        "user_id": lambda values: values["subscriber_id"],
+        "blog_id": lambda values: values["blog_id"],
+        "tag_name": lambda values: "Audit",
+    }),
+    "categories": (get_listed_categories_query, SortCategoryBy, {}, {
+        "category_name": lambda values: "Audit",
+        "approved": lambda values: True,
+    }),
+}
+# Filters of the API which are passed to the builder under other name
+FILTER_ARGUMENTS = {"active": "archived", "unpublished": "published"}
+
+SINGLE_QUERIES = {
+    "single blog": lambda values: get_single_blog_query(blog_id=values["blog_id"]),
+    "batch blogs": lambda values: get_batch_blogs_query(blog_ids=values["blog_ids"]),
+    "authors blogs": lambda values: get_authors_blogs_query(
+        authors_ids=values["user_ids"],
+        blog_id=values["blog_id"],
+    ),
+    "blog authors count": lambda values: count_blog_authors_query(blog_id=values["blog_id"]),
+    "is author": lambda values: is_author_query(blog_id=values["blog_id"], author_id=values["author_id"]),
+    "blog like": lambda values: check_like_query(blog_id=values["blog_id"], current_user=values["current_user"]),
+    "blog subscription": lambda values: check_subscription_query(
+        blog_id=values["blog_id"],
+        current_user=values["current_user"],
+    ),
+    "single category": lambda values: get_single_category_query(category_id=values["category_id"]),
+    "category blogs": lambda values: get_blogs_for_category_query(category_id=values["category_id"]),
+    "categories": lambda values: get_categories_query(categories_ids=values["category_ids"]),
+    "single tag": lambda values: get_single_tag_query(tag_id=values["tag_id"]),
+    "batch tags": lambda values: get_batch_tags_query(tag_ids=values["tag_ids"]),
+    "tags blogs": lambda values: get_tags_blogs_query(tag_ids=values["tag_ids"]),
+    "tag subscription": lambda values: tag_subscription_query(
+        tag_id=values["tag_id"],
+        current_user=values["current_user"],
+    ),
+    "posts permissions": lambda values: get_posts_permissions_query(
+        posts_ids=values["post_ids"],
+        user_id=values["author_id"],
+    ),
+    "related posts": lambda values: get_related_posts_query(post_id=values["post_id"], limit=5),
+    "related posts refresh": lambda values: refresh_related_posts_query(
+        top_k=settings.RELATED_POSTS_TOP_K,
+        tag_weight=settings.RELATED_POSTS_TAG_WEIGHT,
+        like_weight=settings.RELATED_POSTS_LIKE_WEIGHT,
+        posts_ids=values["post_ids"],
+    ),
+    "recommended blogs": lambda values: get_recommended_blogs_query(
+        user_id=values["liker_id"],
+        like_weight=settings.RELATED_BLOGS_LIKE_WEIGHT,
+        subscribe_weight=settings.RELATED_BLOGS_SUBSCRIBE_WEIGHT,
+        user_interactions_max=settings.RELATED_BLOGS_USER_INTERACTIONS_MAX,
+        limit=10,
+    ),
+}
+
+# Neighbours of the blogs of a user are a sizeable share of the blogs of
+# the dataset, so blogs are hashed instead of looked up one by one
+SINGLE_QUERIES_SCANS = {"recommended blogs": frozenset({"blog"})}
+
+
+def _listing(builder: Callable, kwargs: dict, filters: Dict[str, Callable], values: dict) -> Tuple:
+    kwargs = {**kwargs, **{argument: value(values) for argument, value in filters.items()}}
+    q_pag, _, params = builder(**PAGE, **kwargs)
+    return q_pag, params
+
+
+def _user_posts(liked: bool, values: dict) -> Tuple:
+    q_pag, _, params = get_listed_user_posts_query(user_id=values["author_id"], liked=liked)
+    return q_pag, params
+
+
+def _variants() -> Iterator[Tuple[str, Callable, FrozenSet[str]]]:
+    """Yields name, builder of query and params from the dataset values
+    and the tables allowed to be scanned of every variant
+    """
+    for listing, (builder, sort_enum, defaults, filters) in LISTINGS.items():
+        scanned_tables, computed_sorts = COMPUTED_SORTS.get(listing, (frozenset(), set()))
+        for filter_name in [None, *filters]:
+            # Both directions are checked without filters, with filters they are planned the same
+            if filter_name is None:
+                sort_orders, variant_filters = [SortOrder.ascending, SortOrder.descending], {}
+            else:
+                sort_orders = [SortOrder.descending]
+                variant_filters = {FILTER_ARGUMENTS.get(filter_name, filter_name): filters[filter_name]}
+            for sort_by in sort_enum:
+                for sort_order in sort_orders:
+                    kwargs = {**defaults, "sort_by": sort_by, "sort_order": sort_order}
+                    yield (
+                        f"{listing}, {filter_name or 'all'}, {sort_by.value} {sort_order.value}",
+                        partial(_listing, builder, kwargs, variant_filters),
+                        scanned_tables if sort_by in computed_sorts else frozenset(),
+                    )
+    for liked in (True, False):
+        yield f"user posts, liked {liked}", partial(_user_posts, liked), frozenset()
+    for name, query in SINGLE_QUERIES.items():
+        yield name, lambda values, query=query: (query(values), None), SINGLE_QUERIES_SCANS.get(name, frozenset())
+
+
+VARIANTS = {name: (build, scanned_tables) for name, build, scanned_tables in _variants()}
+
+
+def plan_shape(plan: dict, depth: int = 0) -> Iterator[str]:
+    node = plan["Node Type"]
+    if "Relation Name" in plan:
+        node += f" on {plan['Relation Name']}"
+    if "Index Name" in plan:
+        node += f" using {plan['Index Name']}"
+    if "Subplan Name" in plan:
+        node += f" ({plan['Subplan Name']})"
+    yield "  " * depth + node
+    for child in plan.get("Plans", []):
+        yield from plan_shape(child, depth + 1)
+
+
+def spills(plan: dict) -> Iterator[str]:
+    if plan.get("Sort Space Type") == "Disk":
+        yield f"{plan['Node Type']} ({plan['Sort Method']})"
+    if plan.get("Hash Batches", 1) > 1 or plan.get("Original Hash Batches", 1) > 1:
+        yield f"{plan['Node Type']} ({plan['Hash Batches']} batches)"
+    for child in plan.get("Plans", []):
+        yield from spills(child)
+
+
+@pytest.fixture(scope="session")
+async def plans_values(plans_db) -> Dict:
+    """Filter values matching rows of the generated dataset"""
+    engine, ids = plans_db
+    async with engine.connect() as connection:
+        async def first(sql: str, **params):
+            return (await connection.execute(text(sql), params)).scalar()
+
+        blog_id = ids["blog"][0]
+        post_id = await first("SELECT id FROM post WHERE blog_id = :blog_id ORDER BY id LIMIT 1", blog_id=blog_id)
+        tag_id = await first("SELECT tag_id FROM tagposts WHERE post_id = :post_id ORDER BY 1 LIMIT 1", post_id=post_id)
+        author_id = await first("SELECT author_id FROM blogauthors WHERE blog_id = :id ORDER BY 1 LIMIT 1", id=blog_id)
+        return {
+            "blog_id": blog_id,
+            "post_id": post_id,
+            "blog_ids": ids["blog"][:10],
+            "post_ids": ids["post"][:10],
+            "user_ids": ids["user"][:5],
+            "category_ids": ids["category"][:3],
+            "tag_id": tag_id,
+            "tag_ids": ids["tag"][:10],
+            "author_id": author_id,
+            "current_user": {"user_id": author_id},
+            "post_author_id": await first(
+                "SELECT author_id FROM postauthors WHERE post_id = :post_id ORDER BY 1 LIMIT 1",
+                post_id=post_id,
+            ),
+            "subscriber_id": await first(
+                "SELECT subscriber_id FROM tagsubscribers WHERE tag_id = :tag_id ORDER BY 1 LIMIT 1",
+                tag_id=tag_id,
+            ),
+            "category_id": await first(
+                "SELECT category_id FROM categoryblogs WHERE blog_id = :blog_id ORDER BY 1 LIMIT 1",
+                blog_id=blog_id,
+            ),
+            "liker_id": await first(
+                "SELECT liker_id FROM bloglikes WHERE blog_id = :blog_id ORDER BY 1 LIMIT 1",
+                blog_id=blog_id,
+            ),
+        }
+
+
+@pytest.fixture(scope="session")
+async def table_sizes(plans_db) -> Dict[str, float]:
+    engine, _ = plans_db
+    async with engine.connect() as connection:
+        result = await connection.execute(text(
+            "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace"
+        ))
+        return dict(result.all())
+
+
+async def _explain(engine, q, params) -> dict:
+    async with engine.connect() as connection:
+        compiled = q.compile(dialect=connection.dialect)
+        values = compiled.construct_params(params)
+        result = await connection.exec_driver_sql(
+            f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {compiled}",
+            [tuple(values[key] for key in compiled.positiontup)],
+        )
+        plan = result.scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return plan[0]["Plan"]
+
+
+@pytest.mark.parametrize("name", list(VARIANTS))
+async def test__query_plan(name, plans_db, plans_values, table_sizes, plans_baselines):
+    engine, _ = plans_db
+    build, scanned_tables = VARIANTS[name]
+    q, params = build(plans_values)
+
+    plan = await _explain(engine, q, params)
+    captured = {
+        "shape": list(plan_shape(plan)),
+        "cost": plan["Total Cost"],
+        "buffers": plan["Shared Hit Blocks"] + plan["Shared Read Blocks"],
+    }
+
+    scanned = {table for table in seq_scans(plan) if table_sizes.get(table, 0) >= MIN_ROWS} - scanned_tables
+    assert not scanned, f"Sequential scan of {', '.join(sorted(scanned))}"
+    assert not list(spills(plan)), f"Spilled to disk: {', '.join(spills(plan))}"
+    if UPDATE_BASELINES:
+        plans_baselines[name] = captured
+        return
+
+    assert name in plans_baselines, "No baseline, capture it with UPDATE_PLAN_BASELINES=1"
+    baseline = plans_baselines[name]
+    assert captured["shape"] == baseline["shape"]
+    assert captured["cost"] <= baseline["cost"] * (1 + MAX_GROWTH)
+    assert captured["buffers"] <= baseline["buffers"] * (1 + MAX_GROWTH) + BUFFERS_SLACK